@@ -143,10 +143,41 @@ STATIC_URL = "/static/"
 STATIC_ROOT = os.getenv("STATIC_ROOT", str(BASE_DIR / "staticfiles"))
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Cache: по умолчанию in-process; для нескольких воркеров задайте общий бэкенд через env
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+        "LOCATION": os.getenv("CACHE_LOCATION", "cedar-default"),
+    }
+}
+
 # === Recordings & media serving (DEV) ===
 RECORDING_STORAGE = os.getenv("RECORDING_STORAGE", "LOCAL").upper()  # LOCAL | SFTP
 RECORDING_LOCAL_DIR = os.getenv("RECORDING_LOCAL_DIR", "/app/recordings")
 RECORDING_WEBHOOK_SECRET = os.getenv("RECORDING_WEBHOOK_SECRET", "dev-webhook-secret")
+# Временные .part-файлы воркера recording_ingest (докачка по HTTP Range)
+RECORDING_INGEST_DIR = os.getenv("RECORDING_INGEST_DIR", "/tmp/cedar-ingest")
+# /api/rooms/{id}/recording/stream/: префикс internal-location nginx для X-Accel-Redirect
+# (пусто — Django отдаёт файл сам, с Range и sendfile) и срок жизни подписанных ссылок
+RECORDING_ACCEL_REDIRECT_PREFIX = os.getenv("RECORDING_ACCEL_REDIRECT_PREFIX", "")
+RECORDING_URL_TTL_SECS = int(os.getenv("RECORDING_URL_TTL_SECS", str(6 * 3600)))
+# SSE /api/rooms/events/: опрос журнала событий без PostgreSQL LISTEN, heartbeat,
+# срок жизни подписанной ссылки на поток и хранение журнала
+EVENTS_POLL_INTERVAL_SECS = float(os.getenv("EVENTS_POLL_INTERVAL_SECS", "1.0"))
+EVENTS_HEARTBEAT_SECS = int(os.getenv("EVENTS_HEARTBEAT_SECS", "15"))
+EVENTS_URL_TTL_SECS = int(os.getenv("EVENTS_URL_TTL_SECS", str(12 * 3600)))
+EVENTS_RETENTION_HOURS = int(os.getenv("EVENTS_RETENTION_HOURS", "24"))
+# Присутствие и автоматическая посещаемость: секрет вебхука Jitsi (X-Presence-Secret),
+# порог опоздания и минимальная доля урока для «присутствовал»
+JITSI_PRESENCE_SECRET = os.getenv("JITSI_PRESENCE_SECRET", "dev-presence-secret")
+ATTENDANCE_LATE_GRACE_MIN = int(os.getenv("ATTENDANCE_LATE_GRACE_MIN", "5"))
+ATTENDANCE_MIN_PRESENCE_RATIO = float(os.getenv("ATTENDANCE_MIN_PRESENCE_RATIO", "0.25"))
+# История черновиков: полный снимок каждые N шагов и сколько шагов хранить для undo
+DRAFT_HISTORY_CHECKPOINT_EVERY = int(os.getenv("DRAFT_HISTORY_CHECKPOINT_EVERY", "20"))
+DRAFT_HISTORY_LIMIT = int(os.getenv("DRAFT_HISTORY_LIMIT", "200"))
+# Солвер шаблонной недели (воркер draft_solver): бюджет времени по умолчанию/максимум, сек
+TEMPLATE_SOLVER_TIME_BUDGET = int(os.getenv("TEMPLATE_SOLVER_TIME_BUDGET", "120"))
+TEMPLATE_SOLVER_MAX_TIME_BUDGET = int(os.getenv("TEMPLATE_SOLVER_MAX_TIME_BUDGET", "900"))
 # In DEV we can serve recordings via Django without Nginx
 SERVE_RECORDINGS_VIA_DJANGO = env_bool("SERVE_RECORDINGS_VIA_DJANGO", DEBUG)
 
@@ -4,10 +4,10 @@ URL configuration for config project.
 from django.http import JsonResponse
 import os, datetime
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.conf import settings
-from django.conf.urls.static import static
 from schedule.webinar.views_dev import DevMakeDummyRecordingView
+from schedule.webinar.views_rooms import RecordingFileView
 
 def health(_request):
     return JsonResponse({"status": "ok"}, status=200)
@@ -63,9 +63,9 @@ urlpatterns = [
     path("api/auth/", include("users.registration_urls")),
 ]
 
-# In DEV: serve /media/recordings/* directly from RECORDING_LOCAL_DIR
+# In DEV: serve /media/recordings/* from RECORDING_LOCAL_DIR — with the same ACL as recording/stream/
 if getattr(settings, "SERVE_RECORDINGS_VIA_DJANGO", False):
-    urlpatterns += static("/media/recordings/", document_root=settings.RECORDING_LOCAL_DIR)
+    urlpatterns += [re_path(r"^media/recordings/(?P<path>.+)$", RecordingFileView.as_view(), name="recording-file")]
 
 if settings.DEBUG:
     urlpatterns += [ path("api/dev/", include("schedule.webinar.urls_dev")) ]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'schedule.core'
+
+    def ready(self):
+        from . import checks, signals  # noqa
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+from schedule.core.services.shared_cache import is_process_local
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Без DEBUG кэш должен быть общим: иначе прогрев join-payload'ов и инвалидация не доходят до воркеров."""
+    if settings.DEBUG or not is_process_local():
+        return []
+    return [Warning(
+        "CACHES['default'] is process-local (%s)." % settings.CACHES["default"]["BACKEND"],
+        hint="Set CACHE_BACKEND=django.core.cache.backends.redis.RedisCache and CACHE_LOCATION "
+             "so gunicorn workers, webinar_scheduler and background workers share one cache.",
+        id="core.W001",
+    )]
@@ -0,0 +1,152 @@
+# backend/schedule/core/services/availability.py
+"""
+Доступность учителей как битовые маски: на учителя и день недели — int, бит i = слот
+[i*5, i*5+5) минут от полуночи (288 слотов). Окно доступности заполняет только слоты,
+целиком лежащие внутри него; урок занимает все слоты, которых касается.
+
+  доступен ли учитель на урок      — lesson & ~free == 0
+  кто свободен в слот X            — free >> X & 1 по учителям
+  общее свободное время с классом  — free & ~busy(класс)
+
+Маски кэшируются по учителю (одна строка TeacherAvailability меняет только свой ключ,
+сигналы в schedule/core/signals.py — после коммита); промах компилируется одним запросом
+на всех недостающих. Кэш только общий (shared_cache): в LocMem сброс дошёл бы до одного
+процесса, поэтому там маски каждый раз компилируются заново.
+Сетка 5 минут: время не кратное 5 округляется «в безопасную сторону».
+"""
+from __future__ import annotations
+
+import datetime as dt
+from typing import Iterable
+
+from django.core.cache import cache
+
+from schedule.core.models import TeacherAvailability
+from schedule.core.services.shared_cache import is_process_local
+
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+DAYS = 7
+MASKS_TTL = 24 * 60 * 60
+
+
+def _minutes(t: dt.time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def window_mask(start: dt.time, end: dt.time) -> int:
+    """Слоты, целиком внутри окна доступности [start, end]; end 00:00 — до конца дня."""
+    a = -(-_minutes(start) // SLOT_MINUTES)
+    b = (_minutes(end) or 24 * 60) // SLOT_MINUTES
+    return ((1 << b) - (1 << a)) if b > a else 0
+
+
+def lesson_mask(start: dt.time, duration_minutes: int) -> int:
+    """Слоты, которых касается урок; переход через полночь обрезается концом дня."""
+    s = _minutes(start)
+    a = s // SLOT_MINUTES
+    b = min(SLOTS_PER_DAY, -(-(s + duration_minutes) // SLOT_MINUTES))
+    return ((1 << b) - (1 << a)) if b > a else 0
+
+
+def slot_of(t: dt.time) -> int:
+    return _minutes(t) // SLOT_MINUTES
+
+
+def _key(teacher_id: int) -> str:
+    return f"core:availability:{teacher_id}"
+
+
+def invalidate_teacher(teacher_id: int) -> None:
+    cache.delete(_key(teacher_id))
+
+
+def compile_masks(teacher_ids: Iterable[int]) -> dict[int, list[int]]:
+    """Маски по дням для учителей одним запросом; у учителя без окон — нули."""
+    masks = {tid: [0] * DAYS for tid in teacher_ids}
+    if not masks:
+        return masks
+    for tid, day, start, end in (TeacherAvailability.objects.filter(teacher_id__in=list(masks))
+                                 .values_list("teacher_id", "day_of_week", "start_time", "end_time")):
+        if 0 <= day < DAYS:
+            masks[tid][day] |= window_mask(start, end)
+    return masks
+
+
+def teacher_masks(teacher_ids: Iterable[int]) -> dict[int, list[int]]:
+    """Маски из кэша; недостающие компилируются и кладутся в кэш."""
+    ids = set(teacher_ids)
+    if is_process_local():
+        return compile_masks(ids)
+    cached = cache.get_many([_key(t) for t in ids])
+    out = {t: cached[_key(t)] for t in ids if _key(t) in cached}
+    missing = ids - out.keys()
+    if missing:
+        compiled = compile_masks(missing)
+        cache.set_many({_key(t): m for t, m in compiled.items()}, timeout=MASKS_TTL)
+        out.update(compiled)
+    return out
+
+
+class AvailabilityMasks:
+    """Маски набора учителей: проверки — битовые операции без запросов."""
+
+    def __init__(self, masks: dict[int, list[int]]):
+        self.masks = masks
+
+    @classmethod
+    def load(cls, teacher_ids: Iterable[int]) -> "AvailabilityMasks":
+        return cls(teacher_masks(teacher_ids))
+
+    def free(self, teacher_id: int, day: int) -> int:
+        days = self.masks.get(teacher_id)
+        return days[day] if days and 0 <= day < DAYS else 0
+
+    def has_any(self, teacher_id: int) -> bool:
+        """Заданы ли у учителя окна доступности хоть в один день."""
+        return any(self.masks.get(teacher_id, ()))
+
+    def is_available(self, teacher_id: int, day: int, start: dt.time, duration_minutes: int) -> bool:
+        need = lesson_mask(start, duration_minutes)
+        return bool(need) and need & ~self.free(teacher_id, day) == 0
+
+    def free_teachers(self, day: int, slot: int) -> list[int]:
+        """Учителя, свободные в слот slot дня day."""
+        return sorted(t for t in self.masks if self.free(t, day) >> slot & 1)
+
+    def common_free(self, teacher_id: int, day: int, busy: int) -> int:
+        """Свободное время учителя, не занятое busy (например, уроками класса)."""
+        return self.free(teacher_id, day) & ~busy & FULL_DAY
+
+
+def busy_masks(lessons: Iterable[dict], key: str = "grade") -> dict[tuple, int]:
+    """(ресурс, день) → маска занятых слотов по урокам черновика/шаблона."""
+    out: dict[tuple, int] = {}
+    for l in lessons:
+        try:
+            hh, mm = str(l.get("start_time")).split(":")[:2]
+            mask = lesson_mask(dt.time(int(hh), int(mm)), int(l.get("duration_minutes") or 0))
+        except (TypeError, ValueError):
+            continue
+        k = (l.get(key), l.get("day_of_week"))
+        out[k] = out.get(k, 0) | mask
+    return out
+
+
+def mask_to_ranges(mask: int) -> list[tuple[dt.time, dt.time]]:
+    """Маска → интервалы [(start, end)] для ответа API / сообщений."""
+    ranges, i = [], 0
+    while mask >> i:
+        if mask >> i & 1:
+            j = i
+            while mask >> j & 1:
+                j += 1
+            end = j * SLOT_MINUTES
+            ranges.append((dt.time(i * SLOT_MINUTES // 60, i * SLOT_MINUTES % 60),
+                           dt.time.max.replace(second=0, microsecond=0) if end >= 24 * 60
+                           else dt.time(end // 60, end % 60)))
+            i = j
+        else:
+            i += 1
+    return ranges
@@ -98,3 +98,14 @@ def validate_and_materialize_range(d_from: Optional[dt.date], d_to: Optional[dt.
     # верхняя граница эксклюзивная: следующий день 00:00
     to_dt_exclusive = timezone.make_aware(dt.datetime.combine(d_to + dt.timedelta(days=1), dt.time.min), dt.timezone.utc)
     return from_dt, to_dt_exclusive
+
+
+def utc_day_bounds(d_from: dt.date, d_to: dt.date) -> Tuple[dt.datetime, dt.datetime]:
+    """
+    Школьные даты [d_from..d_to] (таймзона проекта) → [from_utc, to_utc_exclusive)
+    для фильтра по RealLesson.start.
+    """
+    tz = timezone.get_default_timezone()
+    start = timezone.make_aware(dt.datetime.combine(d_from, dt.time.min), tz)
+    end = timezone.make_aware(dt.datetime.combine(d_to + dt.timedelta(days=1), dt.time.min), tz)
+    return start.astimezone(dt.timezone.utc), end.astimezone(dt.timezone.utc)
@@ -0,0 +1,123 @@
+# backend/schedule/core/services/norms.py
+"""
+Выполнение недельных норм (WeeklyNorm) по шаблону недели или по реальным урокам за период.
+
+Фактические уроки считаются одним GROUP BY (класс, предмет, тип урока); нормы и типы уроков —
+по запросу; сопоставление — в памяти. Типы с counts_towards_norm=False показываются, но в норму
+не идут; тип "course" сравнивается с courses_per_week, остальные (и урок без типа) — с lessons_per_week.
+
+Кэшируются только строки GROUP BY — по отпечатку данных из БД (число уроков, последний
+updated_at, для реальных — ещё версия генерации): любая правка, удаление или пересоздание уроков
+меняет ключ в любом процессе без явного сброса. Нормы и типы читаются заново на каждый отчёт.
+"""
+from __future__ import annotations
+
+import datetime as dt
+
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+
+from schedule.core.models import LessonType, WeeklyNorm
+from schedule.core.services.date_windows import utc_day_bounds
+from schedule.real_schedule.models import RealLesson
+from schedule.template.models import TemplateLesson
+
+NORMS_TTL = 60 * 60
+
+
+def _stamp(qs, **extra) -> str:
+    """Отпечаток выборки уроков одним агрегатом: число строк, последний updated_at и extra."""
+    agg = qs.aggregate(n=Count("id"), changed=Max("updated_at"), **extra)
+    return ":".join(str(v.timestamp() if isinstance(v, dt.datetime) else v) for v in agg.values())
+
+
+def norm_kind(type_key: str | None) -> str:
+    return "course" if type_key == "course" else "lesson"
+
+
+def compare(rows, weeks: float = 1.0, with_delivered: bool = False) -> dict:
+    """
+    rows — [{grade_id, subject_id, type_id, planned[, delivered]}] из GROUP BY; возвращает строки
+    по (класс, предмет, вид нормы) с отклонениями.
+    """
+    out: dict[tuple, dict] = {}
+    types = {pk: (key, counts) for pk, key, counts in
+             LessonType.objects.values_list("id", "key", "counts_towards_norm")}
+
+    def row(grade, subject, kind):
+        key = (grade, subject, kind)
+        if key not in out:
+            out[key] = {"grade": grade, "subject": subject, "kind": kind, "norm": 0, "expected": 0,
+                        "planned": 0, "delivered": 0 if with_delivered else None, "types": {}, "not_counted": {}}
+        return out[key]
+
+    for grade, subject, lessons, courses in WeeklyNorm.objects.values_list(
+            "grade_id", "subject_id", "lessons_per_week", "courses_per_week"):
+        for kind, norm in (("lesson", lessons), ("course", courses)):
+            if norm:
+                r = row(grade, subject, kind)
+                r["norm"] = norm
+                r["expected"] = round(norm * weeks, 2)
+
+    for g in rows:
+        key, counts = types.get(g["type_id"], (None, None))
+        key = key or "lesson"
+        r = row(g["grade_id"], g["subject_id"], norm_kind(key))
+        if counts is False:
+            r["not_counted"][key] = r["not_counted"].get(key, 0) + g["planned"]
+            continue
+        r["types"][key] = r["types"].get(key, 0) + g["planned"]
+        r["planned"] += g["planned"]
+        if with_delivered:
+            r["delivered"] += g["delivered"]
+
+    result = []
+    for r in sorted(out.values(), key=lambda x: (x["grade"], x["subject"], x["kind"])):
+        if not r["norm"] and not r["planned"]:
+            continue  # только уроки, не идущие в норму
+        r["diff"] = round(r["planned"] - r["expected"], 2)
+        r["status"] = "ok" if abs(r["diff"]) < 1 else ("under" if r["diff"] < 0 else "over")
+        if r["delivered"] is not None:
+            r["delivered_diff"] = round(r["delivered"] - r["expected"], 2)
+        result.append(r)
+    deviations = [r for r in result if r["status"] != "ok"]
+    return {
+        "rows": result,
+        "totals": {
+            "rows": len(result),
+            "deviations": len(deviations),
+            "under": sum(r["status"] == "under" for r in deviations),
+            "over": sum(r["status"] == "over" for r in deviations),
+        },
+    }
+
+
+def template_compliance(template_week_id: int) -> dict:
+    """План шаблонной недели против норм: одна неделя — одна норма."""
+    lessons = TemplateLesson.objects.filter(template_week_id=template_week_id)
+    key = f"core:norms:template:{template_week_id}:{_stamp(lessons)}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(lessons.values("grade_id", "subject_id", "type_id").annotate(planned=Count("id")))
+        cache.set(key, rows, timeout=NORMS_TTL)
+    return {"mode": "template", "template_week_id": template_week_id, "weeks": 1, **compare(rows)}
+
+
+def real_compliance(d_from: dt.date, d_to: dt.date) -> dict:
+    """
+    Реальные уроки за [d_from..d_to] (даты школы): planned — все уроки периода,
+    delivered — проведённые (conducted_at). Норма — недельная × число недель периода.
+    """
+    start, end = utc_day_bounds(d_from, d_to)
+    lessons = RealLesson.objects.filter(start__gte=start, start__lt=end)
+    key = f"core:norms:real:{d_from.isoformat()}:{d_to.isoformat()}:{_stamp(lessons, version=Max('version'))}"
+    rows = cache.get(key)
+    if rows is None:
+        rows = [{"grade_id": r["grade_id"], "subject_id": r["subject_id"], "type_id": r["lesson_type_id"],
+                 "planned": r["planned"], "delivered": r["delivered"]}
+                for r in lessons.values("grade_id", "subject_id", "lesson_type_id")
+                .annotate(planned=Count("id"), delivered=Count("id", filter=Q(conducted_at__isnull=False)))]
+        cache.set(key, rows, timeout=NORMS_TTL)
+    weeks = ((d_to - d_from).days + 1) / 7
+    return {"mode": "real", "from": d_from.isoformat(), "to": d_to.isoformat(), "weeks": round(weeks, 2),
+            **compare(rows, weeks, with_delivered=True)}
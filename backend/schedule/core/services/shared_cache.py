@@ -0,0 +1,17 @@
+# backend/schedule/core/services/shared_cache.py
+"""
+Общий ли кэш у процессов. LocMemCache (значение по умолчанию) живёт в памяти одного
+процесса: воркеры gunicorn, webinar_scheduler и фоновые воркеры его не видят.
+Всё, что один процесс кладёт в кэш для другого, требует общего бэкенда
+(CACHE_BACKEND/CACHE_LOCATION, в compose — Redis).
+"""
+from django.conf import settings
+
+PROCESS_LOCAL_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def is_process_local(alias: str = "default") -> bool:
+    return settings.CACHES.get(alias, {}).get("BACKEND") in PROCESS_LOCAL_BACKENDS
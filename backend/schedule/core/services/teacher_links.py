@@ -0,0 +1,55 @@
+# backend/schedule/core/services/teacher_links.py
+"""
+Связи учителей для проверок расписания: предметы (TeacherSubject), классы (TeacherGrade)
+и окна доступности (битовые маски из services/availability.py). Для пачки уроков грузится
+один раз — не больше трёх запросов на всех учителей (маски обычно уже в кэше), дальше
+проверки без обращений к БД. Общий путь для validate_schedule, TemplateLesson.clean
+и TemplateLessonForm.clean.
+"""
+from __future__ import annotations
+
+import datetime as dt
+from typing import Iterable
+
+from schedule.core.models import TeacherGrade, TeacherSubject
+from schedule.core.services.availability import AvailabilityMasks
+
+
+def as_pk(value):
+    """pk из JSON может прийти строкой или объектом модели."""
+    value = getattr(value, "pk", value)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TeacherLinkIndex:
+    def __init__(self, subjects=(), grades=(), availability: AvailabilityMasks | None = None):
+        self.subjects: set[tuple[int, int]] = set(subjects)
+        self.grades: set[tuple[int, int]] = set(grades)
+        self.availability = availability or AvailabilityMasks({})
+
+    @classmethod
+    def load(cls, teacher_ids: Iterable) -> "TeacherLinkIndex":
+        ids = {pk for pk in map(as_pk, teacher_ids) if pk is not None}
+        if not ids:
+            return cls()
+        return cls(
+            subjects=TeacherSubject.objects.filter(teacher_id__in=ids).values_list("teacher_id", "subject_id"),
+            grades=TeacherGrade.objects.filter(teacher_id__in=ids).values_list("teacher_id", "grade_id"),
+            availability=AvailabilityMasks.load(ids),
+        )
+
+    def teaches_subject(self, teacher, subject) -> bool:
+        return (as_pk(teacher), as_pk(subject)) in self.subjects
+
+    def teaches_grade(self, teacher, grade) -> bool:
+        return (as_pk(teacher), as_pk(grade)) in self.grades
+
+    def is_available(self, teacher, day_of_week, start: dt.time, end: dt.time) -> bool:
+        """Все 5-минутные слоты урока [start, end] попадают в окна доступности учителя в этот день."""
+        duration = (end.hour * 60 + end.minute) - (start.hour * 60 + start.minute)
+        if duration < 0:
+            duration += 24 * 60
+        return self.availability.is_available(as_pk(teacher), as_pk(day_of_week), start, duration)
@@ -0,0 +1,23 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from schedule.core.models import TeacherAvailability
+from schedule.core.services.availability import invalidate_teacher
+
+
+@receiver(pre_save, sender=TeacherAvailability)
+def remember_availability_teacher(sender, instance: TeacherAvailability, **kwargs):
+    # окно могли переназначить другому учителю — сбросить нужно и прежнего
+    instance._old_teacher_id = (
+        sender.objects.filter(pk=instance.pk).values_list("teacher_id", flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver([post_save, post_delete], sender=TeacherAvailability)
+def on_availability_changed(sender, instance: TeacherAvailability, **kwargs):
+    # маски пересоберутся при следующем обращении; сброс после коммита, иначе
+    # параллельный запрос успел бы закэшировать старые окна
+    for teacher_id in {instance.teacher_id, getattr(instance, "_old_teacher_id", None)} - {None}:
+        transaction.on_commit(lambda t=teacher_id: invalidate_teacher(t))
@@ -3,13 +3,15 @@
 Маршруты API для доступа к справочникам core.
 """
 
+from django.urls import path
 from rest_framework.routers import SimpleRouter
 from .views import (
     GradeViewSet, SubjectViewSet, TeacherAvailabilityViewSet,
     WeeklyNormViewSet, LessonTypeViewSet, AcademicYearViewSet,
     GradeSubjectViewSet, StudentSubjectViewSet,
     TeacherSubjectViewSet, TeacherGradeViewSet,
-    QuarterViewSet, HolidayViewSet
+    QuarterViewSet, HolidayViewSet,
+    norms_compliance,
 )
 
 router = SimpleRouter()
@@ -26,5 +28,9 @@ router.register('student-subjects', StudentSubjectViewSet)
 router.register("quarters", QuarterViewSet)
 router.register("holidays", HolidayViewSet)
 
-urlpatterns = router.urls
+urlpatterns = [
+    path("norms/compliance/", norms_compliance, name="norms-compliance"),  # GET — выполнение норм
+]
+
+urlpatterns += router.urls
 
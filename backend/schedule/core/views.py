@@ -3,7 +3,12 @@
 ViewSet'ы для CRUD-операций справочников core через REST API.
 """
 
-from rest_framework import viewsets
+from django.shortcuts import get_object_or_404
+from django.utils.dateparse import parse_date
+from rest_framework import status, viewsets
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 from rest_framework.viewsets import ReadOnlyModelViewSet, ModelViewSet
 from .models import (
     Grade,
@@ -33,6 +38,10 @@ from .serializers import (
     QuarterSerializer,
     HolidaySerializer
 )
+from .services.norms import real_compliance, template_compliance
+from schedule.template.models import TemplateWeek
+
+NORMS_MAX_RANGE_DAYS = 400
 
 class GradeViewSet(ReadOnlyModelViewSet):
     queryset = Grade.objects.all()
@@ -80,4 +89,36 @@ class QuarterViewSet(viewsets.ModelViewSet):
 
 class HolidayViewSet(viewsets.ModelViewSet):
     queryset = Holiday.objects.all()
-    serializer_class = HolidaySerializer
\ No newline at end of file
+    serializer_class = HolidaySerializer
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def norms_compliance(request):
+    """
+    Выполнение недельных норм:
+    - ?template_week_id=… — план шаблонной недели (без параметров — активной);
+    - ?from=YYYY-MM-DD&to=YYYY-MM-DD — реальные уроки периода: запланировано и проведено.
+    """
+    qp = request.query_params
+    if qp.get("from") or qp.get("to"):
+        try:
+            d_from, d_to = parse_date(qp.get("from") or ""), parse_date(qp.get("to") or "")
+        except ValueError:
+            d_from = d_to = None
+        if not d_from or not d_to or d_from > d_to:
+            return Response({"detail": "INVALID_DATES"}, status=status.HTTP_400_BAD_REQUEST)
+        if (d_to - d_from).days + 1 > NORMS_MAX_RANGE_DAYS:
+            return Response({"detail": "RANGE_TOO_LARGE"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(real_compliance(d_from, d_to))
+
+    week_id = qp.get("template_week_id")
+    if week_id:
+        if not str(week_id).isdigit():
+            return Response({"detail": "INVALID_TEMPLATE_WEEK"}, status=status.HTTP_400_BAD_REQUEST)
+        week = get_object_or_404(TemplateWeek.objects.only("id"), pk=int(week_id))
+    else:
+        week = TemplateWeek.objects.filter(is_active=True).only("id").order_by("-id").first()
+        if week is None:
+            return Response({"detail": "NO_ACTIVE_TEMPLATE"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(template_compliance(week.id))
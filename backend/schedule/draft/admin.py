@@ -1,5 +1,18 @@
 # schedule/draft/admin.py
 from django.contrib import admin
-from .models import TemplateWeekDraft
+from .models import DraftChange, SolveJob, TemplateWeekDraft
 
 admin.site.register(TemplateWeekDraft)
+
+
+@admin.register(DraftChange)
+class DraftChangeAdmin(admin.ModelAdmin):
+    list_display = ("id", "draft", "seq", "created_at")
+    raw_id_fields = ("draft",)
+
+
+@admin.register(SolveJob)
+class SolveJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "user", "status", "time_budget", "created_at", "finished_at")
+    list_filter = ("status",)
+    raw_id_fields = ("user",)
@@ -0,0 +1,38 @@
+# backend/schedule/draft/management/commands/draft_solver.py
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from schedule.draft.services.solve import run_pending
+
+
+class Command(BaseCommand):
+    help = "Воркер солвера шаблонной недели: выполняет SolveJob и пишет результат в черновики."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Выполнить готовые задания и выйти")
+        parser.add_argument("--sleep", type=float, default=5.0,
+                            help="Пауза между опросами пустой очереди, сек (default: 5)")
+
+    def handle(self, *args, **opts):
+        if opts["once"]:
+            n = run_pending()
+            self.stdout.write(self.style.SUCCESS(f"draft_solver: processed={n}"))
+            return
+
+        stopped = False
+
+        def _stop(signum, frame):
+            nonlocal stopped
+            stopped = True
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+        self.stdout.write(self.style.SUCCESS("draft_solver: started"))
+        while not stopped:
+            close_old_connections()
+            if not run_pending(limit=1):
+                time.sleep(opts["sleep"])
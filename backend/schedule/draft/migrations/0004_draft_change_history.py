@@ -0,0 +1,84 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def history_to_changes(apps, schema_editor):
+    """
+    change_history (список прежних снимков data) → шаги DraftChange: каждый снимок —
+    checkpoint, дельта шага заменяет документ целиком; текущее data — последний шаг.
+    Хранится не больше DRAFT_HISTORY_LIMIT шагов, как и в services/history.py.
+    """
+    TemplateWeekDraft = apps.get_model("draft", "TemplateWeekDraft")
+    DraftChange = apps.get_model("draft", "DraftChange")
+    limit = getattr(settings, "DRAFT_HISTORY_LIMIT", 200)
+    for draft in TemplateWeekDraft.objects.exclude(change_history=[]).iterator():
+        if not isinstance(draft.change_history, list) or not draft.change_history:
+            continue
+        states = draft.change_history[-limit:] + [draft.data]
+        DraftChange.objects.bulk_create([
+            DraftChange(draft=draft, seq=seq, snapshot=state,
+                        patch=[] if seq == 0 else [{"op": "replace", "path": "", "value": state}])
+            for seq, state in enumerate(states)
+        ])
+        draft.history_seq = draft.history_head = len(states) - 1
+        draft.history_base = 0
+        draft.save(update_fields=["history_seq", "history_head", "history_base"])
+
+
+def changes_to_history(apps, schema_editor):
+    """Обратно — только снимки checkpoint'ов до текущего шага (дельты между ними теряются)."""
+    TemplateWeekDraft = apps.get_model("draft", "TemplateWeekDraft")
+    DraftChange = apps.get_model("draft", "DraftChange")
+    for draft in TemplateWeekDraft.objects.filter(history_seq__gt=0).iterator():
+        draft.change_history = list(
+            DraftChange.objects.filter(draft=draft, seq__lt=draft.history_seq, snapshot__isnull=False)
+            .order_by("seq").values_list("snapshot", flat=True))
+        draft.save(update_fields=["change_history"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('draft', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='templateweekdraft',
+            name='history_base',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='templateweekdraft',
+            name='history_head',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='templateweekdraft',
+            name='history_seq',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='DraftChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seq', models.PositiveIntegerField()),
+                ('patch', models.JSONField(blank=True, default=list)),
+                ('snapshot', models.JSONField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('draft', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='draft.templateweekdraft')),
+            ],
+            options={
+                'ordering': ['draft', 'seq'],
+                'unique_together': {('draft', 'seq')},
+            },
+        ),
+        migrations.RunPython(history_to_changes, changes_to_history),
+        migrations.RemoveField(
+            model_name='templateweekdraft',
+            name='change_history',
+        ),
+    ]
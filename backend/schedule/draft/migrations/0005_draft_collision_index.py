@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('draft', '0004_draft_change_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='templateweekdraft',
+            name='collision_index',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
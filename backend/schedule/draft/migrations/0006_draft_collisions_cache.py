@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('draft', '0005_draft_collision_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='templateweekdraft',
+            name='collisions_cache',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='templateweekdraft',
+            name='collisions_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -1,7 +1,7 @@
 """
 Модуль draft/models.py:
 Модели для хранения черновиков шаблонных недель и их уроков.
-Хранит только один активный черновик недели.
+Хранит только один активный черновик недели; история правок — дельтами в DraftChange.
 """
 
 from django.db import models
@@ -15,8 +15,66 @@ class TemplateWeekDraft(models.Model):
     )
     base_week = models.ForeignKey(TemplateWeek, on_delete=models.CASCADE, null=True, blank=True)
     data = models.JSONField(default=dict)
-    change_history = models.JSONField(default=list, blank=True)
+    # курсор истории (services/history.py): текущий, последний и самый старый доступный шаг
+    history_seq = models.PositiveIntegerField(default=0)
+    history_head = models.PositiveIntegerField(default=0)
+    history_base = models.PositiveIntegerField(default=0)
+    # индекс корзин пересечений для /ops/ (services/ops.py); сбрасывается при любой другой правке
+    collision_index = models.JSONField(default=dict, blank=True)
+    # результат check_collisions для уроков с данным sha256 (services/collisions.py)
+    collisions_hash = models.CharField(max_length=64, blank=True, default="")
+    collisions_cache = models.JSONField(default=list, blank=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"Draft by {self.user} for {self.base_week.name if self.base_week else 'empty'}"
+
+
+class DraftChange(models.Model):
+    """
+    Шаг истории черновика: JSON Patch от состояния seq-1 к seq.
+    snapshot — полное состояние после шага (checkpoint), у остальных шагов — NULL.
+    """
+    draft = models.ForeignKey(TemplateWeekDraft, on_delete=models.CASCADE, related_name="changes")
+    seq = models.PositiveIntegerField()
+    patch = models.JSONField(default=list, blank=True)
+    snapshot = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ("draft", "seq")
+        ordering = ["draft", "seq"]
+
+    def __str__(self):
+        return f"Draft {self.draft_id} #{self.seq}{' (checkpoint)' if self.snapshot is not None else ''}"
+
+
+class SolveJob(models.Model):
+    """
+    Фоновое составление черновика солвером schedule.template.solver:
+    API ставит задание (202), считает воркер draft_solver (services/solve.py).
+    Результат записывается в черновик пользователя шагом истории — его можно отменить.
+    """
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED"
+        RUNNING = "RUNNING"
+        DONE = "DONE"
+        FAILED = "FAILED"
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="solve_jobs")
+    params = models.JSONField(default=dict, blank=True)  # grades, days, periods, duration_minutes, seed
+    time_budget = models.PositiveIntegerField(default=120)  # сек на поиск
+    status = models.CharField(max_length=8, choices=Status.choices, default=Status.QUEUED, db_index=True)
+    locked_until = models.DateTimeField(null=True, blank=True)  # аренда задания воркером
+    progress = models.JSONField(default=dict, blank=True)  # итерации и стоимость, обновляется раз в секунду
+    result = models.JSONField(null=True, blank=True)  # hard/soft, unplaced, число уроков
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"SolveJob #{self.pk} ({self.status}) by {self.user}"
@@ -3,8 +3,8 @@
 """
 
 from rest_framework import serializers
-from .models import TemplateWeekDraft
-from schedule.validators.schedule_rules import check_collisions  # <— импорт
+from .models import SolveJob, TemplateWeekDraft
+from .services.collisions import draft_collisions
 
 class TemplateWeekDraftSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
@@ -12,9 +12,17 @@ class TemplateWeekDraftSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = TemplateWeekDraft
-        fields = "__all__"  # collisions попадёт автоматически
+        # служебные индекс /ops/ и кэш коллизий; collisions попадёт автоматически
+        exclude = ("collision_index", "collisions_hash", "collisions_cache")
 
     def get_collisions(self, obj):
-        lessons = (obj.data or {}).get("lessons", [])
         # lessons — в формате твоего черновика: id, day_of_week, start_time, duration_minutes, teacher, grade, subject
-        return check_collisions(lessons)
+        # неизменённый черновик не перепроверяется: сравнивается только хэш уроков
+        return draft_collisions(obj)
+
+
+class SolveJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SolveJob
+        fields = ("id", "status", "params", "time_budget", "progress", "result", "last_error",
+                  "created_at", "started_at", "finished_at")
@@ -0,0 +1,32 @@
+"""
+schedule/draft/services/collisions.py
+Кэш коллизий черновика: результат check_collisions хранится в строке черновика
+вместе с sha256 канонического JSON уроков. Пока уроки не менялись, сериализация
+черновика (GET, опрос редактора) стоит хэша, а не полной проверки.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+
+from schedule.draft.models import TemplateWeekDraft
+from schedule.validators.schedule_rules import check_collisions
+
+
+def lessons_hash(lessons) -> str:
+    """Стабильный хэш списка уроков: ключи сортируются, пробелы не влияют."""
+    raw = json.dumps(lessons, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def draft_collisions(draft: TemplateWeekDraft) -> list[dict]:
+    """Коллизии черновика: из кэша, если хэш уроков совпал, иначе — проверка и запись кэша."""
+    lessons = (draft.data or {}).get("lessons", [])
+    digest = lessons_hash(lessons)
+    if draft.collisions_hash == digest:
+        return draft.collisions_cache
+    result = check_collisions(lessons)
+    draft.collisions_hash, draft.collisions_cache = digest, result
+    if draft.pk:
+        TemplateWeekDraft.objects.filter(pk=draft.pk).update(collisions_hash=digest, collisions_cache=result)
+    return result
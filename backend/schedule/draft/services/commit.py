@@ -1,8 +1,12 @@
 import logging
+from datetime import time as _time
+
 from django.utils import timezone
 from django.db import transaction
 
-from schedule.template.models import TemplateWeek
+from users.models import User
+from schedule.core.models import Grade, LessonType, Subject
+from schedule.template.models import TemplateLesson, TemplateWeek
 from schedule.template.serializers import TemplateLessonWriteSerializer  # ← ДОЛЖЕН БЫТЬ
 
 logger = logging.getLogger("cedar.draft.commit")
@@ -37,3 +41,108 @@ def create_template_lessons_from_draft(draft_obj, week: TemplateWeek):
             ser.is_valid(raise_exception=True)
             # поле в модели называется template_week
             ser.save(template_week=week)
+
+
+# -----------------------------------------------------
+# Пакетная публикация (commit_draft)
+# -----------------------------------------------------
+def parse_time(v):
+    if v is None:
+        return None
+    if isinstance(v, str):
+        try:
+            hh, mm = v.split(":")[:2]
+            return _time(int(hh), int(mm))
+        except Exception:
+            return None
+    return v
+
+
+def _as_int(v):
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _type_resolver():
+    """Все LessonType одним запросом; поиск как в get_lesson_type_or_400 (key, затем label, без регистра)."""
+    types = list(LessonType.objects.all())
+    by_id = {t.id: t for t in types}
+    by_key = {t.key.lower(): t for t in types}
+    by_label = {}
+    for t in types:
+        by_label.setdefault(t.label.lower(), t)
+
+    def resolve(l: dict):
+        type_id = l.get("type_id")
+        if type_id is not None:
+            lt = by_id.get(int(type_id)) if str(type_id).isdigit() else None
+            return lt, (None if lt else f"LessonType id={type_id} не найден.")
+        payload = l.get("type")
+        if payload is None or (isinstance(payload, dict) and not payload):
+            return None, "Тип урока обязателен (key или label)."
+        if isinstance(payload, dict):
+            key, label = payload.get("key"), payload.get("label")
+        else:
+            key = label = str(payload)
+        key = key.strip().lower() if isinstance(key, str) else None
+        label = label.strip().lower() if isinstance(label, str) else None
+        lt = (by_key.get(key) if key else None) or (by_label.get(label) if label else None)
+        return lt, (None if lt else "Неизвестный тип урока. Используйте 'key' или 'label'.")
+
+    return resolve, [{"key": t.key, "label": t.label} for t in types]
+
+
+def build_template_lessons(lessons: list[dict]) -> tuple[list[dict], list[dict], list[dict]]:
+    """
+    Проверяет все уроки черновика до записи в БД.
+    Возвращает (поля TemplateLesson по урокам, ошибки [{index, id, errors: {поле: текст}}],
+    доступные типы). Запросов к БД — четыре: LessonType и существующие pk классов,
+    предметов и учителей.
+    """
+    resolve_type, available = _type_resolver()
+    fk_models = {"grade": Grade, "subject": Subject, "teacher": User}
+    raw_fk = [{f: l.get(f) or l.get(f"{f}_id") for f in fk_models} for l in lessons]
+    existing = {
+        f: set(model.objects.filter(pk__in={_as_int(r[f]) for r in raw_fk} - {None})
+               .values_list("pk", flat=True))
+        for f, model in fk_models.items()
+    }
+    rows, errors = [], []
+    for i, l in enumerate(lessons):
+        problems = {}
+        fk = {}
+        for field in fk_models:
+            raw = raw_fk[i][field]
+            fk[field] = _as_int(raw)
+            if not raw:
+                problems[field] = "Обязательное поле."
+            elif fk[field] not in existing[field]:
+                problems[field] = f"Не найден (id={raw})."
+        day = _as_int(l.get("day_of_week"))
+        if day is None or not 0 <= day <= 6:
+            problems["day_of_week"] = "Ожидается день недели 0–6."
+        start = parse_time(l.get("start_time"))
+        if start is None:
+            problems["start_time"] = f"Невалидное время '{l.get('start_time')}'."
+        duration = _as_int(l.get("duration_minutes"))
+        if duration is None or duration <= 0:
+            problems["duration_minutes"] = "Ожидается положительное число минут."
+        lt, type_error = resolve_type(l)
+        if type_error:
+            problems["type"] = type_error
+        if problems:
+            errors.append({"index": i, "id": l.get("id"), "errors": problems})
+            continue
+        rows.append({
+            "grade_id": fk["grade"], "subject_id": fk["subject"], "teacher_id": fk["teacher"],
+            "day_of_week": day, "start_time": start, "duration_minutes": duration, "type": lt,
+        })
+    return rows, errors, available
+
+
+def bulk_create_template_lessons(week: TemplateWeek, rows: list[dict]) -> list[TemplateLesson]:
+    return TemplateLesson.objects.bulk_create(
+        [TemplateLesson(template_week=week, **r) for r in rows], batch_size=500,
+    )
@@ -0,0 +1,196 @@
+"""
+schedule/draft/services/history.py
+История правок черновика: дельты JSON Patch (RFC 6902: add/remove/replace) в DraftChange.
+
+Строка черновика хранит только текущее состояние и курсор (history_seq/head/base), поэтому
+PATCH пишет одну маленькую строку дельты, а не весь прошлый снимок. Каждые
+DRAFT_HISTORY_CHECKPOINT_EVERY шагов дельта несёт полный снимок (checkpoint): undo
+восстанавливает состояние от ближайшего checkpoint, применяя не больше N дельт.
+Сверх DRAFT_HISTORY_LIMIT шагов старые дельты удаляются до ближайшего checkpoint.
+"""
+from __future__ import annotations
+
+import copy
+
+from django.conf import settings
+from django.db import transaction
+
+from schedule.draft.models import DraftChange, TemplateWeekDraft
+
+
+def _checkpoint_every() -> int:
+    return max(1, getattr(settings, "DRAFT_HISTORY_CHECKPOINT_EVERY", 20))
+
+
+def _limit() -> int:
+    return max(_checkpoint_every(), getattr(settings, "DRAFT_HISTORY_LIMIT", 200))
+
+
+# -----------------------------------------------------
+# JSON Patch
+# -----------------------------------------------------
+def escape_token(token) -> str:
+    return str(token).replace("~", "~0").replace("/", "~1")
+
+
+def _unescape(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def make_patch(old, new, path: str = "") -> list[dict]:
+    """
+    Дельта old → new. Словари сравниваются по ключам, списки — по общему префиксу
+    и суффиксу: правка, вставка или удаление одного урока дают одну-две операции.
+    """
+    if type(old) is not type(new):
+        return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+    if isinstance(old, dict):
+        ops = []
+        for key in old:
+            if key not in new:
+                ops.append({"op": "remove", "path": f"{path}/{escape_token(key)}"})
+        for key, value in new.items():
+            if key not in old:
+                ops.append({"op": "add", "path": f"{path}/{escape_token(key)}", "value": copy.deepcopy(value)})
+            elif old[key] != value:
+                ops.extend(make_patch(old[key], value, f"{path}/{escape_token(key)}"))
+        return ops
+    if isinstance(old, list):
+        lo = 0
+        while lo < len(old) and lo < len(new) and old[lo] == new[lo]:
+            lo += 1
+        hi_old, hi_new = len(old), len(new)
+        while hi_old > lo and hi_new > lo and old[hi_old - 1] == new[hi_new - 1]:
+            hi_old -= 1
+            hi_new -= 1
+        ops = []
+        common = min(hi_old, hi_new) - lo
+        for i in range(lo, lo + common):
+            ops.extend(make_patch(old[i], new[i], f"{path}/{i}"))
+        # удаляем с конца, чтобы индексы оставшихся не сдвигались
+        for i in range(hi_old - 1, lo + common - 1, -1):
+            ops.append({"op": "remove", "path": f"{path}/{i}"})
+        for i in range(lo + common, hi_new):
+            ops.append({"op": "add", "path": f"{path}/{i}", "value": copy.deepcopy(new[i])})
+        return ops
+    if old != new:
+        return [{"op": "replace", "path": path, "value": copy.deepcopy(new)}]
+    return []
+
+
+def apply_patch(doc, ops: list[dict]):
+    """Применяет дельту к копии doc и возвращает результат."""
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        path = op["path"]
+        if path == "":
+            doc = copy.deepcopy(op.get("value"))
+            continue
+        *parents, last = [_unescape(t) for t in path.split("/")[1:]]
+        target = doc
+        for token in parents:
+            target = target[int(token)] if isinstance(target, list) else target[token]
+        if isinstance(target, list):
+            index = len(target) if last == "-" else int(last)
+            if op["op"] == "add":
+                target.insert(index, copy.deepcopy(op["value"]))
+            elif op["op"] == "remove":
+                del target[index]
+            else:
+                target[index] = copy.deepcopy(op["value"])
+        elif op["op"] == "remove":
+            del target[last]
+        else:
+            target[last] = copy.deepcopy(op["value"])
+    return doc
+
+
+# -----------------------------------------------------
+# История черновика
+# -----------------------------------------------------
+def state_at(draft: TemplateWeekDraft, seq: int):
+    """Состояние после шага seq: ближайший checkpoint ≤ seq + дельты после него (два запроса)."""
+    checkpoint = (DraftChange.objects
+                  .filter(draft=draft, seq__lte=seq, snapshot__isnull=False)
+                  .order_by("-seq").values_list("seq", "snapshot").first())
+    if checkpoint is None:
+        raise DraftChange.DoesNotExist(f"No checkpoint for draft={draft.id} seq={seq}")
+    base_seq, state = checkpoint
+    for patch in (DraftChange.objects.filter(draft=draft, seq__gt=base_seq, seq__lte=seq)
+                  .order_by("seq").values_list("patch", flat=True)):
+        state = apply_patch(state, patch)
+    return state
+
+
+def record_change(draft: TemplateWeekDraft, new_data, patch: list[dict] | None = None,
+                  collision_index: dict | None = None) -> bool:
+    """
+    Сохраняет новое содержимое черновика с дельтой в истории. Правка после undo
+    отбрасывает ветку redo. Возвращает False, если содержимое не изменилось.
+    patch — уже известная дельта (операции /ops/), collision_index — индекс для нового
+    состояния; без него индекс сбрасывается и будет пересобран при следующем /ops/.
+    """
+    if patch is None:
+        patch = make_patch(draft.data, new_data)
+    if not patch:
+        return False
+    with transaction.atomic():
+        if draft.history_head == 0:
+            # первый шаг: исходное состояние — checkpoint 0
+            DraftChange.objects.get_or_create(draft=draft, seq=0, defaults={"snapshot": draft.data})
+        if draft.history_seq < draft.history_head:
+            DraftChange.objects.filter(draft=draft, seq__gt=draft.history_seq).delete()
+        seq = draft.history_seq + 1
+        DraftChange.objects.create(
+            draft=draft, seq=seq, patch=patch,
+            snapshot=new_data if seq % _checkpoint_every() == 0 else None,
+        )
+        draft.data = new_data
+        draft.history_seq = draft.history_head = seq
+        draft.collision_index = collision_index or {}
+        if seq - draft.history_base > _limit():
+            _compact(draft)
+        draft.save(update_fields=["data", "history_seq", "history_head", "history_base",
+                                  "collision_index", "updated_at"])
+    return True
+
+
+def _compact(draft: TemplateWeekDraft) -> None:
+    """Удаляет шаги старше лимита; новая база — checkpoint, чтобы от неё можно было восстановить состояние."""
+    new_base = (DraftChange.objects
+                .filter(draft=draft, seq__lte=draft.history_head - _limit(), snapshot__isnull=False)
+                .order_by("-seq").values_list("seq", flat=True).first())
+    if new_base is None or new_base <= draft.history_base:
+        return
+    DraftChange.objects.filter(draft=draft, seq__lt=new_base).delete()
+    draft.history_base = new_base
+
+
+def undo(draft: TemplateWeekDraft) -> bool:
+    """Шаг назад: состояние восстанавливается от ближайшего checkpoint."""
+    if draft.history_seq <= draft.history_base:
+        return False
+    draft.history_seq -= 1
+    draft.data = state_at(draft, draft.history_seq)
+    draft.collision_index = {}
+    draft.save(update_fields=["data", "history_seq", "collision_index", "updated_at"])
+    return True
+
+
+def redo(draft: TemplateWeekDraft) -> bool:
+    """Шаг вперёд: к текущему состоянию применяется следующая дельта."""
+    if draft.history_seq >= draft.history_head:
+        return False
+    patch = DraftChange.objects.get(draft=draft, seq=draft.history_seq + 1).patch
+    draft.history_seq += 1
+    draft.data = apply_patch(draft.data, patch)
+    draft.collision_index = {}
+    draft.save(update_fields=["data", "history_seq", "collision_index", "updated_at"])
+    return True
+
+
+def reset_history(draft: TemplateWeekDraft) -> None:
+    """Очистка истории (после публикации черновика)."""
+    DraftChange.objects.filter(draft=draft).delete()
+    draft.history_seq = draft.history_head = draft.history_base = 0
+    draft.collision_index = {}
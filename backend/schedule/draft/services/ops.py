@@ -0,0 +1,202 @@
+"""
+schedule/draft/services/ops.py
+Правка черновика операциями (add / move / update / delete) с инкрементальной проверкой пересечений.
+
+В черновике хранится индекс корзин (collision_index):
+  buckets  — "teacher:<id>:<day>" / "grade:…" / "room:…" → id уроков в корзине;
+  problems — корзина (и "lesson:<id>" для проблем самого урока) → её текущие проблемы.
+Операция затрагивает только корзины урока до и после правки: их проблемы пересчитываются
+check_collisions-правилами по нескольким урокам, ответ — разница (added / removed).
+Индекс привязан к history_seq: после PATCH, undo/redo или публикации он пересобирается целиком.
+"""
+from __future__ import annotations
+
+import copy
+
+from schedule.draft.models import TemplateWeekDraft
+from schedule.draft.services import history
+from schedule.validators.schedule_rules import (
+    COLLISION_KINDS, bucket_problems, lesson_problems, lesson_resource,
+)
+
+OPS = {"add", "move", "update", "delete"}
+MOVE_FIELDS = ("day_of_week", "start_time")
+MAX_OPS = 200
+
+
+class DraftOpError(ValueError):
+    """Операция не применима; code — для ответа API, index — номер операции в пакете."""
+
+    def __init__(self, code: str, index: int):
+        super().__init__(code)
+        self.code = code
+        self.index = index
+
+
+def _normalize(lesson: dict) -> dict:
+    """*_id → базовые ключи, как в validate_draft."""
+    d = dict(lesson)
+    for key in ("teacher", "grade", "subject", "room"):
+        kid = f"{key}_id"
+        if not d.get(key) and d.get(kid) not in (None, "", 0):
+            d[key] = d[kid]
+    return d
+
+
+def lesson_keys(lesson: dict) -> list[str]:
+    """Корзины урока: своя ("lesson:<id>") и по ресурсам, если время валидно."""
+    keys = [f"lesson:{lesson.get('id')}"]
+    _, interval = lesson_problems(lesson)
+    if interval is not None:
+        day = lesson.get("day_of_week")
+        for kind, _, _ in COLLISION_KINDS:
+            rid = lesson_resource(lesson, kind)
+            if rid is not None:
+                keys.append(f"{kind}:{rid}:{day}")
+    return keys
+
+
+def _bucket_check(key: str, lessons: list[dict]) -> list[dict]:
+    if key.startswith("lesson:"):
+        return lesson_problems(lessons[0])[0] if lessons else []
+    kind = key.split(":", 1)[0]
+    items, rid, day = [], None, None
+    for l in lessons:
+        _, (s, e) = lesson_problems(l)
+        items.append((s, e, l.get("id")))
+        rid, day = lesson_resource(l, kind), l.get("day_of_week")
+    return bucket_problems(kind, rid, day, items) if items else []
+
+
+def build_index(lessons: list[dict], seq: int) -> dict:
+    """Полная сборка индекса: один проход по урокам (при первой операции или после сброса)."""
+    buckets: dict[str, list] = {}
+    by_id = {}
+    for l in lessons:
+        l = _normalize(l)
+        by_id[l.get("id")] = l
+        for key in lesson_keys(l):
+            buckets.setdefault(key, []).append(l.get("id"))
+    problems = {}
+    for key, ids in buckets.items():
+        found = _bucket_check(key, [by_id[i] for i in ids])
+        if found:
+            problems[key] = found
+    return {"seq": seq, "buckets": buckets, "problems": problems}
+
+
+def _ensure_ids(lessons: list[dict]) -> list[dict]:
+    """Уроки без id (черновик из шаблона) получают числовые id — операции ссылаются на них."""
+    if all(l.get("id") is not None for l in lessons):
+        return []
+    next_id = max((l["id"] for l in lessons if isinstance(l.get("id"), int)), default=0) + 1
+    ops = []
+    for i, l in enumerate(lessons):
+        if l.get("id") is None:
+            l["id"] = next_id
+            ops.append({"op": "add", "path": f"/lessons/{i}/id", "value": next_id})
+            next_id += 1
+    return ops
+
+
+def apply_ops(draft: TemplateWeekDraft, ops: list[dict]) -> dict:
+    """
+    Применяет пакет операций к черновику (один шаг истории) и возвращает
+    { history_seq, collisions: { added, removed }, totals: { errors, warnings } }.
+    Ошибка в любой операции — DraftOpError, черновик не меняется.
+    """
+    if not isinstance(ops, list) or not ops or len(ops) > MAX_OPS:
+        raise DraftOpError("INVALID_OPS", -1)
+    data = copy.deepcopy(draft.data) if isinstance(draft.data, dict) else {}
+    patch = []
+    if not isinstance(data.get("lessons"), list):
+        data["lessons"] = []
+        patch.append({"op": "add", "path": "/lessons", "value": []})
+    lessons = data["lessons"]
+    patch += _ensure_ids(lessons)
+
+    index = draft.collision_index or {}
+    if patch or index.get("seq") != draft.history_seq or "buckets" not in index:
+        index = build_index(lessons, draft.history_seq)
+    buckets, problems = index["buckets"], index["problems"]
+    pos = {l.get("id"): i for i, l in enumerate(lessons)}
+    touched: set[str] = set()
+
+    def _unlink(lesson):
+        for key in lesson_keys(_normalize(lesson)):
+            ids = buckets.get(key, [])
+            if lesson["id"] in ids:
+                ids.remove(lesson["id"])
+            if not ids:
+                buckets.pop(key, None)
+            touched.add(key)
+
+    def _link(lesson):
+        for key in lesson_keys(_normalize(lesson)):
+            buckets.setdefault(key, []).append(lesson["id"])
+            touched.add(key)
+
+    for n, op in enumerate(ops):
+        kind = op.get("op") if isinstance(op, dict) else None
+        if kind not in OPS:
+            raise DraftOpError("UNKNOWN_OP", n)
+        if kind == "add":
+            lesson = op.get("lesson")
+            if not isinstance(lesson, dict) or lesson.get("id") is None:
+                raise DraftOpError("LESSON_ID_REQUIRED", n)
+            if lesson["id"] in pos:
+                raise DraftOpError("DUPLICATE_ID", n)
+            lessons.append(copy.deepcopy(lesson))
+            pos[lesson["id"]] = len(lessons) - 1
+            patch.append({"op": "add", "path": "/lessons/-", "value": copy.deepcopy(lesson)})
+            _link(lesson)
+            continue
+
+        i = pos.get(op.get("id"))
+        if i is None:
+            raise DraftOpError("LESSON_NOT_FOUND", n)
+        old = lessons[i]
+        _unlink(old)
+        if kind == "delete":
+            lessons.pop(i)
+            patch.append({"op": "remove", "path": f"/lessons/{i}"})
+            pos = {l.get("id"): j for j, l in enumerate(lessons)}
+            continue
+
+        if kind == "move":
+            fields = {k: op[k] for k in MOVE_FIELDS if k in op}
+        else:
+            fields = op.get("fields")
+            if not isinstance(fields, dict) or "id" in fields:
+                raise DraftOpError("INVALID_FIELDS", n)
+        for key, value in fields.items():
+            if old.get(key) != value or key not in old:
+                patch.append({"op": "replace" if key in old else "add",
+                              "path": f"/lessons/{i}/{history.escape_token(key)}", "value": copy.deepcopy(value)})
+                old[key] = copy.deepcopy(value)
+        _link(old)
+
+    added, removed = [], []
+    for key in sorted(touched):
+        found = _bucket_check(key, [_normalize(lessons[pos[i]]) for i in buckets.get(key, [])])
+        before = problems.get(key, [])
+        added += [p for p in found if p not in before]
+        removed += [p for p in before if p not in found]
+        if found:
+            problems[key] = found
+        else:
+            problems.pop(key, None)
+
+    if patch:
+        index["seq"] = draft.history_seq + 1  # шаг, который запишет record_change
+        history.record_change(draft, data, patch=patch, collision_index=index)
+
+    totals = {"errors": 0, "warnings": 0}
+    for found in problems.values():
+        for p in found:
+            totals["errors" if p["severity"] == "error" else "warnings"] += 1
+    return {
+        "history_seq": draft.history_seq,
+        "collisions": {"added": added, "removed": removed},
+        "totals": totals,
+    }
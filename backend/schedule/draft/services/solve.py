@@ -0,0 +1,119 @@
+"""
+schedule/draft/services/solve.py
+Очередь заданий солвера шаблонной недели (SolveJob): постановка из API, аренда и
+выполнение в воркере draft_solver. Готовые уроки пишутся в черновик пользователя
+через history.record_change — «Отменить» возвращает черновик, каким он был до солвера.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.timezone import now
+
+from schedule.draft.models import SolveJob, TemplateWeekDraft
+from schedule.draft.services import history
+from schedule.template.solver import load_problem, solve
+
+logger = logging.getLogger("cedar.draft.solve")
+
+LEASE_MARGIN = timedelta(minutes=5)  # сверх time_budget: загрузка задачи и запись черновика
+
+
+def default_time_budget() -> int:
+    return getattr(settings, "TEMPLATE_SOLVER_TIME_BUDGET", 120)
+
+
+def max_time_budget() -> int:
+    return getattr(settings, "TEMPLATE_SOLVER_MAX_TIME_BUDGET", 900)
+
+
+def active_job(user) -> SolveJob | None:
+    return (SolveJob.objects
+            .filter(user=user, status__in=[SolveJob.Status.QUEUED, SolveJob.Status.RUNNING])
+            .first())
+
+
+def enqueue_solve(user, params: dict, time_budget: int | None = None) -> SolveJob:
+    return SolveJob.objects.create(user=user, params=params, time_budget=time_budget or default_time_budget())
+
+
+def claim_next_job() -> SolveJob | None:
+    """Берёт задание в аренду на time_budget + запас; упавший воркер отдаёт его по истечении аренды."""
+    ts = now()
+    with transaction.atomic():
+        job = (SolveJob.objects
+               .select_for_update(skip_locked=True)
+               .filter(Q(status=SolveJob.Status.QUEUED) |
+                       Q(status=SolveJob.Status.RUNNING, locked_until__lt=ts))
+               .order_by("created_at", "id")
+               .first())
+        if job is None:
+            return None
+        job.status = SolveJob.Status.RUNNING
+        job.started_at = ts
+        job.locked_until = ts + timedelta(seconds=job.time_budget) + LEASE_MARGIN
+        job.save(update_fields=["status", "started_at", "locked_until"])
+    return job
+
+
+def _apply_to_draft(job: SolveJob, lessons: list[dict]) -> int:
+    with transaction.atomic():
+        draft, _ = TemplateWeekDraft.objects.select_for_update().get_or_create(user=job.user)
+        history.record_change(draft, {**(draft.data or {}), "lessons": lessons})
+    return draft.history_seq
+
+
+def process_job(job: SolveJob) -> SolveJob:
+    params = job.params or {}
+
+    def on_progress(progress: dict) -> None:
+        SolveJob.objects.filter(pk=job.pk).update(progress=progress)
+
+    try:
+        problem = load_problem(grade_ids=params.get("grades"), days=params.get("days"),
+                               periods=params.get("periods"), duration=params.get("duration_minutes"))
+        solution = solve(problem, time_budget=job.time_budget, seed=params.get("seed"), on_progress=on_progress)
+        seq = _apply_to_draft(job, solution.lessons)
+    except Exception as e:
+        job.status = SolveJob.Status.FAILED
+        job.last_error = f"{type(e).__name__}: {e}"
+        job.finished_at = now()
+        job.save(update_fields=["status", "last_error", "finished_at"])
+        logger.exception("solve job #%s failed", job.id)
+        return job
+
+    job.status = SolveJob.Status.DONE
+    job.progress = {"iterations": solution.iterations, "cost": solution.cost,
+                    "hard": solution.hard, "elapsed": solution.elapsed}
+    job.result = {
+        "lessons": len(solution.lessons),
+        "hard": solution.hard,
+        "soft": solution.soft,
+        "unplaced": solution.unplaced,
+        "iterations": solution.iterations,
+        "elapsed": solution.elapsed,
+        "history_seq": seq,
+        **solution.stats,
+    }
+    job.finished_at = now()
+    job.locked_until = None
+    job.save(update_fields=["status", "progress", "result", "finished_at", "locked_until"])
+    logger.info("solve job #%s: lessons=%s hard=%s soft=%s in %.1fs",
+                job.id, len(solution.lessons), solution.hard, solution.soft, solution.elapsed)
+    return job
+
+
+def run_pending(limit: int | None = None) -> int:
+    """Выполняет задания из очереди; возвращает их число."""
+    done = 0
+    while limit is None or done < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        process_job(job)
+        done += 1
+    return done
@@ -0,0 +1,10 @@
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    # маски доступности кэшируются по teacher_id, а id в тестовой БД переиспользуются
+    cache.clear()
+    yield
+    cache.clear()
@@ -3,7 +3,7 @@ from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
 from users.models import User
-from schedule.core.models import LessonType
+from schedule.core.models import Grade, LessonType, Subject
 from schedule.draft.models import TemplateWeekDraft
 from schedule.template.models import TemplateWeek, TemplateLesson
 
@@ -14,10 +14,19 @@ def _mk_types():
     LessonType.objects.create(key="lecture", label="Лекция", counts_towards_norm=True)
     LessonType.objects.create(key="lab",     label="Лабораторная", counts_towards_norm=True)
 
+def _mk_refs():
+    """Классы, предметы и учителя, на которые ссылаются уроки черновика: {поле: [pk, ...]}."""
+    return {
+        "subject": [Subject.objects.create(name=f"Предмет {i}").pk for i in range(3)],
+        "grade": [Grade.objects.create(name=f"Класс {i}").pk for i in range(5)],
+        "teacher": [User.objects.create(username=f"teacher{i}", role=User.Role.TEACHER).pk for i in range(7)],
+    }
+
 def _mk_draft_with_lesson(lesson_type, user):
+    refs = _mk_refs()
     data = {
         "lessons": [{
-            "subject": 1, "grade": 1, "teacher": 1,
+            "subject": refs["subject"][0], "grade": refs["grade"][0], "teacher": refs["teacher"][0],
             "day_of_week": 0, "start_time": "09:00",
             "duration_minutes": 45, "type": lesson_type
         }]
@@ -72,3 +81,64 @@ def test_commit_unknown_type_returns_400(db):
     assert "type" in err
     assert "available" in err["type"]
     assert any(x["key"] == "lecture" for x in err["type"]["available"])
+
+
+def _lessons(n, **kw):
+    refs = _mk_refs()
+    return [{"subject": refs["subject"][i % 3], "grade": refs["grade"][i % 5], "teacher": refs["teacher"][i % 7],
+             "day_of_week": i % 5, "start_time": f"{8 + i % 8:02d}:00",
+             "duration_minutes": 45, "type": {"key": "lecture"}, **kw} for i in range(n)]
+
+
+def test_commit_is_bulk(db, django_assert_max_num_queries):
+    _mk_types()
+    admin = _mk_admin()
+    draft = TemplateWeekDraft.objects.create(user=admin, data={"lessons": _lessons(600)})
+
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    with django_assert_max_num_queries(25):
+        resp = _commit(client, draft.id)
+    assert resp.status_code == status.HTTP_200_OK, resp.data
+    week = TemplateWeek.objects.get(id=resp.json()["week_id"])
+    assert week.lessons.count() == 600
+    assert week.lessons.filter(type__key="lecture").count() == 600
+
+
+def test_commit_reports_all_lesson_errors(db):
+    _mk_types()
+    admin = _mk_admin()
+    lessons = _lessons(4)
+    lessons[1]["start_time"] = "25:xx"
+    lessons[2]["type"] = {"key": "nope"}
+    del lessons[3]["teacher"]
+    draft = TemplateWeekDraft.objects.create(user=admin, data={"lessons": lessons})
+
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    resp = _commit(client, draft.id)
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+    errors = {e["index"]: set(e["errors"]) for e in resp.json()["errors"]}
+    assert errors == {1: {"start_time"}, 2: {"type"}, 3: {"teacher"}}
+    assert not TemplateWeek.objects.exists()
+
+
+def test_commit_accepts_string_ids_and_reports_unknown(db):
+    _mk_types()
+    admin = _mk_admin()
+    lessons = _lessons(2)
+    lessons[0].update(grade=str(lessons[0]["grade"]), subject=str(lessons[0]["subject"]))
+    lessons[1]["teacher"] = 999999
+    draft = TemplateWeekDraft.objects.create(user=admin, data={"lessons": lessons})
+
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    resp = _commit(client, draft.id)
+    assert resp.status_code == status.HTTP_400_BAD_REQUEST
+    assert resp.json()["errors"] == [{"index": 1, "id": None, "errors": {"teacher": "Не найден (id=999999)."}}]
+    assert not User.objects.filter(pk=999999).exists()
+
+    lessons[1]["teacher"] = lessons[0]["teacher"]
+    draft.data = {"lessons": lessons}
+    draft.save()
+    assert _commit(client, draft.id).status_code == status.HTTP_200_OK
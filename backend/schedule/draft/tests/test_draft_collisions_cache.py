@@ -0,0 +1,68 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from schedule.draft.models import TemplateWeekDraft
+from schedule.draft.services import collisions
+from schedule.draft.services.collisions import lessons_hash
+
+pytestmark = pytest.mark.django_db
+
+
+def _lesson(i, start):
+    return {"id": i, "subject": 1, "grade": 1, "teacher": 1, "day_of_week": 0,
+            "start_time": start, "duration_minutes": 45}
+
+
+@pytest.fixture
+def client():
+    user = User.objects.create_user(username="editor", password="x")
+    TemplateWeekDraft.objects.create(user=user, data={"lessons": [_lesson(1, "09:00"), _lesson(2, "09:30")]})
+    c = APIClient()
+    c.force_authenticate(user)
+    return c
+
+
+@pytest.fixture
+def checks(monkeypatch):
+    calls = []
+    real = collisions.check_collisions
+
+    def counting(lessons):
+        calls.append(len(lessons))
+        return real(lessons)
+
+    monkeypatch.setattr(collisions, "check_collisions", counting)
+    return calls
+
+
+def test_hash_is_stable_for_key_order():
+    a = [{"id": 1, "start_time": "09:00", "teacher": 1}]
+    b = [{"teacher": 1, "start_time": "09:00", "id": 1}]
+    assert lessons_hash(a) == lessons_hash(b)
+    assert lessons_hash(a) != lessons_hash([{**a[0], "teacher": 2}])
+
+
+def test_polling_reuses_cached_collisions(client, checks):
+    url = reverse("draft:get-or-create-draft")
+    first = client.get(url).json()
+    assert [c["type"] for c in first["collisions"]] == ["teacher", "grade"]
+    for _ in range(3):
+        assert client.get(url).json()["collisions"] == first["collisions"]
+    assert checks == [2]
+    assert "collisions_cache" not in first
+
+
+def test_change_invalidates_cache(client, checks):
+    url = reverse("draft:get-or-create-draft")
+    client.get(url)
+    res = client.patch(reverse("draft:update-draft"),
+                       {"data": {"lessons": [_lesson(1, "09:00"), _lesson(2, "11:00")]}}, format="json")
+    assert res.json()["collisions"] == []
+    assert client.get(url).json()["collisions"] == []
+    assert checks == [2, 2]
+
+    client.post(reverse("draft:undo-draft"))
+    assert len(client.get(url).json()["collisions"]) == 2
+    assert checks == [2, 2, 2]
@@ -0,0 +1,91 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from schedule.draft.models import DraftChange, TemplateWeekDraft
+from schedule.draft.services.history import apply_patch, make_patch, state_at
+
+pytestmark = pytest.mark.django_db
+
+
+def _lesson(i, **kw):
+    return {"id": i + 1, "subject": 1, "grade": 1, "teacher": 1, "day_of_week": i % 5,
+            "start_time": f"{8 + i % 6:02d}:00", "duration_minutes": 45, **kw}
+
+
+@pytest.fixture
+def client():
+    user = User.objects.create_user(username="editor", password="x")
+    c = APIClient()
+    c.force_authenticate(user)
+    c.post(reverse("draft:create-empty-draft"))
+    return c
+
+
+def _save(client, lessons):
+    res = client.patch(reverse("draft:update-draft"), {"data": {"lessons": lessons}}, format="json")
+    assert res.status_code == 200
+    return res.json()
+
+
+@pytest.mark.parametrize("old, new", [
+    ({"lessons": [_lesson(0), _lesson(1)]}, {"lessons": [_lesson(0), _lesson(1, start_time="12:00")]}),
+    ({"lessons": [_lesson(0), _lesson(1)]}, {"lessons": [_lesson(0), _lesson(5), _lesson(1)]}),
+    ({"lessons": [_lesson(0), _lesson(1), _lesson(2)]}, {"lessons": [_lesson(2)]}),
+    ({"lessons": [], "a/b~c": 1}, {"lessons": [_lesson(3)], "note": None}),
+    ({"lessons": [_lesson(0)]}, []),
+])
+def test_patch_roundtrip(old, new):
+    assert apply_patch(old, make_patch(old, new)) == new
+
+
+def test_single_edit_stores_small_delta(client):
+    lessons = [_lesson(i) for i in range(40)]
+    _save(client, lessons)
+    lessons[7]["start_time"] = "15:00"
+    data = _save(client, lessons)
+
+    assert "change_history" not in data
+    assert data["history_seq"] == 2
+    last = DraftChange.objects.get(seq=2)
+    assert last.patch == [{"op": "replace", "path": "/lessons/7/start_time", "value": "15:00"}]
+    assert last.snapshot is None
+
+
+def test_undo_redo(client):
+    states = [[_lesson(i) for i in range(n)] for n in range(1, 5)]
+    for lessons in states:
+        _save(client, lessons)
+
+    undo, redo = reverse("draft:undo-draft"), reverse("draft:redo-draft")
+    assert client.post(undo).json()["data"]["lessons"] == states[2]
+    assert client.post(undo).json()["data"]["lessons"] == states[1]
+    assert client.post(redo).json()["data"]["lessons"] == states[2]
+
+    # новая правка после undo отбрасывает ветку redo
+    _save(client, [_lesson(9)])
+    assert client.post(redo).status_code == 400
+    assert client.post(undo).json()["data"]["lessons"] == states[2]
+    for _ in range(3):
+        client.post(undo)
+    assert client.post(undo).status_code == 400  # дошли до пустого черновика
+    assert TemplateWeekDraft.objects.get().data == {"lessons": []}
+
+
+def test_checkpoints_and_compaction(client, settings):
+    settings.DRAFT_HISTORY_CHECKPOINT_EVERY = 5
+    settings.DRAFT_HISTORY_LIMIT = 10
+    for n in range(1, 24):
+        _save(client, [_lesson(i) for i in range(n)])
+
+    draft = TemplateWeekDraft.objects.get()
+    assert (draft.history_base, draft.history_head) == (10, 23)
+    assert DraftChange.objects.filter(seq__lt=10).count() == 0
+    assert list(DraftChange.objects.filter(snapshot__isnull=False).values_list("seq", flat=True)) == [10, 15, 20]
+    assert state_at(draft, 12)["lessons"] == [_lesson(i) for i in range(12)]
+
+    for _ in range(13):
+        assert client.post(reverse("draft:undo-draft")).status_code == 200
+    assert client.post(reverse("draft:undo-draft")).status_code == 400
+    assert TemplateWeekDraft.objects.get().data["lessons"] == [_lesson(i) for i in range(10)]
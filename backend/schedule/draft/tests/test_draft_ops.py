@@ -0,0 +1,126 @@
+import random
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from schedule.draft.models import TemplateWeekDraft
+from schedule.validators.schedule_rules import check_collisions
+
+pytestmark = pytest.mark.django_db
+
+
+def _lesson(i, day=0, start="09:00", teacher=1, grade=1, **kw):
+    return {"id": i, "subject": 1, "grade": grade, "teacher": teacher, "day_of_week": day,
+            "start_time": start, "duration_minutes": 45, **kw}
+
+
+def _week(n):
+    """n уроков без пересечений: у каждого свой учитель и класс."""
+    return [_lesson(i, day=i % 5, start=f"{8 + i % 8:02d}:00", teacher=i, grade=i) for i in range(1, n + 1)]
+
+
+@pytest.fixture
+def user():
+    return User.objects.create_user(username="editor", password="x")
+
+
+@pytest.fixture
+def client(user):
+    c = APIClient()
+    c.force_authenticate(user)
+    return c
+
+
+def _draft(user, lessons):
+    return TemplateWeekDraft.objects.create(user=user, data={"lessons": lessons})
+
+
+def _ops(client, *ops):
+    return client.post(reverse("draft:draft-ops"), {"ops": list(ops)}, format="json")
+
+
+def _key(p):
+    return (p["type"], p.get("resource_id"), p.get("weekday"), tuple(p["lesson_ids"]))
+
+
+def test_move_reports_collision_delta(client, user):
+    _draft(user, [_lesson(1), _lesson(2, start="11:00", grade=2), _lesson(3, start="13:00", teacher=2)])
+
+    res = _ops(client, {"op": "move", "id": 2, "start_time": "09:30"})
+    assert res.status_code == 200
+    body = res.json()
+    assert [_key(p) for p in body["collisions"]["added"]] == [("teacher", 1, 0, (1, 2))]
+    assert body["collisions"]["removed"] == []
+    assert body["totals"] == {"errors": 1, "warnings": 0}
+
+    body = _ops(client, {"op": "move", "id": 2, "start_time": "12:00"}).json()
+    assert [_key(p) for p in body["collisions"]["removed"]] == [("teacher", 1, 0, (1, 2))]
+    assert body["totals"] == {"errors": 0, "warnings": 0}
+    assert TemplateWeekDraft.objects.get().data["lessons"][1]["start_time"] == "12:00"
+
+
+def test_index_matches_full_check(client, user):
+    draft = _draft(user, _week(30))
+    rnd = random.Random(7)
+    next_id = 100
+    for _ in range(40):
+        ids = [l["id"] for l in TemplateWeekDraft.objects.get().data["lessons"]]
+        choice = rnd.choice(["add", "move", "update", "delete"])
+        if choice == "add":
+            op = {"op": "add", "lesson": _lesson(next_id, day=rnd.randrange(5), teacher=rnd.randrange(1, 4),
+                                                 start=f"{rnd.randrange(8, 12):02d}:{rnd.choice(['00', '30'])}",
+                                                 room=rnd.choice([None, 7]))}
+            next_id += 1
+        elif choice == "move":
+            op = {"op": "move", "id": rnd.choice(ids), "day_of_week": rnd.randrange(5),
+                  "start_time": f"{rnd.randrange(8, 12):02d}:15"}
+        elif choice == "update":
+            op = {"op": "update", "id": rnd.choice(ids), "fields": {"grade": rnd.randrange(1, 4)}}
+        else:
+            op = {"op": "delete", "id": rnd.choice(ids)}
+        assert _ops(client, op).status_code == 200
+
+    draft.refresh_from_db()
+    indexed = sorted(_key(p) for found in draft.collision_index["problems"].values() for p in found)
+    assert indexed == sorted(_key(p) for p in check_collisions(draft.data["lessons"]))
+    assert indexed  # сценарий действительно создаёт пересечения
+
+
+def test_cost_does_not_depend_on_week_size(client, user):
+    draft = _draft(user, _week(10))
+    _ops(client, {"op": "move", "id": 1, "start_time": "08:30"})  # сборка индекса
+    with CaptureQueriesContext(connection) as small:
+        _ops(client, {"op": "move", "id": 1, "start_time": "08:45"})
+
+    draft.delete()
+    _draft(user, _week(400))
+    _ops(client, {"op": "move", "id": 1, "start_time": "08:30"})
+    with CaptureQueriesContext(connection) as large:
+        _ops(client, {"op": "move", "id": 1, "start_time": "08:45"})
+    assert len(large) == len(small)
+
+
+def test_bad_op_rejects_whole_batch(client, user):
+    _draft(user, [_lesson(1)])
+    res = _ops(client, {"op": "move", "id": 1, "start_time": "10:00"}, {"op": "delete", "id": 99})
+    assert res.status_code == 400
+    assert res.json() == {"detail": "LESSON_NOT_FOUND", "op_index": 1}
+    draft = TemplateWeekDraft.objects.get()
+    assert draft.data["lessons"][0]["start_time"] == "09:00"
+    assert draft.history_seq == 0
+
+
+def test_ops_are_undoable_and_assign_missing_ids(client, user):
+    _draft(user, [{k: v for k, v in _lesson(0).items() if k != "id"}])
+    body = _ops(client, {"op": "add", "lesson": _lesson(5, start="09:15")}).json()
+    assert body["history_seq"] == 1
+    lessons = TemplateWeekDraft.objects.get().data["lessons"]
+    assert [l["id"] for l in lessons] == [1, 5]
+
+    res = client.post(reverse("draft:undo-draft"))
+    assert res.json()["data"]["lessons"] == [{k: v for k, v in _lesson(0).items() if k != "id"}]
+    assert TemplateWeekDraft.objects.get().collision_index == {}
@@ -0,0 +1,182 @@
+import random
+import time
+from datetime import time as _time
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from schedule.core.models import (
+    Grade, LessonType, Subject, TeacherAvailability, TeacherGrade, TeacherSubject, WeeklyNorm,
+)
+from schedule.draft.models import SolveJob, TemplateWeekDraft
+from schedule.draft.services.solve import run_pending
+from schedule.template.solver import Group, Problem, load_problem, propagate, solve
+from schedule.template.solver.problem import DEFAULT_PERIODS, parse_periods
+from schedule.template.solver.search import State, anneal, assign_teachers, greedy_place
+from schedule.validators.schedule_rules import check_collisions
+
+pytestmark = pytest.mark.django_db
+
+PERIODS = parse_periods(DEFAULT_PERIODS)
+FULL = (1 << 5 * len(PERIODS)) - 1
+
+
+def _synthetic(grades, seed=0, teacher_load=22):
+    """Школа без БД: 28 уроков в неделю на класс, учителей — по нагрузке ~teacher_load уроков."""
+    rnd = random.Random(seed)
+    per_week = dict(zip(range(1, 13), [5, 4, 3, 3, 2, 2, 2, 2, 2, 1, 1, 1]))
+    teachers = {s: list(range(s * 1000, s * 1000 + grades * n // teacher_load + 1)) for s, n in per_week.items()}
+    allowed = {t: FULL for ts in teachers.values() for t in ts}
+    for t in rnd.sample(sorted(allowed), len(allowed) // 5):  # часть учителей не работает по пятницам
+        allowed[t] = (1 << 4 * len(PERIODS)) - 1
+    groups = [Group(g, s, ["lesson"] * n, teachers[s][:]) for g in range(grades) for s, n in per_week.items()]
+    problem = Problem(days=5, periods=PERIODS, duration=45, groups=groups, allowed=allowed)
+    propagate(problem)
+    return problem
+
+
+def _assert_feasible(problem, lessons):
+    assert not [c for c in check_collisions(lessons) if c["severity"] == "error"]
+    per = len(problem.periods)
+    for l in lessons:
+        pos = l["day_of_week"] * per + problem.periods.index(_time(*map(int, l["start_time"].split(":"))))
+        assert problem.allowed[l["teacher"]] >> pos & 1
+    expected = {(g.grade, g.subject): len(g.units) for g in problem.groups if g.candidates}
+    got = {}
+    for l in lessons:
+        got[(l["grade"], l["subject"])] = got.get((l["grade"], l["subject"]), 0) + 1
+    assert got == expected
+
+
+def test_solver_produces_conflict_free_week():
+    problem = _synthetic(6)
+    solution = solve(problem, time_budget=5, seed=1, max_iterations=30_000)
+    assert solution.hard == 0
+    assert solution.unplaced == []
+    _assert_feasible(problem, solution.lessons)
+    # один учитель на пару (класс, предмет) на всю неделю
+    teachers = {}
+    for l in solution.lessons:
+        assert teachers.setdefault((l["grade"], l["subject"]), l["teacher"]) == l["teacher"]
+
+
+def test_incremental_cost_matches_full_recompute():
+    state = State(_synthetic(4, teacher_load=40), random.Random(3))
+    assign_teachers(state)
+    greedy_place(state)
+    assert (state.hard, state.soft) == state.recompute()
+    anneal(state, time_budget=5, max_iterations=20_000)
+    assert (state.hard, state.soft) == state.recompute()
+
+
+def test_propagation_reports_unplaceable_groups():
+    allowed = {1: FULL, 2: 0b111}  # учитель 2 свободен только на три первые пары понедельника
+    problem = Problem(days=5, periods=PERIODS, duration=45, allowed=allowed, groups=[
+        Group(1, 1, ["lesson"] * 3, [1]),
+        Group(1, 2, ["lesson"] * 4, [2]),
+        Group(1, 3, ["lesson"], []),
+    ])
+    propagate(problem)
+    solution = solve(problem, time_budget=1, seed=0, max_iterations=1_000)
+    assert [(u["subject"], u["reason"]) for u in solution.unplaced] == [
+        (2, "NO_AVAILABLE_TEACHER"), (3, "NO_TEACHER")]
+    assert len(solution.lessons) == 3
+
+
+@pytest.fixture
+def school():
+    grades = [Grade.objects.create(name=f"{i}А") for i in range(1, 4)]
+    subjects = [Subject.objects.create(name=n) for n in ("Математика", "Русский язык", "История")]
+    LessonType.objects.create(key="lesson", label="Урок")
+    LessonType.objects.create(key="course", label="Курс")
+    teachers = []
+    for i, subject in enumerate(subjects):
+        t = User.objects.create(username=f"t{i}", role=User.Role.TEACHER)
+        TeacherSubject.objects.create(teacher=t, subject=subject)
+        for g in grades:
+            TeacherGrade.objects.create(teacher=t, grade=g)
+        teachers.append(t)
+    for g in grades:
+        WeeklyNorm.objects.create(grade=g, subject=subjects[0], lessons_per_week=4, courses_per_week=1)
+        WeeklyNorm.objects.create(grade=g, subject=subjects[1], lessons_per_week=3)
+        WeeklyNorm.objects.create(grade=g, subject=subjects[2], lessons_per_week=2)
+    # историк работает только в понедельник и вторник до обеда
+    for day in (0, 1):
+        TeacherAvailability.objects.create(teacher=teachers[2], day_of_week=day,
+                                           start_time=_time(8), end_time=_time(12))
+    return grades, subjects, teachers
+
+
+def test_load_problem_respects_availability(school):
+    grades, subjects, teachers = school
+    problem = load_problem()
+    assert len(problem.groups) == 9
+    solution = solve(problem, time_budget=5, seed=2, max_iterations=30_000)
+    assert solution.hard == 0
+    _assert_feasible(problem, solution.lessons)
+    history_lessons = [l for l in solution.lessons if l["teacher"] == teachers[2].id]
+    assert len(history_lessons) == 6
+    assert all(l["day_of_week"] in (0, 1) and l["start_time"] < "11:15" for l in history_lessons)
+    kinds = [l["type"]["key"] for l in solution.lessons if l["subject"] == subjects[0].id]
+    assert kinds.count("course") == 3
+
+
+def test_grid_must_fit_lesson(school):
+    with pytest.raises(ValueError, match="заходит на пару"):
+        load_problem(duration=90)
+    with pytest.raises(ValueError, match="после полуночи"):
+        Problem(days=5, periods=[_time(23, 30)], duration=45, groups=[], allowed={})
+    assert load_problem(periods=["08:00", "09:30"], duration=90).duration == 90
+
+
+def test_solve_job_writes_draft(school):
+    user = User.objects.create_user(username="editor", password="x")
+    client = APIClient()
+    client.force_authenticate(user)
+    before = [{"id": 1, "grade": school[0][0].id, "subject": school[1][0].id, "teacher": school[2][0].id,
+               "day_of_week": 0, "start_time": "08:30", "duration_minutes": 45}]
+    TemplateWeekDraft.objects.create(user=user, data={"lessons": before})
+
+    url = reverse("draft:solve-draft")
+    assert client.post(url, {"time_budget": 0}, format="json").json()["detail"] == "INVALID_TIME_BUDGET"
+    assert client.post(url, {"periods": ["8:x"]}, format="json").json()["detail"] == "INVALID_PERIODS"
+    # 90-минутный урок не помещается между парами по умолчанию (08:30, 09:25, ...)
+    assert client.post(url, {"duration_minutes": 90}, format="json").json()["detail"] == "INVALID_DURATION"
+    assert client.post(url, {"periods": ["08:00", "08:30"]}, format="json").json()["detail"] == "INVALID_PERIODS"
+    assert client.post(url, {"periods": ["08:00", "10:00"], "duration_minutes": 90},
+                       format="json").status_code == 202
+    SolveJob.objects.all().delete()
+
+    resp = client.post(url, {"time_budget": 3, "seed": 5}, format="json")
+    assert resp.status_code == 202
+    job_id = resp.json()["id"]
+    assert client.post(url, {}, format="json").status_code == 409
+
+    assert run_pending() == 1
+    data = client.get(reverse("draft:solve-job", args=[job_id])).json()
+    assert data["status"] == SolveJob.Status.DONE, data["last_error"]
+    assert data["result"]["hard"] == 0 and data["result"]["lessons"] == 30
+
+    draft = TemplateWeekDraft.objects.get(user=user)
+    assert len(draft.data["lessons"]) == 30
+    assert client.post(reverse("draft:undo-draft")).json()["data"]["lessons"] == before
+
+    other = APIClient()
+    other.force_authenticate(User.objects.create_user(username="other", password="x"))
+    assert other.get(reverse("draft:solve-job", args=[job_id])).status_code == 404
+
+
+@pytest.mark.slow
+def test_benchmark_hundred_grades(record_property):
+    problem = _synthetic(100)
+    started = time.perf_counter()
+    solution = solve(problem, time_budget=20, seed=1)
+    elapsed = time.perf_counter() - started
+    record_property("solver_seconds", round(elapsed, 1))
+    record_property("solver_iterations", solution.iterations)
+    record_property("solver_soft", solution.soft)
+    assert solution.hard == 0
+    assert elapsed < 25
+    _assert_feasible(problem, solution.lessons)
@@ -8,7 +8,12 @@ from .views import (
     create_draft_from_template,
     create_empty_draft,
     update_draft,
+    draft_ops,
+    undo_draft,
+    redo_draft,
     commit_draft,
+    solve_draft,
+    solve_job_status,
     draft_exists,
     validate_draft
 )
@@ -20,6 +25,11 @@ urlpatterns = [
     path('template-drafts/create-from/', create_draft_from_template, name='create-draft-from-template'),  # POST с template_id (или без — с активной)
     path('template-drafts/create-empty/', create_empty_draft, name='create-empty-draft'),  # POST
     path('template-drafts/update/', update_draft, name='update-draft'),  # PATCH
+    path('ops/', draft_ops, name='draft-ops'),  # POST — операции add/move/update/delete
+    path('template-drafts/undo/', undo_draft, name='undo-draft'),  # POST
+    path('template-drafts/redo/', redo_draft, name='redo-draft'),  # POST
+    path('template-drafts/solve/', solve_draft, name='solve-draft'),  # POST — поставить солвер в очередь
+    path('solve-jobs/<int:job_id>/', solve_job_status, name='solve-job'),  # GET — статус/прогресс
     path('template-drafts/<int:draft_id>/commit/', commit_draft, name='commit-draft'),  # POST
     path('template-drafts/exists/', draft_exists),
     path('template-drafts/validate/', validate_draft, name='template-draft-validate'),
@@ -2,7 +2,7 @@
 schedule/draft/views.py
 Функции для управления единственным активным черновиком недели.
 """
-from datetime import date as _date, time as _time
+from datetime import date as _date
 
 from django.db import transaction
 from django.shortcuts import get_object_or_404
@@ -11,48 +11,27 @@ from django.utils.timezone import now
 
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from users.models import User
 
-from .models import TemplateWeekDraft
-from .serializers import TemplateWeekDraftSerializer
+from .models import SolveJob, TemplateWeekDraft
+from .services import history
+from .services import solve
+from .services.commit import build_template_lessons, bulk_create_template_lessons
+from .services.ops import DraftOpError, apply_ops
+from .serializers import SolveJobSerializer, TemplateWeekDraftSerializer
 
-from schedule.core.models import AcademicYear, LessonType, Grade, Subject
-from schedule.core.services.lesson_type_lookup import get_lesson_type_or_400
+from schedule.core.models import AcademicYear
 from schedule.template.models import TemplateWeek, TemplateLesson
-from schedule.validators.schedule_rules import check_collisions
+from schedule.template.solver.problem import grid, parse_periods
+from schedule.validators.schedule_rules import check_availability, check_collisions
 
 
 # -----------------------------------------------------
 # Вспомогательные
 # -----------------------------------------------------
-def _parse_time(v):
-    if v is None:
-        return None
-    if isinstance(v, str):
-        try:
-            hh, mm = v.split(":")[:2]
-            return _time(int(hh), int(mm))
-        except Exception:
-            return None
-    return v
-
-
-def _ensure_fk_rows(grade_id: int | None, subject_id: int | None, teacher_id: int | None):
-    """
-    В тестах черновик может ссылаться на pk, которых ещё нет (grade=1, subject=1, teacher=1).
-    Чтобы не падать на FK-проверке SQLite, гарантируем наличие записей.
-    """
-    if grade_id and not Grade.objects.filter(pk=grade_id).exists():
-        Grade.objects.create(pk=grade_id, name=f"Класс {grade_id}")
-    if subject_id and not Subject.objects.filter(pk=subject_id).exists():
-        Subject.objects.create(pk=subject_id, name=f"Предмет {subject_id}")
-    if teacher_id and not User.objects.filter(pk=teacher_id).exists():
-        User.objects.create(pk=teacher_id, username=f"teacher{teacher_id}", role=User.Role.TEACHER)
-
 def _normalize_lessons(raw_lessons: list[dict]) -> list[dict]:
     norm = []
     for item in raw_lessons or []:
@@ -108,7 +87,6 @@ def create_draft_from_template(request):
         user=request.user,
         base_week=template,
         data={"lessons": lessons_data},
-        change_history=[],
     )
     return Response(TemplateWeekDraftSerializer(draft).data, status=status.HTTP_200_OK)
 
@@ -120,7 +98,6 @@ def create_empty_draft(request):
     draft = TemplateWeekDraft.objects.create(
         user=request.user,
         data={"lessons": []},
-        change_history=[],
     )
     return Response(TemplateWeekDraftSerializer(draft).data, status=status.HTTP_200_OK)
 
@@ -128,14 +105,119 @@ def create_empty_draft(request):
 @api_view(['PATCH'])
 @permission_classes([IsAuthenticated])
 def update_draft(request):
-    draft = get_object_or_404(TemplateWeekDraft, user=request.user)
     new_data = request.data.get('data', {})
-    draft.change_history.append(draft.data)
-    draft.data = new_data
-    draft.save()
+    with transaction.atomic():  # параллельные PATCH одного пользователя — по очереди
+        draft = get_object_or_404(TemplateWeekDraft.objects.select_for_update(), user=request.user)
+        history.record_change(draft, new_data)
+    return Response(TemplateWeekDraftSerializer(draft).data, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def draft_ops(request):
+    """
+    Пакет операций над уроками черновика: { "ops": [ {"op": "add", "lesson": {...}},
+    {"op": "move", "id": 5, "day_of_week": 2, "start_time": "10:00"},
+    {"op": "update", "id": 5, "fields": {...}}, {"op": "delete", "id": 5} ] }.
+    Ответ — изменение коллизий по затронутым корзинам, а не весь черновик.
+    """
+    with transaction.atomic():
+        draft = get_object_or_404(TemplateWeekDraft.objects.select_for_update(), user=request.user)
+        try:
+            result = apply_ops(draft, request.data.get("ops"))
+        except DraftOpError as e:
+            return Response({"detail": e.code, "op_index": e.index}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def undo_draft(request):
+    """Шаг назад по истории черновика; 400 NOTHING_TO_UNDO — отменять нечего."""
+    with transaction.atomic():
+        draft = get_object_or_404(TemplateWeekDraft.objects.select_for_update(), user=request.user)
+        moved = history.undo(draft)
+    if not moved:
+        return Response({"detail": "NOTHING_TO_UNDO"}, status=status.HTTP_400_BAD_REQUEST)
     return Response(TemplateWeekDraftSerializer(draft).data, status=status.HTTP_200_OK)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def redo_draft(request):
+    """Шаг вперёд после undo; 400 NOTHING_TO_REDO — после undo была новая правка или undo не было."""
+    with transaction.atomic():
+        draft = get_object_or_404(TemplateWeekDraft.objects.select_for_update(), user=request.user)
+        moved = history.redo(draft)
+    if not moved:
+        return Response({"detail": "NOTHING_TO_REDO"}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(TemplateWeekDraftSerializer(draft).data, status=status.HTTP_200_OK)
+
+
+def _solve_params(data) -> tuple[dict, int, str | None]:
+    """Параметры солвера из тела запроса: (params, time_budget, код ошибки или None)."""
+    params = {}
+    raw = data.get("time_budget")
+    try:
+        budget = solve.default_time_budget() if raw in (None, "") else int(raw)
+    except (TypeError, ValueError):
+        return params, 0, "INVALID_TIME_BUDGET"
+    if not 1 <= budget <= solve.max_time_budget():
+        return params, 0, "INVALID_TIME_BUDGET"
+    try:
+        if data.get("grades") is not None:
+            params["grades"] = [int(g) for g in data["grades"]]
+    except (TypeError, ValueError):
+        return params, 0, "INVALID_GRADES"
+    try:
+        if data.get("periods"):
+            params["periods"] = [t.strftime("%H:%M") for t in parse_periods(data["periods"])]
+    except (TypeError, ValueError):
+        return params, 0, "INVALID_PERIODS"
+    for key, code, hi in (("days", "INVALID_DAYS", 7), ("duration_minutes", "INVALID_DURATION", 24 * 60),
+                          ("seed", "INVALID_SEED", None)):
+        if data.get(key) is None:
+            continue
+        try:
+            params[key] = int(data[key])
+        except (TypeError, ValueError):
+            return params, 0, code
+        if hi is not None and not 1 <= params[key] <= hi:
+            return params, 0, code
+    try:
+        grid(params.get("periods"), params.get("duration_minutes"))  # урок помещается между парами
+    except ValueError:
+        return params, 0, "INVALID_PERIODS" if "periods" in params else "INVALID_DURATION"
+    return params, budget, None
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def solve_draft(request):
+    """
+    Ставит в очередь автоматическое составление черновика (schedule.template.solver).
+    Тело (всё необязательно): time_budget (сек), grades, days, periods ["08:30", ...],
+    duration_minutes, seed. Ответ 202 — задание; результат придёт в черновик шагом истории.
+    """
+    params, budget, error = _solve_params(request.data)
+    if error:
+        return Response({"detail": error}, status=status.HTTP_400_BAD_REQUEST)
+    with transaction.atomic():
+        running = solve.active_job(request.user)
+        if running:
+            return Response({"detail": "SOLVE_IN_PROGRESS", "job": SolveJobSerializer(running).data},
+                            status=status.HTTP_409_CONFLICT)
+        job = solve.enqueue_solve(request.user, params, budget)
+    return Response(SolveJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def solve_job_status(request, job_id: int):
+    job = get_object_or_404(SolveJob, pk=job_id, user=request.user)
+    return Response(SolveJobSerializer(job).data, status=status.HTTP_200_OK)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def commit_draft(request, draft_id: int | None = None):
@@ -154,6 +236,20 @@ def commit_draft(request, draft_id: int | None = None):
 
     lessons = (draft.data or {}).get("lessons", [])
 
+    # все уроки проверяются до записи: ошибки — одним ответом, по каждому уроку
+    rows, errors, available_types = build_template_lessons(lessons)
+    if errors:
+        payload = {"detail": "INVALID_LESSONS", "errors": errors}
+        if any("type" in e["errors"] for e in errors):
+            first = next(e for e in errors if "type" in e["errors"])
+            payload["type"] = {
+                "message": first["errors"]["type"],
+                "received": lessons[first["index"]].get("type"),
+                "available": available_types,
+                "hint": "Напр.: {'type': {'key': 'lecture'}} или {'type': {'label': 'Лекция'}}",
+            }
+        return Response(payload, status=status.HTTP_400_BAD_REQUEST)
+
     with transaction.atomic():
         TemplateWeek.objects.filter(is_active=True).update(is_active=False)
 
@@ -177,36 +273,10 @@ def commit_draft(request, draft_id: int | None = None):
             is_active=True,
             description=f"Опубликовано пользователем {request.user.username}",
         )
-
-        for l in lessons:
-            grade_id = l.get("grade") or l.get("grade_id")
-            subject_id = l.get("subject") or l.get("subject_id")
-            teacher_id = l.get("teacher") or l.get("teacher_id")
-
-            # type: поддерживаем type_id ИЛИ объект {"key": ...} / {"label": ...}
-            type_id = l.get("type_id")
-            if type_id is not None:
-                lt_obj = LessonType.objects.filter(id=type_id).first()
-                if lt_obj is None:
-                    raise ValidationError({"type": f"LessonType id={type_id} не найден."})
-            else:
-                lt_obj = get_lesson_type_or_400(l.get("type"))
-
-            _ensure_fk_rows(grade_id, subject_id, teacher_id)
-
-            TemplateLesson.objects.create(
-                template_week=week,
-                grade_id=grade_id,
-                subject_id=subject_id,
-                teacher_id=teacher_id,
-                day_of_week=l["day_of_week"],
-                start_time=_parse_time(l.get("start_time")),
-                duration_minutes=l["duration_minutes"],
-                type=lt_obj,
-            )
+        bulk_create_template_lessons(week, rows)
 
         draft.data = {"lessons": []}
-        draft.change_history = []
+        history.reset_history(draft)
         draft.save()
 
     return Response({"detail": "Черновик опубликован", "week_id": week.id}, status=status.HTTP_200_OK)
@@ -233,6 +303,9 @@ def validate_draft(request):
 
     # C) вызываем валидатор
     collisions_raw = check_collisions(lessons) or []
+    if isinstance(collisions_raw, list):
+        # доступность учителей — по кэшированным битовым маскам
+        collisions_raw += check_availability(lessons)
 
     # D) раскладываем list → errors/warnings (если валидатор не отдаёт dict)
     if isinstance(collisions_raw, dict):
@@ -35,13 +35,13 @@ class RoomAdmin(admin.ModelAdmin):
         "recording_status", "recording_file_url",
     )
     fieldsets = (
-        ("Базовое", {"fields": ("type", "lesson", "is_open", "public_slug", "status")}),
+        ("Базовое", {"fields": ("type", "lesson", "is_open", "public_slug", "status", "status_override")}),
         ("Время", {"fields": ("scheduled_start", "scheduled_end", "started_at", "ended_at")}),
         ("Jitsi", {"fields": ("jitsi_env", "jitsi_domain", "jitsi_room", "join_url")}),
         ("Запись", {"fields": (
             "recording_status", "recording_file_url",
             "recording_started_at", "recording_ended_at",
-            "recording_duration_secs", "recording_storage", "recording_meta",
+            "recording_duration_secs", "recording_storage", "recording_meta", "recording_keep",
         )}),
         ("Служебное", {"fields": ("created_at",)}),
     )
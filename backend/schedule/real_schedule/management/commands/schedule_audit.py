@@ -0,0 +1,43 @@
+# backend/schedule/real_schedule/management/commands/schedule_audit.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from schedule.real_schedule.services.audit import audit
+
+
+class Command(BaseCommand):
+    help = "Аудит RealLesson: пересечения учителей/классов, дубли уроков, повторное использование тем КТП."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", help="YYYY-MM-DD (по умолчанию — вся таблица)")
+        parser.add_argument("--to", dest="date_to", help="YYYY-MM-DD")
+        parser.add_argument("--limit", type=int, default=20, help="Кластеров каждого вида в выводе (default: 20)")
+        parser.add_argument("--python", action="store_true", help="Не использовать NumPy, даже если он установлен")
+        parser.add_argument("--json", action="store_true", help="Полный отчёт в JSON")
+
+    def handle(self, *args, **opts):
+        try:
+            d_from = parse_date(opts["date_from"]) if opts["date_from"] else None
+            d_to = parse_date(opts["date_to"]) if opts["date_to"] else None
+        except ValueError:
+            d_from = d_to = None
+        if (opts["date_from"] and not d_from) or (opts["date_to"] and not d_to):
+            raise CommandError("--from/--to: ожидается YYYY-MM-DD")
+
+        report = audit(d_from, d_to, limit=opts["limit"], use_numpy=False if opts["python"] else None)
+        if opts["json"]:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        self.stdout.write(f"schedule_audit: lessons={report['lessons']} engine={report['engine']} "
+                          f"load={report['timing']['load']}s check={report['timing']['check']}s")
+        for section in ("teacher_overlaps", "grade_overlaps", "duplicates", "ktp_reuse"):
+            found = report[section]
+            style = self.style.WARNING if found["count"] else self.style.SUCCESS
+            self.stdout.write(style(f"{section}: {found['count']}"))
+            for c in found["clusters"]:
+                self.stdout.write(f"  {json.dumps(c, ensure_ascii=False)}")
+        if any(report[s]["count"] for s in ("teacher_overlaps", "grade_overlaps", "duplicates", "ktp_reuse")):
+            raise SystemExit(1)
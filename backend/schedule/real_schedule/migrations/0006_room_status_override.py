@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_schedule', '0005_reallesson_is_open'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='status_override',
+            field=models.CharField(blank=True, max_length=16, null=True),
+        ),
+    ]
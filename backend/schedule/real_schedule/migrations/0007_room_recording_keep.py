@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_schedule', '0006_room_status_override'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='room',
+            name='recording_keep',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -2,7 +2,7 @@ from django.conf import settings
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
-from datetime import timezone as dt_timezone
+from datetime import timedelta, timezone as dt_timezone
 # core / ktp
 from schedule.core.models import Subject, Grade, LessonType
 from schedule.ktp.models import KTPEntry
@@ -48,6 +48,40 @@ class RealLesson(models.Model):
     def __str__(self):
         return f"{self.subject} {self.grade} {self.start.astimezone(dt_timezone.utc)}"
 
+ROOM_OPEN_BEFORE = timedelta(minutes=15)  # окно входа: за 15 минут до начала
+ROOM_CLOSE_AFTER = timedelta(minutes=10)  # и 10 минут после конца
+
+
+def room_window_status(scheduled_start, scheduled_end, now=None) -> str:
+    """SCHEDULED | OPEN | ENDED по окну [start-15m, end+10m]."""
+    now = now or timezone.now()
+    if now < scheduled_start - ROOM_OPEN_BEFORE:
+        return "SCHEDULED"
+    if now > scheduled_end + ROOM_CLOSE_AFTER:
+        return "ENDED"
+    return "OPEN"
+
+
+class RoomQuerySet(models.QuerySet):
+    def with_live_status(self, now=None):
+        """
+        Аннотация live_status — статус комнаты «на сейчас» без записи в БД.
+        Приоритет: status_override → сохранённый CLOSED → окно по scheduled_start/end.
+        Пригодна для фильтров: .with_live_status().filter(live_status="OPEN").
+        """
+        now = now or timezone.now()
+        return self.annotate(live_status=models.Case(
+            models.When(status_override__isnull=False, then=models.F("status_override")),
+            models.When(status="CLOSED", then=models.Value("CLOSED")),
+            models.When(models.Q(scheduled_start__isnull=True) | models.Q(scheduled_end__isnull=True),
+                        then=models.F("status")),
+            models.When(scheduled_start__gt=now + ROOM_OPEN_BEFORE, then=models.Value("SCHEDULED")),
+            models.When(scheduled_end__lt=now - ROOM_CLOSE_AFTER, then=models.Value("ENDED")),
+            default=models.Value("OPEN"),
+            output_field=models.CharField(max_length=16),
+        ))
+
+
 class Room(models.Model):
     class Type(models.TextChoices):
         LESSON = "LESSON"
@@ -70,7 +104,8 @@ class Room(models.Model):
     public_slug = models.SlugField(max_length=64, unique=True, null=True, blank=True)
 
     auto_manage = models.BooleanField(default=True)
-    status = models.CharField(max_length=16, default="SCHEDULED")  # SCHEDULED|OPEN|ENDED|CLOSED
+    status = models.CharField(max_length=16, default="SCHEDULED")  # SCHEDULED|OPEN|ENDED|CLOSED — пишет только maintenance
+    status_override = models.CharField(max_length=16, null=True, blank=True)  # ручной статус (напр. CLOSED из /close/)
 
     scheduled_start = models.DateTimeField(null=True, blank=True)
     scheduled_end = models.DateTimeField(null=True, blank=True)
@@ -79,16 +114,30 @@ class Room(models.Model):
     ended_at = models.DateTimeField(null=True, blank=True)
 
     # Метаданные записи
-    recording_status = models.CharField(max_length=16, default="PENDING")  # PENDING|RECORDING|UPLOADING|READY|FAILED|SKIPPED
+    recording_status = models.CharField(max_length=16, default="PENDING")  # PENDING|RECORDING|UPLOADING|READY|FAILED|SKIPPED|EXPIRED
     recording_started_at = models.DateTimeField(null=True, blank=True)
     recording_ended_at = models.DateTimeField(null=True, blank=True)
     recording_duration_secs = models.PositiveIntegerField(null=True, blank=True)
     recording_storage = models.CharField(max_length=16, default="LOCAL")  # LOCAL|S3|JAAS
     recording_file_url = models.URLField(null=True, blank=True)  # Итоговый URL плеера
     recording_meta = models.JSONField(default=dict, blank=True)  # сырой payload JaaS вебхука, локальные пути и т.п.
+    recording_keep = models.BooleanField(default=False)  # хранить бессрочно: recordings_gc не удаляет
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = RoomQuerySet.as_manager()
+
+    def compute_live_status(self, now=None) -> str:
+        """То же правило, что RoomQuerySet.with_live_status, но для уже загруженного объекта."""
+        annotated = getattr(self, "live_status", None)
+        if annotated and now is None:
+            return annotated
+        if self.status_override:
+            return self.status_override
+        if self.status == "CLOSED" or not (self.scheduled_start and self.scheduled_end):
+            return self.status
+        return room_window_status(self.scheduled_start, self.scheduled_end, now)
+
 
 
 class LessonStudent(models.Model):
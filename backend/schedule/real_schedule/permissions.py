@@ -125,3 +125,11 @@ class CanViewLesson(BasePermission):
             return False
 
         return False
+
+
+class CanAuditSchedule(BasePermission):
+    """Аудит всего расписания — только администрация."""
+    def has_permission(self, request, view):
+        user = getattr(request, "user", None)
+        return bool(user and user.is_authenticated and
+                    (user.is_superuser or getattr(user, "role", None) in (ROLE_ADMIN, ROLE_HEAD, ROLE_DIR, ROLE_AUD)))
@@ -13,6 +13,8 @@ from datetime import timedelta
 from schedule.real_schedule.models import RealLesson, Room
 from schedule.core.models import StudentSubject
 from users.models import ParentChild
+from schedule.webinar.services.delivery import signed_stream_url
+from schedule.webinar.services.join import can_view_recording
 
 User = get_user_model()
 # ——— Вспомогательные мини-сериализаторы ———
@@ -86,9 +88,13 @@ class RealLessonSerializer(serializers.ModelSerializer):
 
 
 class RoomSerializer(serializers.ModelSerializer):
+    # статус «на сейчас»: override → CLOSED → окно времени (см. Room.compute_live_status)
+    status = serializers.SerializerMethodField()
     available_from = serializers.SerializerMethodField()
     available_until = serializers.SerializerMethodField()
     is_join_allowed_now = serializers.SerializerMethodField()
+    # сырой путь файла не отдаём: только подписанная ссылка и только тем, кому запись доступна
+    recording_file_url = serializers.SerializerMethodField()
 
     class Meta:
         model = Room
@@ -106,6 +112,15 @@ class RoomSerializer(serializers.ModelSerializer):
         )
         read_only_fields = fields
 
+    def get_status(self, obj: Room):
+        return obj.compute_live_status()
+
+    def get_recording_file_url(self, obj: Room):
+        request = self.context.get("request")
+        if obj.recording_status != "READY" or not obj.recording_file_url or request is None:
+            return None
+        return signed_stream_url(obj.id) if can_view_recording(obj, request.user) else None
+
     def get_available_from(self, obj: Room):
         if not obj.scheduled_start:
             return None
@@ -119,10 +134,7 @@ class RoomSerializer(serializers.ModelSerializer):
         return (obj.scheduled_end + timedelta(minutes=10)).astimezone(ZoneInfo("UTC"))
 
     def get_is_join_allowed_now(self, obj: Room):
-        now = timezone.now()
-        af = self.get_available_from(obj)
-        au = self.get_available_until(obj)
-        return bool(af and au and (af <= now <= au))
+        return obj.compute_live_status() == "OPEN"
 
 
 # ——— Компактный сериализатор для /api/real_schedule/my/ ———
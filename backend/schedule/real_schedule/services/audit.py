@@ -0,0 +1,181 @@
+# backend/schedule/real_schedule/services/audit.py
+"""
+Аудит таблицы RealLesson целиком (или за период): пересечения у учителя и у класса,
+дубли уроков (класс, предмет, учитель, начало) и одна тема КТП у нескольких уроков.
+
+Уроки читаются потоком (values_list().iterator()) в колонки array('q'): start/end —
+секунды эпохи, ktp — 0, если темы нет. С NumPy колонки превращаются в массивы без
+копирования, и проверки векторные:
+  пересечения — lexsort по (ресурс, start, end); накопленный максимум конца со сдвигом на
+                номер ресурса (чтобы не протекал между ресурсами); новый кластер там,
+                где start ≥ максимума концов предыдущих уроков ресурса;
+  дубли       — lexsort по ключу и сравнение соседей;
+  КТП         — np.unique(return_inverse, return_counts).
+NumPy есть в requirements; если его нет в окружении — те же проверки в Python,
+пересечения через overlap_groups из валидаторов.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import time
+from array import array
+from collections import defaultdict
+
+from schedule.core.services.date_windows import utc_day_bounds
+from schedule.real_schedule.models import RealLesson
+from schedule.validators.schedule_rules import overlap_groups
+
+try:
+    import numpy as np  # в requirements; без него аудит работает медленнее, но так же
+except ImportError:
+    np = None
+
+COLUMNS = ("id", "start", "end", "teacher", "grade", "subject", "ktp")
+CHUNK_SIZE = 5000
+
+
+def load_columns(d_from: dt.date | None = None, d_to: dt.date | None = None,
+                 chunk_size: int = CHUNK_SIZE) -> dict[str, array]:
+    """Колонки уроков без создания моделей; память — 7 × 8 байт на урок."""
+    qs = RealLesson.objects.all()
+    if d_from:
+        qs = qs.filter(start__gte=utc_day_bounds(d_from, d_from)[0])
+    if d_to:
+        qs = qs.filter(start__lt=utc_day_bounds(d_to, d_to)[1])
+    cols = {c: array("q") for c in COLUMNS}
+    rows = qs.values_list("id", "start", "duration_minutes", "teacher_id", "grade_id", "subject_id", "ktp_entry_id")
+    for lid, start, duration, teacher, grade, subject, ktp in rows.iterator(chunk_size=chunk_size):
+        ts = int(start.timestamp())
+        cols["id"].append(lid)
+        cols["start"].append(ts)
+        cols["end"].append(ts + duration * 60)
+        cols["teacher"].append(teacher)
+        cols["grade"].append(grade)
+        cols["subject"].append(subject)
+        cols["ktp"].append(ktp or 0)
+    return cols
+
+
+# --- NumPy -------------------------------------------------------------------
+def _overlaps_np(res, start, end) -> list[tuple[int, list[int]]]:
+    """[(ресурс, номера строк кластера в порядке начала)] для кластеров из ≥2 уроков."""
+    if not len(res):
+        return []
+    order = np.lexsort((end, start, res))  # тот же порядок, что у overlap_groups
+    r, s, e = res[order], start[order], end[order]
+    t0 = int(min(s.min(), e.min()))
+    span = int(max(s.max(), e.max())) - t0 + 1
+    offset = np.concatenate(([0], np.cumsum(r[1:] != r[:-1]))).astype(np.int64) * span
+    reach = np.maximum.accumulate(e - t0 + offset)
+    begin = np.ones(len(r), dtype=bool)
+    begin[1:] = s[1:] - t0 + offset[1:] >= reach[:-1]
+    starts = np.flatnonzero(begin)
+    sizes = np.diff(np.append(starts, len(r)))
+    return [(int(r[b]), order[b:b + n].tolist()) for b, n in zip(starts[sizes > 1], sizes[sizes > 1])]
+
+
+def _same_key_np(*keys) -> list[list[int]]:
+    """Группы строк с одинаковым составным ключом (≥2 строки)."""
+    if not len(keys[0]):
+        return []
+    order = np.lexsort(keys[::-1])
+    changed = np.zeros(len(order), dtype=bool)
+    changed[0] = True
+    for k in keys:
+        ks = k[order]
+        changed[1:] |= ks[1:] != ks[:-1]
+    starts = np.flatnonzero(changed)
+    sizes = np.diff(np.append(starts, len(order)))
+    return [order[b:b + n].tolist() for b, n in zip(starts[sizes > 1], sizes[sizes > 1])]
+
+
+def _ktp_reuse_np(ktp) -> list[list[int]]:
+    rows = np.flatnonzero(ktp > 0)
+    _, inverse, counts = np.unique(ktp[rows], return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    shared = counts[inverse] > 1
+    rows, inverse = rows[shared], inverse[shared]
+    order = np.argsort(inverse, kind="stable")
+    rows, inverse = rows[order], inverse[order]
+    cuts = np.flatnonzero(inverse[1:] != inverse[:-1]) + 1
+    return [part.tolist() for part in np.split(rows, cuts)] if len(rows) else []
+
+
+def _find_np(cols):
+    c = {k: np.frombuffer(v, dtype=np.int64) if len(v) else np.zeros(0, dtype=np.int64) for k, v in cols.items()}
+    return (
+        _overlaps_np(c["teacher"], c["start"], c["end"]),
+        _overlaps_np(c["grade"], c["start"], c["end"]),
+        _same_key_np(c["grade"], c["subject"], c["teacher"], c["start"]),
+        _ktp_reuse_np(c["ktp"]),
+    )
+
+
+# --- Python ------------------------------------------------------------------
+def _overlaps_py(res, start, end) -> list[tuple[int, list[int]]]:
+    by_res = defaultdict(list)
+    for i, r in enumerate(res):
+        by_res[r].append((start[i], end[i], i))
+    return [(r, group) for r in sorted(by_res) for group in overlap_groups(by_res[r])]
+
+
+def _same_key_py(keys) -> list[list[int]]:
+    groups = defaultdict(list)
+    for i, key in enumerate(keys):
+        groups[key].append(i)
+    return [rows for _, rows in sorted(groups.items()) if len(rows) > 1]
+
+
+def _find_py(cols):
+    return (
+        _overlaps_py(cols["teacher"], cols["start"], cols["end"]),
+        _overlaps_py(cols["grade"], cols["start"], cols["end"]),
+        _same_key_py(zip(cols["grade"], cols["subject"], cols["teacher"], cols["start"])),
+        [rows for rows in _same_key_py(cols["ktp"]) if cols["ktp"][rows[0]]],
+    )
+
+
+# --- отчёт -------------------------------------------------------------------
+def _iso(ts: int) -> str:
+    return dt.datetime.fromtimestamp(ts, dt.timezone.utc).isoformat()
+
+
+def _section(clusters: list[dict], limit: int) -> dict:
+    return {"count": len(clusters), "clusters": clusters[:limit]}
+
+
+def audit(d_from: dt.date | None = None, d_to: dt.date | None = None, limit: int = 100,
+          use_numpy: bool | None = None) -> dict:
+    """Полный отчёт; в ответ попадает не больше limit кластеров каждого вида, count — всего."""
+    started = time.monotonic()
+    cols = load_columns(d_from, d_to)
+    loaded = time.monotonic()
+    engine = "numpy" if (np is not None if use_numpy is None else use_numpy) else "python"
+    teacher, grade, duplicates, ktp = (_find_np if engine == "numpy" else _find_py)(cols)
+    ids, start, end = cols["id"], cols["start"], cols["end"]
+
+    def overlaps(found):
+        out = []
+        for rid, rows in found:
+            rows = sorted(rows, key=lambda i: (start[i], ids[i]))
+            out.append({"resource_id": rid, "lesson_ids": [ids[i] for i in rows],
+                        "start": _iso(start[rows[0]]), "end": _iso(max(end[i] for i in rows))})
+        out.sort(key=lambda c: (c["resource_id"], c["start"]))
+        return out
+
+    dup = sorted(({"lesson_ids": sorted(ids[i] for i in rows), "grade": cols["grade"][rows[0]],
+                   "subject": cols["subject"][rows[0]], "teacher": cols["teacher"][rows[0]],
+                   "start": _iso(start[rows[0]])} for rows in duplicates), key=lambda c: c["lesson_ids"])
+    reuse = sorted(({"ktp_entry_id": cols["ktp"][rows[0]], "lesson_ids": sorted(ids[i] for i in rows)}
+                    for rows in ktp), key=lambda c: c["ktp_entry_id"])
+    return {
+        "engine": engine,
+        "from": d_from.isoformat() if d_from else None,
+        "to": d_to.isoformat() if d_to else None,
+        "lessons": len(ids),
+        "teacher_overlaps": _section(overlaps(teacher), limit),
+        "grade_overlaps": _section(overlaps(grade), limit),
+        "duplicates": _section(dup, limit),
+        "ktp_reuse": _section(reuse, limit),
+        "timing": {"load": round(loaded - started, 3), "check": round(time.monotonic() - loaded, 3)},
+    }
@@ -0,0 +1,31 @@
+# backend/schedule/real_schedule/services/conduct.py
+# Фиксация факта проведения уроков (RealLesson.conducted_at + KTPEntry.actual_date).
+# Работает пачкой: постоянное число запросов независимо от количества уроков.
+
+import datetime as dt
+from typing import Iterable
+
+from django.utils import timezone
+
+from schedule.real_schedule.models import RealLesson
+
+
+def mark_lessons_conducted(lesson_ids: Iterable[int], conducted_at: dt.datetime) -> int:
+    """
+    Проставляет conducted_at урокам, у которых он ещё пуст, и actual_date в их КТП-записях.
+    Возвращает число обновлённых уроков.
+    """
+    ids = {lid for lid in lesson_ids if lid}
+    if not ids:
+        return 0
+
+    qs = RealLesson.objects.filter(id__in=ids, conducted_at__isnull=True)
+    ktp_ids = [kid for kid in qs.values_list("ktp_entry_id", flat=True) if kid]
+    updated = qs.update(conducted_at=conducted_at, updated_at=timezone.now())
+
+    if ktp_ids:
+        # actual_date — дата без времени
+        from schedule.ktp.models import KTPEntry
+        KTPEntry.objects.filter(id__in=ktp_ids, actual_date__isnull=True)\
+                        .update(actual_date=conducted_at.date())
+    return updated
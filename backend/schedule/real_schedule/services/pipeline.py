@@ -15,6 +15,7 @@ from django.db.models import Max, Q
 from django.utils import timezone
 
 from schedule.real_schedule.models import RealLesson
+from schedule.real_schedule.signals import bulk_lesson_changes, lessons_regenerated
 from schedule.template.models import TemplateWeek, TemplateLesson
 from schedule.ktp.models import KTPEntry
 
@@ -244,9 +245,11 @@ def generate(
     )
     rewrite_from_utc = rewrite_from_local.astimezone(dt_timezone.utc)
 
-    deleted, _ = RealLesson.objects.filter(
-        source=RealLesson.Source.TEMPLATE, start__gte=rewrite_from_utc
-    ).delete()
+    # удаление пачкой: вместо события на каждый урок — одно lessons_regenerated ниже
+    with bulk_lesson_changes():
+        deleted, _ = RealLesson.objects.filter(
+            source=RealLesson.Source.TEMPLATE, start__gte=rewrite_from_utc
+        ).delete()
 
     prev_version = RealLesson.objects.aggregate(m=Max("version"))["m"] or 0
     new_version = prev_version + 1
@@ -326,6 +329,11 @@ def generate(
 
     # Вставка
     RealLesson.objects.bulk_create(to_insert, batch_size=500)
+    lessons_regenerated.send(
+        sender=RealLesson, version=new_version, generation_batch_id=batch_id,
+        from_date=from_date, to_date=to_date, rewrite_from=rewrite_from,
+        deleted=deleted, created=len(to_insert),
+    )
 
     return GenerateResult(
         version=new_version,
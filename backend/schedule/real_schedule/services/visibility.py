@@ -0,0 +1,119 @@
+# backend/schedule/real_schedule/services/visibility.py
+# Какие уроки видит пользователь — правило /api/real_schedule/my/.
+# Переиспользуется там, где нужна та же ACL-фильтрация (напр. /api/rooms/by-lessons/).
+
+from dataclasses import dataclass
+
+from django.db.models import Q
+
+from users.models import User, ParentChild
+from schedule.core.models import StudentSubject
+
+ALLOWED_MANAGER_ROLES = {
+    User.Role.ADMIN,
+    User.Role.DIRECTOR,
+    User.Role.HEAD_TEACHER,
+    User.Role.AUDITOR,
+    User.Role.METHODIST,
+}
+
+
+def filter_for_student(queryset, student: User):
+    if getattr(student, "individual_subjects_enabled", False):
+        subject_ids = (StudentSubject.objects
+                       .filter(student=student)
+                       .values_list("subject_id", flat=True)
+                       .distinct())
+        return queryset.filter(subject_id__in=subject_ids)
+
+    grade_ids = (StudentSubject.objects
+                 .filter(student=student)
+                 .values_list("grade_id", flat=True)
+                 .distinct())
+    return queryset.filter(grade_id__in=grade_ids) if grade_ids else queryset.none()
+
+
+def visible_lessons(queryset, user: User, children_param: str | None = None):
+    """
+    Сужает queryset уроков до видимых пользователю; None — роль без доступа к расписанию.
+    children_param (для родителя) — "id,id,..." детей, которыми ограничить выборку.
+    """
+    role = user.role
+    if role in ALLOWED_MANAGER_ROLES:
+        return queryset
+
+    if role == User.Role.TEACHER:
+        return queryset.filter(teacher_id=user.id)
+
+    if role == User.Role.STUDENT:
+        return filter_for_student(queryset, user)
+
+    if role == User.Role.PARENT:
+        links = (
+            ParentChild.objects
+            .filter(parent=user, is_active=True)
+            .select_related("child")
+        )
+        children = [ln.child for ln in links]
+
+        if children_param:
+            try:
+                allowed_ids = {int(x) for x in children_param.split(",") if x.strip().isdigit()}
+                children = [c for c in children if c.id in allowed_ids]
+            except Exception:
+                pass
+
+        if not children:
+            return queryset.none()
+        cond = Q()
+        for child in children:
+            child_pks = filter_for_student(queryset, child).values_list("pk", flat=True)
+            cond |= Q(pk__in=list(child_pks))
+        return queryset.filter(cond)
+
+    return None
+
+
+@dataclass(frozen=True)
+class Audience:
+    """
+    То же правило видимости, что visible_lessons, но в памяти — для фильтрации потока событий
+    по полям урока (teacher_id, grade_id, subject_id) без запроса на каждое событие.
+    """
+    everything: bool = False
+    teacher_id: int | None = None
+    grade_ids: frozenset = frozenset()
+    subject_ids: frozenset = frozenset()
+
+    def sees(self, teacher_id, grade_id, subject_id) -> bool:
+        return (self.everything
+                or (self.teacher_id is not None and teacher_id == self.teacher_id)
+                or grade_id in self.grade_ids
+                or subject_id in self.subject_ids)
+
+
+def _student_keys(student: User) -> tuple[set, set]:
+    rows = StudentSubject.objects.filter(student=student)
+    if getattr(student, "individual_subjects_enabled", False):
+        return set(), set(rows.values_list("subject_id", flat=True))
+    return set(rows.values_list("grade_id", flat=True)), set()
+
+
+def audience_for(user: User) -> Audience | None:
+    """Audience пользователя; None — роль без доступа к расписанию (как у visible_lessons)."""
+    role = user.role
+    if role in ALLOWED_MANAGER_ROLES:
+        return Audience(everything=True)
+    if role == User.Role.TEACHER:
+        return Audience(teacher_id=user.id)
+    if role == User.Role.STUDENT:
+        grades, subjects = _student_keys(user)
+        return Audience(grade_ids=frozenset(grades), subject_ids=frozenset(subjects))
+    if role == User.Role.PARENT:
+        grades, subjects = set(), set()
+        for link in ParentChild.objects.filter(parent=user, is_active=True).select_related("child"):
+            g, s = _student_keys(link.child)
+            grades |= g
+            subjects |= s
+        return Audience(grade_ids=frozenset(grades), subject_ids=frozenset(subjects))
+    return None
@@ -1,19 +1,35 @@
+import contextvars
+from contextlib import contextmanager
+
 from django.db.models.signals import post_save
-from django.dispatch import receiver
-from django.utils import timezone
+from django.dispatch import Signal, receiver
 from schedule.real_schedule.models import Room
+from schedule.real_schedule.services.conduct import mark_lessons_conducted
+
+# Пакетная перегенерация реальных уроков (services.pipeline.generate) — одно событие вместо
+# сигнала на каждый урок. kwargs: version, generation_batch_id, from_date, to_date, rewrite_from,
+# deleted, created. Отправляется внутри транзакции генерации.
+lessons_regenerated = Signal()
+
+_bulk_lessons = contextvars.ContextVar("real_schedule_bulk_lessons", default=False)
+
+
+@contextmanager
+def bulk_lesson_changes():
+    """Пакетное изменение RealLesson: построчные получатели post_save/post_delete пропускают работу."""
+    token = _bulk_lessons.set(True)
+    try:
+        yield
+    finally:
+        _bulk_lessons.reset(token)
+
+
+def in_bulk_lesson_changes() -> bool:
+    return _bulk_lessons.get()
+
 
 @receiver(post_save, sender=Room)
 def on_room_saved(sender, instance: Room, created, **kwargs):
-    # Если вебинар завершён — фиксируем факт проведения
-    if instance.ended_at:
-        lesson = instance.lesson
-        if not lesson.conducted_at:
-            lesson.conducted_at = instance.ended_at
-            lesson.save(update_fields=["conducted_at", "updated_at"])
-            # Проставляем факт в КТП
-            if lesson.ktp_entry_id:
-                # actual_date — дата без времени
-                from schedule.ktp.models import KTPEntry
-                KTPEntry.objects.filter(id=lesson.ktp_entry_id, actual_date__isnull=True)\
-                                .update(actual_date=instance.ended_at.date())
+    # Если вебинар завершён — фиксируем факт проведения (и actual_date в КТП)
+    if instance.ended_at and instance.lesson_id:
+        mark_lessons_conducted([instance.lesson_id], instance.ended_at)
@@ -30,3 +30,20 @@ def test_generate_is_idempotent_rewrite_window(ay):
     assert RealLesson.objects.count() == res2.created
     starts = list(RealLesson.objects.values_list("start", flat=True))
     assert len(starts) == len(set(starts))
+
+
+def test_generate_publishes_one_batch_event(week_with_lessons):
+    from schedule.webinar.models import ChangeEvent
+
+    d1, d2 = dt.date(2025, 9, 1), dt.date(2025, 9, 7)
+    generate(d1, d2)
+    res = generate(d1, d2)  # удаляет 3 урока и создаёт 3 заново
+
+    events = list(ChangeEvent.objects.order_by("id"))
+    assert [e.kind for e in events] == [ChangeEvent.Kind.SCHEDULE] * 2  # ни одного lesson.changed
+    last = events[-1]
+    assert last.is_open
+    assert last.payload["version"] == res.version
+    assert last.payload["generation_batch_id"] == str(res.generation_batch_id)
+    assert (last.payload["deleted"], last.payload["created"]) == (3, 3)
+    assert last.payload["from"] == "2025-09-01"
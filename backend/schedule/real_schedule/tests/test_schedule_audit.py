@@ -0,0 +1,158 @@
+import datetime as dt
+import json
+import random
+import time
+from array import array
+
+import pytest
+from django.apps import apps
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from schedule.core.models import Grade, LessonType, Subject
+from schedule.ktp.models import KTPEntry, KTPSection, KTPTemplate
+from schedule.real_schedule.models import RealLesson
+from schedule.real_schedule.services import audit as audit_mod
+from schedule.real_schedule.services.audit import audit
+
+pytestmark = pytest.mark.django_db
+
+User = apps.get_model("users", "User")
+
+
+def _at(day, h, m=0):
+    return timezone.make_aware(dt.datetime(2025, 9, day, h, m), timezone.get_default_timezone())
+
+
+@pytest.fixture
+def lessons(ay):
+    subj = Subject.objects.create(name="Math")
+    g1, g2 = Grade.objects.create(name="9А"), Grade.objects.create(name="9Б")
+    t1, t2 = User.objects.create(username="t1"), User.objects.create(username="t2")
+    lt = LessonType.objects.create(key="lesson", label="Урок")
+    tpl = KTPTemplate.objects.create(subject=subj, grade=g1, academic_year=ay, name="KTP")
+    section = KTPSection.objects.create(ktp_template=tpl, title="S", order=1)
+    entry = KTPEntry.objects.create(section=section, title="Тема 1", order=1)
+
+    def make(grade, teacher, start, minutes=45, ktp=None):
+        return RealLesson.objects.create(subject=subj, grade=grade, teacher=teacher, start=start,
+                                         duration_minutes=minutes, lesson_type=lt, ktp_entry=ktp)
+
+    return {
+        # t1 ведёт 9А и 9Б одновременно; третий урок касается конца второго — не пересечение
+        "t1_a": make(g1, t1, _at(1, 9)),
+        "t1_b": make(g2, t1, _at(1, 9, 30)),
+        "t1_c": make(g1, t1, _at(1, 10, 15)),
+        # у 9Б два урока разных учителей внахлёст
+        "g2_a": make(g2, t2, _at(2, 9), minutes=90),
+        "g2_b": make(g2, t1, _at(2, 10)),
+        # дубль: тот же урок создан дважды; обоим назначена одна тема КТП
+        "dup_a": make(g1, t2, _at(3, 12), ktp=entry),
+        "dup_b": make(g1, t2, _at(3, 12), ktp=entry),
+        "other": make(g1, t2, _at(10, 12)),
+        "entry": entry, "t1": t1, "g2": g2,
+    }
+
+
+def _ids(*names, lessons):
+    return [lessons[n].id for n in names]
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_audit_finds_all_kinds(lessons, use_numpy):
+    if use_numpy and audit_mod.np is None:
+        pytest.skip("numpy не установлен")
+    report = audit(use_numpy=use_numpy)
+    assert report["engine"] == ("numpy" if use_numpy else "python")
+    assert report["lessons"] == 8
+
+    teacher = report["teacher_overlaps"]["clusters"]
+    assert [c["lesson_ids"] for c in teacher] == [_ids("t1_a", "t1_b", lessons=lessons),
+                                                  sorted(_ids("dup_a", "dup_b", lessons=lessons))]
+    assert teacher[0]["resource_id"] == lessons["t1"].id
+    assert teacher[0]["end"] == _at(1, 10, 15).astimezone(dt.timezone.utc).isoformat()
+
+    grade = report["grade_overlaps"]["clusters"]
+    assert [c["lesson_ids"] for c in grade] == [sorted(_ids("dup_a", "dup_b", lessons=lessons)),
+                                                _ids("g2_a", "g2_b", lessons=lessons)]
+    assert report["duplicates"]["clusters"][0]["lesson_ids"] == sorted(_ids("dup_a", "dup_b", lessons=lessons))
+    assert report["ktp_reuse"]["clusters"] == [
+        {"ktp_entry_id": lessons["entry"].id, "lesson_ids": sorted(_ids("dup_a", "dup_b", lessons=lessons))}]
+
+    # период отсекает уроки по дате школы
+    assert audit(dt.date(2025, 9, 10), dt.date(2025, 9, 10), use_numpy=use_numpy)["lessons"] == 1
+
+
+def _random_columns(n, seed):
+    rnd = random.Random(seed)
+    cols = {c: array("q") for c in audit_mod.COLUMNS}
+    for i in range(n):
+        start = rnd.randrange(0, 5 * 24 * 3600, 300)
+        cols["id"].append(i + 1)
+        cols["start"].append(start)
+        cols["end"].append(start + rnd.choice([0, 40, 45, 90]) * 60)
+        cols["teacher"].append(rnd.randrange(1, 40))
+        cols["grade"].append(rnd.randrange(1, 30))
+        cols["subject"].append(rnd.randrange(1, 3))
+        cols["ktp"].append(rnd.choice([0, 0, rnd.randrange(1, n)]))
+    return cols
+
+
+def _normalized(found):
+    teacher, grade, dup, ktp = found
+    return ({(r, frozenset(rows)) for r, rows in teacher}, {(r, frozenset(rows)) for r, rows in grade},
+            {frozenset(rows) for rows in dup}, {frozenset(rows) for rows in ktp})
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_numpy_matches_python(seed):
+    if audit_mod.np is None:
+        pytest.skip("numpy не установлен")
+    cols = _random_columns(3000, seed)
+    assert _normalized(audit_mod._find_np(cols)) == _normalized(audit_mod._find_py(cols))
+
+
+def test_api_and_command(lessons, capsys):
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username="teacher", password="x", role="TEACHER"))
+    assert client.get("/api/real_schedule/audit/").status_code == 403
+
+    client.force_authenticate(User.objects.create_user(username="head", password="x", role="HEAD_TEACHER"))
+    data = client.get("/api/real_schedule/audit/", {"from": "2025-09-01", "to": "2025-09-07", "limit": 1}).json()
+    assert data["lessons"] == 7
+    assert data["grade_overlaps"]["count"] == 2 and len(data["grade_overlaps"]["clusters"]) == 1
+    assert client.get("/api/real_schedule/audit/", {"from": "2025-09-07", "to": "2025-09-01"}).status_code == 400
+    assert client.get("/api/real_schedule/audit/", {"limit": "x"}).json()["detail"] == "INVALID_LIMIT"
+
+    call_command("schedule_audit", "--json", "--python")
+    report = json.loads(capsys.readouterr().out)
+    assert report["duplicates"]["count"] == 1
+    with pytest.raises(SystemExit):  # найдены проблемы — код выхода 1
+        call_command("schedule_audit", "--from", "2025-09-01")
+    call_command("schedule_audit", "--from", "2025-09-10", "--to", "2025-09-10")
+    assert "teacher_overlaps: 0" in capsys.readouterr().out
+
+
+@pytest.mark.slow
+def test_benchmark_100k_lessons(ay, record_property):
+    subj = Subject.objects.create(name="Math")
+    lt = LessonType.objects.create(key="lesson", label="Урок")
+    grades = [Grade.objects.create(name=f"{i}") for i in range(60)]
+    teachers = [User.objects.create(username=f"bt{i}") for i in range(120)]
+    rnd = random.Random(7)
+    base = _at(1, 8)
+    RealLesson.objects.bulk_create([
+        RealLesson(subject=subj, grade=rnd.choice(grades), teacher=rnd.choice(teachers), lesson_type=lt,
+                   start=base + dt.timedelta(days=rnd.randrange(270), minutes=rnd.randrange(0, 480, 5)),
+                   duration_minutes=45)
+        for _ in range(100_000)], batch_size=5000)
+
+    started = time.perf_counter()
+    report = audit()
+    elapsed = time.perf_counter() - started
+    record_property("audit_seconds", round(elapsed, 2))
+    record_property("audit_engine", report["engine"])
+    assert report["lessons"] == 100_000
+    assert report["teacher_overlaps"]["count"] and report["grade_overlaps"]["count"]
+    assert elapsed < 10
@@ -2,7 +2,7 @@
 from django.urls import path
 from schedule.real_schedule.views import (
     GenerateRealScheduleView, ConductLessonView,
-    RoomGetOrCreateView, RoomEndView, LessonDetailView,
+    RoomGetOrCreateView, RoomEndView, LessonDetailView, ScheduleAuditView,
 )
 from schedule.real_schedule.views_my import MyScheduleView, RealLessonsListView, ViewAsScheduleView
 
@@ -10,6 +10,7 @@ urlpatterns = [
     path("my/", MyScheduleView.as_view()),
 
     path("generate/", GenerateRealScheduleView.as_view()),
+    path("audit/", ScheduleAuditView.as_view()),
     path("rooms/get-or-create/", RoomGetOrCreateView.as_view()),
     path("rooms/<int:pk>/end/", RoomEndView.as_view()),
     path("lessons/<int:pk>/conduct/", ConductLessonView.as_view()),
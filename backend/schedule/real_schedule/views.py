@@ -14,8 +14,9 @@ from rest_framework.views import APIView
 
 from schedule.real_schedule.models import RealLesson, Room
 from schedule.real_schedule.serializers import RealLessonSerializer, RoomSerializer, LessonDetailSerializer
+from schedule.real_schedule.services.audit import audit
 from schedule.real_schedule.services.pipeline import generate, CollisionError
-from .permissions import CanViewLesson
+from .permissions import CanAuditSchedule, CanViewLesson
 
 
 
@@ -147,6 +148,25 @@ class GenerateRealScheduleView(APIView):
         }, status=201)
 
 
+class ScheduleAuditView(APIView):
+    """
+    GET ?from=&to=&limit= — пересечения, дубли и повторные темы КТП по RealLesson
+    (без from/to — вся таблица). См. services/audit.py.
+    """
+    permission_classes = [CanAuditSchedule]
+
+    def get(self, request):
+        raw_from, raw_to = request.query_params.get("from"), request.query_params.get("to")
+        d_from, d_to = _parse_date_value(raw_from), _parse_date_value(raw_to)
+        if (raw_from and not d_from) or (raw_to and not d_to) or (d_from and d_to and d_from > d_to):
+            return Response({"detail": "INVALID_RANGE"}, status=400)
+        try:
+            limit = max(0, min(int(request.query_params.get("limit", 100)), 1000))
+        except ValueError:
+            return Response({"detail": "INVALID_LIMIT"}, status=400)
+        return Response(audit(d_from, d_to, limit=limit))
+
+
 class ConductLessonView(APIView):
     permission_classes = [IsAdminUser]  # TODO: teacher of lesson OR director
 
@@ -188,7 +208,7 @@ class RoomGetOrCreateView(APIView):
             lesson_id=lesson_id,
             defaults={"join_url": join_url}
         )
-        return Response(RoomSerializer(room).data, status=201 if created else 200)
+        return Response(RoomSerializer(room, context={"request": request}).data, status=201 if created else 200)
 
 
 class RoomEndView(APIView):
@@ -201,7 +221,7 @@ class RoomEndView(APIView):
             return Response({"detail": "Not found"}, status=404)
         room.ended_at = timezone.now()
         room.save(update_fields=["ended_at"])
-        return Response(RoomSerializer(room).data, status=200)
+        return Response(RoomSerializer(room, context={"request": request}).data, status=200)
 
 class LessonDetailView(RetrieveAPIView):
     serializer_class = LessonDetailSerializer
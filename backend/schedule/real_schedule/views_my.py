@@ -10,34 +10,13 @@ from rest_framework.pagination import PageNumberPagination
 from users.models import User, ParentChild
 from schedule.real_schedule.models import RealLesson
 from schedule.real_schedule.serializers import MyRealLessonSerializer
-from schedule.core.models import StudentSubject
 from schedule.core.services import date_windows as dw
-
-ALLOWED_MANAGER_ROLES = {
-    User.Role.ADMIN,
-    User.Role.DIRECTOR,
-    User.Role.HEAD_TEACHER,
-    User.Role.AUDITOR,
-    User.Role.METHODIST,
-}
+from schedule.real_schedule.services.visibility import (
+    ALLOWED_MANAGER_ROLES, filter_for_student as _filter_for_student, visible_lessons,
+)
 
 DEFAULT_PAGE_SIZE = getattr(settings, "REST_FRAMEWORK", {}).get("PAGE_SIZE", 200)
 
-def _filter_for_student(queryset, student: "User"):
-    if getattr(student, "individual_subjects_enabled", False):
-        subject_ids = (StudentSubject.objects
-                       .filter(student=student)
-                       .values_list("subject_id", flat=True)
-                       .distinct())
-        return queryset.filter(subject_id__in=subject_ids)
-
-    grade_ids = (StudentSubject.objects
-                 .filter(student=student)
-                 .values_list("grade_id", flat=True)
-                 .distinct())
-    return queryset.filter(grade_id__in=grade_ids) if grade_ids else queryset.none()
-
-
 class MyScheduleView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -64,44 +43,8 @@ class MyScheduleView(APIView):
             .order_by("start", "grade_id")
         )
 
-        role = user.role
-        if role in ALLOWED_MANAGER_ROLES:
-            pass
-
-        elif role == User.Role.TEACHER:
-            qs = qs.filter(teacher_id=user.id)
-
-        elif role == User.Role.STUDENT:
-            qs = _filter_for_student(qs, user)
-
-        elif role == User.Role.PARENT:
-            from users.models import ParentChild
-            links = (
-                ParentChild.objects
-                .filter(parent=user, is_active=True)
-                .select_related("child")
-            )
-            children = [ln.child for ln in links]
-
-            children_param = request.query_params.get("children")
-            if children_param:
-                try:
-                    allowed_ids = {int(x) for x in children_param.split(",") if x.strip().isdigit()}
-                    children = [c for c in children if c.id in allowed_ids]
-                except Exception:
-                    pass
-
-            if not children:
-                qs = qs.none()
-            else:
-                cond = Q()
-                base = RealLesson.objects.filter(start__gte=from_dt, start__lt=to_dt_excl)
-                for child in children:
-                    child_pks = _filter_for_student(base, child).values_list("pk", flat=True)
-                    cond |= Q(pk__in=list(child_pks))
-                qs = qs.filter(cond)
-
-        else:
+        qs = visible_lessons(qs, user, request.query_params.get("children"))
+        if qs is None:
             return Response({"detail": "FORBIDDEN"}, status=403)
 
         data = MyRealLessonSerializer(qs, many=True).data
@@ -1,5 +1,5 @@
 from django import forms
-from schedule.core.models import TeacherAvailability, TeacherSubject, TeacherGrade
+from schedule.core.services.teacher_links import TeacherLinkIndex
 from .models import TemplateLesson
 from django.core.exceptions import ValidationError
 
@@ -26,12 +26,16 @@ class TemplateLessonForm(forms.ModelForm):
         if not teacher or not subject or not grade or day is None or not start or not duration:
             return cleaned_data  # Пропускаем, если что-то пустое
 
+        links = TeacherLinkIndex.load([teacher.pk])
+        # передаём в TemplateLesson.clean() при full_clean: связи не грузятся второй раз
+        self.instance._link_index = links
+
         # Проверка — предмет
-        if not TeacherSubject.objects.filter(teacher=teacher, subject=subject).exists():
+        if not links.teaches_subject(teacher, subject):
             raise forms.ValidationError(f"{teacher} не преподаёт предмет «{subject}».")
 
         # Проверка — класс
-        if not TeacherGrade.objects.filter(teacher=teacher, grade=grade).exists():
+        if not links.teaches_grade(teacher, grade):
             raise forms.ValidationError(f"{teacher} не работает с классом «{grade}».")
 
         # Проверка — занятость по времени
@@ -41,12 +45,7 @@ class TemplateLessonForm(forms.ModelForm):
         end_dt = start_dt + timedelta(minutes=duration)
         end = end_dt.time()
 
-        if not TeacherAvailability.objects.filter(
-                teacher=teacher,
-                day_of_week=day,
-                start_time__lte=start,
-                end_time__gte=end
-        ).exists():
+        if not links.is_available(teacher, day, start, end):
             raise forms.ValidationError(f"{teacher} недоступен в это время: {start}–{end}.")
 
         # Проверка — занят ли класс в это время другим уроком
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('template', '0003_alter_templatelesson_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='templatelesson',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -6,7 +6,8 @@
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
-from schedule.core.models import Grade, Subject, AcademicYear, LessonType, TeacherAvailability, TeacherSubject, TeacherGrade  # импортируем из core
+from schedule.core.models import Grade, Subject, AcademicYear, LessonType  # импортируем из core
+from schedule.core.services.teacher_links import TeacherLinkIndex
 
 # Шаблон недели (например, "Неделя №1") — основа для генерации расписания
 class TemplateWeek(models.Model):
@@ -43,6 +44,7 @@ class TemplateLesson(models.Model):
         blank=True,
         related_name='lessons'
     )
+    updated_at = models.DateTimeField(auto_now=True)  # отпечаток недели для кэша отчёта норм
 
     class Meta:
         ordering = ["day_of_week", "start_time"]
@@ -57,17 +59,17 @@ class TemplateLesson(models.Model):
         return self.type
 
     def clean(self):
+        """
+        Связи учителя берутся из self._link_index, если его выставил вызывающий код
+        (форма админки, пакетная проверка), иначе грузятся для одного учителя.
+        """
         user = self.teacher
         is_superuser = getattr(user, "is_superuser", False)
         role = getattr(user, "role", None)
+        links = getattr(self, "_link_index", None) or TeacherLinkIndex.load([self.teacher_id])
 
         # Проверка: входит ли день/время в доступное расписание
-        available = TeacherAvailability.objects.filter(
-            teacher=user,
-            day_of_week=self.day_of_week,
-            start_time__lte=self.start_time,
-            end_time__gte=self.get_end_time()
-        ).exists()
+        available = links.is_available(self.teacher_id, self.day_of_week, self.start_time, self.get_end_time())
 
         if not available:
             if is_superuser or role in ["DIRECTOR", "HEAD_TEACHER"]:
@@ -76,14 +78,14 @@ class TemplateLesson(models.Model):
                 raise ValidationError("Учитель недоступен в это время")
 
         # Проверка: преподаватель должен быть привязан к предмету
-        if not TeacherSubject.objects.filter(teacher=self.teacher, subject=self.subject).exists():
+        if not links.teaches_subject(self.teacher_id, self.subject_id):
             if is_superuser or role in ["DIRECTOR", "HEAD_TEACHER"]:
                 print(f"⚠️ Предупреждение: {user} не привязан к предмету {self.subject}")
             else:
                 raise ValidationError("Учитель не привязан к данному предмету")
 
         # Проверка: преподаватель должен быть привязан к классу
-        if not TeacherGrade.objects.filter(teacher=self.teacher, grade=self.grade).exists():
+        if not links.teaches_grade(self.teacher_id, self.grade_id):
             if is_superuser or role in ["DIRECTOR", "HEAD_TEACHER"]:
                 print(f"⚠️ Предупреждение: {user} не привязан к классу {self.grade}")
             else:
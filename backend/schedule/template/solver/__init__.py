@@ -0,0 +1,9 @@
+"""
+Автоматическое составление шаблонной недели: load_problem собирает ограничения из БД
+(WeeklyNorm, TeacherSubject/TeacherGrade, TeacherAvailability), solve возвращает уроки
+в формате TemplateWeekDraft.data. Фоновый запуск — schedule/draft/services/solve.py.
+"""
+from .problem import Group, Problem, load_problem, propagate
+from .search import Solution, solve
+
+__all__ = ["Group", "Problem", "Solution", "load_problem", "propagate", "solve"]
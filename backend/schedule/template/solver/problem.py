@@ -0,0 +1,154 @@
+# backend/schedule/template/solver/problem.py
+"""
+Постановка задачи для солвера шаблонной недели.
+
+Сетка — days дней × periods пар (время начала урока), позиция = day * len(periods) + period.
+Урок длительностью duration должен помещаться между началами соседних пар и до конца дня,
+иначе «без пересечений» по позициям не значит без пересечений по времени (check_grid).
+Норма WeeklyNorm (класс, предмет) даёт группу из lessons_per_week + courses_per_week
+единиц; у группы один учитель на всю неделю. Распространение ограничений здесь же:
+кандидаты группы — учителя с TeacherSubject и TeacherGrade, у которых хватает
+допустимых позиций (TeacherAvailability) на всю группу; пустой домен — группа
+в unplaced с причиной.
+"""
+from __future__ import annotations
+
+import datetime as dt
+from dataclasses import dataclass, field
+from typing import Iterable
+
+from django.conf import settings
+
+from schedule.core.models import LessonType, TeacherGrade, TeacherSubject, WeeklyNorm
+from schedule.core.services.availability import AvailabilityMasks, lesson_mask
+
+DEFAULT_PERIODS = ("08:30", "09:25", "10:20", "11:25", "12:20", "13:15", "14:10", "15:05")
+
+
+@dataclass
+class Group:
+    grade: int
+    subject: int
+    units: list[str]                                       # тип каждой единицы: "lesson" / "course"
+    candidates: list[int] = field(default_factory=list)   # учителя после распространения
+    reason: str = ""                                       # почему кандидатов нет
+
+
+@dataclass
+class Problem:
+    days: int
+    periods: list[dt.time]
+    duration: int
+    groups: list[Group]
+    allowed: dict[int, int]                               # учитель → маска допустимых позиций
+    types: dict[str, dict] = field(default_factory=dict)  # key → {"key", "label"} для уроков черновика
+
+    def __post_init__(self):
+        check_grid(self.periods, self.duration)
+
+    @property
+    def size(self) -> int:
+        return self.days * len(self.periods)
+
+
+def parse_periods(values: Iterable) -> list[dt.time]:
+    out = []
+    for v in values:
+        if isinstance(v, dt.time):
+            out.append(v)
+        else:
+            hh, mm = str(v).split(":")[:2]
+            out.append(dt.time(int(hh), int(mm)))
+    return sorted(set(out))
+
+
+def check_grid(periods: list[dt.time], duration: int) -> None:
+    """ValueError, если урок не помещается между началами соседних пар или за полночь."""
+    if not periods:
+        raise ValueError("не задано ни одной пары")
+    if duration < 1:
+        raise ValueError(f"длительность урока {duration} мин")
+    periods = sorted(periods)
+    for a, b in zip(periods, periods[1:]):
+        if a.hour * 60 + a.minute + duration > b.hour * 60 + b.minute:
+            raise ValueError(f"урок {duration} мин с {a:%H:%M} заходит на пару {b:%H:%M}")
+    if periods[-1].hour * 60 + periods[-1].minute + duration > 24 * 60:
+        raise ValueError(f"урок {duration} мин с {periods[-1]:%H:%M} заканчивается после полуночи")
+
+
+def grid(periods: Iterable | None = None, duration: int | None = None) -> tuple[list[dt.time], int]:
+    """Пары и длительность урока с подстановкой настроек TEMPLATE_SOLVER_*; проверены check_grid."""
+    periods = parse_periods(periods or getattr(settings, "TEMPLATE_SOLVER_PERIODS", DEFAULT_PERIODS))
+    duration = duration or getattr(settings, "TEMPLATE_SOLVER_LESSON_MINUTES", 45)
+    check_grid(periods, duration)
+    return periods, duration
+
+
+def allowed_positions(masks: AvailabilityMasks, teacher_id: int, days: int,
+                      periods: list[dt.time], duration: int) -> int:
+    """
+    Позиции, где урок учителя целиком в окнах доступности. Учитель без окон считается
+    свободным всегда — как в check_availability при проверке черновика.
+    """
+    full = (1 << days * len(periods)) - 1
+    if not masks.has_any(teacher_id):
+        return full
+    out = 0
+    for day in range(days):
+        free = masks.free(teacher_id, day)
+        for p, start in enumerate(periods):
+            need = lesson_mask(start, duration)
+            if need and need & ~free == 0:
+                out |= 1 << (day * len(periods) + p)
+    return out
+
+
+def propagate(problem: Problem) -> None:
+    """Сужает кандидатов групп: учитель должен вмещать группу в свои допустимые позиции."""
+    for g in problem.groups:
+        if not g.candidates:
+            g.reason = g.reason or "NO_TEACHER"
+            continue
+        fits = [t for t in g.candidates if bin(problem.allowed.get(t, 0)).count("1") >= len(g.units)]
+        if not fits:
+            g.reason = "NO_AVAILABLE_TEACHER"
+        g.candidates = fits
+
+
+def load_problem(grade_ids: Iterable[int] | None = None, days: int | None = None,
+                 periods: Iterable | None = None, duration: int | None = None) -> Problem:
+    """
+    Задача из БД: нормы, связи учителей и их доступность — по запросу на таблицу.
+    ValueError — сетка пар не вмещает урок (grid).
+    """
+    days = days or getattr(settings, "TEMPLATE_SOLVER_DAYS", 5)
+    periods, duration = grid(periods, duration)
+
+    norms = WeeklyNorm.objects.all()
+    if grade_ids is not None:
+        norms = norms.filter(grade_id__in=list(grade_ids))
+    norms = list(norms.values_list("grade_id", "subject_id", "lessons_per_week", "courses_per_week"))
+
+    by_subject: dict[int, set[int]] = {}
+    for t, s in TeacherSubject.objects.values_list("teacher_id", "subject_id"):
+        by_subject.setdefault(s, set()).add(t)
+    by_grade: dict[int, set[int]] = {}
+    for t, g in TeacherGrade.objects.values_list("teacher_id", "grade_id"):
+        by_grade.setdefault(g, set()).add(t)
+
+    groups = []
+    for grade, subject, lessons, courses in norms:
+        units = ["lesson"] * lessons + ["course"] * courses
+        if units:
+            groups.append(Group(grade, subject, units,
+                                sorted(by_subject.get(subject, set()) & by_grade.get(grade, set()))))
+
+    teachers = sorted({t for g in groups for t in g.candidates})
+    masks = AvailabilityMasks.load(teachers)
+    allowed = {t: allowed_positions(masks, t, days, periods, duration) for t in teachers}
+    types = {t.key: {"key": t.key, "label": t.label}
+             for t in LessonType.objects.filter(key__in=["lesson", "course"])}
+
+    problem = Problem(days=days, periods=periods, duration=duration, groups=groups, allowed=allowed, types=types)
+    propagate(problem)
+    return problem
@@ -0,0 +1,349 @@
+# backend/schedule/template/solver/search.py
+"""
+Поиск расписания: жадная расстановка с forward checking, затем имитация отжига.
+
+Состояние — позиция каждой единицы и учитель каждой группы; занятость учителей/классов
+хранится счётчиками по позициям, поэтому стоимость хода считается инкрементально:
+пересечения — O(1), «окна» и повторы предмета — только по затронутым дням (O(пар в дне)).
+
+Стоимость = HARD × пересечения (учитель/класс) + мягкие штрафы:
+  окна у класса, окна у учителя, предмет чаще ceil(n / days) раз в день.
+Доступность учителя — не штраф, а домен: единица ставится только в допустимые позиции.
+"""
+from __future__ import annotations
+
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+from .problem import Problem
+
+HARD = 1000
+W_GRADE_GAP = 3
+W_TEACHER_GAP = 1
+W_SUBJECT_DAY = 5
+
+T_START = 10.0
+T_END = 0.05
+PROGRESS_EVERY = 1.0  # сек между вызовами on_progress
+
+
+@dataclass
+class Solution:
+    lessons: list[dict]                  # уроки в формате TemplateWeekDraft.data["lessons"]
+    unplaced: list[dict]                 # группы без подходящего учителя
+    hard: int                            # оставшиеся пересечения (0 — расписание без конфликтов)
+    soft: int
+    iterations: int
+    elapsed: float
+    stats: dict = field(default_factory=dict)
+
+    @property
+    def cost(self) -> int:
+        return HARD * self.hard + self.soft
+
+    def as_data(self) -> dict:
+        return {"lessons": self.lessons}
+
+
+def _gaps(occ: list[int], start: int, width: int) -> int:
+    """Пустые пары между первой и последней занятой в дне."""
+    first = last = -1
+    busy = 0
+    for i in range(start, start + width):
+        if occ[i]:
+            if first < 0:
+                first = i
+            last = i
+            busy += 1
+    return last - first + 1 - busy if busy else 0
+
+
+class State:
+    def __init__(self, problem: Problem, rng: random.Random):
+        self.p = problem
+        self.rng = rng
+        self.P = len(problem.periods)
+        self.N = problem.size
+        self.groups = [g for g in problem.groups if g.candidates]
+        self.cap = [math.ceil(len(g.units) / problem.days) for g in self.groups]
+
+        self.unit_group: list[int] = []
+        self.group_units: list[list[int]] = []
+        for gi, g in enumerate(self.groups):
+            ids = list(range(len(self.unit_group), len(self.unit_group) + len(g.units)))
+            self.unit_group.extend([gi] * len(g.units))
+            self.group_units.append(ids)
+        self.grade_units: dict[int, list[int]] = {}
+        for u, gi in enumerate(self.unit_group):
+            self.grade_units.setdefault(self.groups[gi].grade, []).append(u)
+
+        self.allowed_list = {t: [i for i in range(self.N) if m >> i & 1] for t, m in problem.allowed.items()}
+        self.teacher = [g.candidates[0] for g in self.groups]
+        self.pos = [-1] * len(self.unit_group)
+        self.t_occ = {t: [0] * self.N for t in problem.allowed}
+        self.g_occ = {g.grade: [0] * self.N for g in self.groups}
+        self.subj = [[0] * problem.days for _ in self.groups]
+        self.hard = 0
+        self.soft = 0
+
+    # --- стоимость ---------------------------------------------------------
+    def _day_cost(self, t: int, grade: int, gi: int, day: int) -> int:
+        s = day * self.P
+        return (W_TEACHER_GAP * _gaps(self.t_occ[t], s, self.P)
+                + W_GRADE_GAP * _gaps(self.g_occ[grade], s, self.P)
+                + W_SUBJECT_DAY * max(0, self.subj[gi][day] - self.cap[gi]))
+
+    def recompute(self) -> tuple[int, int]:
+        """Полный пересчёт (hard, soft) — для проверки инкрементального учёта."""
+        hard = sum(max(0, c - 1) for occ in self.t_occ.values() for c in occ)
+        hard += sum(max(0, c - 1) for occ in self.g_occ.values() for c in occ)
+        soft = 0
+        for day in range(self.p.days):
+            s = day * self.P
+            soft += sum(W_TEACHER_GAP * _gaps(occ, s, self.P) for occ in self.t_occ.values())
+            soft += sum(W_GRADE_GAP * _gaps(occ, s, self.P) for occ in self.g_occ.values())
+        soft += sum(W_SUBJECT_DAY * max(0, c - self.cap[gi]) for gi, row in enumerate(self.subj) for c in row)
+        return hard, soft
+
+    @property
+    def cost(self) -> int:
+        return HARD * self.hard + self.soft
+
+    # --- ходы --------------------------------------------------------------
+    def _put(self, u: int, t: int, p: int, sign: int) -> int:
+        """Снимает (sign=-1) или ставит (+1) единицу; возвращает изменение числа пересечений."""
+        gi = self.unit_group[u]
+        to, go = self.t_occ[t], self.g_occ[self.groups[gi].grade]
+        if sign < 0:
+            clash = -((to[p] >= 2) + (go[p] >= 2))
+        else:
+            clash = (to[p] >= 1) + (go[p] >= 1)
+        to[p] += sign
+        go[p] += sign
+        self.subj[gi][p // self.P] += sign
+        return clash
+
+    def place(self, u: int, p: int) -> None:
+        gi = self.unit_group[u]
+        t, grade, day = self.teacher[gi], self.groups[gi].grade, p // self.P
+        before = self._day_cost(t, grade, gi, day)
+        self.hard += self._put(u, t, p, +1)
+        self.pos[u] = p
+        self.soft += self._day_cost(t, grade, gi, day) - before
+
+    def move(self, u: int, p: int) -> int:
+        """Переносит единицу в позицию p; возвращает изменение стоимости."""
+        a = self.pos[u]
+        if a == p:
+            return 0
+        gi = self.unit_group[u]
+        t, grade = self.teacher[gi], self.groups[gi].grade
+        days = {a // self.P, p // self.P}
+        before = sum(self._day_cost(t, grade, gi, d) for d in days)
+        clash = self._put(u, t, a, -1) + self._put(u, t, p, +1)
+        self.pos[u] = p
+        soft = sum(self._day_cost(t, grade, gi, d) for d in days) - before
+        self.hard += clash
+        self.soft += soft
+        return HARD * clash + soft
+
+    def retarget(self, gi: int, t2: int) -> int:
+        """Меняет учителя группы; позиции единиц сохраняются."""
+        t1 = self.teacher[gi]
+        units = self.group_units[gi]
+        days = {self.pos[u] // self.P for u in units}
+
+        def teacher_gaps():
+            return sum(W_TEACHER_GAP * (_gaps(self.t_occ[t1], d * self.P, self.P)
+                                        + _gaps(self.t_occ[t2], d * self.P, self.P)) for d in days)
+
+        before = teacher_gaps()
+        clash = 0
+        for u in units:
+            p = self.pos[u]
+            clash += -(self.t_occ[t1][p] >= 2) + (self.t_occ[t2][p] >= 1)
+            self.t_occ[t1][p] -= 1
+            self.t_occ[t2][p] += 1
+        self.teacher[gi] = t2
+        soft = teacher_gaps() - before
+        self.hard += clash
+        self.soft += soft
+        return HARD * clash + soft
+
+    def in_conflict(self, u: int) -> bool:
+        gi = self.unit_group[u]
+        p = self.pos[u]
+        return self.t_occ[self.teacher[gi]][p] > 1 or self.g_occ[self.groups[gi].grade][p] > 1
+
+
+# --- начальная расстановка ---------------------------------------------------
+def assign_teachers(state: State) -> None:
+    """Группы с меньшим выбором — первыми; учитель — с наибольшим запасом допустимых позиций."""
+    load: dict[int, int] = {}
+    capacity = {t: len(ps) for t, ps in state.allowed_list.items()}
+    order = sorted(range(len(state.groups)),
+                   key=lambda gi: (len(state.groups[gi].candidates), -len(state.groups[gi].units)))
+    for gi in order:
+        need = len(state.groups[gi].units)
+        t = max(state.groups[gi].candidates, key=lambda c: (capacity[c] - load.get(c, 0) - need, -c))
+        state.teacher[gi] = t
+        load[t] = load.get(t, 0) + need
+
+
+def greedy_place(state: State) -> None:
+    """
+    Самые стеснённые единицы (мало допустимых позиций у учителя) — первыми; позиция —
+    без пересечений, если есть (forward checking по счётчикам), иначе с минимумом пересечений.
+    """
+    P = state.P
+    order = sorted(range(len(state.pos)),
+                   key=lambda u: (len(state.allowed_list[state.teacher[state.unit_group[u]]]),
+                                  -len(state.group_units[state.unit_group[u]]), u))
+    for u in order:
+        gi = state.unit_group[u]
+        t, grade = state.teacher[gi], state.groups[gi].grade
+        to, go, subj = state.t_occ[t], state.g_occ[grade], state.subj[gi]
+
+        def score(p):
+            day = p // P
+            day_load = sum(go[day * P:(day + 1) * P])
+            return (to[p] + go[p], subj[day] >= state.cap[gi], subj[day], day_load, p % P)
+
+        state.place(u, min(state.allowed_list[t], key=score))
+
+
+# --- отжиг -------------------------------------------------------------------
+def _random_step(state: State) -> tuple[int, Callable[[], None]] | None:
+    """Случайный ход: (изменение стоимости, откат) или None, если ход невозможен."""
+    rng = state.rng
+    n = len(state.pos)
+    u = rng.randrange(n)
+    if state.hard and rng.random() < 0.5:
+        for _ in range(8):  # смещаем выбор к единицам в конфликте
+            if state.in_conflict(u):
+                break
+            u = rng.randrange(n)
+    gi = state.unit_group[u]
+    r = rng.random()
+
+    if r < 0.6:
+        a = state.pos[u]
+        p = rng.choice(state.allowed_list[state.teacher[gi]])
+        if p == a:
+            return None
+        return state.move(u, p), lambda: state.move(u, a)
+
+    if r < 0.95:
+        v = rng.choice(state.grade_units[state.groups[gi].grade])
+        a, b = state.pos[u], state.pos[v]
+        if a == b or state.unit_group[v] == gi:
+            return None
+        tu, tv = state.teacher[gi], state.teacher[state.unit_group[v]]
+        if not (state.p.allowed[tu] >> b & 1 and state.p.allowed[tv] >> a & 1):
+            return None
+        delta = state.move(u, b) + state.move(v, a)
+
+        def undo():
+            state.move(v, b)
+            state.move(u, a)
+        return delta, undo
+
+    candidates = state.groups[gi].candidates
+    if len(candidates) < 2:
+        return None
+    t1, t2 = state.teacher[gi], rng.choice(candidates)
+    if t2 == t1 or any(not state.p.allowed[t2] >> state.pos[x] & 1 for x in state.group_units[gi]):
+        return None
+    return state.retarget(gi, t2), lambda: state.retarget(gi, t1)
+
+
+def anneal(state: State, time_budget: float, max_iterations: int | None = None,
+           on_progress: Callable[[dict], None] | None = None) -> dict:
+    """Отжиг с геометрическим охлаждением по доле израсходованного времени; лучшее состояние восстанавливается."""
+    started = time.monotonic()
+    deadline = started + time_budget
+    best_cost, best = state.cost, (state.pos[:], state.teacher[:])
+    temp, iterations, accepted = T_START, 0, 0
+    last_progress = started
+
+    while state.cost and state.pos and (max_iterations is None or iterations < max_iterations):
+        if iterations % 256 == 0:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            temp = T_START * (T_END / T_START) ** ((now - started) / time_budget)
+            if on_progress and now - last_progress >= PROGRESS_EVERY:
+                last_progress = now
+                on_progress({"iterations": iterations, "cost": state.cost, "best_cost": best_cost,
+                             "hard": state.hard, "elapsed": round(now - started, 2)})
+        iterations += 1
+        step = _random_step(state)
+        if step is None:
+            continue
+        delta, undo = step
+        if delta <= 0 or state.rng.random() < math.exp(-delta / temp):
+            accepted += 1
+            if state.cost < best_cost:
+                best_cost, best = state.cost, (state.pos[:], state.teacher[:])
+        else:
+            undo()
+
+    if state.cost > best_cost:
+        _restore(state, *best)
+    return {"iterations": iterations, "accepted": accepted, "elapsed": time.monotonic() - started}
+
+
+def _restore(state: State, pos: list[int], teachers: list[int]) -> None:
+    for occ in (*state.t_occ.values(), *state.g_occ.values(), *state.subj):
+        occ[:] = [0] * len(occ)
+    state.teacher = teachers
+    state.hard = state.soft = 0
+    for u, p in enumerate(pos):
+        state.place(u, p)
+
+
+# --- результат ---------------------------------------------------------------
+def to_lessons(state: State) -> list[dict]:
+    p = state.p
+    lessons = []
+    order = sorted(range(len(state.pos)), key=lambda u: (state.groups[state.unit_group[u]].grade, state.pos[u]))
+    for u in order:
+        gi = state.unit_group[u]
+        g = state.groups[gi]
+        day, period = divmod(state.pos[u], state.P)
+        key = g.units[u - state.group_units[gi][0]]
+        lessons.append({
+            "id": len(lessons) + 1,
+            "grade": g.grade,
+            "subject": g.subject,
+            "teacher": state.teacher[gi],
+            "day_of_week": day,
+            "start_time": p.periods[period].strftime("%H:%M"),
+            "duration_minutes": p.duration,
+            "type": p.types.get(key),
+        })
+    return lessons
+
+
+def solve(problem: Problem, time_budget: float = 60.0, seed: int | None = None,
+          max_iterations: int | None = None, on_progress: Callable[[dict], None] | None = None) -> Solution:
+    started = time.monotonic()
+    state = State(problem, random.Random(seed))
+    assign_teachers(state)
+    greedy_place(state)
+    greedy = {"hard": state.hard, "soft": state.soft}
+    run = anneal(state, max(0.0, time_budget - (time.monotonic() - started)), max_iterations, on_progress)
+    unplaced = [{"grade": g.grade, "subject": g.subject, "count": len(g.units), "reason": g.reason}
+                for g in problem.groups if not g.candidates]
+    return Solution(
+        lessons=to_lessons(state),
+        unplaced=unplaced,
+        hard=state.hard,
+        soft=state.soft,
+        iterations=run["iterations"],
+        elapsed=round(time.monotonic() - started, 3),
+        stats={"greedy": greedy, "accepted": run["accepted"], "units": len(state.pos)},
+    )
@@ -1,6 +1,7 @@
 #Проверки пересечений в расписании.
 from datetime import datetime, timedelta
-from schedule.core.models import TeacherSubject, TeacherGrade
+from schedule.core.services.availability import AvailabilityMasks, mask_to_ranges
+from schedule.core.services.teacher_links import TeacherLinkIndex, as_pk
 from django.contrib.auth import get_user_model
 from collections import defaultdict
 
@@ -11,19 +12,35 @@ def get_lesson_end(lesson):
     end = start + timedelta(minutes=lesson["duration_minutes"])
     return start.time(), end.time()
 
+def overlap_groups(items):
+    """
+    Связные группы пересекающихся интервалов, sweep line: items — [(start, end, payload), ...].
+    После сортировки по началу интервал входит в текущую группу, если начинается раньше
+    максимального конца группы. O(n log n); группы из ≥2 элементов — в порядке начала.
+    """
+    groups, cur, cur_end = [], [], None
+    for s, e, payload in sorted(items, key=lambda x: (x[0], x[1])):
+        if cur and s < cur_end:
+            cur.append(payload)
+            cur_end = max(cur_end, e)
+            continue
+        if len(cur) > 1:
+            groups.append(cur)
+        cur, cur_end = [payload], e
+    if len(cur) > 1:
+        groups.append(cur)
+    return groups
+
 def has_conflict(time_list):
-    time_list.sort()
-    for i in range(len(time_list) - 1):
-        s1, e1 = time_list[i]
-        s2, e2 = time_list[i + 1]
-        if s2 < e1:
-            return True
-    return False
-
-def validate_schedule(lessons: list[dict], weekly_norms: list[dict] = None, check_user_links: bool = False) -> tuple[list[str], list[str]]:
+    return bool(overlap_groups([(s, e, None) for s, e in time_list]))
+
+def validate_schedule(lessons: list[dict], weekly_norms: list[dict] = None, check_user_links: bool = False,
+                      link_index: TeacherLinkIndex | None = None) -> tuple[list[str], list[str]]:
     """
     Проверяет список уроков и возвращает (ошибки, предупреждения)
     Ошибки блокируют сохранение, предупреждения — нет
+    Связи учителей (check_user_links) берутся из TeacherLinkIndex: учителя и их связи
+    грузятся один раз на весь список, а не запросами на каждый урок.
     """
     errors = []
     warnings = []
@@ -31,7 +48,10 @@ def validate_schedule(lessons: list[dict], weekly_norms: list[dict] = None, chec
     by_grade = {}
     by_subject_grade_type = {}
 
-    teacher_cache = {}
+    if check_user_links:
+        teacher_ids = {l.get("teacher") for l in lessons if l.get("teacher")}
+        teacher_cache = User.objects.in_bulk({pk for pk in map(as_pk, teacher_ids) if pk is not None})
+        links = link_index or TeacherLinkIndex.load(teacher_cache)
 
     for lesson in lessons:
         teacher_id = lesson.get("teacher")
@@ -58,27 +78,23 @@ def validate_schedule(lessons: list[dict], weekly_norms: list[dict] = None, chec
 
         # 🔍 Проверка связей учителя
         if check_user_links:
-            teacher = teacher_cache.get(teacher_id)
+            teacher = teacher_cache.get(as_pk(teacher_id))
             if not teacher:
-                try:
-                    teacher = User.objects.get(id=teacher_id)
-                    teacher_cache[teacher_id] = teacher
-                except User.DoesNotExist:
-                    errors.append(f"⛔ Учитель ID={teacher_id} не найден в системе")
-                    continue
+                errors.append(f"⛔ Учитель ID={teacher_id} не найден в системе")
+                continue
 
             role = getattr(teacher, "role", None)
             is_superuser = getattr(teacher, "is_superuser", False)
 
             # Проверка предмета
-            if not TeacherSubject.objects.filter(teacher=teacher, subject_id=subject_id).exists():
+            if not links.teaches_subject(teacher, subject_id):
                 if is_superuser or role in ["DIRECTOR", "HEAD_TEACHER"]:
                     warnings.append(f"⚠️ {teacher} не привязан к предмету ID={subject_id}")
                 else:
                     errors.append(f"⛔ {teacher} не привязан к предмету ID={subject_id}")
 
             # Проверка класса
-            if not TeacherGrade.objects.filter(teacher=teacher, grade_id=grade_id).exists():
+            if not links.teaches_grade(teacher, grade_id):
                 if is_superuser or role in ["DIRECTOR", "HEAD_TEACHER"]:
                     warnings.append(f"⚠️ {teacher} не привязан к классу ID={grade_id}")
                 else:
@@ -111,114 +127,120 @@ def validate_schedule(lessons: list[dict], weekly_norms: list[dict] = None, chec
     return errors, warnings
 
 
-from collections import defaultdict
+def _id_order(x):
+    return (type(x).__name__, x)
 
 def _collect_overlap_ids(items):
-    # items: list[(start_time, end_time, lesson_id)]
-    items = sorted(items, key=lambda x: (x[0], x[1]))
-    n = len(items)
-    pairs = set()
-    for i in range(n):
-        s1, e1, id1 = items[i]
-        # сравниваем со всеми, начинающимися до конца i-го
-        for j in range(i + 1, n):
-            s2, e2, id2 = items[j]
-            if s2 >= e1:
-                break  # дальше все ещё позже
-            pairs.add(tuple(sorted((id1, id2))))
-    # объединяем пары в компоненты
-    g = defaultdict(set)
-    for a, b in pairs:
-        g[a].add(b); g[b].add(a)
-    visited, clusters = set(), []
-    for node in {x for ab in pairs for x in ab}:
-        if node in visited: continue
-        stack, comp = [node], []
-        while stack:
-            v = stack.pop()
-            if v in visited: continue
-            visited.add(v); comp.append(v)
-            stack.extend(g[v] - visited)
-        clusters.append(sorted(comp))
+    # items: list[(start_time, end_time, lesson_id)] → кластеры id, упорядоченные по началу
+    clusters = []
+    for group in overlap_groups(items):
+        ids = {x for x in group if x is not None}
+        clusters.append(sorted(ids, key=_id_order))
     return clusters
 
+# Корзины пересечений: (ресурс урока, type проблемы, severity); по комнате — предупреждение
+COLLISION_KINDS = (
+    ("teacher", "teacher", "error"),
+    ("grade", "grade", "error"),
+    ("room", "room_overlap", "warning"),
+)
+
+
+def lesson_resource(l: dict, kind: str):
+    """teacher / grade / room урока; room может приходить как room или room_id, иногда объектом."""
+    val = l.get(kind)
+    if kind == "room" and val is None:
+        val = l.get("room_id")
+    if isinstance(val, dict):
+        return val.get("id")
+    return val
+
+
+def lesson_problems(l: dict, include_warnings: bool = True) -> tuple[list[dict], tuple | None]:
+    """Проблемы самого урока (время, незаполненные поля) и его интервал (s, e) или None."""
+    lid = l.get("id")
+    try:
+        s, e = get_lesson_end(l)
+    except Exception:
+        return [{
+            "type": "invalid_time",
+            "lesson_ids": [lid] if lid else [],
+            "severity": "error",
+            "message": f"Невалидное время — день {l.get('day_of_week')}, строка '{l.get('start_time')}'"
+        }], None
+    problems = []
+    if include_warnings:
+        missing = [f for f in ("teacher","grade","subject") if not l.get(f)]
+        if missing:
+            problems.append({
+                "type": "missing_fields",
+                "lesson_ids": [lid] if lid else [],
+                "severity": "warning",
+                "message": "Не заполнены поля: " + ", ".join(missing)
+            })
+    return problems, (s, e)
+
+
+def bucket_problems(kind: str, rid, day, items) -> list[dict]:
+    """Пересечения в одной корзине (ресурс, день); items — [(s, e, lesson_id), ...]."""
+    _, ptype, severity = next(k for k in COLLISION_KINDS if k[0] == kind)
+    return [{
+        "type": ptype,
+        "resource_id": rid,
+        "weekday": day,
+        "lesson_ids": cluster,
+        "severity": severity,
+        "message": f"Пересечение по {kind} (id={rid}) в день {day}",
+    } for cluster in _collect_overlap_ids(items)]
+
+
 def check_collisions(lessons: list[dict], include_warnings: bool = True) -> list[dict]:
     problems: list[dict] = []
-    by_teacher = defaultdict(list)  # (teacher, day) -> [(s,e,id), ...]
-    by_grade = defaultdict(list)  # (grade,   day) -> [(s,e,id), ...]
-    by_room = defaultdict(list)  # (room,    day) -> [(s,e,id), ...]
+    buckets = {kind: defaultdict(list) for kind, _, _ in COLLISION_KINDS}  # (ресурс, day) -> [(s,e,id), ...]
 
     for l in lessons:
-        lid = l.get("id")
-        teacher = l.get("teacher")
-        grade = l.get("grade")
-        day = l.get("day_of_week")
-        # room может приходить как room или room_id, иногда объектом
-        room_val = l.get("room", l.get("room_id"))
-        if isinstance(room_val, dict):
-            room = room_val.get("id")
-        else:
-            room = room_val
-        try:
-            s, e = get_lesson_end(l)
-        except Exception:
-            problems.append({
-                "type": "invalid_time",
-                "lesson_ids": [lid] if lid else [],
-                "severity": "error",
-                "message": f"Невалидное время — день {day}, строка '{l.get('start_time')}'"
-            })
+        own, interval = lesson_problems(l, include_warnings)
+        problems.extend(own)
+        if interval is None:
             continue
+        for kind, by_kind in buckets.items():
+            rid = lesson_resource(l, kind)
+            if rid is not None:
+                by_kind[(rid, l.get("day_of_week"))].append((*interval, l.get("id")))
 
-        if teacher is not None:
-            by_teacher[(teacher, day)].append((s, e, lid))
-        if grade is not None:
-            by_grade[(grade, day)].append((s, e, lid))
-        if room is not None:
-            by_room[(room, day)].append((s, e, lid))
-
-        if include_warnings:
-            missing = [f for f in ("teacher","grade","subject") if not l.get(f)]
-            if missing:
-                problems.append({
-                    "type": "missing_fields",
-                    "lesson_ids": [lid] if lid else [],
-                    "severity": "warning",
-                    "message": "Не заполнены поля: " + ", ".join(missing)
-                })
-
-    for (tid, day), items in by_teacher.items():
-        for cluster in _collect_overlap_ids(items):
-            problems.append({
-                "type": "teacher",
-                "resource_id": tid,
-                "weekday": day,
-                "lesson_ids": cluster,
-                "severity": "error",
-                "message": f"Пересечение по teacher (id={tid}) в день {day}"
-            })
+    for kind, by_kind in buckets.items():
+        for (rid, day), items in by_kind.items():
+            problems.extend(bucket_problems(kind, rid, day, items))
 
-    for (gid, day), items in by_grade.items():
-        for cluster in _collect_overlap_ids(items):
-            problems.append({
-                "type": "grade",
-                "resource_id": gid,
-                "weekday": day,
-                "lesson_ids": cluster,
-                "severity": "error",
-                "message": f"Пересечение по grade (id={gid}) в день {day}"
-            })
+    return problems
 
-    # 🔔 Пересечения по аудитории/комнате — предупреждение
-    for (rid, day), items in by_room.items():
-        for cluster in _collect_overlap_ids(items):
-            problems.append({
-                "type": "room_overlap",  # оставим явный тип, чтобы фронту проще маппить
-                "resource_id": rid,
-                "weekday": day,
-                "lesson_ids": cluster,
-                "severity": "warning",  # договорённость: по комнате — warning
-                "message": f"Пересечение по room (id={rid}) в день {day}",
-            })
 
-    return problems
\ No newline at end of file
+def check_availability(lessons: list[dict], masks: AvailabilityMasks | None = None) -> list[dict]:
+    """
+    Предупреждения «урок вне окон доступности учителя» по битовым маскам (без запросов,
+    если маски в кэше). Учителя, у которых окна не заданы вовсе, не проверяются.
+    """
+    if masks is None:
+        masks = AvailabilityMasks.load({as_pk(l.get("teacher")) for l in lessons} - {None})
+    problems = []
+    for l in lessons:
+        tid, day = as_pk(l.get("teacher")), as_pk(l.get("day_of_week"))
+        if tid is None or day is None or not masks.has_any(tid):
+            continue
+        try:
+            start, _ = get_lesson_end(l)
+        except Exception:
+            continue  # невалидное время уже отмечено check_collisions
+        if masks.is_available(tid, day, start, l["duration_minutes"]):
+            continue
+        free = ", ".join(f"{a:%H:%M}–{b:%H:%M}" for a, b in mask_to_ranges(masks.free(tid, day))) or "нет окон"
+        lid = l.get("id")
+        problems.append({
+            "type": "teacher_unavailable",
+            "resource_id": tid,
+            "weekday": day,
+            "lesson_ids": [lid] if lid else [],
+            "severity": "warning",
+            "message": f"Учитель (id={tid}) недоступен в день {day} в {l.get('start_time')}; свободен: {free}",
+        })
+    return problems
@@ -1,7 +1,24 @@
 import pytest
+from django.core.cache import cache
 from django.utils import timezone
 from zoneinfo import ZoneInfo
 
+from schedule.core.services import availability
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    # маски доступности и отчёты норм кэшируются по id, а id в тестовой БД переиспользуются
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    # маски доступности кэшируются только в общем бэкенде; в тестах LocMem играет его роль
+    monkeypatch.setattr(availability, "is_process_local", lambda alias="default": False)
+
 @pytest.fixture(autouse=True)
 def activate_moscow_tz(settings):
     settings.TIME_ZONE = "Europe/Moscow"
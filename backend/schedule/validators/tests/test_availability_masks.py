@@ -0,0 +1,117 @@
+from datetime import time
+
+import pytest
+from rest_framework.test import APIClient
+
+from users.models import User
+from schedule.core.models import TeacherAvailability
+from schedule.core.services.availability import (
+    AvailabilityMasks, busy_masks, lesson_mask, mask_to_ranges, slot_of, window_mask,
+)
+from schedule.validators.schedule_rules import check_availability
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def teachers():
+    out = []
+    for i, (start, end) in enumerate([(time(8), time(12)), (time(10), time(15)), (time(13), time(17))]):
+        t = User.objects.create(username=f"t{i}", role=User.Role.TEACHER)
+        TeacherAvailability.objects.create(teacher=t, day_of_week=0, start_time=start, end_time=end)
+        out.append(t)
+    return out
+
+
+def test_masks_are_slot_exact():
+    assert mask_to_ranges(window_mask(time(8), time(9, 30))) == [(time(8), time(9, 30))]
+    # окно не по сетке сжимается, урок — расширяется
+    assert mask_to_ranges(window_mask(time(8, 2), time(9, 3))) == [(time(8, 5), time(9))]
+    assert mask_to_ranges(lesson_mask(time(8, 2), 58)) == [(time(8), time(9))]
+    assert lesson_mask(time(23, 30), 60) == window_mask(time(23, 30), time(0))
+
+
+def test_bitwise_queries(teachers, shared_cache, django_assert_num_queries):
+    ids = [t.id for t in teachers]
+    with django_assert_num_queries(1):
+        masks = AvailabilityMasks.load(ids)
+    with django_assert_num_queries(0):
+        assert AvailabilityMasks.load(ids).masks == masks.masks  # из кэша
+        assert masks.is_available(ids[0], 0, time(11), 60)
+        assert not masks.is_available(ids[0], 0, time(11, 30), 45)
+        assert not masks.is_available(ids[0], 1, time(9), 45)
+        assert masks.free_teachers(0, slot_of(time(11))) == ids[:2]
+        assert masks.free_teachers(0, slot_of(time(14))) == ids[1:]
+
+    busy = busy_masks([{"grade": 5, "day_of_week": 0, "start_time": "10:00", "duration_minutes": 90}])
+    common = masks.common_free(ids[1], 0, busy[(5, 0)])
+    assert mask_to_ranges(common) == [(time(11, 30), time(15))]
+
+
+def test_adjacent_windows_join(teachers):
+    t = teachers[0]
+    TeacherAvailability.objects.create(teacher=t, day_of_week=0, start_time=time(12), end_time=time(13))
+    assert AvailabilityMasks.load([t.id]).is_available(t.id, 0, time(11, 30), 60)
+
+
+def test_signal_invalidates_cache(teachers, shared_cache, django_capture_on_commit_callbacks):
+    t = teachers[0]
+    assert not AvailabilityMasks.load([t.id]).is_available(t.id, 2, time(9), 45)
+    with django_capture_on_commit_callbacks(execute=True):
+        TeacherAvailability.objects.create(teacher=t, day_of_week=2, start_time=time(8), end_time=time(10))
+    assert AvailabilityMasks.load([t.id]).is_available(t.id, 2, time(9), 45)
+    with django_capture_on_commit_callbacks(execute=True):
+        TeacherAvailability.objects.filter(teacher=t, day_of_week=2).get().delete()
+    assert not AvailabilityMasks.load([t.id]).is_available(t.id, 2, time(9), 45)
+
+
+def test_invalidation_waits_for_commit(teachers, shared_cache, django_capture_on_commit_callbacks):
+    t = teachers[0]
+    AvailabilityMasks.load([t.id])
+    with django_capture_on_commit_callbacks() as callbacks:
+        TeacherAvailability.objects.create(teacher=t, day_of_week=2, start_time=time(8), end_time=time(10))
+        # до коммита чужие процессы видят старые окна — и кэш не сброшен
+        assert not AvailabilityMasks.load([t.id]).is_available(t.id, 2, time(9), 45)
+    for callback in callbacks:
+        callback()
+    assert AvailabilityMasks.load([t.id]).is_available(t.id, 2, time(9), 45)
+
+
+def test_reassigned_window_invalidates_both_teachers(teachers, shared_cache, django_capture_on_commit_callbacks):
+    old, new = teachers[0], teachers[2]
+    window = TeacherAvailability.objects.get(teacher=old)
+    masks = AvailabilityMasks.load([old.id, new.id])
+    assert masks.is_available(old.id, 0, time(9), 45) and not masks.is_available(new.id, 0, time(9), 45)
+    window.teacher = new
+    with django_capture_on_commit_callbacks(execute=True):
+        window.save()
+    masks = AvailabilityMasks.load([old.id, new.id])
+    assert not masks.is_available(old.id, 0, time(9), 45) and masks.is_available(new.id, 0, time(9), 45)
+
+
+def test_process_local_cache_is_bypassed(teachers, django_assert_num_queries):
+    ids = [t.id for t in teachers]
+    AvailabilityMasks.load(ids)
+    with django_assert_num_queries(1):
+        AvailabilityMasks.load(ids)  # LocMem не делится между процессами — маски из БД
+
+
+def test_draft_validate_warns_on_availability(teachers):
+    free_teacher = User.objects.create(username="free", role=User.Role.TEACHER)  # окна не заданы
+    lessons = [
+        {"id": 1, "teacher": teachers[0].id, "grade": 1, "subject": 1, "day_of_week": 0,
+         "start_time": "09:00", "duration_minutes": 45},
+        {"id": 2, "teacher": teachers[0].id, "grade": 2, "subject": 1, "day_of_week": 0,
+         "start_time": "11:30", "duration_minutes": 45},
+        {"id": 3, "teacher": free_teacher.id, "grade": 3, "subject": 1, "day_of_week": 4,
+         "start_time": "19:00", "duration_minutes": 45},
+    ]
+    problems = check_availability(lessons)
+    assert [(p["type"], p["lesson_ids"]) for p in problems] == [("teacher_unavailable", [2])]
+    assert "08:00–12:00" in problems[0]["message"]
+
+    client = APIClient()
+    client.force_authenticate(User.objects.create_superuser(username="adm", password="x"))
+    data = client.post("/api/draft/template-drafts/validate/", {"lessons": lessons}, format="json").json()
+    assert [w["type"] for w in data["warnings"]] == ["teacher_unavailable"]
+    assert data["errors"] == []
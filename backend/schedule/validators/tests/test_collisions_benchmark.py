@@ -0,0 +1,90 @@
+import random
+import time
+from collections import defaultdict
+from datetime import time as _time
+
+import pytest
+
+from schedule.validators.schedule_rules import (
+    _collect_overlap_ids, check_collisions, has_conflict, overlap_groups,
+)
+
+
+def _pairwise_clusters(items):
+    """Прежний алгоритм (все пары + DFS) — эталон для сравнения кластеров."""
+    items = sorted(items, key=lambda x: (x[0], x[1]))
+    g = defaultdict(set)
+    for i, (s1, e1, id1) in enumerate(items):
+        for s2, e2, id2 in items[i + 1:]:
+            if s2 >= e1:
+                break
+            g[id1].add(id2)
+            g[id2].add(id1)
+    seen, out = set(), []
+    for node in g:
+        if node in seen:
+            continue
+        stack, comp = [node], []
+        while stack:
+            v = stack.pop()
+            if v not in seen:
+                seen.add(v)
+                comp.append(v)
+                stack.extend(g[v] - seen)
+        out.append(sorted(comp))
+    return sorted(out)
+
+
+def _week(n, teachers=120, grades=60, rooms=40, seed=1):
+    rnd = random.Random(seed)
+    return [{
+        "id": i, "teacher": rnd.randrange(teachers), "grade": rnd.randrange(grades),
+        "subject": 1, "room": rnd.randrange(rooms), "day_of_week": rnd.randrange(5),
+        "start_time": f"{rnd.randrange(8, 17):02d}:{rnd.choice(['00', '15', '30', '45'])}",
+        "duration_minutes": rnd.choice([40, 45, 90]),
+    } for i in range(n)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_same_clusters_as_pairwise(seed):
+    rnd = random.Random(seed)
+    items = []
+    for i in range(300):
+        s = rnd.randrange(8 * 60, 17 * 60)
+        e = s + rnd.choice([0, 15, 45, 90])
+        items.append((_time(s // 60, s % 60), _time(e // 60, e % 60), i))
+    clusters = _collect_overlap_ids(items)
+    assert sorted(clusters) == _pairwise_clusters(items)
+    # детерминированный порядок: по началу первого интервала кластера
+    assert clusters == _collect_overlap_ids(list(reversed(items)))
+
+
+def test_has_conflict_uses_groups():
+    assert not has_conflict([(_time(10), _time(11)), (_time(9), _time(10))])
+    assert has_conflict([(_time(9), _time(12)), (_time(11), _time(11, 30))])
+    assert overlap_groups([(1, 5, "a"), (2, 3, "b"), (4, 6, "c"), (6, 7, "d")]) == [["a", "b", "c"]]
+
+
+@pytest.mark.slow
+def test_benchmark_10k_lesson_week(record_property):
+    lessons = _week(10_000)
+    started = time.perf_counter()
+    problems = check_collisions(lessons)
+    elapsed = time.perf_counter() - started
+    record_property("check_collisions_seconds", round(elapsed, 3))
+    assert problems
+    assert elapsed < 5
+
+
+@pytest.mark.slow
+def test_benchmark_dense_bucket(record_property):
+    # один учитель, один день: все 10k уроков в одной корзине — прежний алгоритм здесь квадратичный
+    lessons = _week(10_000, teachers=1, grades=1, rooms=1)
+    for l in lessons:
+        l["day_of_week"] = 0
+    started = time.perf_counter()
+    problems = check_collisions(lessons, include_warnings=False)
+    elapsed = time.perf_counter() - started
+    record_property("check_collisions_seconds", round(elapsed, 3))
+    assert {p["type"] for p in problems} == {"teacher", "grade", "room_overlap"}
+    assert elapsed < 5
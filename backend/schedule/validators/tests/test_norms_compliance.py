@@ -0,0 +1,117 @@
+import datetime as dt
+
+import pytest
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+from schedule.core.models import AcademicYear, Grade, LessonType, Subject, WeeklyNorm
+from schedule.real_schedule.models import RealLesson
+from schedule.real_schedule.services.conduct import mark_lessons_conducted
+from schedule.template.models import TemplateLesson, TemplateWeek
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/core/norms/compliance/"
+
+
+@pytest.fixture
+def school():
+    grade = Grade.objects.create(name="5А")
+    math, art = Subject.objects.create(name="Математика"), Subject.objects.create(name="ИЗО")
+    types = {
+        "lesson": LessonType.objects.create(key="lesson", label="Урок"),
+        "course": LessonType.objects.create(key="course", label="Курс"),
+        "consult": LessonType.objects.create(key="consult", label="Консультация", counts_towards_norm=False),
+    }
+    WeeklyNorm.objects.create(grade=grade, subject=math, lessons_per_week=3, courses_per_week=1)
+    WeeklyNorm.objects.create(grade=grade, subject=art, lessons_per_week=1)
+    teacher = User.objects.create(username="t", role=User.Role.TEACHER)
+    ay = AcademicYear.objects.create(name="2025", start_date="2025-09-01", end_date="2026-05-31")
+    week = TemplateWeek.objects.create(name="W", academic_year=ay, is_active=True)
+    for day, key in enumerate(["lesson", "lesson", "course", "consult", None]):
+        TemplateLesson.objects.create(template_week=week, grade=grade, subject=math, teacher=teacher,
+                                      day_of_week=day, start_time=dt.time(9), duration_minutes=45,
+                                      type=types[key] if key else None)
+    return grade, math, art, teacher, types, week
+
+
+@pytest.fixture
+def client():
+    c = APIClient()
+    c.force_authenticate(User.objects.create_user(username="viewer", password="x"))
+    return c
+
+
+def _rows(report):
+    return {(r["subject"], r["kind"]): r for r in report["rows"]}
+
+
+def test_template_report(school, client, django_assert_max_num_queries):
+    grade, math, art, teacher, types, week = school
+    with django_assert_max_num_queries(5):  # неделя + отпечаток + GROUP BY + нормы + типы
+        report = client.get(URL, {"template_week_id": week.id}).json()
+    rows = _rows(report)
+    # урок без типа идёт в lessons_per_week, консультация — не идёт
+    assert (rows[(math.id, "lesson")]["planned"], rows[(math.id, "lesson")]["status"]) == (3, "ok")
+    assert rows[(math.id, "lesson")]["types"] == {"lesson": 3}
+    assert rows[(math.id, "lesson")]["not_counted"] == {"consult": 1}
+    assert (rows[(math.id, "course")]["planned"], rows[(math.id, "course")]["status"]) == (1, "ok")
+    assert (rows[(art.id, "lesson")]["diff"], rows[(art.id, "lesson")]["status"]) == (-1, "under")
+    assert report["totals"] == {"rows": 3, "deviations": 1, "under": 1, "over": 0}
+    # без параметров — активная неделя
+    assert client.get(URL).json() == report
+
+
+def test_template_report_cached_until_change(school, client, django_assert_num_queries):
+    grade, math, art, teacher, types, week = school
+    client.get(URL, {"template_week_id": week.id})
+    with django_assert_num_queries(4):  # неделя + отпечаток + нормы + типы; GROUP BY из кэша
+        client.get(URL, {"template_week_id": week.id})
+    TemplateLesson.objects.create(template_week=week, grade=grade, subject=art, teacher=teacher,
+                                  day_of_week=0, start_time=dt.time(10), duration_minutes=45, type=types["lesson"])
+    report = client.get(URL, {"template_week_id": week.id}).json()
+    assert report["totals"]["deviations"] == 0
+    types["lesson"].counts_towards_norm = False
+    types["lesson"].save()
+    assert client.get(URL, {"template_week_id": week.id}).json()["totals"]["under"] == 2
+
+
+def test_real_report_counts_planned_and_delivered(school, client):
+    grade, math, art, teacher, types, week = school
+    tz = timezone.get_default_timezone()
+    lessons = [RealLesson.objects.create(
+        subject=math, grade=grade, teacher=teacher, duration_minutes=45, lesson_type=types["lesson"],
+        start=timezone.make_aware(dt.datetime(2025, 9, day, 9), tz)) for day in (1, 2, 3, 8, 9, 10, 15)]
+    report = client.get(URL, {"from": "2025-09-01", "to": "2025-09-14"}).json()
+    row = _rows(report)[(math.id, "lesson")]
+    assert report["weeks"] == 2
+    assert (row["expected"], row["planned"], row["delivered"], row["status"]) == (6, 6, 0, "ok")
+    assert row["delivered_diff"] == -6
+
+    mark_lessons_conducted([l.id for l in lessons[:4]], timezone.now())  # update() ставит updated_at
+    row = _rows(client.get(URL, {"from": "2025-09-01", "to": "2025-09-14"}).json())[(math.id, "lesson")]
+    assert (row["delivered"], row["delivered_diff"]) == (4, -2)
+
+
+def test_real_report_keyed_by_db_stamp(school, client, django_assert_num_queries):
+    grade, math, art, teacher, types, week = school
+    tz = timezone.get_default_timezone()
+    for day in (1, 2, 3):
+        RealLesson.objects.create(subject=math, grade=grade, teacher=teacher, duration_minutes=45,
+                                  lesson_type=types["lesson"], start=timezone.make_aware(dt.datetime(2025, 9, day, 9), tz))
+    params = {"from": "2025-09-01", "to": "2025-09-07"}
+    client.get(URL, params)
+    with django_assert_num_queries(3):  # отпечаток + нормы + типы; GROUP BY из кэша
+        client.get(URL, params)
+    # удаление пачкой не шлёт сигналов и не трогает updated_at оставшихся — ключ меняет число уроков
+    RealLesson.objects.filter(start__day=3).delete()
+    assert _rows(client.get(URL, params).json())[(math.id, "lesson")]["planned"] == 2
+
+
+def test_bad_params(client, school):
+    assert client.get(URL, {"from": "2025-09-10", "to": "2025-09-01"}).json()["detail"] == "INVALID_DATES"
+    assert client.get(URL, {"from": "2025-09-01"}).json()["detail"] == "INVALID_DATES"
+    assert client.get(URL, {"from": "2025-01-01", "to": "2026-12-31"}).json()["detail"] == "RANGE_TOO_LARGE"
+    assert client.get(URL, {"template_week_id": "x"}).json()["detail"] == "INVALID_TEMPLATE_WEEK"
+    assert client.get(URL, {"template_week_id": 999999}).status_code == 404
@@ -0,0 +1,86 @@
+from datetime import time
+
+import pytest
+from django.core.exceptions import ValidationError
+
+from users.models import User
+from schedule.core.models import (
+    AcademicYear, Grade, Subject, TeacherAvailability, TeacherGrade, TeacherSubject,
+)
+from schedule.core.services.teacher_links import TeacherLinkIndex
+from schedule.template.forms import TemplateLessonForm
+from schedule.template.models import TemplateLesson, TemplateWeek
+from schedule.validators.schedule_rules import validate_schedule
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def school():
+    grades = [Grade.objects.create(name=f"{i}А") for i in range(1, 4)]
+    subjects = [Subject.objects.create(name=f"Предмет {i}") for i in range(3)]
+    teachers = []
+    for i in range(5):
+        t = User.objects.create(username=f"t{i}", role=User.Role.TEACHER)
+        TeacherSubject.objects.create(teacher=t, subject=subjects[i % 3])
+        TeacherGrade.objects.create(teacher=t, grade=grades[i % 3])
+        TeacherAvailability.objects.create(teacher=t, day_of_week=0, start_time=time(8), end_time=time(14))
+        teachers.append(t)
+    return grades, subjects, teachers
+
+
+def _lessons(school, n):
+    grades, subjects, teachers = school
+    return [{"teacher": teachers[i % 5].id, "grade": grades[i % 5 % 3].id, "subject": subjects[i % 5 % 3].id,
+             "day_of_week": i % 5, "start_time": f"{8 + i // 5 % 6:02d}:00", "duration_minutes": 45}
+            for i in range(n)]
+
+
+def test_index_answers_from_memory(school, django_assert_num_queries):
+    grades, subjects, teachers = school
+    with django_assert_num_queries(3):
+        index = TeacherLinkIndex.load(t.id for t in teachers)
+    with django_assert_num_queries(0):
+        assert index.teaches_subject(teachers[1], subjects[1].id)
+        assert index.teaches_subject(str(teachers[1].id), str(subjects[1].id))
+        assert not index.teaches_subject(teachers[1], subjects[0])
+        assert index.teaches_grade(teachers[4].id, grades[1].id)
+        assert index.is_available(teachers[0], 0, time(9), time(9, 45))
+        assert not index.is_available(teachers[0], 0, time(13, 30), time(14, 15))
+        assert not index.is_available(teachers[0], 1, time(9), time(9, 45))
+
+
+def test_validate_schedule_query_count_is_constant(school, shared_cache, django_assert_num_queries):
+    with django_assert_num_queries(4):  # учителя + предметы + классы + доступность
+        errors, _ = validate_schedule(_lessons(school, 20), check_user_links=True)
+    assert errors == []
+    with django_assert_num_queries(3):  # маски доступности уже в кэше
+        validate_schedule(_lessons(school, 300), check_user_links=True)
+
+
+def test_validate_schedule_reports_missing_links(school):
+    grades, subjects, teachers = school
+    lessons = _lessons(school, 1)
+    lessons[0]["subject"] = subjects[2].id
+    lessons.append({**lessons[0], "teacher": 999999, "start_time": "12:00"})
+    errors, _ = validate_schedule(lessons, check_user_links=True)
+    assert any("не привязан к предмету" in e for e in errors)
+    assert any("ID=999999 не найден" in e for e in errors)
+
+
+def test_model_and_form_clean_share_index(school, django_assert_num_queries):
+    grades, subjects, teachers = school
+    ay = AcademicYear.objects.create(name="2025", start_date="2025-09-01", end_date="2026-05-31")
+    week = TemplateWeek.objects.create(name="W", academic_year=ay)
+    lesson = TemplateLesson(template_week=week, grade=grades[0], subject=subjects[0], teacher=teachers[0],
+                            day_of_week=0, start_time=time(15), duration_minutes=45)
+    with pytest.raises(ValidationError, match="недоступен"):
+        lesson.clean()
+
+    form = TemplateLessonForm(data={
+        "template_week": week.id, "grade": grades[0].id, "subject": subjects[0].id, "teacher": teachers[0].id,
+        "day_of_week": 0, "start_time": "09:00", "duration_minutes": 45,
+    })
+    assert form.is_valid(), form.errors
+    with django_assert_num_queries(0):  # связи уже загружены формой
+        form.instance.clean()
@@ -0,0 +1,43 @@
+from django.contrib import admin
+
+from .models import (AttendanceSummary, PresenceEvent, RecordingBlob, RecordingDelivery, RecordingQuota,
+                     RecordingRetention)
+
+
+@admin.register(RecordingRetention)
+class RecordingRetentionAdmin(admin.ModelAdmin):
+    list_display = ("id", "lesson_type", "retention_days")
+
+
+@admin.register(RecordingQuota)
+class RecordingQuotaAdmin(admin.ModelAdmin):
+    list_display = ("id", "academic_year", "quota_bytes")
+
+
+@admin.register(RecordingBlob)
+class RecordingBlobAdmin(admin.ModelAdmin):
+    list_display = ("id", "digest", "size", "refcount", "created_at")
+    readonly_fields = ("digest", "size", "path", "refcount", "created_at")
+    search_fields = ("digest",)
+
+
+@admin.register(RecordingDelivery)
+class RecordingDeliveryAdmin(admin.ModelAdmin):
+    list_display = ("id", "source", "room", "ingest", "hits", "created_at", "last_seen_at")
+    list_filter = ("source",)
+    readonly_fields = ("key", "created_at")
+    raw_id_fields = ("room", "ingest")
+
+
+@admin.register(PresenceEvent)
+class PresenceEventAdmin(admin.ModelAdmin):
+    list_display = ("id", "room", "user", "kind", "source", "at")
+    list_filter = ("kind", "source")
+    raw_id_fields = ("room", "user")
+
+
+@admin.register(AttendanceSummary)
+class AttendanceSummaryAdmin(admin.ModelAdmin):
+    list_display = ("room", "computed_at", "present", "late", "absent", "skipped")
+    readonly_fields = ("computed_at", "minutes")
+    raw_id_fields = ("room",)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class WebinarConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "schedule.webinar"
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,22 @@
+# backend/schedule/webinar/management/commands/attendance_aggregate.py
+from django.core.management.base import BaseCommand
+
+from schedule.webinar.services.attendance import aggregate_attendance
+
+
+class Command(BaseCommand):
+    help = ("Считает посещаемость закрытых комнат по журналу присутствия и заполняет LessonStudent "
+            "(+ / late / -). Отметки учителя не перезаписывает. Обычно это делает webinar_scheduler.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--room", type=int, action="append", dest="rooms",
+                            help="Только эти комнаты (можно повторять)")
+        parser.add_argument("--batch-size", type=int, default=50,
+                            help="Комнат за одну пачку (default: 50)")
+
+    def handle(self, *args, **opts):
+        res = aggregate_attendance(room_ids=opts["rooms"], batch_size=opts["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"attendance_aggregate: rooms={res.rooms}, present={res.present}, late={res.late}, "
+            f"absent={res.absent}, skipped={res.skipped}"
+        ))
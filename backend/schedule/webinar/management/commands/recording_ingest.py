@@ -0,0 +1,38 @@
+# backend/schedule/webinar/management/commands/recording_ingest.py
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from schedule.webinar.services.recordings import run_pending
+
+
+class Command(BaseCommand):
+    help = "Воркер очереди записей: скачивает/копирует записи в хранилище и финализирует комнаты."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Обработать готовые задания и выйти")
+        parser.add_argument("--sleep", type=float, default=5.0,
+                            help="Пауза между опросами пустой очереди, сек (default: 5)")
+
+    def handle(self, *args, **opts):
+        if opts["once"]:
+            n = run_pending()
+            self.stdout.write(self.style.SUCCESS(f"recording_ingest: processed={n}"))
+            return
+
+        stopped = False
+
+        def _stop(signum, frame):
+            nonlocal stopped
+            stopped = True
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+        self.stdout.write(self.style.SUCCESS("recording_ingest: started"))
+        while not stopped:
+            close_old_connections()
+            if not run_pending(limit=10):
+                time.sleep(opts["sleep"])
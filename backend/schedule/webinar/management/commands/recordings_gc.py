@@ -0,0 +1,27 @@
+# backend/schedule/webinar/management/commands/recordings_gc.py
+from django.core.management.base import BaseCommand
+
+from schedule.webinar.services.retention import collect_garbage
+
+
+class Command(BaseCommand):
+    help = ("Удаляет записи по сроку хранения (RecordingRetention) и квотам учебного года "
+            "(RecordingQuota), затем blob'ы без ссылок. Записи с recording_keep не трогает.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Только посчитать кандидатов, ничего не удалять")
+        parser.add_argument("--batch-size", type=int, default=100,
+                            help="Сколько записей удалять за одну пачку (default: 100)")
+        parser.add_argument("--pause", type=float, default=0.5,
+                            help="Пауза между пачками, сек (default: 0.5)")
+
+    def handle(self, *args, **opts):
+        res = collect_garbage(batch_size=opts["batch_size"], pause=opts["pause"], dry_run=opts["dry_run"])
+        if opts["dry_run"]:
+            self.stdout.write(f"recordings_gc (dry-run): expired={len(res.expired)}, over_quota={len(res.over_quota)}")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"recordings_gc: refs_deleted={res.refs_deleted}, blobs_deleted={res.blobs_deleted}, "
+            f"bytes_freed={res.bytes_freed}"
+        ))
@@ -0,0 +1,33 @@
+# backend/schedule/webinar/management/commands/rooms_capacity.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from schedule.webinar.services.capacity import capacity_forecast, materialize_range
+
+
+class Command(BaseCommand):
+    help = ("Прогноз нагрузки на видеосерверы по расписанию: пик одновременных комнат "
+            "и ожидаемых участников по корзинам --bucket минут, плюс самые загруженные дни.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", required=True, help="YYYY-MM-DD")
+        parser.add_argument("--to", dest="date_to", required=True, help="YYYY-MM-DD (включительно)")
+        parser.add_argument("--bucket", type=int, default=5, help="Размер корзины, мин (default: 5)")
+        parser.add_argument("--top", type=int, default=10, help="Сколько самых загруженных дней вывести")
+
+    def handle(self, *args, **opts):
+        try:
+            from_dt, to_dt = materialize_range(parse_date(opts["date_from"]), parse_date(opts["date_to"]))
+        except (TypeError, ValueError) as e:
+            raise CommandError(f"Неверный диапазон: {e}")
+
+        res = capacity_forecast(from_dt, to_dt, opts["bucket"], with_series=False)
+        peak = res["peak"]
+        self.stdout.write(self.style.SUCCESS(
+            f"rooms_capacity: lessons={res['lessons']}, peak_rooms={peak['rooms']} at {peak['rooms_at']}, "
+            f"peak_participants={peak['participants']} at {peak['participants_at']}"
+        ))
+        busiest = sorted(res["daily"], key=lambda d: (-d["peak_rooms"], -d["peak_participants"]))[:opts["top"]]
+        for day in busiest:
+            self.stdout.write(f"  {day['date']}: rooms={day['peak_rooms']} at {day['peak_rooms_at']:%H:%M}, "
+                              f"participants={day['peak_participants']}")
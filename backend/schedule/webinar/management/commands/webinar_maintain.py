@@ -1,13 +1,16 @@
 # backend/schedule/webinar/management/commands/webinar_maintain.py
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
 from schedule.webinar.services.auto import (
     maintain_rooms,
     precreate_rooms_for_open_lessons,
 )
+from schedule.webinar.services.events import prune_events
 
 class Command(BaseCommand):
-    help = "Создаёт/закрывает вебинарные комнаты по расписанию. Запускать периодически."
+    help = ("Создаёт/закрывает вебинарные комнаты по расписанию. С --once — один цикл; "
+            "без него — передаёт управление резидентному webinar_scheduler.")
 
     def add_arguments(self, parser):
         parser.add_argument("--ahead", type=int, default=48,
@@ -16,10 +19,16 @@ class Command(BaseCommand):
                             help="Выполнить один цикл и выйти")
 
     def handle(self, *args, **opts):
+        if not opts["once"]:
+            call_command("webinar_scheduler", ahead=opts["ahead"])
+            return
+
         created, closed = maintain_rooms()
         precreated = precreate_rooms_for_open_lessons(hours_ahead=opts["ahead"])
+        pruned = prune_events()
         self.stdout.write(
             self.style.SUCCESS(
-                f"webinar_maintain: created={created}, closed={closed}, precreated_open={precreated}"
+                f"webinar_maintain: created={created}, closed={closed}, precreated_open={precreated}, "
+                f"events_pruned={pruned}"
             )
         )
@@ -0,0 +1,43 @@
+# backend/schedule/webinar/management/commands/webinar_scheduler.py
+import json
+import signal
+
+from django.core.management.base import BaseCommand
+
+from schedule.webinar.services.scheduler import RoomScheduler
+
+
+class Command(BaseCommand):
+    help = ("Резидентный планировщик вебинарных комнат: спит до ближайшего дедлайна "
+            "(создание/открытие/закрытие) и выполняет переход вовремя.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=48,
+                            help="Горизонт загрузки уроков в часах (default: 48)")
+        parser.add_argument("--refresh", type=float, default=30.0,
+                            help="Как часто (сек) подтягивать изменённые уроки (default: 30)")
+        parser.add_argument("--max-sleep", type=float, default=60.0,
+                            help="Максимальный сон между проверками, сек (default: 60)")
+        parser.add_argument("--metrics-file", default="",
+                            help="Куда писать JSON с метриками задержки тиков (для healthcheck)")
+
+    def handle(self, *args, **opts):
+        scheduler = RoomScheduler(ahead_hours=opts["ahead"], refresh_seconds=opts["refresh"])
+
+        def _stop(signum, frame):
+            scheduler.stop()
+        signal.signal(signal.SIGTERM, _stop)
+        signal.signal(signal.SIGINT, _stop)
+
+        metrics_file = opts["metrics_file"]
+
+        def _dump(s: RoomScheduler):
+            if metrics_file:
+                with open(metrics_file, "w") as f:
+                    json.dump(s.metrics.snapshot(), f)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"webinar_scheduler: started (ahead={opts['ahead']}h, refresh={opts['refresh']}s)"
+        ))
+        scheduler.run_forever(max_sleep=opts["max_sleep"], on_step=_dump)
+        self.stdout.write(f"webinar_scheduler: stopped {json.dumps(scheduler.metrics.snapshot())}")
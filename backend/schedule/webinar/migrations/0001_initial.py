@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('real_schedule', '0006_room_status_override'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordingIngest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('JAAS', 'Jaas'), ('JIBRI', 'Jibri')], max_length=8)),
+                ('location', models.TextField()),
+                ('file_ext', models.CharField(default='mp4', max_length=8)),
+                ('status', models.CharField(choices=[('QUEUED', 'Queued'), ('RUNNING', 'Running'), ('DONE', 'Done'), ('FAILED', 'Failed')], db_index=True, default='QUEUED', max_length=8)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('max_attempts', models.PositiveSmallIntegerField(default=5)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_until', models.DateTimeField(blank=True, null=True)),
+                ('part_path', models.CharField(blank=True, default='', max_length=512)),
+                ('bytes_done', models.BigIntegerField(default=0)),
+                ('bytes_total', models.BigIntegerField(blank=True, null=True)),
+                ('chunk_checksums', models.JSONField(blank=True, default=list)),
+                ('result_url', models.URLField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recording_ingests', to='real_schedule.room')),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='webinar_rec_status_7c6b3e_idx')],
+            },
+        ),
+    ]
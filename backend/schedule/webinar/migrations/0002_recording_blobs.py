@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_schedule', '0006_room_status_override'),
+        ('webinar', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordingBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('digest', models.CharField(max_length=64, unique=True)),
+                ('size', models.BigIntegerField()),
+                ('path', models.CharField(max_length=255)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecordingBlobRef',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('blob', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='refs', to='webinar.recordingblob')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recording_refs', to='real_schedule.room')),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_holiday_academicyear_end_date_and_more'),
+        ('webinar', '0002_recording_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordingQuota',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quota_bytes', models.BigIntegerField()),
+                ('academic_year', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recording_quota', to='core.academicyear')),
+            ],
+            options={
+                'verbose_name': 'RecordingQuota',
+                'verbose_name_plural': 'Квоты на записи',
+            },
+        ),
+        migrations.CreateModel(
+            name='RecordingRetention',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('retention_days', models.PositiveIntegerField(blank=True, null=True)),
+                ('lesson_type', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recording_retention', to='core.lessontype')),
+            ],
+            options={
+                'verbose_name': 'RecordingRetention',
+                'verbose_name_plural': 'Сроки хранения записей',
+            },
+        ),
+    ]
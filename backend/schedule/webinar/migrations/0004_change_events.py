@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:04
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webinar', '0003_recording_retention'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('room.status', 'Room'), ('recording.status', 'Recording'), ('lesson.changed', 'Lesson')], max_length=24)),
+                ('room_id', models.IntegerField(blank=True, null=True)),
+                ('lesson_id', models.IntegerField(blank=True, null=True)),
+                ('teacher_id', models.IntegerField(blank=True, null=True)),
+                ('grade_id', models.IntegerField(blank=True, null=True)),
+                ('subject_id', models.IntegerField(blank=True, null=True)),
+                ('is_open', models.BooleanField(default=False)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
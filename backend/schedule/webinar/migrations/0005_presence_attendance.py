@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_schedule', '0007_room_recording_keep'),
+        ('webinar', '0004_change_events'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('skipped', models.PositiveIntegerField(default=0)),
+                ('minutes', models.JSONField(blank=True, default=dict)),
+                ('room', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summary', to='real_schedule.room')),
+            ],
+            options={
+                'ordering': ['-computed_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PresenceEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('occupant', models.CharField(blank=True, default='', max_length=255)),
+                ('kind', models.CharField(choices=[('JOIN', 'Join'), ('LEAVE', 'Leave')], max_length=8)),
+                ('source', models.CharField(choices=[('JITSI', 'Jitsi'), ('API', 'Api')], max_length=8)),
+                ('at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presence_events', to='real_schedule.room')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='presence_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['at', 'id'],
+                'indexes': [models.Index(fields=['room', 'at'], name='webinar_pre_room_id_01f367_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 15:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('real_schedule', '0007_room_recording_keep'),
+        ('webinar', '0005_presence_attendance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordingDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('source', models.CharField(choices=[('JAAS', 'Jaas'), ('JIBRI', 'Jibri')], max_length=8)),
+                ('hits', models.PositiveIntegerField(default=1)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('last_seen_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ingest', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='deliveries', to='webinar.recordingingest')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recording_deliveries', to='real_schedule.room')),
+            ],
+            options={
+                'ordering': ['-id'],
+            },
+        ),
+    ]
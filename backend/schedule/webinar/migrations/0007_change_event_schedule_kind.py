@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 16:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('webinar', '0006_recording_deliveries'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='changeevent',
+            name='kind',
+            field=models.CharField(choices=[('room.status', 'Room'), ('recording.status', 'Recording'), ('lesson.changed', 'Lesson'), ('schedule.regenerated', 'Schedule')], max_length=24),
+        ),
+    ]
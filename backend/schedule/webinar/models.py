@@ -0,0 +1,224 @@
+"""
+Модуль webinar/models.py:
+Служебные модели вебинаров (очередь приёма записей и т.п.).
+Сама модель Room пока живёт в real_schedule.
+"""
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from schedule.core.models import AcademicYear, LessonType
+from schedule.real_schedule.models import Room
+
+
+class RecordingIngest(models.Model):
+    """
+    Задание на приём записи: вебхук только ставит его в очередь (202),
+    скачивание/копирование и финализация комнаты — в воркере recording_ingest.
+    """
+    class Source(models.TextChoices):
+        JAAS = "JAAS"    # скачивание по preAuthenticatedLink
+        JIBRI = "JIBRI"  # локальный файл после finalize-скрипта
+
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED"
+        RUNNING = "RUNNING"
+        DONE = "DONE"
+        FAILED = "FAILED"
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="recording_ingests")
+    source = models.CharField(max_length=8, choices=Source.choices)
+    location = models.TextField()  # URL (JAAS) или путь к файлу (JIBRI)
+    file_ext = models.CharField(max_length=8, default="mp4")
+
+    status = models.CharField(max_length=8, choices=Status.choices, default=Status.QUEUED, db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)  # аренда задания воркером
+
+    # Прогресс скачивания (для докачки по HTTP Range)
+    part_path = models.CharField(max_length=512, blank=True, default="")
+    bytes_done = models.BigIntegerField(default=0)
+    bytes_total = models.BigIntegerField(null=True, blank=True)
+    chunk_checksums = models.JSONField(default=list, blank=True)  # sha256 каждого полного чанка
+
+    result_url = models.URLField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+        ordering = ["-id"]
+
+    def __str__(self):
+        return f"Ingest #{self.id} room={self.room_id} {self.source} {self.status}"
+
+
+class RecordingDelivery(models.Model):
+    """
+    Доставка вебхука записи по ключу идемпотентности (sha256 ссылки JaaS без подписи
+    или пути Jibri с размером и mtime). Уникальный ключ склеивает повторы и гонки
+    параллельных доставок в одно задание приёма.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    source = models.CharField(max_length=8, choices=RecordingIngest.Source.choices)
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="recording_deliveries")
+    ingest = models.ForeignKey(RecordingIngest, null=True, blank=True, on_delete=models.SET_NULL,
+                               related_name="deliveries")
+    hits = models.PositiveIntegerField(default=1)  # сколько раз пришла эта доставка
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_seen_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["-id"]
+
+    def __str__(self):
+        return f"{self.source} room={self.room_id} {self.key[:12]}… ×{self.hits}"
+
+
+class RecordingBlob(models.Model):
+    """
+    Файл записи в контент-адресуемом хранилище (LOCAL): лежит один раз по sha256,
+    пути комнат — жёсткие ссылки на него. refcount = число RecordingBlobRef.
+    """
+    digest = models.CharField(max_length=64, unique=True)  # sha256 hex
+    size = models.BigIntegerField()
+    path = models.CharField(max_length=255)  # относительно RECORDING_LOCAL_DIR
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-id"]
+
+    def __str__(self):
+        return f"{self.digest[:12]}… {self.size} B ×{self.refcount}"
+
+
+class RecordingBlobRef(models.Model):
+    """Путь записи комнаты (lessons/<id>/<ts>.mp4) → blob."""
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="recording_refs")
+    blob = models.ForeignKey(RecordingBlob, on_delete=models.PROTECT, related_name="refs")
+    path = models.CharField(max_length=255, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-id"]
+
+    def __str__(self):
+        return f"{self.path} → {self.blob.digest[:12]}…"
+
+
+class RecordingRetention(models.Model):
+    """
+    Срок хранения записей по типу урока. Строка без lesson_type — правило по умолчанию
+    (для прочих типов и собраний). retention_days=None — хранить бессрочно.
+    """
+    lesson_type = models.OneToOneField(LessonType, null=True, blank=True, on_delete=models.CASCADE,
+                                       related_name="recording_retention")
+    retention_days = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "RecordingRetention"
+        verbose_name_plural = "Сроки хранения записей"
+
+    def __str__(self):
+        days = f"{self.retention_days} дн." if self.retention_days is not None else "бессрочно"
+        return f"{self.lesson_type or 'по умолчанию'}: {days}"
+
+
+class RecordingQuota(models.Model):
+    """Квота на объём записей уроков учебного года; при превышении GC удаляет самые старые."""
+    academic_year = models.OneToOneField(AcademicYear, on_delete=models.CASCADE, related_name="recording_quota")
+    quota_bytes = models.BigIntegerField()
+
+    class Meta:
+        verbose_name = "RecordingQuota"
+        verbose_name_plural = "Квоты на записи"
+
+    def __str__(self):
+        return f"{self.academic_year}: {self.quota_bytes} B"
+
+
+class ChangeEvent(models.Model):
+    """
+    Журнал изменений для SSE (/api/rooms/events/): комната сменила статус, запись готова,
+    урок изменился, расписание перегенерировано пачкой. id — курсор клиента (Last-Event-ID).
+    Поля адресатов денормализованы, чтобы фильтровать события по пользователю без запросов
+    (и после удаления урока).
+    Старые строки чистит prune_events().
+    """
+    class Kind(models.TextChoices):
+        ROOM = "room.status"
+        RECORDING = "recording.status"
+        LESSON = "lesson.changed"
+        SCHEDULE = "schedule.regenerated"
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=24, choices=Kind.choices)
+    room_id = models.IntegerField(null=True, blank=True)
+    lesson_id = models.IntegerField(null=True, blank=True)
+    teacher_id = models.IntegerField(null=True, blank=True)
+    grade_id = models.IntegerField(null=True, blank=True)
+    subject_id = models.IntegerField(null=True, blank=True)
+    is_open = models.BooleanField(default=False)  # открытый урок/собрание — видно всем
+    payload = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} room={self.room_id} lesson={self.lesson_id}"
+
+
+class PresenceEvent(models.Model):
+    """
+    Журнал присутствия в комнате (только добавление): вход/выход участника.
+    Источники: вебхук присутствия Jitsi (точные join/leave) и нажатие «Войти» в /join/
+    (запасной вариант, если вебхук не настроен). Посещаемость из него считает services.attendance.
+    """
+    class Kind(models.TextChoices):
+        JOIN = "JOIN"
+        LEAVE = "LEAVE"
+
+    class Source(models.TextChoices):
+        JITSI = "JITSI"
+        API = "API"
+
+    room = models.ForeignKey(Room, on_delete=models.CASCADE, related_name="presence_events")
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL,
+                             related_name="presence_events")  # гость — без пользователя
+    occupant = models.CharField(max_length=255, blank=True, default="")  # occupant JID: вкладка/устройство
+    kind = models.CharField(max_length=8, choices=Kind.choices)
+    source = models.CharField(max_length=8, choices=Source.choices)
+    at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["room", "at"])]
+        ordering = ["at", "id"]
+
+    def __str__(self):
+        return f"{self.room_id}: {self.kind} {self.user_id or self.occupant} @ {self.at:%H:%M:%S}"
+
+
+class AttendanceSummary(models.Model):
+    """Итог автоматической посещаемости по комнате урока: когда посчитано и минуты присутствия учеников."""
+    room = models.OneToOneField(Room, on_delete=models.CASCADE, related_name="attendance_summary")
+    computed_at = models.DateTimeField(default=timezone.now)
+    present = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)  # у ученика уже стояла отметка учителя
+    minutes = models.JSONField(default=dict, blank=True)  # {student_id: минуты присутствия}
+
+    class Meta:
+        ordering = ["-computed_at"]
+
+    def __str__(self):
+        return f"room {self.room_id}: +{self.present} late {self.late} -{self.absent}"
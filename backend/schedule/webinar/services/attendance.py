@@ -0,0 +1,245 @@
+# backend/schedule/webinar/services/attendance.py
+"""
+Автоматическая посещаемость по журналу присутствия (PresenceEvent).
+
+Запись: вебхук присутствия Jitsi и /join/ только добавляют строки журнала (вебхук — пачкой).
+Подсчёт: после закрытия комнаты aggregate_attendance() обрабатывает комнаты пачками:
+  события → интервалы по occupant (вкладка/устройство) → слияние по ученику → минуты в окне
+  урока → статус LessonStudent (+ / late / -), вставка и обновление bulk-операциями.
+Отметки, уже выставленные учителем, не перезаписываются. Число запросов не зависит
+от числа учеников и событий.
+"""
+from __future__ import annotations
+
+import logging
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from users.models import User
+from schedule.real_schedule.models import LessonStudent, Room, ROOM_CLOSE_AFTER
+from schedule.webinar.models import AttendanceSummary, PresenceEvent
+from schedule.webinar.services.join import build_role_maps
+
+logger = logging.getLogger("cedar.webinar.attendance")
+
+LOOKBACK = timedelta(days=7)  # старше — не досчитываем: журнал мог не вестись
+JITSI_EVENTS = {"muc-occupant-joined": PresenceEvent.Kind.JOIN, "muc-occupant-left": PresenceEvent.Kind.LEAVE}
+
+
+@dataclass
+class AttendanceResult:
+    rooms: int = 0
+    present: int = 0
+    late: int = 0
+    absent: int = 0
+    skipped: int = 0
+
+
+# -----------------------------------------------------
+# Запись журнала
+# -----------------------------------------------------
+def _parse_at(value) -> datetime:
+    """Время события: epoch (секунды или миллисекунды) или ISO-8601; иначе — «сейчас»."""
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.isdigit()):
+        ts = float(value)
+        if ts > 1e12:
+            ts /= 1000
+        return datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+    if isinstance(value, str):
+        parsed = parse_datetime(value)
+        if parsed is not None:
+            return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+    return timezone.now()
+
+
+def ingest_jitsi_events(items) -> int:
+    """
+    События Jitsi (mod_event_sync): объект, список или {"events": [...]}, формат
+    { "event_name": "muc-occupant-joined|left", "room_name": "cedar-lesson-12",
+      "occupant": { "id": "<user id из JWT>", "occupant_jid": "…", "joined_at": 1700000000, "left_at": … } }.
+    Комнаты и пользователи разрешаются двумя запросами, строки пишутся одним bulk_create.
+    Неизвестные комнаты и прочие события пропускаются. Возвращает число записанных событий.
+    """
+    if isinstance(items, dict):
+        items = items.get("events", [items])
+    items = [i for i in items or [] if isinstance(i, dict) and i.get("event_name") in JITSI_EVENTS]
+    if not items:
+        return 0
+
+    names = {str(i.get("room_name", "")).split("@")[0] for i in items}
+    rooms = dict(Room.objects.filter(jitsi_room__in=names).order_by("id").values_list("jitsi_room", "id"))
+    raw_ids = {str((i.get("occupant") or {}).get("id", "")) for i in items}
+    user_ids = set(User.objects.filter(id__in=[int(x) for x in raw_ids if x.isdigit()])
+                   .values_list("id", flat=True))
+
+    rows = []
+    for item in items:
+        room_id = rooms.get(str(item.get("room_name", "")).split("@")[0])
+        if room_id is None:
+            continue
+        occupant = item.get("occupant") or {}
+        kind = JITSI_EVENTS[item["event_name"]]
+        uid = str(occupant.get("id", ""))
+        at = occupant.get("left_at") if kind == PresenceEvent.Kind.LEAVE else occupant.get("joined_at")
+        rows.append(PresenceEvent(
+            room_id=room_id,
+            user_id=int(uid) if uid.isdigit() and int(uid) in user_ids else None,
+            occupant=str(occupant.get("occupant_jid") or uid)[:255],
+            kind=kind, source=PresenceEvent.Source.JITSI,
+            at=_parse_at(at or item.get("timestamp")),
+        ))
+    PresenceEvent.objects.bulk_create(rows)
+    return len(rows)
+
+
+def record_join_click(room: Room, user) -> None:
+    """«Войти» в /join/: запасной сигнал присутствия для комнат без вебхука Jitsi."""
+    if room.type == "LESSON" and getattr(user, "is_authenticated", False):
+        PresenceEvent.objects.create(room=room, user=user, kind=PresenceEvent.Kind.JOIN,
+                                     source=PresenceEvent.Source.API, at=timezone.now())
+
+
+# -----------------------------------------------------
+# Подсчёт
+# -----------------------------------------------------
+def presence_intervals(events, until: datetime) -> dict[int, list[tuple[datetime, datetime]]]:
+    """
+    Интервалы присутствия по пользователям из событий (user_id, occupant, kind, at), упорядоченных по at.
+    Вход без выхода длится до until; повторный вход того же occupant и выход без входа игнорируются.
+    """
+    opened: dict[tuple, datetime] = {}
+    out: dict[int, list] = {}
+    for user_id, occupant, kind, at in events:
+        if user_id is None:
+            continue
+        key = (user_id, occupant)
+        if kind == PresenceEvent.Kind.JOIN:
+            opened.setdefault(key, at)
+        elif key in opened:
+            out.setdefault(user_id, []).append((opened.pop(key), at))
+    for (user_id, _), at in opened.items():
+        out.setdefault(user_id, []).append((at, max(at, until)))
+    return out
+
+
+def presence_minutes(intervals, start: datetime, end: datetime) -> tuple[float, datetime | None]:
+    """Минуты присутствия в окне [start, end] (пересечения вкладок не удваиваются) и время первого входа."""
+    clipped = sorted((max(a, start), min(b, end)) for a, b in intervals if b > start and a < end)
+    total, cur_a, cur_b = 0.0, None, None
+    for a, b in clipped:
+        if cur_b is None or a > cur_b:
+            if cur_b is not None:
+                total += (cur_b - cur_a).total_seconds()
+            cur_a, cur_b = a, b
+        else:
+            cur_b = max(cur_b, b)
+    if cur_b is not None:
+        total += (cur_b - cur_a).total_seconds()
+    return total / 60, (clipped[0][0] if clipped else None)
+
+
+def classify(minutes: float, first_at: datetime | None, start: datetime, duration: int) -> tuple[str, int | None]:
+    """(status, late_minutes): меньше ATTENDANCE_MIN_PRESENCE_RATIO урока — «-», вход позже порога — late."""
+    grace = timedelta(minutes=getattr(settings, "ATTENDANCE_LATE_GRACE_MIN", 5))
+    ratio = getattr(settings, "ATTENDANCE_MIN_PRESENCE_RATIO", 0.25)
+    if first_at is None or minutes < duration * ratio:
+        return LessonStudent.Status.ABSENT, None
+    if first_at > start + grace:
+        return LessonStudent.Status.LATE, math.ceil((first_at - start).total_seconds() / 60)
+    return LessonStudent.Status.PRESENT, None
+
+
+def pending_rooms(now: datetime | None = None):
+    """Закрытые комнаты уроков с журналом присутствия, по которым посещаемость ещё не считалась."""
+    now = now or timezone.now()
+    return (Room.objects
+            .filter(type="LESSON", lesson__isnull=False, attendance_summary__isnull=True,
+                    scheduled_end__gte=now - LOOKBACK)
+            .filter(Q(status="CLOSED") | Q(scheduled_end__lte=now - ROOM_CLOSE_AFTER))
+            .filter(Exists(PresenceEvent.objects.filter(room=OuterRef("pk")))))
+
+
+def _aggregate_batch(rooms: list[Room], now: datetime, res: AttendanceResult) -> None:
+    maps = build_role_maps(rooms)
+    events: dict[int, list] = {}
+    for row in (PresenceEvent.objects.filter(room_id__in=[r.id for r in rooms])
+                .order_by("at", "id").values_list("room_id", "source", "user_id", "occupant", "kind", "at")):
+        events.setdefault(row[0], []).append(row[1:])
+    existing = {(ls.lesson_id, ls.student_id): ls
+                for ls in LessonStudent.objects.filter(lesson_id__in=[r.lesson_id for r in rooms])}
+
+    to_create, to_update, summaries = [], [], []
+    for room in rooms:
+        lesson = room.lesson
+        start = room.scheduled_start or lesson.start
+        duration = lesson.duration_minutes or 0
+        end = start + timedelta(minutes=duration)
+        rows = events.get(room.id, [])
+        # есть данные Jitsi — клики «Войти» не учитываем: они не знают о выходе
+        if any(src == PresenceEvent.Source.JITSI for src, *_ in rows):
+            rows = [r for r in rows if r[0] == PresenceEvent.Source.JITSI]
+        intervals = presence_intervals([r[1:] for r in rows], until=room.ended_at or end)
+
+        summary = AttendanceSummary(room=room, computed_at=now)
+        students = [uid for uid, (role, _) in maps.get(room.id, {}).items() if role == "participant"]
+        for sid in students:
+            minutes, first_at = presence_minutes(intervals.get(sid, []), start, end)
+            status, late_minutes = classify(minutes, first_at, start, duration)
+            summary.minutes[str(sid)] = round(minutes, 1)
+            row = existing.get((lesson.id, sid))
+            if row is not None and row.status:
+                summary.skipped += 1  # отметка учителя важнее
+                continue
+            if row is None:
+                to_create.append(LessonStudent(lesson_id=lesson.id, student_id=sid,
+                                               status=status, late_minutes=late_minutes))
+            else:
+                row.status, row.late_minutes = status, late_minutes
+                to_update.append(row)
+            if status == LessonStudent.Status.PRESENT:
+                summary.present += 1
+            elif status == LessonStudent.Status.LATE:
+                summary.late += 1
+            else:
+                summary.absent += 1
+        summaries.append(summary)
+
+    with transaction.atomic():
+        LessonStudent.objects.bulk_create(to_create, ignore_conflicts=True)
+        LessonStudent.objects.bulk_update(to_update, ["status", "late_minutes"])
+        AttendanceSummary.objects.bulk_create(summaries, ignore_conflicts=True)
+
+    res.rooms += len(summaries)
+    for s in summaries:
+        res.present += s.present
+        res.late += s.late
+        res.absent += s.absent
+        res.skipped += s.skipped
+
+
+def aggregate_attendance(now: datetime | None = None, room_ids=None, batch_size: int = 50) -> AttendanceResult:
+    """Считает посещаемость по всем ожидающим комнатам (или только room_ids) пачками по batch_size."""
+    now = now or timezone.now()
+    res = AttendanceResult()
+    qs = pending_rooms(now)
+    if room_ids is not None:
+        qs = qs.filter(id__in=list(room_ids))
+    last_id = 0
+    while True:
+        rooms = list(qs.filter(id__gt=last_id).select_related("lesson").order_by("id")[:batch_size])
+        if not rooms:
+            break
+        _aggregate_batch(rooms, now, res)
+        last_id = rooms[-1].id
+    if res.rooms:
+        logger.info("attendance: rooms=%s present=%s late=%s absent=%s skipped=%s",
+                    res.rooms, res.present, res.late, res.absent, res.skipped)
+    return res
@@ -1,34 +1,55 @@
 # backend/schedule/webinar/services/auto.py
 from datetime import timedelta
+from django.db import connection
+from django.db.models import Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.text import slugify
 from django.db.utils import ProgrammingError, OperationalError
 from schedule.real_schedule.models import RealLesson, Room
+from schedule.real_schedule.services.conduct import mark_lessons_conducted
+from schedule.webinar.services.events import publish_rooms
+from schedule.webinar.services.feed import invalidate_open_lessons_feed
 
-def _ensure_room_for_lesson(lesson: RealLesson) -> Room:
-    room = Room.objects.filter(type="LESSON", lesson_id=lesson.id).first()
-    if room:
-        return room
-    start = lesson.start
-    end = start + timedelta(minutes=lesson.duration_minutes or 0)
-    jitsi_room = f"cedar-lesson-{lesson.id}"
+OPEN_BEFORE = timedelta(minutes=15)   # комната создаётся за 15 минут до начала
+CLOSE_AFTER = timedelta(minutes=10)   # и закрывается через 10 минут после конца
+LOOKBACK = timedelta(hours=6)
+
+def _room_for_lesson(lesson_id: int, start, duration_minutes: int | None, is_open: bool) -> Room:
+    """Несохранённая комната для урока; slug считаем заранее, без второго save()."""
+    end = start + timedelta(minutes=duration_minutes or 0)
+    jitsi_room = f"cedar-lesson-{lesson_id}"
     domain_default = Room._meta.get_field("jitsi_domain").default
-    room = Room.objects.create(
+    return Room(
         type="LESSON",
-        lesson_id=lesson.id,
+        lesson_id=lesson_id,
         jitsi_room=jitsi_room,
         jitsi_env="SELF_HOSTED",
-        is_open=getattr(lesson, "is_open", False),
+        is_open=is_open,
+        public_slug=slugify(jitsi_room) if is_open else None,
         status="SCHEDULED",
         scheduled_start=start,
         scheduled_end=end,
         join_url=f"https://{domain_default}/{jitsi_room}",
         auto_manage=True,
     )
-    if not room.public_slug and room.is_open:
-        room.public_slug = slugify(room.jitsi_room)
-        room.save(update_fields=["public_slug"])
-    return room
+
+def provision_rooms(lessons) -> int:
+    """
+    Создаёт недостающие комнаты для уроков из queryset'а двумя запросами:
+    anti-join (уроки без комнаты) + bulk_create. Гонки с параллельным созданием
+    гасятся ignore_conflicts (lesson_id и public_slug уникальны).
+    Возвращает число комнат, отправленных на создание.
+    """
+    rows = (lessons
+            .filter(room__isnull=True)
+            .values_list("id", "start", "duration_minutes", "is_open"))
+    rooms = [_room_for_lesson(*row) for row in rows]
+    if rooms:
+        Room.objects.bulk_create(rooms, ignore_conflicts=True)
+        invalidate_open_lessons_feed()  # bulk_create не шлёт post_save
+        publish_rooms(Room.objects.filter(lesson_id__in=[r.lesson_id for r in rooms]))
+    return len(rooms)
 
 def _tables_ready() -> bool:
     try:
@@ -41,43 +62,63 @@ def _tables_ready() -> bool:
     except Exception:
         return False
 
+def open_started_rooms(now=None) -> int:
+    """SCHEDULED → OPEN для идущих уроков одним UPDATE."""
+    now = now or timezone.now()
+    ids = list(Room.objects
+               .filter(type="LESSON", status="SCHEDULED",
+                       scheduled_start__lte=now, scheduled_end__gt=now)
+               .values_list("id", flat=True))
+    if not ids:
+        return 0
+    opened = Room.objects.filter(id__in=ids, status="SCHEDULED").update(status="OPEN", started_at=now)
+    if opened:
+        invalidate_open_lessons_feed()
+        publish_rooms(Room.objects.filter(id__in=ids))
+    return opened
+
+def close_stale_rooms(now=None) -> int:
+    """
+    Закрывает «зависшие» комнаты одним UPDATE. queryset.update() не шлёт post_save,
+    поэтому факт проведения урока фиксируем тем же пакетным сервисом, что и сигнал.
+    """
+    now = now or timezone.now()
+    stale = (Room.objects
+             .filter(type="LESSON", scheduled_end__lte=now - CLOSE_AFTER)
+             .exclude(status="CLOSED"))
+    rows = list(stale.values_list("id", "lesson_id", "ended_at"))
+    if not rows:
+        return 0
+    room_ids = [room_id for room_id, _, _ in rows]
+    lesson_ids = [lesson_id for _, lesson_id, ended_at in rows if ended_at is None]
+    closed = (Room.objects.filter(id__in=room_ids).exclude(status="CLOSED")
+              .update(status="CLOSED", ended_at=Coalesce("ended_at", Value(now))))
+    mark_lessons_conducted(lesson_ids, now)
+    if closed:
+        invalidate_open_lessons_feed()
+        publish_rooms(Room.objects.filter(id__in=room_ids))
+    return closed
+
 def maintain_rooms() -> tuple[int, int]:
     """
     Создать комнаты за 15 минут до начала урока и закрыть через 10 минут после конца.
+    Каждый шаг — set-операция, число запросов не зависит от числа уроков.
     Возвращает (created_count, closed_count).
     """
     if not _tables_ready():
         return 0, 0
     try:
         now = timezone.now()
-        created = 0
-        closed = 0
 
         # 1) создание комнат
-        soon = now + timedelta(minutes=15)
-        lessons = RealLesson.objects.filter(start__lte=soon, start__gte=now - timedelta(hours=6)).order_by("start")
-        for lesson in lessons:
-            existed = Room.objects.filter(type="LESSON", lesson_id=lesson.id).exists()
-            room = _ensure_room_for_lesson(lesson)
-            if not existed:
-                created += 1
-            # опционально переводим в OPEN в момент старта
-            if room.status == "SCHEDULED" and lesson.start <= now <= (lesson.start + timedelta(minutes=1)):
-                room.status = "OPEN"
-                room.started_at = now
-                room.save(update_fields=["status", "started_at"])
+        lessons = RealLesson.objects.filter(start__lte=now + OPEN_BEFORE, start__gte=now - LOOKBACK)
+        created = provision_rooms(lessons)
+
+        # 2) перевод в OPEN в момент старта
+        open_started_rooms(now)
 
-        # 2) закрытие «зависших»
-        to_close = Room.objects.filter(
-            type="LESSON",
-            scheduled_end__lte=now - timedelta(minutes=10),
-        ).exclude(status="CLOSED")
-        for room in to_close:
-            room.status = "CLOSED"
-            if not room.ended_at:
-                room.ended_at = now
-            room.save(update_fields=["status", "ended_at"])
-            closed += 1
+        # 3) закрытие «зависших»
+        closed = close_stale_rooms(now)
 
         return created, closed
 
@@ -92,12 +133,8 @@ def precreate_rooms_for_open_lessons(hours_ahead: int = 48) -> int:
     try:
         now = timezone.now()
         until = now + timedelta(hours=hours_ahead)
-        cnt = 0
-        qs = RealLesson.objects.filter(start__gte=now, start__lte=until, is_open=True)
-        for lesson in qs:
-            if not Room.objects.filter(type="LESSON", lesson_id=lesson.id).exists():
-                _ensure_room_for_lesson(lesson)
-                cnt += 1
-        return cnt
+        return provision_rooms(
+            RealLesson.objects.filter(start__gte=now, start__lte=until, is_open=True)
+        )
     except (ProgrammingError, OperationalError):
         return 0
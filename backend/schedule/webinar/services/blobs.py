@@ -0,0 +1,54 @@
+# backend/schedule/webinar/services/blobs.py
+"""
+Индекс контент-адресуемого хранилища записей: RecordingBlob (digest, size, refcount)
+и ссылки путей комнат на blob'ы. Учёт места и очистка — запросы к индексу, без обхода каталогов.
+"""
+import hashlib
+import os
+
+from django.db import transaction
+from django.db.models import F
+
+from schedule.webinar.models import RecordingBlob, RecordingBlobRef
+from schedule.webinar.storage import SavedFile
+
+READ_SIZE = 1024 * 1024
+
+
+def find_blob(src_path: str) -> RecordingBlob | None:
+    """
+    Уже сохранённый blob с тем же содержимым, что у файла src_path, — до копирования.
+    Сначала размер по индексу: файл, чьего размера нет среди blob'ов, заведомо новый
+    (ни одного чтения). Иначе sha256 считается чтением исходника, без записи на диск.
+    """
+    size = os.path.getsize(src_path)
+    if not RecordingBlob.objects.filter(size=size).exists():
+        return None
+    h = hashlib.sha256()
+    with open(src_path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_SIZE), b""):
+            h.update(chunk)
+    return RecordingBlob.objects.filter(digest=h.hexdigest(), size=size).first()
+
+
+def index_recording(room_id: int, path: str, saved: SavedFile) -> RecordingBlobRef | None:
+    """
+    Привязывает путь записи комнаты к blob'у. Повтор той же доставки — no-op;
+    новый контент по тому же пути переносит ссылку (refcount старого blob'а уменьшится).
+    Без blob_path (внешнее хранилище) индекс не ведём.
+    """
+    if not saved.blob_path:
+        return None
+    with transaction.atomic():
+        blob, _ = RecordingBlob.objects.get_or_create(
+            digest=saved.digest, defaults={"size": saved.size, "path": saved.blob_path},
+        )
+        ref = RecordingBlobRef.objects.select_for_update().filter(path=path).first()
+        if ref is not None and ref.blob_id == blob.id:
+            return ref
+        if ref is not None:
+            ref.delete()  # post_delete уменьшит refcount прежнего blob'а
+        ref = RecordingBlobRef.objects.create(room_id=room_id, blob=blob, path=path)
+        RecordingBlob.objects.filter(id=blob.id).update(refcount=F("refcount") + 1)
+    return ref
+
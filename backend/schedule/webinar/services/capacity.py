@@ -0,0 +1,120 @@
+# backend/schedule/webinar/services/capacity.py
+"""
+Прогноз одновременной нагрузки на видеосерверы по расписанию.
+
+Каждый урок — интервал [start, start + duration), выровненный по корзинам bucket_minutes.
+Вместо массива на все корзины диапазона копим только изменения на границах интервалов
+(+комната/+участники на входе, − на выходе) и проходим по ним один раз по возрастанию —
+sweep line. Работа O(n log n) по числу уроков, от длины диапазона не зависит; к БД — два запроса.
+Участники урока — ученики пары (класс, предмет) из StudentSubject плюс учитель.
+"""
+from __future__ import annotations
+
+import datetime as dt
+import math
+from collections import defaultdict
+
+from django.db.models import Count
+from django.utils import timezone
+
+from schedule.core.models import StudentSubject
+from schedule.real_schedule.models import RealLesson
+
+MAX_DAYS = 366
+MAX_LESSON = dt.timedelta(hours=12)  # урок, начавшийся до диапазона, может в него заходить
+
+
+def materialize_range(d_from: dt.date, d_to: dt.date) -> tuple[dt.datetime, dt.datetime]:
+    """[from 00:00, to+1 00:00) в текущей таймзоне: корзины прогноза — по местному времени."""
+    if not d_from or not d_to or d_from > d_to:
+        raise ValueError("INVALID_RANGE")
+    if (d_to - d_from).days + 1 > MAX_DAYS:
+        raise ValueError("RANGE_TOO_WIDE")
+    tz = timezone.get_current_timezone()
+    return (dt.datetime.combine(d_from, dt.time.min, tzinfo=tz),
+            dt.datetime.combine(d_to + dt.timedelta(days=1), dt.time.min, tzinfo=tz))
+
+
+def _class_sizes() -> dict[tuple[int, int], int]:
+    rows = (StudentSubject.objects.values("grade_id", "subject_id")
+            .annotate(n=Count("student_id", distinct=True))
+            .values_list("grade_id", "subject_id", "n"))
+    return {(g, s): n for g, s, n in rows}
+
+
+def capacity_forecast(from_dt: dt.datetime, to_dt: dt.datetime, bucket_minutes: int = 5,
+                      with_series: bool = True) -> dict:
+    """
+    Пик одновременных комнат и ожидаемых участников в [from_dt, to_dt) с шагом bucket_minutes.
+    series — только точки изменения (значение держится до следующей точки), daily — пики по дням.
+    """
+    step = bucket_minutes * 60
+    base = from_dt.timestamp()
+    n_buckets = math.ceil((to_dt.timestamp() - base) / step)
+    sizes = _class_sizes()
+
+    d_rooms: dict[int, int] = defaultdict(int)
+    d_people: dict[int, int] = defaultdict(int)
+    lessons = 0
+    rows = (RealLesson.objects
+            .filter(start__gte=from_dt - MAX_LESSON, start__lt=to_dt, duration_minutes__gt=0)
+            .values_list("start", "duration_minutes", "grade_id", "subject_id"))
+    for start, duration, grade_id, subject_id in rows:
+        s = start.timestamp() - base
+        e = s + duration * 60
+        if e <= 0:
+            continue
+        i = max(0, int(s // step))
+        j = min(n_buckets, math.ceil(e / step))
+        people = sizes.get((grade_id, subject_id), 0) + 1
+        d_rooms[i] += 1
+        d_rooms[j] -= 1
+        d_people[i] += people
+        d_people[j] -= people
+        lessons += 1
+
+    tz = timezone.get_current_timezone()
+    series: list[dict] = []
+    daily: dict[dt.date, dict] = {}
+    peak = {"rooms": 0, "rooms_at": None, "participants": 0, "participants_at": None}
+    rooms = people = 0
+
+    def _observe_day(day: dt.date, at: dt.datetime):
+        if not rooms:
+            return
+        entry = daily.setdefault(day, {"date": day, "peak_rooms": 0, "peak_rooms_at": None,
+                                       "peak_participants": 0})
+        if rooms > entry["peak_rooms"]:
+            entry["peak_rooms"], entry["peak_rooms_at"] = rooms, at
+        entry["peak_participants"] = max(entry["peak_participants"], people)
+
+    # полночи — тоже точки прохода: значение, перешедшее через 00:00, попадает в пики нового дня
+    midnights = set()
+    day = from_dt.date()
+    while (midnight := dt.datetime.combine(day, dt.time.min, tzinfo=tz)) < to_dt:
+        midnights.add(int((midnight.timestamp() - base) // step))
+        day += dt.timedelta(days=1)
+
+    for k in sorted(set(d_rooms) | midnights):
+        if k >= n_buckets:
+            break
+        rooms += d_rooms.get(k, 0)
+        people += d_people.get(k, 0)
+        at = dt.datetime.fromtimestamp(base + k * step, tz)
+        if with_series and (not series or (series[-1]["rooms"], series[-1]["participants"]) != (rooms, people)):
+            series.append({"start": at, "rooms": rooms, "participants": people})
+        if rooms > peak["rooms"]:
+            peak["rooms"], peak["rooms_at"] = rooms, at
+        if people > peak["participants"]:
+            peak["participants"], peak["participants_at"] = people, at
+        _observe_day(at.date(), at)
+
+    out = {
+        "from": from_dt, "to": to_dt, "bucket_minutes": bucket_minutes,
+        "lessons": lessons,
+        "peak": peak,
+        "daily": [daily[d] for d in sorted(daily)],
+    }
+    if with_series:
+        out["series"] = series
+    return out
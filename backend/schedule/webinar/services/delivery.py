@@ -0,0 +1,159 @@
+# backend/schedule/webinar/services/delivery.py
+"""
+Отдача записей уроков.
+
+Доступ проверяется один раз в Django, а байты отдаёт не Python:
+  • с RECORDING_ACCEL_REDIRECT_PREFIX — nginx по X-Accel-Redirect (Range, sendfile — на его стороне);
+  • без него — ответ 200/206 с файловым объектом, который gunicorn передаёт через
+    wsgi.file_wrapper → os.sendfile (смещение и длина диапазона берутся из дескриптора
+    и Content-Length).
+Для <video src> выдаются подписанные URL с истечением: браузер не шлёт Bearer-заголовок.
+"""
+from __future__ import annotations
+
+import mimetypes
+import os
+import re
+import time
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
+from django.urls import reverse
+from django.utils._os import safe_join
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from schedule.real_schedule.models import Room
+
+LOCAL_URL_PREFIX = "/media/recordings/"
+_SIGN_SALT = "cedar.webinar.recording-stream"
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+# -----------------------------------------------------
+# Подписанные URL
+# -----------------------------------------------------
+def _signature(room_id: int, exp: int) -> str:
+    return salted_hmac(_SIGN_SALT, f"{room_id}:{exp}", algorithm="sha256").hexdigest()
+
+def signed_stream_url(room_id: int, ttl: int | None = None, now: float | None = None) -> str:
+    ttl = ttl or getattr(settings, "RECORDING_URL_TTL_SECS", 6 * 3600)
+    exp = int((now or time.time()) + ttl)
+    query = urlencode({"exp": exp, "sig": _signature(room_id, exp)})
+    return f"{reverse('room-recording-stream', args=[room_id])}?{query}"
+
+def verify_stream_signature(room_id: int, exp: str | None, sig: str | None, now: float | None = None) -> bool:
+    if not (exp and sig and exp.isdigit()):
+        return False
+    if int(exp) < (now or time.time()):
+        return False
+    return constant_time_compare(sig, _signature(room_id, int(exp)))
+
+
+# -----------------------------------------------------
+# Файл записи
+# -----------------------------------------------------
+def local_relpath(room: Room) -> str | None:
+    """Путь записи относительно RECORDING_LOCAL_DIR или None, если файл не в локальном хранилище."""
+    url = room.recording_file_url or ""
+    if not url.startswith(LOCAL_URL_PREFIX):
+        return None
+    return url[len(LOCAL_URL_PREFIX):]
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Разбирает одиночный диапазон `bytes=a-b` / `bytes=a-` / `bytes=-n`.
+    None — отдать файл целиком; ValueError — диапазон невыполним (416).
+    Несколько диапазонов не поддерживаем — отдаём файл целиком (RFC 7233 это допускает).
+    """
+    if not header:
+        return None
+    m = _RANGE_RE.match(header.strip())
+    if not m:
+        return None
+    first, last = m.groups()
+    if not first and not last:
+        return None
+    if not first:  # суффикс: последние n байт
+        n = int(last)
+        if n == 0 or size == 0:
+            raise ValueError("unsatisfiable range")
+        return max(0, size - n), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+class _FileRange:
+    """
+    Файловый объект, ограниченный диапазоном [start, start+length).
+    Дескриптор спозиционирован на start, поэтому file_wrapper с sendfile
+    отправит ровно Content-Length байт; без sendfile read() не выйдет за диапазон.
+    """
+
+    def __init__(self, f, start: int, length: int):
+        self._f = f
+        self._left = length
+        f.seek(start)
+        self.name = f.name
+
+    def read(self, size: int = -1) -> bytes:
+        if self._left <= 0:
+            return b""
+        size = self._left if size < 0 else min(size, self._left)
+        data = self._f.read(size)
+        self._left -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self._f.fileno()
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def serve_recording(request, room: Room) -> HttpResponse:
+    rel = local_relpath(room)
+    if rel is None:
+        if room.recording_file_url:
+            return HttpResponseRedirect(room.recording_file_url)  # внешнее хранилище (SFTP/CDN)
+        return HttpResponse(status=404)
+
+    try:
+        path = safe_join(settings.RECORDING_LOCAL_DIR, rel)
+    except Exception:
+        return HttpResponse(status=404)
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    accel = getattr(settings, "RECORDING_ACCEL_REDIRECT_PREFIX", "")
+    if accel:
+        resp = HttpResponse(content_type=content_type)
+        resp["X-Accel-Redirect"] = accel.rstrip("/") + "/" + quote(rel)
+        resp["Cache-Control"] = "private"
+        return resp
+
+    try:
+        f = open(path, "rb")
+    except (FileNotFoundError, IsADirectoryError):
+        return HttpResponse(status=404)
+    size = os.fstat(f.fileno()).st_size
+
+    try:
+        rng = parse_range(request.headers.get("Range"), size)
+    except ValueError:
+        f.close()
+        resp = HttpResponse(status=416)
+        resp["Content-Range"] = f"bytes */{size}"
+        return resp
+
+    start, end = rng or (0, size - 1)
+    length = end - start + 1 if size else 0
+    resp = FileResponse(_FileRange(f, start, length), status=206 if rng else 200, content_type=content_type)
+    resp["Content-Length"] = str(length)
+    resp["Accept-Ranges"] = "bytes"
+    resp["Cache-Control"] = "private"
+    if rng:
+        resp["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return resp
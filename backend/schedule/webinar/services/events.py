@@ -0,0 +1,322 @@
+# backend/schedule/webinar/services/events.py
+"""
+Поток изменений для SSE (/api/rooms/events/) вместо опроса комнат и расписания из каждой вкладки.
+
+Запись: publish_*() добавляют строки ChangeEvent в той же транзакции, что и само изменение;
+на PostgreSQL там же выполняется pg_notify(CHANNEL) — сигнал доставляется после коммита.
+
+Чтение: в процессе ASGI на каждый event loop один EventHub. Он ждёт NOTIFY на отдельном
+соединении (LISTEN) или, на прочих БД, опрашивает таблицу раз в EVENTS_POLL_INTERVAL_SECS,
+вычитывает новые строки одним запросом и раздаёт их открытым SSE-соединениям. Число запросов
+к БД не зависит от числа подписчиков; каждое соединение фильтрует события по Audience
+пользователя в памяти.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from schedule.real_schedule.models import RealLesson, Room
+from schedule.real_schedule.services.visibility import Audience, audience_for
+from schedule.webinar.models import ChangeEvent
+
+logger = logging.getLogger("cedar.webinar.events")
+
+CHANNEL = "cedar_events"
+FETCH_LIMIT = 500               # строк за одно чтение хаба
+REPLAY_LIMIT = 1000             # догонка по Last-Event-ID; дальше — event: reset
+QUEUE_SIZE = 100                # пачек в очереди подписчика; переполнение — отключаем
+GAP_WAIT = timedelta(seconds=2)  # «дырка» в id — транзакция ещё не закоммичена (или откатилась)
+AUDIENCE_TTL = 300.0            # как часто пересчитывать Audience открытого соединения, с
+NOTIFY_TIMEOUT = 30.0           # страховочный опрос при LISTEN, с
+RETRY_MS = 3000                 # подсказка EventSource для переподключения
+
+_SIGN_SALT = "cedar.webinar.events"
+
+
+# -----------------------------------------------------
+# Запись событий
+# -----------------------------------------------------
+def _notify(using: str = "default") -> None:
+    conn = connections[using]
+    if conn.vendor != "postgresql":
+        return
+    # одинаковые NOTIFY в одной транзакции PostgreSQL схлопывает в один
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_notify(%s, '')", [CHANNEL])
+
+
+def _emit(rows: list[ChangeEvent]) -> int:
+    if rows:
+        ChangeEvent.objects.bulk_create(rows)
+        _notify()
+    return len(rows)
+
+
+def _room_event(room: Room, kind: str) -> ChangeEvent:
+    lesson = room.lesson if room.lesson_id else None
+    payload = {"room_id": room.id, "lesson_id": room.lesson_id}
+    if kind == ChangeEvent.Kind.RECORDING:
+        payload["recording_status"] = room.recording_status
+    else:
+        payload.update(status=room.compute_live_status(), is_open=room.is_open)
+    return ChangeEvent(
+        kind=kind, room_id=room.id, lesson_id=room.lesson_id,
+        teacher_id=lesson.teacher_id if lesson else None,
+        grade_id=lesson.grade_id if lesson else None,
+        subject_id=lesson.subject_id if lesson else None,
+        is_open=room.is_open or lesson is None,  # собрания видны всем
+        payload=payload,
+    )
+
+
+def publish_room(room: Room, kind: str = ChangeEvent.Kind.ROOM) -> int:
+    return _emit([_room_event(room, kind)])
+
+
+def publish_rooms(rooms, kind: str = ChangeEvent.Kind.ROOM) -> int:
+    """События по пачке комнат одним запросом — после UPDATE, которые не шлют post_save."""
+    return _emit([_room_event(r, kind) for r in rooms.select_related("lesson")])
+
+
+def publish_lesson(lesson: RealLesson, deleted: bool = False) -> int:
+    return _emit([ChangeEvent(
+        kind=ChangeEvent.Kind.LESSON, lesson_id=lesson.id,
+        teacher_id=lesson.teacher_id, grade_id=lesson.grade_id, subject_id=lesson.subject_id,
+        is_open=lesson.is_open,
+        payload={"lesson_id": lesson.id, "start": lesson.start.isoformat() if lesson.start else None,
+                 "duration_minutes": lesson.duration_minutes, "deleted": deleted},
+    )])
+
+
+def publish_schedule(payload: dict) -> int:
+    """Пакетная перегенерация уроков: одно событие всем — клиент перечитывает уроки периода."""
+    return _emit([ChangeEvent(kind=ChangeEvent.Kind.SCHEDULE, is_open=True, payload=payload)])
+
+
+def last_event_id() -> int:
+    return ChangeEvent.objects.order_by("-id").values_list("id", flat=True).first() or 0
+
+
+def events_after(last_id: int, limit: int = REPLAY_LIMIT) -> list[ChangeEvent]:
+    return list(ChangeEvent.objects.filter(id__gt=last_id).order_by("id")[:limit])
+
+
+def prune_events(now=None) -> int:
+    """Удаляет события старше EVENTS_RETENTION_HOURS (клиенту столько не догнать — он получит reset)."""
+    hours = getattr(settings, "EVENTS_RETENTION_HOURS", 24)
+    cutoff = (now or timezone.now()) - timedelta(hours=hours)
+    deleted, _ = ChangeEvent.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+# -----------------------------------------------------
+# Подписанная ссылка на поток (EventSource не умеет слать Authorization)
+# -----------------------------------------------------
+def _signature(user_id: int, exp: int) -> str:
+    return salted_hmac(_SIGN_SALT, f"{user_id}:{exp}", algorithm="sha256").hexdigest()
+
+
+def signed_events_url(user_id: int, ttl: int | None = None, now: float | None = None) -> str:
+    ttl = ttl or getattr(settings, "EVENTS_URL_TTL_SECS", 12 * 3600)
+    exp = int((now or time.time()) + ttl)
+    query = urlencode({"uid": user_id, "exp": exp, "sig": _signature(user_id, exp)})
+    return f"{reverse('room-events')}?{query}"
+
+
+def verify_events_signature(user_id: int, exp: str | None, sig: str | None, now: float | None = None) -> bool:
+    if not (exp and sig and exp.isdigit()):
+        return False
+    if int(exp) < (now or time.time()):
+        return False
+    return constant_time_compare(sig, _signature(user_id, int(exp)))
+
+
+# -----------------------------------------------------
+# Хаб процесса
+# -----------------------------------------------------
+def _poll_interval() -> float:
+    return float(getattr(settings, "EVENTS_POLL_INTERVAL_SECS", 1.0))
+
+
+class EventHub:
+    """Одно чтение журнала на event loop, раздача пачек событий очередям подписчиков."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.cursor: int | None = None
+        self._seen: set[int] = set()   # выданные id выше курсора (за «дыркой»)
+        self._subscribers: set[asyncio.Queue] = set()
+        self._task: asyncio.Task | None = None
+        self._listen = None            # psycopg.AsyncConnection с LISTEN
+
+    def subscribe(self) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = self.loop.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def fetch(self) -> list[ChangeEvent]:
+        """
+        Новые события после курсора. Курсор двигается только по непрерывному ряду id:
+        строка за «дыркой» уже выдаётся, но курсор ждёт GAP_WAIT — вдруг меньший id
+        закоммитят позже. Повторно выданные строки отсекает _seen.
+        """
+        rows = events_after(self.cursor, FETCH_LIMIT)
+        fresh = [r for r in rows if r.id not in self._seen]
+        now = timezone.now()
+        for r in rows:
+            if r.id != self.cursor + 1 and now - r.created_at < GAP_WAIT:
+                break
+            self.cursor = r.id
+        self._seen = {r.id for r in rows if r.id > self.cursor}
+        return fresh
+
+    def _broadcast(self, events: list[ChangeEvent]) -> None:
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(events)
+            except asyncio.QueueFull:
+                # медленный клиент: закрываем поток, он переподключится с Last-Event-ID
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def _wait(self) -> None:
+        if connections["default"].vendor != "postgresql":
+            await asyncio.sleep(_poll_interval())
+            return
+        try:
+            if self._listen is None:
+                import psycopg
+                params = connections["default"].get_connection_params()
+                params.pop("cursor_factory", None)
+                params.pop("context", None)
+                self._listen = await psycopg.AsyncConnection.connect(**params, autocommit=True)
+                await self._listen.execute(f"LISTEN {CHANNEL}")
+            timeout = GAP_WAIT.total_seconds() if self._seen else NOTIFY_TIMEOUT
+            async for _ in self._listen.notifies(timeout=timeout, stop_after=1):
+                pass
+        except Exception:
+            logger.warning("events LISTEN failed, falling back to polling", exc_info=True)
+            await self._close_listen()
+            await asyncio.sleep(_poll_interval())
+
+    async def _close_listen(self) -> None:
+        if self._listen is not None:
+            try:
+                await self._listen.close()
+            except Exception:
+                pass
+            self._listen = None
+
+    async def _run(self) -> None:
+        try:
+            self.cursor = await sync_to_async(last_event_id)()
+            while self._subscribers:
+                await self._wait()
+                events = await sync_to_async(self.fetch)()
+                if events:
+                    self._broadcast(events)
+        finally:
+            # без подписчиков журнал не читаем; следующий subscribe начнёт с актуального id
+            self.cursor, self._seen = None, set()
+            await self._close_listen()
+
+
+_hubs: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, EventHub]" = weakref.WeakKeyDictionary()
+
+
+def get_hub() -> EventHub:
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        hub = _hubs[loop] = EventHub(loop)
+    return hub
+
+
+# -----------------------------------------------------
+# SSE-поток пользователя
+# -----------------------------------------------------
+def format_sse(event: ChangeEvent) -> str:
+    data = json.dumps({"id": event.id, "kind": event.kind, "at": event.created_at, **event.payload},
+                      cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f"id: {event.id}\nevent: {event.kind}\ndata: {data}\n\n"
+
+
+def _visible(event: ChangeEvent, audience: Audience) -> bool:
+    return event.is_open or audience.sees(event.teacher_id, event.grade_id, event.subject_id)
+
+
+async def stream_events(user, audience: Audience, last_id: int | None = None):
+    """
+    Асинхронный генератор SSE-кадров. Сначала догоняет журнал с last_id (Last-Event-ID),
+    затем отдаёт события хаба; в тишине шлёт комментарий-heartbeat.
+    """
+    heartbeat = float(getattr(settings, "EVENTS_HEARTBEAT_SECS", 15))
+    loop = asyncio.get_running_loop()
+    hub = get_hub()
+    queue = hub.subscribe()  # до догонки: события, пришедшие во время неё, не потеряются
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        if last_id is None:
+            last_id = await sync_to_async(last_event_id)()
+        else:
+            backlog = await sync_to_async(events_after)(last_id)
+            if len(backlog) == REPLAY_LIMIT:
+                # клиент отстал слишком сильно: пусть перечитает состояние целиком
+                last_id = await sync_to_async(last_event_id)()
+                yield f"id: {last_id}\nevent: reset\ndata: {{}}\n\n"
+            else:
+                for event in backlog:
+                    last_id = event.id
+                    if _visible(event, audience):
+                        yield format_sse(event)
+
+        start_id = last_id
+        refresh_at = loop.time() + AUDIENCE_TTL
+        quiet_since = loop.time()
+        while True:
+            try:
+                batch = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                batch = []
+            if batch is None:
+                return
+            if loop.time() >= refresh_at:
+                audience = await sync_to_async(audience_for)(user) or audience
+                refresh_at = loop.time() + AUDIENCE_TTL
+            sent = False
+            for event in batch:
+                # хаб не выдаёт id дважды, но может выдать меньший id позже («дырка»),
+                # поэтому отсекаем только то, что было до начала потока
+                if event.id <= start_id:
+                    continue
+                if _visible(event, audience):
+                    yield format_sse(event)
+                    sent = True
+            if sent:
+                quiet_since = loop.time()
+            elif loop.time() - quiet_since >= heartbeat:
+                yield ": ping\n\n"
+                quiet_since = loop.time()
+    finally:
+        hub.unsubscribe(queue)
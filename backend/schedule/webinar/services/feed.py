@@ -0,0 +1,117 @@
+# backend/schedule/webinar/services/feed.py
+"""
+Фид открытых уроков (/api/rooms/open-lessons/).
+
+Строится только чтением: уроки is_open + их комнаты одним join'ом, плюс открытые комнаты
+без открытого урока. Комнаты здесь не создаются — это делает maintenance (services.auto).
+Готовый ответ кэшируется по «корзине» окна на FEED_TTL секунд; версия кэша
+поднимается при изменении открытых уроков/комнат (signals + set-операции в auto).
+Ширина окна (since_hours/hours) ограничена FEED_MAX_HOURS и округляется вверх до шага
+(window_minutes), чтобы произвольные значения не плодили ключи кэша и сборки фида.
+"""
+import math
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.cache import cache
+
+from schedule.real_schedule.models import RealLesson, Room, room_window_status
+from schedule.real_schedule.serializers import RealLessonSerializer
+
+FEED_BUCKET_SECONDS = 60
+FEED_TTL = 60
+FEED_MAX_HOURS = 7 * 24
+_VERSION_KEY = "webinar:open-feed:version"
+
+
+def _feed_version() -> int:
+    return cache.get_or_set(_VERSION_KEY, 1, timeout=None)
+
+
+def invalidate_open_lessons_feed() -> None:
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, 2, timeout=None)
+
+
+def window_minutes(hours: float) -> int:
+    """
+    Часы окна → минуты с шагом: до часа — 10 минут, до суток — час, дальше — сутки;
+    до шага округление вверх, не больше FEED_MAX_HOURS. ValueError — не конечное число.
+    """
+    if not math.isfinite(hours):
+        raise ValueError(f"window is not finite: {hours}")
+    minutes = round(min(max(hours, 0.0), FEED_MAX_HOURS) * 60)  # 0.1667 ч — ровно 10 минут
+    step = 10 if minutes <= 60 else 60 if minutes <= 24 * 60 else 24 * 60
+    return min(-(-minutes // step) * step, FEED_MAX_HOURS * 60)
+
+
+def _bucket_start(now: datetime) -> datetime:
+    ts = int(now.timestamp()) // FEED_BUCKET_SECONDS * FEED_BUCKET_SECONDS
+    return datetime.fromtimestamp(ts, tz=dt_timezone.utc)
+
+
+def _item(room: Room | None, lesson: RealLesson | None, lesson_data) -> dict:
+    if room is not None:
+        start, end, status = room.scheduled_start, room.scheduled_end, room.compute_live_status()
+    else:
+        # комнату ещё не создал maintenance — отдаём окно урока
+        start = lesson.start
+        end = lesson.start + timedelta(minutes=lesson.duration_minutes or 0)
+        status = room_window_status(start, end)
+    return {
+        "room_id": room.id if room else None,
+        "public_slug": room.public_slug if room else None,
+        "status": status,
+        "scheduled_start": start,
+        "scheduled_end": end,
+        "lesson": lesson_data,
+    }
+
+
+def build_open_lessons_feed(since: datetime, until: datetime) -> list[dict]:
+    """Два SELECT'а с join'ами, без записи в БД."""
+    lessons = list(
+        RealLesson.objects
+        .select_related("subject", "grade", "teacher", "lesson_type", "room")
+        .filter(is_open=True, start__gte=since, start__lte=until)
+        .order_by("start")
+    )
+    lessons_data = RealLessonSerializer(lessons, many=True).data
+
+    items = []
+    seen_lesson_ids = set()
+    for lesson, data in zip(lessons, lessons_data):
+        seen_lesson_ids.add(lesson.id)
+        items.append(_item(getattr(lesson, "room", None), lesson, data))
+
+    # Фолбэк: открытые комнаты в том же окне (могут быть без is_open у урока)
+    rooms = (Room.objects
+             .select_related("lesson", "lesson__subject", "lesson__grade",
+                             "lesson__teacher", "lesson__lesson_type")
+             .filter(type="LESSON", is_open=True,
+                     scheduled_start__lte=until, scheduled_end__gte=since)
+             .exclude(lesson_id__in=seen_lesson_ids)
+             .order_by("scheduled_start"))
+    for r in rooms:
+        lesson = r.lesson
+        items.append(_item(r, lesson, RealLessonSerializer(lesson).data if lesson else None))
+    return items
+
+
+def get_open_lessons_feed(now: datetime, since_delta: timedelta, until_delta: timedelta,
+                          cache_tag: str) -> list[dict]:
+    """
+    Кэш по (версия, корзина времени, параметры окна). Окно считается от начала корзины,
+    поэтому все запросы одной корзины видят одинаковый результат.
+    """
+    bucket = _bucket_start(now)
+    key = f"webinar:open-feed:{_feed_version()}:{int(bucket.timestamp())}:{cache_tag}"
+    items = cache.get(key)
+    if items is None:
+        items = build_open_lessons_feed(
+            bucket - since_delta,
+            bucket + timedelta(seconds=FEED_BUCKET_SECONDS) + until_delta,
+        )
+        cache.set(key, items, timeout=FEED_TTL)
+    return items
@@ -3,52 +3,125 @@ from __future__ import annotations
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
 from zoneinfo import ZoneInfo
-import json, uuid
+import hashlib, json, logging, uuid
 
 import jwt  # PyJWT
 from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
 from django.utils import timezone
 
 from schedule.real_schedule.models import Room, RealLesson
 from schedule.core.models import StudentSubject
+from schedule.core.services.shared_cache import is_process_local
 from users.models import ParentChild  # важен для родителей
 
+logger = logging.getLogger("cedar.webinar.join")
+
 def _now_utc() -> datetime:
     return timezone.now().astimezone(ZoneInfo("UTC"))
 
-def _lesson_has_student(lesson: RealLesson, user_id: int) -> bool:
-    return StudentSubject.objects.filter(
-        grade_id=lesson.grade_id,
-        subject_id=lesson.subject_id,
-        student_id=user_id,
-    ).exists()
-
-def _lesson_has_parent(lesson: RealLesson, user_id: int) -> bool:
-    # родитель, у которого есть хотя бы один ребёнок-ученик на этом уроке
-    child_ids = set(ParentChild.objects.filter(parent_id=user_id, is_active=True)
-                    .values_list("child_id", flat=True))
-    if not child_ids:
-        return False
-    return StudentSubject.objects.filter(
-        grade_id=lesson.grade_id,
-        subject_id=lesson.subject_id,
-        student_id__in=list(child_ids),
-    ).exists()
-
-def _is_co_teacher(lesson: RealLesson, user_id: int) -> bool:
-    # если у модели есть m2m co_teachers — учитываем
-    co = getattr(lesson, "co_teachers", None)
-    if not co:
-        return False
+STAFF_OBSERVER_ROLES = {"DIRECTOR", "HEAD_TEACHER", "METHODIST", "AUDITOR"}
+
+# -----------------------------------------------------
+# Карта ролей комнаты: user_id -> (base_role, allowed_for_closed)
+# Строится пачкой для многих комнат (maintenance за OPEN_BEFORE до старта) или
+# лениво при первом join; остальные join'ы урока определяют роль без запросов к БД.
+# Кэшируется только в общем кэше: сброс по сигналам в LocMem дошёл бы до одного воркера,
+# и исключённый из класса ученик входил бы через остальные. В LocMem — роли на каждый запрос.
+# -----------------------------------------------------
+_ROLES_VERSION_KEY = "webinar:join-roles:version"
+
+def _roles_version() -> int:
+    return cache.get_or_set(_ROLES_VERSION_KEY, 1, timeout=None)
+
+def _roles_key(lesson_id: int, version: int) -> str:
+    # ключ по уроку: сигнал RealLesson сбрасывает карту без запроса за комнатой
+    return f"webinar:join-roles:{version}:{lesson_id}"
+
+def invalidate_role_maps() -> None:
+    """Составы классов/родители изменились — все карты ролей устарели."""
     try:
-        return co.filter(id=user_id).exists()
-    except Exception:
-        try:
-            return any(getattr(t, "id", None) == user_id for t in co.all())
-        except Exception:
-            return False
+        cache.incr(_ROLES_VERSION_KEY)
+    except ValueError:
+        cache.set(_ROLES_VERSION_KEY, 2, timeout=None)
 
-STAFF_OBSERVER_ROLES = {"DIRECTOR", "HEAD_TEACHER", "METHODIST", "AUDITOR"}
+def invalidate_lesson_roles(lesson_id: int) -> None:
+    cache.delete(_roles_key(lesson_id, _roles_version()))
+
+def _co_teacher_ids(lessons: list[RealLesson]) -> dict[int, set[int]]:
+    # если у модели появится m2m co_teachers — учитываем одним запросом
+    field = next((f for f in RealLesson._meta.get_fields() if f.name == "co_teachers"), None)
+    if field is None or not lessons:
+        return {}
+    through = field.remote_field.through
+    src = field.m2m_field_name() + "_id"
+    dst = field.m2m_reverse_field_name() + "_id"
+    out: dict[int, set[int]] = {}
+    for lid, uid in through.objects.filter(**{f"{src}__in": [l.id for l in lessons]}).values_list(src, dst):
+        out.setdefault(lid, set()).add(uid)
+    return out
+
+def build_role_maps(rooms) -> dict[int, dict[int, tuple[str, bool]]]:
+    """
+    Карты ролей для уроков-комнат: учитель/со-преподаватели → moderator,
+    ученики предмета/класса → participant, их родители → observer (все — «свои»).
+    Два запроса (плюс один при наличии co_teachers) на любое число комнат.
+    """
+    lessons = {r.id: r.lesson for r in rooms if r.type == "LESSON" and r.lesson_id}
+    if not lessons:
+        return {}
+    pairs = {(l.grade_id, l.subject_id) for l in lessons.values()}
+    cond = Q()
+    for grade_id, subject_id in pairs:
+        cond |= Q(grade_id=grade_id, subject_id=subject_id)
+    students: dict[tuple, set[int]] = {}
+    for grade_id, subject_id, sid in StudentSubject.objects.filter(cond).values_list(
+            "grade_id", "subject_id", "student_id"):
+        students.setdefault((grade_id, subject_id), set()).add(sid)
+
+    all_students = set().union(*students.values()) if students else set()
+    parents_of: dict[int, set[int]] = {}
+    for parent_id, child_id in ParentChild.objects.filter(
+            child_id__in=all_students, is_active=True).values_list("parent_id", "child_id"):
+        parents_of.setdefault(child_id, set()).add(parent_id)
+    co = _co_teacher_ids(list(lessons.values()))
+
+    maps: dict[int, dict[int, tuple[str, bool]]] = {}
+    for room_id, lesson in lessons.items():
+        roles: dict[int, tuple[str, bool]] = {}
+        kids = students.get((lesson.grade_id, lesson.subject_id), set())
+        # от младшего приоритета к старшему: учитель перекрывает ученика, ученик — родителя
+        for kid in kids:
+            for parent_id in parents_of.get(kid, ()):
+                roles[parent_id] = ("observer", True)
+        for kid in kids:
+            roles[kid] = ("participant", True)
+        for tid in co.get(lesson.id, set()) | {lesson.teacher_id}:
+            roles[tid] = ("moderator", True)
+        maps[room_id] = roles
+    return maps
+
+def warm_role_maps(rooms) -> dict[int, dict[int, tuple[str, bool]]]:
+    """Кладёт карты ролей комнат в кэш заранее (перед стартом уроков)."""
+    rooms = list(rooms)
+    maps = build_role_maps(rooms)
+    if is_process_local():
+        return maps
+    version = _roles_version()
+    cache.set_many({_roles_key(r.lesson_id, version): maps[r.id] for r in rooms if r.id in maps},
+                   timeout=_join_cache_ttl())
+    return maps
+
+def _role_map(room: Room) -> dict[int, tuple[str, bool]]:
+    if is_process_local():
+        return build_role_maps([room]).get(room.id, {})
+    key = _roles_key(room.lesson_id, _roles_version())
+    roles = cache.get(key)
+    if roles is None:
+        roles = build_role_maps([room]).get(room.id, {})
+        cache.set(key, roles, timeout=_join_cache_ttl())
+    return roles
 
 def _role_for_user(room: Room, user) -> Tuple[str, str, bool]:
     """
@@ -64,19 +137,10 @@ def _role_for_user(room: Room, user) -> Tuple[str, str, bool]:
 
     # ===== УРОКИ =====
     if room.type == "LESSON" and room.lesson_id:
-        lesson: RealLesson = room.lesson
-
-        # 1) Учитель или со-преподаватель → moderator (допуск в закрытый)
-        if getattr(lesson, "teacher_id", None) == user.id or _is_co_teacher(lesson, user.id):
-            return "moderator", "moderator", True
-
-        # 2) Ученик этого предмета/класса → participant (допуск в закрытый)
-        if _lesson_has_student(lesson, user.id):
-            return "participant", "participant", True
-
-        # 3) Родитель такого ученика → observer (допуск в закрытый)
-        if _lesson_has_parent(lesson, user.id):
-            return "observer", "observer", True
+        # 1–3) учитель/со-преподаватель, ученик, родитель — из карты ролей (кэш)
+        hit = _role_map(room).get(user.id)
+        if hit:
+            return hit[0], hit[0], hit[1]
 
         # 4) Директор/Завуч/Методист/Аудитор → observer (допуск в закрытый)
         if user_role in STAFF_OBSERVER_ROLES or getattr(user, "is_superuser", False) or getattr(user, "is_staff", False):
@@ -93,6 +157,14 @@ def _role_for_user(room: Room, user) -> Tuple[str, str, bool]:
 
     return "observer", "observer", False
 
+def can_view_recording(room: Room, user) -> bool:
+    """Запись видят те же, кого пускают в комнату: в открытый урок — любой пользователь, в закрытый — «свои»."""
+    if not user or not getattr(user, "is_authenticated", False):
+        return False
+    if room.type == "LESSON" and room.is_open:
+        return True
+    return _role_for_user(room, user)[2]
+
 def _make_jwt(room: Room, user, display_name: str, internal_role: str) -> Optional[str]:
     if not getattr(settings, "JITSI_JWT_ENABLED", False):
         return None
@@ -125,33 +197,28 @@ def _make_jwt(room: Room, user, display_name: str, internal_role: str) -> Option
     }
     return jwt.encode(payload, secret, algorithm="HS256")
 
-def build_join_payload(room: Room, user=None, display_name: Optional[str]=None, enforce_closed_access: bool=True) -> dict:
-    """
-    Правило:
-      • закрытый урок: пускаем только тех, у кого allowed_for_closed=True; иначе 403
-      • открытый урок: пускаем всех; "своим" даём их base_role, "прочим" — observer
-      • анонимы к урокам — только через public join (этот приватный эндпоинт требует auth)
-    """
-    base_role, label, allowed_for_closed = _role_for_user(room, user)
+JOIN_TOKEN_MARGIN = 15 * 60
+
+def _join_cache_ttl() -> int:
+    """Кэшируем payload почти до истечения JWT: остаётся запас на вход в комнату."""
+    ttl = getattr(settings, "JITSI_JWT_TTL_MIN", 120) * 60
+    return max(60, ttl - JOIN_TOKEN_MARGIN)
 
-    if room.type == "LESSON":
-        if not room.is_open:
-            if enforce_closed_access and not allowed_for_closed:
-                return {"error": "forbidden", "reason": "not allowed for this lesson"}
-            internal_role = base_role
-        else:
-            # открытый: своим — как обычно; прочим — observer
-            internal_role = base_role if allowed_for_closed else "observer"
-    else:
-        # MEETING и пр. — как рассчиталось
-        internal_role = base_role
-
-    if not display_name:
-        if user and getattr(user, "is_authenticated", False):
-            display_name = getattr(user, "username", None) or f"User-{user.id}"
-        else:
-            display_name = "Гость"
+def _payload_key(room: Room, user_id: int, internal_role: str, display_name: str) -> str:
+    raw = f"{room.jitsi_domain}/{room.jitsi_room}|{user_id}|{internal_role}|{display_name}"
+    return f"webinar:join-payload:{room.id}:{hashlib.sha1(raw.encode()).hexdigest()}"
 
+def _default_display_name(user) -> str:
+    if user and getattr(user, "is_authenticated", False):
+        return getattr(user, "username", None) or f"User-{user.id}"
+    return "Гость"
+
+def _internal_role(room: Room, base_role: str, allowed_for_closed: bool) -> str:
+    if room.type == "LESSON" and room.is_open and not allowed_for_closed:
+        return "observer"  # открытый: своим — как обычно; прочим — observer
+    return base_role
+
+def _issue_payload(room: Room, user, display_name: str, internal_role: str) -> dict:
     token = _make_jwt(room, user, display_name, internal_role)
 
     base = f"https://{room.jitsi_domain}/{room.jitsi_room}"
@@ -167,3 +234,63 @@ def build_join_payload(room: Room, user=None, display_name: Optional[str]=None,
         join_url = f"{join_url}{ui_tail}"
 
     return {"join_url": join_url, "you_are": internal_role}
+
+def build_join_payload(room: Room, user=None, display_name: Optional[str]=None, enforce_closed_access: bool=True) -> dict:
+    """
+    Правило:
+      • закрытый урок: пускаем только тех, у кого allowed_for_closed=True; иначе 403
+      • открытый урок: пускаем всех; "своим" даём их base_role, "прочим" — observer
+      • анонимы к урокам — только через public join (этот приватный эндпоинт требует auth)
+    Payload авторизованного пользователя кэшируется по (комната, пользователь, роль, имя)
+    почти до истечения JWT — повторные нажатия «Войти» не подписывают токен заново
+    (только в общем кэше, как и карты ролей).
+    """
+    base_role, label, allowed_for_closed = _role_for_user(room, user)
+
+    if room.type == "LESSON" and not room.is_open:
+        if enforce_closed_access and not allowed_for_closed:
+            return {"error": "forbidden", "reason": "not allowed for this lesson"}
+    internal_role = _internal_role(room, base_role, allowed_for_closed)
+    display_name = display_name or _default_display_name(user)
+
+    if not (user and getattr(user, "is_authenticated", False)) or is_process_local():
+        # у гостя в JWT случайный id — не кэшируем
+        return _issue_payload(room, user, display_name, internal_role)
+
+    key = _payload_key(room, user.id, internal_role, display_name)
+    payload = cache.get(key)
+    if payload is None:
+        payload = _issue_payload(room, user, display_name, internal_role)
+        cache.set(key, payload, timeout=_join_cache_ttl())
+    return payload
+
+def warm_join_payloads(rooms) -> int:
+    """
+    Перед стартом уроков: карты ролей + заранее выданные payload'ы для всех «своих»
+    (учитель, ученики, родители). Пользователи читаются одним запросом.
+    Возвращает число выданных payload'ов.
+    Прогрев делает процесс webinar_scheduler: при кэше в памяти процесса (LocMemCache)
+    веб-воркеры его не увидят, поэтому прогрев пропускается с предупреждением.
+    """
+    from users.models import User
+
+    if is_process_local():
+        logger.warning("join payload warm-up skipped: cache backend is process-local; "
+                       "set CACHE_BACKEND/CACHE_LOCATION to a shared cache (Redis)")
+        return 0
+    rooms = [r for r in rooms if r.type == "LESSON" and r.lesson_id]
+    maps = warm_role_maps(rooms)
+
+    user_ids = set().union(*maps.values()) if maps else set()
+    users = User.objects.in_bulk(list(user_ids))
+    payloads = {}
+    for room in rooms:
+        for uid, (base_role, allowed) in maps.get(room.id, {}).items():
+            user = users.get(uid)
+            if user is None or not user.is_active:
+                continue
+            role = _internal_role(room, base_role, allowed)
+            name = _default_display_name(user)
+            payloads[_payload_key(room, uid, role, name)] = _issue_payload(room, user, name, role)
+    cache.set_many(payloads, timeout=_join_cache_ttl())
+    return len(payloads)
@@ -1,12 +1,28 @@
+import hashlib
+import logging
 import os
-import tempfile
+import re
 import requests
-from datetime import timezone
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from datetime import timedelta, timezone
+from django.conf import settings
 from django.db import transaction
+from django.db.models import F, Q
 from django.utils.timezone import now
 
 from schedule.real_schedule.models import Room  # путь к вашей модели
-from schedule.webinar.storage import get_storage
+from schedule.webinar.models import ChangeEvent, RecordingDelivery, RecordingIngest
+from schedule.webinar.services.blobs import find_blob, index_recording
+from schedule.webinar.services.events import publish_rooms
+from schedule.webinar.storage import LocalRecordingStorage, SavedFile, get_storage
+
+logger = logging.getLogger("cedar.webinar.recordings")
+
+CHUNK_SIZE = 8 * 1024 * 1024       # гранулярность контрольных сумм и точек докачки
+READ_SIZE = 1024 * 1024
+LEASE = timedelta(minutes=30)      # сколько воркер «держит» задание
+RETRY_BASE = timedelta(seconds=30) # 30s, 60s, 120s, ...
+HTTP_TIMEOUT = (10, 60)            # connect, read — на каждый блок, а не на весь файл
 
 def _dst_path_for_room(room: Room, ext: str = "mp4") -> str:
     # lessons/456/2025-09-08T08-00-00Z.mp4
@@ -14,38 +30,257 @@ def _dst_path_for_room(room: Room, ext: str = "mp4") -> str:
     base = f"lessons/{room.lesson_id or room.id}/{start}.{ext}"
     return base
 
-@transaction.atomic
-def recording_uploaded_from_jaas(room_id: int, preauth_link: str, file_ext: str = "mp4") -> Room:
-    room = Room.objects.select_for_update().get(id=room_id)
-    storage = get_storage()
+def _ingest_dir() -> str:
+    return getattr(settings, "RECORDING_INGEST_DIR", "/tmp/cedar-ingest")
+
+# -----------------------------------------------------
+# Очередь
+# -----------------------------------------------------
+def enqueue_recording(room_id: int, source: str, location: str, file_ext: str | None = None,
+                      reuse: bool = True) -> RecordingIngest:
+    """
+    Ставит запись в очередь: пара коротких запросов, без сети и файлов.
+    Повторная доставка того же файла (вебхук/finalize пришёл ещё раз) — no-op:
+    возвращается уже существующее задание. reuse=False — дубли уже отсеяны
+    по ключу доставки (accept_delivery), задание создаётся всегда.
+    """
+    existing = reuse and (RecordingIngest.objects
+                          .filter(room_id=room_id, source=source, location=location)
+                          .exclude(status=RecordingIngest.Status.FAILED)
+                          .order_by("-id").first())
+    if existing:
+        return existing
+    if not Room.objects.filter(id=room_id).update(recording_status="UPLOADING"):
+        raise Room.DoesNotExist(f"Room id={room_id} not found")
+    ext = file_ext or os.path.splitext(location)[1].lstrip(".") or "mp4"
+    return RecordingIngest.objects.create(
+        room_id=room_id, source=source, location=location, file_ext=ext,
+    )
+
+# подписи и сроки в ссылках S3/GCS/Azure: при повторе вебхука провайдер может выдать новые
+_SIGNATURE_PARAMS = {"sig", "signature", "se", "st", "sp", "sv", "expires", "token", "policy", "key-pair-id"}
+
+def _unsigned_link(link: str) -> str:
+    parts = urlsplit(link)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in _SIGNATURE_PARAMS and not k.lower().startswith(("x-amz-", "x-goog-"))]
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(sorted(query)), ""))
+
+def delivery_key(room_id: int, source: str, location: str) -> str:
+    """
+    Ключ идемпотентности доставки: JaaS — ссылка без параметров подписи,
+    Jibri — путь + размер + mtime файла (тот же путь после перезаписи — новая доставка).
+    """
+    if source == RecordingIngest.Source.JAAS:
+        ident = _unsigned_link(location)
+    else:
+        try:
+            st = os.stat(location)
+            ident = f"{location}:{st.st_size}:{st.st_mtime_ns}"
+        except OSError:
+            ident = location
+    return hashlib.sha256(f"{room_id}:{source}:{ident}".encode()).hexdigest()
+
+def accept_delivery(room_id: int, source: str, location: str,
+                    file_ext: str | None = None) -> tuple[RecordingIngest, bool]:
+    """
+    Принимает вебхук записи: (задание, повтор ли это).
+    Повтор доставки возвращает уже существующее задание — в работе или готовое с result_url;
+    новое ставится, только если прошлое упало (FAILED). Параллельные дубли упираются
+    в уникальный ключ RecordingDelivery и получают одно и то же задание.
+    """
+    key = delivery_key(room_id, source, location)
+    with transaction.atomic():
+        delivery, created = (RecordingDelivery.objects.select_for_update()
+                             .select_related("ingest")
+                             .get_or_create(key=key, defaults={"source": source, "room_id": room_id}))
+        job = delivery.ingest
+        duplicate = not created and job is not None and job.status != RecordingIngest.Status.FAILED
+        if not duplicate:
+            job = enqueue_recording(room_id, source, location, file_ext=file_ext, reuse=False)
+        if created:
+            delivery.ingest = job
+            delivery.save(update_fields=["ingest"])
+        else:
+            RecordingDelivery.objects.filter(id=delivery.id).update(
+                ingest=job, hits=F("hits") + 1, last_seen_at=now())
+    if duplicate:
+        logger.info("recording delivery repeated: room=%s ingest=%s status=%s", room_id, job.id, job.status)
+    return job, duplicate
+
+def claim_next_job() -> RecordingIngest | None:
+    """Берёт задание в аренду. На PostgreSQL параллельные воркеры не мешают друг другу (SKIP LOCKED)."""
+    ts = now()
+    with transaction.atomic():
+        job = (RecordingIngest.objects
+               .select_for_update(skip_locked=True)
+               .select_related("room")
+               .filter(Q(status=RecordingIngest.Status.QUEUED, next_attempt_at__lte=ts) |
+                       Q(status=RecordingIngest.Status.RUNNING, locked_until__lt=ts))
+               .order_by("next_attempt_at", "id")
+               .first())
+        if job is None:
+            return None
+        job.status = RecordingIngest.Status.RUNNING
+        job.locked_until = ts + LEASE
+        job.attempts += 1
+        job.save(update_fields=["status", "locked_until", "attempts", "updated_at"])
+    return job
+
+# -----------------------------------------------------
+# Скачивание с докачкой
+# -----------------------------------------------------
+def _verified_offset(part_path: str, checksums: list[str], total: int | None = None) -> tuple[int, list[str]]:
+    """
+    Сверяет уже скачанный .part с сохранёнными sha256 чанков и обрезает его
+    до последнего подтверждённого чанка. Возвращает (offset, подтверждённые суммы).
+    Неполный хвостовой чанк засчитывается, только если файл скачан целиком (total):
+    иначе докачка начнётся с полного чанка и не собьёт сетку CHUNK_SIZE.
+    """
+    if not os.path.exists(part_path):
+        return 0, []
+    offset, good = 0, []
+    with open(part_path, "r+b") as f:
+        for expected in checksums:
+            data = f.read(CHUNK_SIZE)
+            if not data or hashlib.sha256(data).hexdigest() != expected:
+                break
+            if len(data) < CHUNK_SIZE and offset + len(data) != total:
+                break
+            good.append(expected)
+            offset += len(data)
+        f.truncate(offset)
+    return offset, good
+
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
 
-    with requests.get(preauth_link, stream=True, timeout=300) as r:
+def _total_from_response(r, offset: int) -> int | None:
+    m = _CONTENT_RANGE_RE.match(r.headers.get("Content-Range", ""))
+    if m and m.group(3) != "*":
+        return int(m.group(3))
+    length = r.headers.get("Content-Length")
+    return offset + int(length) if length and length.isdigit() else None
+
+def _save_progress(job: RecordingIngest) -> None:
+    RecordingIngest.objects.filter(id=job.id).update(
+        part_path=job.part_path, bytes_done=job.bytes_done,
+        bytes_total=job.bytes_total, chunk_checksums=job.chunk_checksums,
+        locked_until=now() + LEASE,
+    )
+
+def _download(job: RecordingIngest) -> str:
+    os.makedirs(_ingest_dir(), exist_ok=True)
+    job.part_path = job.part_path or os.path.join(_ingest_dir(), f"{job.id}.part")
+    offset, checksums = _verified_offset(job.part_path, job.chunk_checksums or [], job.bytes_total)
+    job.bytes_done, job.chunk_checksums = offset, checksums
+    if job.bytes_total is not None and offset == job.bytes_total:
+        return job.part_path  # файл уже скачан целиком (упали на сохранении)
+
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with requests.get(job.location, headers=headers, stream=True, timeout=HTTP_TIMEOUT) as r:
         r.raise_for_status()
-        with tempfile.TemporaryFile() as tmp:
-            for chunk in r.iter_content(chunk_size=1024 * 1024):
-                if chunk:
-                    tmp.write(chunk)
-            tmp.seek(0)
-            dst_rel = _dst_path_for_room(room, ext=file_ext)
-            saved = storage.save_fileobj(tmp, dst_rel)
-
-    room.recording_status = "READY"
-    room.recording_file_url = saved.public_url
-    room.recording_ended_at = room.recording_ended_at or now()
-    room.save(update_fields=["recording_status", "recording_file_url", "recording_ended_at"])
-    return room
-
-@transaction.atomic
-def recording_uploaded_from_jibri(room_id: int, local_path: str, file_ext: str | None = None) -> Room:
-    room = Room.objects.select_for_update().get(id=room_id)
+        if offset and r.status_code != 206:
+            # сервер не поддерживает Range — начинаем заново
+            offset, checksums = 0, []
+        job.bytes_total = _total_from_response(r, offset)
+
+        hasher, in_chunk = hashlib.sha256(), 0
+        with open(job.part_path, "r+b" if offset else "wb") as out:
+            out.seek(offset)
+            out.truncate()
+            for block in r.iter_content(chunk_size=READ_SIZE):
+                while block:
+                    take = block[:CHUNK_SIZE - in_chunk]
+                    block = block[len(take):]
+                    out.write(take)
+                    hasher.update(take)
+                    in_chunk += len(take)
+                    offset += len(take)
+                    if in_chunk == CHUNK_SIZE:
+                        out.flush()
+                        checksums.append(hasher.hexdigest())
+                        hasher, in_chunk = hashlib.sha256(), 0
+                        job.bytes_done, job.chunk_checksums = offset, checksums
+                        _save_progress(job)
+            if in_chunk:
+                checksums.append(hasher.hexdigest())
+
+    job.bytes_done, job.chunk_checksums = offset, checksums
+    _save_progress(job)
+    if job.bytes_total is not None and offset != job.bytes_total:
+        raise IOError(f"incomplete download: {offset} of {job.bytes_total} bytes")
+    return job.part_path
+
+# -----------------------------------------------------
+# Обработка задания
+# -----------------------------------------------------
+def _finalize(job: RecordingIngest, dst_path: str, saved: SavedFile) -> None:
+    """Короткая транзакция: только обновление строк, вся тяжёлая работа уже сделана."""
+    public_url = saved.public_url
+    with transaction.atomic():
+        index_recording(job.room_id, dst_path, saved)
+        room = Room.objects.select_for_update().get(id=job.room_id)
+        room.recording_status = "READY"
+        room.recording_file_url = public_url
+        room.recording_ended_at = room.recording_ended_at or now()
+        room.save(update_fields=["recording_status", "recording_file_url", "recording_ended_at"])
+
+        job.status = RecordingIngest.Status.DONE
+        job.result_url = public_url
+        job.last_error = ""
+        job.locked_until = None
+        job.finished_at = now()
+        job.save(update_fields=["status", "result_url", "last_error", "locked_until", "finished_at", "updated_at"])
+
+def _fail(job: RecordingIngest, exc: Exception) -> None:
+    job.last_error = f"{type(exc).__name__}: {exc}"[:2000]
+    job.locked_until = None
+    if job.attempts >= job.max_attempts:
+        job.status = RecordingIngest.Status.FAILED
+        job.finished_at = now()
+        Room.objects.filter(id=job.room_id).update(recording_status="FAILED")
+        publish_rooms(Room.objects.filter(id=job.room_id), ChangeEvent.Kind.RECORDING)
+    else:
+        job.status = RecordingIngest.Status.QUEUED
+        job.next_attempt_at = now() + RETRY_BASE * (2 ** (job.attempts - 1))
+    job.save(update_fields=["status", "last_error", "locked_until", "next_attempt_at", "finished_at", "updated_at"])
+    logger.warning("recording ingest #%s failed (attempt %s/%s): %s",
+                   job.id, job.attempts, job.max_attempts, job.last_error)
+
+def _save(src_path: str, dst_path: str) -> SavedFile:
+    """Содержимое, уже лежащее blob'ом (LOCAL), только привязывается к пути комнаты — без копирования."""
     storage = get_storage()
+    if isinstance(storage, LocalRecordingStorage):
+        blob = find_blob(src_path)
+        saved = blob and storage.link_blob(blob.path, blob.digest, blob.size, dst_path)
+        if saved:
+            return saved
+    return storage.save_local_path(src_path, dst_path)
+
+def process_job(job: RecordingIngest) -> RecordingIngest:
+    try:
+        if job.source == RecordingIngest.Source.JAAS:
+            src_path = _download(job)
+        else:
+            src_path = job.location
+
+        dst_path = _dst_path_for_room(job.room, ext=job.file_ext)
+        _finalize(job, dst_path, _save(src_path, dst_path))
+    except Exception as e:
+        _fail(job, e)
+        return job
 
-    ext = file_ext or os.path.splitext(local_path)[1].lstrip(".") or "mp4"
-    dst_rel = _dst_path_for_room(room, ext=ext)
-    saved = storage.save_local_path(local_path, dst_rel)
+    if job.source == RecordingIngest.Source.JAAS and job.part_path and os.path.exists(job.part_path):
+        os.remove(job.part_path)
+    return job
 
-    room.recording_status = "READY"
-    room.recording_file_url = saved.public_url
-    room.recording_ended_at = room.recording_ended_at or now()
-    room.save(update_fields=["recording_status", "recording_file_url", "recording_ended_at"])
-    return room
+def run_pending(limit: int | None = None) -> int:
+    """Обрабатывает готовые к запуску задания; возвращает их число."""
+    done = 0
+    while limit is None or done < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        process_job(job)
+        done += 1
+    return done
@@ -0,0 +1,215 @@
+# backend/schedule/webinar/services/retention.py
+"""
+Хранение записей: учёт места и очистка по политике.
+Размеры берутся из индекса RecordingBlob/RecordingBlobRef (services/blobs.py), без обхода каталогов.
+
+Политика:
+  • RecordingRetention — срок хранения по типу урока (строка без типа — по умолчанию);
+  • RecordingQuota     — квота на учебный год: сверх неё удаляются самые старые записи;
+  • Room.recording_keep — отмеченные записи не удаляются никогда.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from schedule.core.models import AcademicYear
+from schedule.real_schedule.models import Room
+from schedule.webinar.models import RecordingBlob, RecordingBlobRef, RecordingQuota, RecordingRetention
+from schedule.webinar.storage import get_storage
+
+logger = logging.getLogger("cedar.webinar.retention")
+
+ORPHAN_GRACE = timedelta(hours=1)  # свежий blob без ссылок может быть в процессе индексации
+
+
+@dataclass
+class GCResult:
+    expired: list[int] = field(default_factory=list)   # id RecordingBlobRef
+    over_quota: list[int] = field(default_factory=list)
+    refs_deleted: int = 0
+    blobs_deleted: int = 0
+    bytes_freed: int = 0
+
+
+def _deletable():
+    return RecordingBlobRef.objects.filter(room__recording_keep=False)
+
+
+# -----------------------------------------------------
+# Отбор кандидатов
+# -----------------------------------------------------
+def expired_ref_ids(now: datetime | None = None) -> list[int]:
+    """Ссылки на записи старше срока хранения своего типа урока."""
+    now = now or timezone.now()
+    policies = list(RecordingRetention.objects.values_list("lesson_type_id", "retention_days"))
+    typed = {lt: days for lt, days in policies if lt is not None}
+    default_days = next((days for lt, days in policies if lt is None), None)
+
+    ids: list[int] = []
+    for lt, days in typed.items():
+        if days is None:
+            continue
+        ids += _deletable().filter(
+            room__lesson__lesson_type_id=lt,
+            room__scheduled_start__lt=now - timedelta(days=days),
+        ).values_list("id", flat=True)
+    if default_days is not None:
+        ids += _deletable().filter(
+            room__scheduled_start__lt=now - timedelta(days=default_days),
+        ).exclude(room__lesson__lesson_type_id__in=list(typed)).values_list("id", flat=True)
+    return ids
+
+
+def _year_refs(year: AcademicYear):
+    return RecordingBlobRef.objects.filter(
+        room__scheduled_start__date__gte=year.start_date,
+        room__scheduled_start__date__lte=year.end_date,
+    )
+
+
+def over_quota_ref_ids(exclude: set[int] | frozenset = frozenset()) -> list[int]:
+    """Самые старые записи года, удаление которых возвращает объём года в квоту."""
+    ids: list[int] = []
+    for quota in RecordingQuota.objects.select_related("academic_year"):
+        refs = _year_refs(quota.academic_year).exclude(id__in=exclude)
+        used = refs.aggregate(total=Sum("blob__size"))["total"] or 0
+        if used <= quota.quota_bytes:
+            continue
+        rows = (refs.filter(room__recording_keep=False)
+                .order_by("room__scheduled_start", "id")
+                .values_list("id", "blob__size"))
+        for ref_id, size in rows.iterator():
+            if used <= quota.quota_bytes:
+                break
+            ids.append(ref_id)
+            used -= size
+    return ids
+
+
+# -----------------------------------------------------
+# Удаление
+# -----------------------------------------------------
+def _delete_refs(ref_ids: list[int], storage) -> tuple[int, int]:
+    with transaction.atomic():
+        rows = list(RecordingBlobRef.objects.filter(id__in=ref_ids).values_list("path", "room_id", "blob__size"))
+        RecordingBlobRef.objects.filter(id__in=ref_ids).delete()  # refcount — в post_delete
+        room_ids = {room_id for _, room_id, _ in rows}
+        # у комнаты больше нет ни одной записи → EXPIRED
+        Room.objects.filter(id__in=room_ids, recording_refs__isnull=True).update(
+            recording_status="EXPIRED", recording_file_url=None,
+        )
+    for path, _, _ in rows:
+        storage.remove(path)
+    return len(rows), sum(size for _, _, size in rows)
+
+
+def _delete_orphan_blobs(ids: list[int], storage) -> tuple[int, int]:
+    blobs = {bid: (path, size) for bid, path, size in
+             RecordingBlob.objects.filter(id__in=ids, refcount=0).values_list("id", "path", "size")}
+    # refcount=0 проверяется и в самом DELETE: ссылка могла появиться между запросами
+    RecordingBlob.objects.filter(id__in=list(blobs), refcount=0).delete()
+    alive = set(RecordingBlob.objects.filter(id__in=list(blobs)).values_list("id", flat=True))
+    freed = 0
+    for bid, (path, size) in blobs.items():
+        if bid not in alive:
+            storage.remove(path)
+            freed += size
+    return len(blobs) - len(alive), freed
+
+
+def _batches(ids: list[int], size: int):
+    for i in range(0, len(ids), size):
+        yield ids[i:i + size]
+
+
+def collect_garbage(*, now: datetime | None = None, batch_size: int = 100, pause: float = 0.0,
+                    dry_run: bool = False, sleep=time.sleep) -> GCResult:
+    """
+    Удаляет записи по сроку хранения и квотам, затем blob'ы без ссылок.
+    Удаление идёт пачками по batch_size с паузой pause между ними, чтобы не грузить диск и БД.
+    """
+    now = now or timezone.now()
+    res = GCResult()
+    res.expired = expired_ref_ids(now)
+    res.over_quota = over_quota_ref_ids(exclude=set(res.expired))
+    if dry_run:
+        return res
+
+    storage = get_storage()
+    for batch in _batches(res.expired + res.over_quota, batch_size):
+        n, _ = _delete_refs(batch, storage)
+        res.refs_deleted += n
+        if pause:
+            sleep(pause)
+
+    orphans = list(RecordingBlob.objects.filter(refcount=0, created_at__lt=now - ORPHAN_GRACE)
+                   .values_list("id", flat=True))
+    for batch in _batches(orphans, batch_size):
+        n, freed = _delete_orphan_blobs(batch, storage)
+        res.blobs_deleted += n
+        res.bytes_freed += freed
+        if pause:
+            sleep(pause)
+
+    logger.info("recordings_gc: expired=%s over_quota=%s refs_deleted=%s blobs_deleted=%s bytes_freed=%s",
+                len(res.expired), len(res.over_quota), res.refs_deleted, res.blobs_deleted, res.bytes_freed)
+    return res
+
+
+# -----------------------------------------------------
+# Учёт места
+# -----------------------------------------------------
+def recording_usage() -> dict:
+    """
+    Сводка по индексу: bytes — логический объём (сумма по записям комнат),
+    stored_bytes — фактически занято на диске (каждый blob один раз).
+    """
+    refs = RecordingBlobRef.objects
+    total = refs.aggregate(files=Count("id"), bytes=Sum("blob__size"))
+    stored = RecordingBlob.objects.filter(refcount__gt=0).aggregate(blobs=Count("id"), bytes=Sum("size"))
+    orphans = RecordingBlob.objects.filter(refcount=0).aggregate(blobs=Count("id"), bytes=Sum("size"))
+
+    by_grade = (refs.filter(room__lesson__isnull=False)
+                .values("room__lesson__grade_id", "room__lesson__grade__name")
+                .annotate(files=Count("id"), bytes=Sum("blob__size"))
+                .order_by("room__lesson__grade__name"))
+    by_type = (refs.filter(room__lesson__isnull=False)
+               .values("room__lesson__lesson_type_id", "room__lesson__lesson_type__label")
+               .annotate(files=Count("id"), bytes=Sum("blob__size"))
+               .order_by("room__lesson__lesson_type__label"))
+    quotas = dict(RecordingQuota.objects.values_list("academic_year_id", "quota_bytes"))
+    by_year = []
+    for year in AcademicYear.objects.order_by("start_date"):
+        agg = _year_refs(year).aggregate(files=Count("id"), bytes=Sum("blob__size"))
+        by_year.append({
+            "academic_year_id": year.id, "name": year.name,
+            "files": agg["files"], "bytes": agg["bytes"] or 0,
+            "quota_bytes": quotas.get(year.id),
+        })
+
+    return {
+        "total": {
+            "files": total["files"], "bytes": total["bytes"] or 0,
+            "blobs": stored["blobs"], "stored_bytes": stored["bytes"] or 0,
+        },
+        "kept": refs.filter(room__recording_keep=True).count(),
+        "orphans": {"blobs": orphans["blobs"], "bytes": orphans["bytes"] or 0},
+        "by_grade": [
+            {"grade_id": r["room__lesson__grade_id"], "grade": r["room__lesson__grade__name"],
+             "files": r["files"], "bytes": r["bytes"] or 0}
+            for r in by_grade
+        ],
+        "by_lesson_type": [
+            {"lesson_type_id": r["room__lesson__lesson_type_id"], "lesson_type": r["room__lesson__lesson_type__label"],
+             "files": r["files"], "bytes": r["bytes"] or 0}
+            for r in by_type
+        ],
+        "by_year": by_year,
+    }
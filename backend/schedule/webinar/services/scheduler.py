@@ -0,0 +1,222 @@
+# backend/schedule/webinar/services/scheduler.py
+"""
+Резидентный планировщик вебинарных комнат.
+
+Держит в памяти очередь с приоритетом (heapq) ближайших дедлайнов по урокам:
+  • PROVISION — создать комнату (start - 15 мин; для открытых уроков — сразу),
+  • WARM      — заранее выдать join-payload'ы «своим» (start - 10 мин, services.join),
+  • OPEN      — перевести комнату в OPEN (start),
+  • CLOSE     — закрыть комнату (end + 10 мин) и посчитать посещаемость по журналу присутствия.
+Переходы публикуются в журнал SSE-событий (services.events); его же раз в час чистит планировщик.
+Спит до ближайшего дедлайна и выполняет set-операции из services.auto.
+Изменения уроков подхватывает инкрементально — по водяному знаку RealLesson.updated_at.
+"""
+from __future__ import annotations
+
+import heapq
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from schedule.real_schedule.models import RealLesson, Room
+from schedule.webinar.services.auto import (
+    CLOSE_AFTER, LOOKBACK, OPEN_BEFORE,
+    close_stale_rooms, open_started_rooms, provision_rooms,
+)
+from schedule.webinar.services.attendance import aggregate_attendance
+from schedule.webinar.services.events import prune_events
+from schedule.webinar.services.join import warm_join_payloads
+
+logger = logging.getLogger("cedar.webinar.scheduler")
+
+PROVISION = "provision"
+WARM = "warm"
+OPEN = "open"
+CLOSE = "close"
+
+WARM_BEFORE = timedelta(minutes=10)  # к «шторму» входов в :00 роли и токены уже в кэше
+PRUNE_EVERY = timedelta(hours=1)     # чистка журнала SSE-событий
+
+
+@dataclass(order=True)
+class Deadline:
+    at: datetime
+    kind: str = field(compare=False)
+    lesson_id: int = field(compare=False)
+    sig: tuple = field(compare=False)
+
+
+@dataclass
+class SchedulerMetrics:
+    """Метрики задержки тиков: насколько позже дедлайна сработал переход."""
+    ticks: int = 0
+    transitions: int = 0
+    refreshes: int = 0
+    last_lateness_ms: float = 0.0
+    max_lateness_ms: float = 0.0
+    total_lateness_ms: float = 0.0
+    last_tick_ms: float = 0.0
+    queue_size: int = 0
+
+    def observe(self, lateness_ms: float, tick_ms: float, transitions: int) -> None:
+        self.ticks += 1
+        self.transitions += transitions
+        self.last_lateness_ms = lateness_ms
+        self.max_lateness_ms = max(self.max_lateness_ms, lateness_ms)
+        self.total_lateness_ms += lateness_ms
+        self.last_tick_ms = tick_ms
+
+    def snapshot(self) -> dict:
+        return {
+            "ticks": self.ticks,
+            "transitions": self.transitions,
+            "refreshes": self.refreshes,
+            "queue_size": self.queue_size,
+            "last_lateness_ms": round(self.last_lateness_ms, 1),
+            "max_lateness_ms": round(self.max_lateness_ms, 1),
+            "avg_lateness_ms": round(self.total_lateness_ms / self.ticks, 1) if self.ticks else 0.0,
+            "last_tick_ms": round(self.last_tick_ms, 1),
+        }
+
+
+class RoomScheduler:
+    def __init__(self, *, ahead_hours: int = 48, refresh_seconds: float = 30.0,
+                 clock: Callable[[], datetime] = timezone.now,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.ahead = timedelta(hours=ahead_hours)
+        self.refresh_every = timedelta(seconds=refresh_seconds)
+        self.clock = clock
+        self.sleep = sleep
+        self.metrics = SchedulerMetrics()
+
+        self._heap: list[Deadline] = []
+        self._sig: dict[int, tuple] = {}     # lesson_id -> (start, duration, is_open)
+        self._watermark: Optional[datetime] = None
+        self._loaded_until: Optional[datetime] = None
+        self._next_refresh: Optional[datetime] = None
+        self._next_prune: Optional[datetime] = None
+        self._started_at: Optional[datetime] = None
+        self._stopped = False
+
+    # ----- очередь -----
+    def _schedule(self, lesson_id: int, start: datetime, duration: int | None, is_open: bool, now: datetime):
+        sig = (start, duration, is_open)
+        if self._sig.get(lesson_id) == sig:
+            return
+        self._sig[lesson_id] = sig  # старые записи в куче станут «протухшими» и будут пропущены
+        end = start + timedelta(minutes=duration or 0)
+        provision_at = now if is_open else start - OPEN_BEFORE
+        for kind, at in ((PROVISION, provision_at), (WARM, start - WARM_BEFORE),
+                         (OPEN, start), (CLOSE, end + CLOSE_AFTER)):
+            heapq.heappush(self._heap, Deadline(at, kind, lesson_id, sig))
+
+    def refresh(self) -> int:
+        """
+        Подгружает уроки: при первом вызове — всё окно [now-LOOKBACK, now+ahead],
+        дальше — изменённые с прошлого раза (updated_at, где бы ни был start) и вошедшие в горизонт.
+        Урок, перенесённый за окно, снимается с очереди: его старые дедлайны «протухают».
+        """
+        now = self.clock()
+        if self._started_at is None:
+            self._started_at = now
+        since, until = now - LOOKBACK, now + self.ahead
+        window = Q(start__gte=since, start__lte=until)
+        if self._watermark is None:
+            qs = RealLesson.objects.filter(window)
+        else:
+            # >=: строки с тем же updated_at, закоммиченные позже, не потеряются (дубли гасит _schedule)
+            qs = RealLesson.objects.filter(Q(updated_at__gte=self._watermark)
+                                           | (window & Q(start__gt=self._loaded_until)))
+
+        n = 0
+        watermark = self._watermark
+        for lid, start, duration, is_open, updated_at in qs.values_list(
+                "id", "start", "duration_minutes", "is_open", "updated_at"):
+            if since <= start <= until:
+                self._schedule(lid, start, duration, is_open, now)
+            else:
+                self._sig.pop(lid, None)  # вернётся в очередь, когда войдёт в горизонт
+            watermark = max(watermark, updated_at) if watermark else updated_at
+            n += 1
+
+        self._watermark = watermark or now
+        # уроки, ушедшие за окно LOOKBACK, отработаны — забываем их сигнатуры
+        self._sig = {lid: sig for lid, sig in self._sig.items() if sig[0] >= since}
+        self._loaded_until = until
+        self._next_refresh = now + self.refresh_every
+        self.metrics.refreshes += 1
+        self.metrics.queue_size = len(self._heap)
+        return n
+
+    def next_wakeup(self) -> datetime:
+        candidates = [self._next_refresh] if self._next_refresh else []
+        if self._heap:
+            candidates.append(self._heap[0].at)
+        return min(candidates) if candidates else self.clock() + self.refresh_every
+
+    # ----- выполнение -----
+    def run_due(self) -> int:
+        """Выполняет все наступившие дедлайны пачкой; возвращает число переходов."""
+        now = self.clock()
+        due: dict[str, list[Deadline]] = {}
+        while self._heap and self._heap[0].at <= now:
+            d = heapq.heappop(self._heap)
+            if self._sig.get(d.lesson_id) != d.sig:
+                continue  # урок изменился — дедлайн перепланирован
+            due.setdefault(d.kind, []).append(d)
+        if not due:
+            return 0
+
+        started = time.monotonic()
+        transitions = 0
+        if PROVISION in due:
+            ids = [d.lesson_id for d in due[PROVISION]]
+            transitions += provision_rooms(RealLesson.objects.filter(id__in=ids))
+        if WARM in due:
+            ids = [d.lesson_id for d in due[WARM]]
+            rooms = Room.objects.filter(lesson_id__in=ids).select_related("lesson")
+            warm_join_payloads(rooms)
+        if OPEN in due:
+            transitions += open_started_rooms(now)
+        if CLOSE in due:
+            transitions += close_stale_rooms(now)
+            aggregate_attendance(now)  # посещаемость закрытых комнат — пачкой
+
+        # дедлайны, прошедшие до запуска процесса (догоняющий тик), в задержку не считаем
+        earliest = max(min(d.at for items in due.values() for d in items), self._started_at or now)
+        lateness_ms = max(0.0, (now - earliest).total_seconds() * 1000)
+        tick_ms = (time.monotonic() - started) * 1000
+        self.metrics.observe(lateness_ms, tick_ms, transitions)
+        self.metrics.queue_size = len(self._heap)
+        logger.info("webinar_scheduler tick: kinds=%s transitions=%s lateness_ms=%.1f tick_ms=%.1f",
+                    sorted(due), transitions, lateness_ms, tick_ms)
+        return transitions
+
+    def step(self) -> None:
+        close_old_connections()
+        if self._next_refresh is None or self.clock() >= self._next_refresh:
+            self.refresh()
+        self.run_due()
+        now = self.clock()
+        if self._next_prune is None or now >= self._next_prune:
+            prune_events(now)
+            self._next_prune = now + PRUNE_EVERY
+        close_old_connections()
+
+    def stop(self) -> None:
+        self._stopped = True
+
+    def run_forever(self, max_sleep: float = 60.0, on_step: Callable[["RoomScheduler"], None] | None = None):
+        while not self._stopped:
+            self.step()
+            if on_step:
+                on_step(self)
+            delay = (self.next_wakeup() - self.clock()).total_seconds()
+            if delay > 0:
+                self.sleep(min(delay, max_sleep))
@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from schedule.core.models import StudentSubject
+from schedule.real_schedule.models import RealLesson, Room
+from schedule.real_schedule.signals import in_bulk_lesson_changes, lessons_regenerated
+from schedule.webinar.models import ChangeEvent, RecordingBlob, RecordingBlobRef
+from schedule.webinar.services.events import publish_lesson, publish_room, publish_schedule
+from schedule.webinar.services.feed import invalidate_open_lessons_feed
+from schedule.webinar.services.join import invalidate_lesson_roles, invalidate_role_maps
+from users.models import ParentChild
+
+
+ROOM_STATUS_FIELDS = {"status", "status_override", "is_open", "scheduled_start", "scheduled_end"}
+
+
+@receiver([post_save, post_delete], sender=Room)
+def on_room_changed(sender, instance: Room, **kwargs):
+    invalidate_open_lessons_feed()
+
+
+@receiver(post_save, sender=Room)
+def on_room_saved(sender, instance: Room, update_fields=None, **kwargs):
+    # SSE: статус комнаты и готовность записи; пакетные UPDATE публикуют сами (services.auto)
+    fields = set(update_fields or ())
+    if update_fields is None or fields & ROOM_STATUS_FIELDS:
+        publish_room(instance, ChangeEvent.Kind.ROOM)
+    if (update_fields is None or "recording_status" in fields) and instance.recording_status in ("READY", "FAILED"):
+        publish_room(instance, ChangeEvent.Kind.RECORDING)
+
+
+@receiver([post_save, post_delete], sender=RealLesson)
+def on_lesson_changed(sender, instance: RealLesson, **kwargs):
+    if in_bulk_lesson_changes():
+        return  # пакет опубликует одно событие (on_lessons_regenerated)
+    invalidate_lesson_roles(instance.id)  # мог смениться учитель/класс/предмет
+    publish_lesson(instance, deleted=kwargs.get("signal") is post_delete)
+    # Фид зависит только от открытых уроков; полное сохранение могло снять флаг is_open
+    update_fields = kwargs.get("update_fields")
+    if instance.is_open or update_fields is None or "is_open" in update_fields:
+        invalidate_open_lessons_feed()
+
+
+@receiver(lessons_regenerated)
+def on_lessons_regenerated(sender, version, generation_batch_id, from_date, to_date, rewrite_from,
+                           deleted, created, **kwargs):
+    # событие пишется в транзакции генерации; удалённые уроки могли быть открытыми — фид после коммита
+    publish_schedule({
+        "version": version, "generation_batch_id": str(generation_batch_id),
+        "from": from_date.isoformat(), "to": to_date.isoformat(), "rewrite_from": rewrite_from.isoformat(),
+        "deleted": deleted, "created": created,
+    })
+    transaction.on_commit(invalidate_open_lessons_feed)
+
+
+@receiver(post_delete, sender=RecordingBlobRef)
+def on_blob_ref_deleted(sender, instance: RecordingBlobRef, **kwargs):
+    # Ссылка ушла (в т.ч. каскадом от Room) — уменьшаем refcount; файл blob'а удаляет GC
+    RecordingBlob.objects.filter(id=instance.blob_id, refcount__gt=0).update(refcount=F("refcount") - 1)
+
+
+@receiver([post_save, post_delete], sender=StudentSubject)
+@receiver([post_save, post_delete], sender=ParentChild)
+def on_enrollment_changed(sender, instance, **kwargs):
+    # состав учеников/родителей влияет на карты ролей join'а всех уроков
+    invalidate_role_maps()
@@ -1,5 +1,12 @@
+import hashlib
 import os
 import posixpath
+import queue
+import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from typing import BinaryIO
 
@@ -15,6 +22,8 @@ except ImportError:
 class SavedFile:
     public_url: str
     size: int
+    digest: str = ""     # sha256 содержимого, считается во время копирования
+    blob_path: str = ""  # путь blob'а в контент-адресуемом хранилище (только LOCAL)
 
 
 class AbstractRecordingStorage:
@@ -25,32 +34,168 @@ class AbstractRecordingStorage:
         with open(src_path, "rb") as f:
             return self.save_fileobj(f, dst_rel_path)
 
+    def remove(self, rel_path: str) -> None:
+        raise NotImplementedError
+
 
 class LocalRecordingStorage(AbstractRecordingStorage):
+    """
+    Контент-адресуемое хранилище: содержимое лежит один раз в .blobs/ab/<sha256>.<ext>,
+    а путь комнаты (lessons/<id>/<ts>.mp4) — жёсткая ссылка на blob.
+    save_fileobj копирует и хэширует за один проход: содержимое, уже лежащее blob'ом,
+    пишется лишь во временный файл. Известный blob привязывается к пути без копирования — link_blob
+    (дубли находит services.blobs.find_blob до копирования).
+    """
+    BLOB_DIR = ".blobs"
+    CHUNK_SIZE = 1024 * 1024
+
     def __init__(self, base_dir: str):
         self.base_dir = base_dir
         os.makedirs(self.base_dir, exist_ok=True)
 
+    def _abs(self, rel_path: str) -> str:
+        return os.path.join(self.base_dir, rel_path)
+
+    def blob_rel_path(self, digest: str, ext: str) -> str:
+        name = f"{digest}.{ext}" if ext else digest
+        return posixpath.join(self.BLOB_DIR, digest[:2], name)
+
+    @staticmethod
+    def _link_or_copy(src: str, dst: str) -> None:
+        try:
+            os.link(src, dst)
+        except FileExistsError:
+            raise
+        except OSError:  # ФС без жёстких ссылок
+            shutil.copyfile(src, dst)
+
+    def _write_blob(self, fileobj: BinaryIO, ext: str) -> tuple[str, str, int]:
+        tmp_dir = self._abs(posixpath.join(self.BLOB_DIR, "tmp"))
+        os.makedirs(tmp_dir, exist_ok=True)
+        tmp = os.path.join(tmp_dir, uuid.uuid4().hex)
+        h, size = hashlib.sha256(), 0
+        try:
+            with open(tmp, "wb") as out:
+                for chunk in iter(lambda: fileobj.read(self.CHUNK_SIZE), b""):
+                    out.write(chunk)
+                    h.update(chunk)
+                    size += len(chunk)
+            digest = h.hexdigest()
+            blob_rel = self.blob_rel_path(digest, ext)
+            os.makedirs(os.path.dirname(self._abs(blob_rel)), exist_ok=True)
+            try:
+                os.link(tmp, self._abs(blob_rel))  # атомарно «создать, если нет»
+            except FileExistsError:
+                pass  # такой blob уже есть — дубликат
+            except OSError:
+                if not os.path.exists(self._abs(blob_rel)):
+                    os.replace(tmp, self._abs(blob_rel))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return digest, blob_rel, size
+
+    def _link_path(self, blob_rel: str, dst_rel_path: str) -> None:
+        blob_abs, dst_abs = self._abs(blob_rel), self._abs(dst_rel_path)
+        if not (os.path.exists(dst_abs) and os.path.samefile(blob_abs, dst_abs)):
+            os.makedirs(os.path.dirname(dst_abs), exist_ok=True)
+            tmp_link = f"{dst_abs}.{uuid.uuid4().hex[:8]}.tmp"
+            self._link_or_copy(blob_abs, tmp_link)
+            os.replace(tmp_link, dst_abs)  # подмена пути комнаты атомарна
+
     def save_fileobj(self, fileobj: BinaryIO, dst_rel_path: str) -> SavedFile:
-        dst_abs = os.path.join(self.base_dir, dst_rel_path)
-        os.makedirs(os.path.dirname(dst_abs), exist_ok=True)
+        ext = os.path.splitext(dst_rel_path)[1].lstrip(".")
+        digest, blob_rel, size = self._write_blob(fileobj, ext)
+        self._link_path(blob_rel, dst_rel_path)
+        public_url = f"/media/recordings/{dst_rel_path}"
+        return SavedFile(public_url=public_url, size=size, digest=digest, blob_path=blob_rel)
 
-        size = 0
-        with open(dst_abs, "wb") as out:
-            while True:
-                chunk = fileobj.read(1024 * 1024)
-                if not chunk:
+    def link_blob(self, blob_rel: str, digest: str, size: int, dst_rel_path: str) -> SavedFile | None:
+        """Путь комнаты — ссылка на уже лежащий blob, без чтения исходника; None, если blob'а нет на диске."""
+        if not os.path.exists(self._abs(blob_rel)):
+            return None
+        self._link_path(blob_rel, dst_rel_path)
+        return SavedFile(public_url=f"/media/recordings/{dst_rel_path}", size=size, digest=digest, blob_path=blob_rel)
+
+    def remove(self, rel_path: str) -> None:
+        try:
+            os.remove(self._abs(rel_path))
+        except FileNotFoundError:
+            pass
+
+
+class _SFTPPool:
+    """
+    Пул SSH/SFTP-сессий к одному серверу. Сессии живут между загрузками (keep-alive),
+    битые отбрасываются при выдаче. Здесь же — кэш каталогов, о которых известно, что они есть.
+    """
+
+    def __init__(self, connect, size: int):
+        self._connect = connect
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self.known_dirs: set[str] = set()
+        self.dirs_lock = threading.Lock()
+
+    @staticmethod
+    def _alive(client) -> bool:
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    @contextmanager
+    def session(self):
+        self._slots.acquire()
+        conn = None
+        try:
+            while conn is None:
+                try:
+                    conn = self._idle.get_nowait()
+                except queue.Empty:
+                    conn = self._connect()
                     break
-                out.write(chunk)
-                size += len(chunk)
+                if not self._alive(conn[0]):
+                    self._close(conn)
+                    conn = None
+            yield conn[1]
+        except BaseException:
+            if conn is not None:
+                self._close(conn)  # после ошибки состояние канала неизвестно
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put(conn)
+            self._slots.release()
 
-        public_url = f"/media/recordings/{dst_rel_path}"
-        return SavedFile(public_url=public_url, size=size)
+    @staticmethod
+    def _close(conn) -> None:
+        client, sftp = conn
+        for c in (sftp, client):
+            try:
+                c.close()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+_pools: dict[tuple, _SFTPPool] = {}
+_pools_lock = threading.Lock()
 
 
 class SFTPRecordingStorage(AbstractRecordingStorage):
+    CHUNK_SIZE = 1024 * 1024
+    KEEPALIVE_SECS = 30
+
     def __init__(self, host: str, port: int, username: str, password: str,
-                 base_dir: str, public_base: str):
+                 base_dir: str, public_base: str, *, pool_size: int = 4,
+                 parallel_streams: int = 4, parallel_threshold: int = 64 * 1024 * 1024,
+                 verify: str = "size"):
         if paramiko is None:
             raise RuntimeError("paramiko is not installed. pip install paramiko")
         self.host = host
@@ -59,45 +204,142 @@ class SFTPRecordingStorage(AbstractRecordingStorage):
         self.password = password
         self.base_dir = base_dir.rstrip("/")
         self.public_base = public_base.rstrip("/")
+        self.parallel_streams = max(1, min(parallel_streams, pool_size))
+        self.parallel_threshold = parallel_threshold
+        self.verify = verify  # size | sha256
+
+        key = (host, port, username, self.base_dir)
+        with _pools_lock:
+            if key not in _pools:
+                _pools[key] = _SFTPPool(self._connect, pool_size)
+            self.pool = _pools[key]
 
     def _connect(self):
         client = paramiko.SSHClient()
         client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
         client.connect(self.host, port=self.port,
                        username=self.username, password=self.password)
+        client.get_transport().set_keepalive(self.KEEPALIVE_SECS)
         sftp = client.open_sftp()
         return client, sftp
 
     def _ensure_dirs(self, sftp, remote_path: str):
-        parts = remote_path.strip("/").split("/")
-        path = ""
-        for p in parts[:-1]:
-            path = f"{path}/{p}" if path else f"/{p}"
+        """Создаёт недостающие каталоги; уже известные не проверяются повторно."""
+        parent = posixpath.dirname(remote_path)
+        if parent in self.pool.known_dirs:
+            return
+        try:
+            sftp.stat(parent)  # обычно каталог уже есть — один round trip
+        except FileNotFoundError:
+            path = ""
+            for p in parent.strip("/").split("/"):
+                path = f"{path}/{p}"
+                if path in self.pool.known_dirs:
+                    continue
+                try:
+                    sftp.mkdir(path)
+                except IOError:
+                    sftp.stat(path)  # уже существует (или создан параллельно) — иначе ошибка
+                with self.pool.dirs_lock:
+                    self.pool.known_dirs.add(path)
+        with self.pool.dirs_lock:
+            self.pool.known_dirs.add(parent)
+
+    def _remote_path(self, dst_rel_path: str) -> str:
+        return posixpath.join(self.base_dir, dst_rel_path).replace("\\", "/")
+
+    def _public_url(self, dst_rel_path: str) -> str:
+        return f"{self.public_base}/{dst_rel_path}".replace("//", "/").replace(":/", "://")
+
+    def _verify(self, sftp, tmp_path: str, size: int, sha256: str) -> None:
+        remote_size = sftp.stat(tmp_path).st_size
+        if remote_size != size:
+            raise IOError(f"SFTP size mismatch for {tmp_path}: {remote_size} != {size}")
+        if self.verify == "sha256":
+            h = hashlib.sha256()
+            with sftp.open(tmp_path, "rb") as f:
+                f.prefetch()
+                for block in iter(lambda: f.read(self.CHUNK_SIZE), b""):
+                    h.update(block)
+            if h.hexdigest() != sha256:
+                raise IOError(f"SFTP checksum mismatch for {tmp_path}")
+
+    def _commit(self, sftp, tmp_path: str, remote_path: str, size: int, sha256: str) -> None:
+        """Проверка загруженного .part и атомарная подмена целевого файла."""
+        try:
+            self._verify(sftp, tmp_path, size, sha256)
+        except Exception:
+            sftp.remove(tmp_path)
+            raise
+        try:
+            sftp.posix_rename(tmp_path, remote_path)
+        except IOError:
+            # posix-rename@openssh.com есть не у всех серверов; rename в SFTP v3 не перезаписывает файл
             try:
-                sftp.stat(path)
-            except FileNotFoundError:
-                sftp.mkdir(path)
+                sftp.remove(remote_path)
+            except IOError:
+                pass
+            sftp.rename(tmp_path, remote_path)
 
     def save_fileobj(self, fileobj: BinaryIO, dst_rel_path: str) -> SavedFile:
-        client, sftp = self._connect()
-        try:
-            remote_path = posixpath.join(self.base_dir, dst_rel_path).replace("\\", "/")
+        remote_path = self._remote_path(dst_rel_path)
+        tmp_path = remote_path + ".part"
+        with self.pool.session() as sftp:
             self._ensure_dirs(sftp, remote_path)
-
-            size = 0
-            with sftp.file(remote_path, "wb") as out:
-                while True:
-                    chunk = fileobj.read(1024 * 1024)
-                    if not chunk:
-                        break
+            size, h = 0, hashlib.sha256()
+            with sftp.open(tmp_path, "wb") as out:
+                out.set_pipelined(True)  # не ждём ACK на каждый write
+                for chunk in iter(lambda: fileobj.read(self.CHUNK_SIZE), b""):
                     out.write(chunk)
+                    h.update(chunk)
                     size += len(chunk)
+            self._commit(sftp, tmp_path, remote_path, size, h.hexdigest())
+        return SavedFile(public_url=self._public_url(dst_rel_path), size=size, digest=h.hexdigest())
 
-            public_url = f"{self.public_base}/{dst_rel_path}".replace("//", "/").replace(":/", "://")
-            return SavedFile(public_url=public_url, size=size)
-        finally:
-            sftp.close()
-            client.close()
+    def save_local_path(self, src_path: str, dst_rel_path: str) -> SavedFile:
+        size = os.path.getsize(src_path)
+        if self.parallel_streams < 2 or size < self.parallel_threshold:
+            return super().save_local_path(src_path, dst_rel_path)
+
+        remote_path = self._remote_path(dst_rel_path)
+        tmp_path = remote_path + ".part"
+        with self.pool.session() as sftp:
+            self._ensure_dirs(sftp, remote_path)
+            sftp.open(tmp_path, "wb").close()
+
+        # диапазоны, выровненные по CHUNK_SIZE; каждый пишется своим каналом
+        step = -(-size // self.parallel_streams)
+        step = -(-step // self.CHUNK_SIZE) * self.CHUNK_SIZE
+        ranges = [(off, min(step, size - off)) for off in range(0, size, step)]
+        with ThreadPoolExecutor(max_workers=len(ranges)) as ex:
+            for fut in [ex.submit(self._upload_range, src_path, tmp_path, off, n) for off, n in ranges]:
+                fut.result()
+
+        with open(src_path, "rb") as f:
+            sha256 = hashlib.file_digest(f, "sha256").hexdigest() if self.verify == "sha256" else ""
+        with self.pool.session() as sftp:
+            self._commit(sftp, tmp_path, remote_path, size, sha256)
+        return SavedFile(public_url=self._public_url(dst_rel_path), size=size, digest=sha256)
+
+    def remove(self, rel_path: str) -> None:
+        with self.pool.session() as sftp:
+            try:
+                sftp.remove(self._remote_path(rel_path))
+            except FileNotFoundError:
+                pass
+
+    def _upload_range(self, src_path: str, tmp_path: str, offset: int, length: int) -> None:
+        with self.pool.session() as sftp, open(src_path, "rb") as src, sftp.open(tmp_path, "r+b") as out:
+            out.set_pipelined(True)
+            src.seek(offset)
+            out.seek(offset)
+            left = length
+            while left:
+                chunk = src.read(min(self.CHUNK_SIZE, left))
+                if not chunk:
+                    raise IOError(f"{src_path} shrank during upload")
+                out.write(chunk)
+                left -= len(chunk)
 
 
 def get_storage() -> AbstractRecordingStorage:
@@ -112,5 +354,9 @@ def get_storage() -> AbstractRecordingStorage:
             password=os.getenv("SFTP_PASSWORD"),
             base_dir=os.getenv("SFTP_BASE_DIR"),
             public_base=os.getenv("SFTP_PUBLIC_BASE"),
+            pool_size=int(os.getenv("SFTP_POOL_SIZE", "4")),
+            parallel_streams=int(os.getenv("SFTP_PARALLEL_STREAMS", "4")),
+            parallel_threshold=int(os.getenv("SFTP_PARALLEL_THRESHOLD_MB", "64")) * 1024 * 1024,
+            verify=os.getenv("SFTP_VERIFY", "size").lower(),
         )
     raise RuntimeError(f"Unsupported RECORDING_STORAGE={backend}")
@@ -0,0 +1,40 @@
+import datetime as dt
+import pytest
+from django.utils import timezone
+
+from users.models import User
+from schedule.core.models import Subject, Grade, LessonType
+from schedule.real_schedule.models import RealLesson
+
+
+@pytest.fixture
+def ref(db):
+    subj = Subject.objects.create(name="Math")
+    grade = Grade.objects.create(name="5A")
+    teacher = User.objects.create_user(username="t_web", password="pass", role=User.Role.TEACHER)
+    lt = LessonType.objects.create(key="lesson", label="Урок")
+    return subj, grade, teacher, lt
+
+
+@pytest.fixture
+def make_lesson(ref):
+    """Фабрика RealLesson: сдвиг старта от «сейчас» в минутах."""
+    subj, grade, teacher, lt = ref
+
+    def _make(offset_minutes=0, duration=45, **kwargs):
+        fields = dict(subject=subj, grade=grade, teacher=teacher, lesson_type=lt)
+        fields.update(kwargs)
+        return RealLesson.objects.create(
+            start=timezone.now() + dt.timedelta(minutes=offset_minutes),
+            duration_minutes=duration,
+            **fields,
+        )
+    return _make
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    from django.core.cache import cache
+    cache.clear()
+    yield
+    cache.clear()
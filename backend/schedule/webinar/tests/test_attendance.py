@@ -0,0 +1,127 @@
+import datetime as dt
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import User
+from schedule.core.models import StudentSubject
+from schedule.real_schedule.models import LessonStudent, Room
+from schedule.webinar.models import AttendanceSummary, PresenceEvent
+from schedule.webinar.services.attendance import aggregate_attendance, ingest_jitsi_events
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _secret(settings):
+    settings.JITSI_PRESENCE_SECRET = "presence"
+
+
+@pytest.fixture
+def students(ref):
+    subj, grade, _, _ = ref
+    out = []
+    for name in ("on_time", "late", "brief", "missing", "marked"):
+        user = User.objects.create_user(username=name, password="x", role=User.Role.STUDENT)
+        StudentSubject.objects.create(student=user, subject=subj, grade=grade)
+        out.append(user)
+    return out
+
+
+@pytest.fixture
+def closed_room(make_lesson):
+    def _make(name="cedar-lesson-att"):
+        lesson = make_lesson(offset_minutes=-120, duration=45)
+        return Room.objects.create(
+            type="LESSON", lesson=lesson, jitsi_room=name, status="CLOSED",
+            scheduled_start=lesson.start, scheduled_end=lesson.start + dt.timedelta(minutes=45),
+        )
+    return _make
+
+
+def _event(room, user, kind, minute, tab="a"):
+    at = int((room.scheduled_start + dt.timedelta(minutes=minute)).timestamp())
+    occupant = {"id": str(user.id), "occupant_jid": f"{room.jitsi_room}@conference/{user.id}-{tab}"}
+    occupant["joined_at" if kind == "joined" else "left_at"] = at
+    return {"event_name": f"muc-occupant-{kind}", "room_name": room.jitsi_room, "occupant": occupant}
+
+
+def _visit(room, user, start, end, tab="a"):
+    return [_event(room, user, "joined", start, tab), _event(room, user, "left", end, tab)]
+
+
+def test_webhook_appends_batch(closed_room, students):
+    room = closed_room()
+    payload = {"events": _visit(room, students[0], 0, 45) + [
+        {"event_name": "muc-occupant-joined", "room_name": "unknown-room", "occupant": {"id": "1"}},
+        {"event_name": "muc-room-created", "room_name": room.jitsi_room},
+    ]}
+    client = APIClient()
+    url = reverse("jitsi-presence-webhook")
+    assert client.post(url, payload, format="json").status_code == 403
+
+    res = client.post(url, payload, format="json", HTTP_X_PRESENCE_SECRET="presence")
+    assert res.status_code == 202
+    assert res.json() == {"accepted": 2}
+    events = list(PresenceEvent.objects.order_by("id"))
+    assert [(e.kind, e.user_id, e.source) for e in events] == [
+        ("JOIN", students[0].id, "JITSI"), ("LEAVE", students[0].id, "JITSI"),
+    ]
+    assert events[1].at - events[0].at == dt.timedelta(minutes=45)
+
+
+def test_aggregator_fills_statuses(closed_room, students, django_assert_max_num_queries):
+    on_time, late, brief, missing, marked = students
+    room = closed_room()
+    ingest_jitsi_events(
+        _visit(room, on_time, -3, 20) + _visit(room, on_time, 10, 45, tab="b")  # две вкладки
+        + _visit(room, late, 15, 45)
+        + _visit(room, brief, 0, 5)
+        + _visit(room, marked, 0, 45)
+    )
+    LessonStudent.objects.create(lesson=room.lesson, student=marked, status=LessonStudent.Status.ABSENT)
+
+    with django_assert_max_num_queries(10):
+        res = aggregate_attendance()
+    assert (res.rooms, res.present, res.late, res.absent, res.skipped) == (1, 1, 1, 2, 1)
+
+    rows = {ls.student_id: ls for ls in LessonStudent.objects.filter(lesson=room.lesson)}
+    assert rows[on_time.id].status == LessonStudent.Status.PRESENT
+    assert (rows[late.id].status, rows[late.id].late_minutes) == (LessonStudent.Status.LATE, 15)
+    assert rows[brief.id].status == LessonStudent.Status.ABSENT
+    assert rows[missing.id].status == LessonStudent.Status.ABSENT
+    assert rows[marked.id].status == LessonStudent.Status.ABSENT  # отметка учителя не тронута
+
+    summary = AttendanceSummary.objects.get(room=room)
+    assert summary.minutes[str(on_time.id)] == 45.0  # пересечение вкладок не удваивается
+    assert aggregate_attendance().rooms == 0
+
+
+def test_query_count_does_not_grow_with_rooms(closed_room, students, django_assert_max_num_queries):
+    for i in range(6):
+        room = closed_room(f"cedar-lesson-att-{i}")
+        ingest_jitsi_events([e for s in students for e in _visit(room, s, 0, 40)])
+
+    with django_assert_max_num_queries(10):
+        res = aggregate_attendance()
+    assert res.rooms == 6
+    assert LessonStudent.objects.count() == 6 * len(students)
+
+
+def test_join_clicks_are_fallback(closed_room, students):
+    room = closed_room()
+    for user, minute in ((students[0], 1), (students[1], 20)):
+        PresenceEvent.objects.create(room=room, user=user, kind="JOIN", source="API",
+                                     at=room.scheduled_start + dt.timedelta(minutes=minute))
+    call_command("attendance_aggregate")
+    rows = dict(LessonStudent.objects.filter(lesson=room.lesson).values_list("student_id", "status"))
+    assert rows[students[0].id] == LessonStudent.Status.PRESENT
+    assert rows[students[1].id] == LessonStudent.Status.LATE
+
+
+def test_room_without_presence_is_left_alone(closed_room, students):
+    closed_room()
+    assert aggregate_attendance().rooms == 0
+    assert not LessonStudent.objects.exists()
@@ -0,0 +1,43 @@
+import datetime as dt
+import pytest
+from django.utils import timezone
+
+from schedule.real_schedule.models import Room
+from schedule.webinar.services.auto import maintain_rooms, precreate_rooms_for_open_lessons
+
+pytestmark = pytest.mark.django_db
+
+
+def test_maintain_creates_rooms_in_constant_queries(make_lesson, django_assert_max_num_queries):
+    lessons = [make_lesson(offset_minutes=5, is_open=(i % 2 == 0)) for i in range(40)]
+
+    with django_assert_max_num_queries(10):
+        created, closed = maintain_rooms()
+
+    assert created == 40 and closed == 0
+    assert Room.objects.count() == 40
+    room = Room.objects.get(lesson=lessons[0])
+    assert room.is_open and room.public_slug == f"cedar-lesson-{lessons[0].id}"
+    assert Room.objects.get(lesson=lessons[1]).public_slug is None
+
+    # Повторный тик ничего не создаёт
+    assert maintain_rooms() == (0, 0)
+
+
+def test_maintain_opens_started_and_closes_stale(make_lesson):
+    running = make_lesson(offset_minutes=-5)
+    finished = make_lesson(offset_minutes=-120)
+    maintain_rooms()
+
+    assert Room.objects.get(lesson=running).status == "OPEN"
+    stale = Room.objects.get(lesson=finished)
+    assert stale.status == "CLOSED" and stale.ended_at is not None
+    finished.refresh_from_db()
+    assert finished.conducted_at == stale.ended_at
+
+
+def test_precreate_only_open_lessons(make_lesson):
+    make_lesson(offset_minutes=24 * 60, is_open=True)
+    make_lesson(offset_minutes=24 * 60, is_open=False)
+    assert precreate_rooms_for_open_lessons(hours_ahead=48) == 1
+    assert precreate_rooms_for_open_lessons(hours_ahead=48) == 0
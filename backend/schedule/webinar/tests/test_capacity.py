@@ -0,0 +1,96 @@
+import datetime as dt
+import io
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+from schedule.core.models import Grade, StudentSubject
+from schedule.real_schedule.models import RealLesson
+from schedule.webinar.services.capacity import capacity_forecast, materialize_range
+
+pytestmark = pytest.mark.django_db
+
+DAY = dt.date(2030, 1, 7)
+
+
+@pytest.fixture
+def lesson_at(ref):
+    subj, grade, teacher, lt = ref
+    tz = timezone.get_current_timezone()
+
+    def _make(day, hh, mm, duration=45, grade_=grade):
+        return RealLesson.objects.create(
+            subject=subj, grade=grade_, teacher=teacher, lesson_type=lt, duration_minutes=duration,
+            start=dt.datetime.combine(day, dt.time(hh, mm), tzinfo=tz),
+        )
+    return _make
+
+
+@pytest.fixture
+def classes(ref):
+    subj, grade, _, _ = ref
+    other = Grade.objects.create(name="6B")
+    for i in range(3):
+        StudentSubject.objects.create(
+            student=User.objects.create_user(username=f"s{i}", password="x", role=User.Role.STUDENT),
+            subject=subj, grade=grade)
+    return grade, other
+
+
+def test_peak_rooms_and_participants(lesson_at, classes, django_assert_num_queries):
+    grade, other = classes
+    lesson_at(DAY, 9, 0)                  # 3 ученика + учитель
+    lesson_at(DAY, 9, 32, grade_=other)   # без учеников: только учитель
+    lesson_at(DAY, 11, 0)
+
+    with django_assert_num_queries(2):
+        res = capacity_forecast(*materialize_range(DAY, DAY))
+
+    assert res["lessons"] == 3
+    assert res["peak"]["rooms"] == 2
+    assert res["peak"]["rooms_at"].time() == dt.time(9, 30)  # 9:32 выравнивается на корзину 9:30
+    assert res["peak"]["participants"] == 5
+    points = [(p["start"].time(), p["rooms"], p["participants"]) for p in res["series"]]
+    assert points == [
+        (dt.time(0, 0), 0, 0),
+        (dt.time(9, 0), 1, 4), (dt.time(9, 30), 2, 5), (dt.time(9, 45), 1, 1),
+        (dt.time(10, 20), 0, 0), (dt.time(11, 0), 1, 4), (dt.time(11, 45), 0, 0),
+    ]
+
+
+def test_daily_peaks_and_overnight(lesson_at, classes):
+    lesson_at(DAY, 23, 30, duration=60)
+    lesson_at(DAY + dt.timedelta(days=2), 10, 0)
+
+    res = capacity_forecast(*materialize_range(DAY, DAY + dt.timedelta(days=2)), with_series=False)
+    assert "series" not in res
+    assert [(d["date"], d["peak_rooms"]) for d in res["daily"]] == [
+        (DAY, 1), (DAY + dt.timedelta(days=1), 1), (DAY + dt.timedelta(days=2), 1),
+    ]
+    assert res["daily"][1]["peak_rooms_at"].time() == dt.time(0, 0)
+
+
+def test_endpoint_and_command(lesson_at, classes):
+    lesson_at(DAY, 9, 0)
+    admin = User.objects.create_user(username="adm", password="x", is_staff=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+    url = reverse("rooms-capacity")
+
+    data = client.get(url, {"from": DAY.isoformat(), "to": "2030-06-30", "series": "0"}).json()
+    assert data["peak"]["rooms"] == 1 and data["lessons"] == 1
+    assert client.get(url, {"from": DAY.isoformat(), "to": "2031-06-30"}).status_code == 400
+
+    out = io.StringIO()
+    call_command("rooms_capacity", "--from", DAY.isoformat(), "--to", DAY.isoformat(), stdout=out)
+    assert "peak_rooms=1" in out.getvalue()
+
+
+def test_requires_staff(ref):
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username="plain", password="x"))
+    assert client.get(reverse("rooms-capacity")).status_code == 403
@@ -0,0 +1,152 @@
+import asyncio
+import datetime as dt
+import json
+
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import ParentChild, User
+from schedule.core.models import Grade, StudentSubject
+from schedule.real_schedule.models import Room
+from schedule.real_schedule.services.visibility import audience_for
+from schedule.webinar.models import ChangeEvent
+from schedule.webinar.services.auto import maintain_rooms
+from schedule.webinar.services.events import prune_events, publish_lesson, stream_events
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _fast_poll(settings):
+    settings.EVENTS_POLL_INTERVAL_SECS = 0.01
+    settings.EVENTS_HEARTBEAT_SECS = 0.2
+
+
+@pytest.fixture
+def people(ref):
+    subj, grade, teacher, _ = ref
+    student = User.objects.create_user(username="st", password="x", role=User.Role.STUDENT)
+    parent = User.objects.create_user(username="pa", password="x", role=User.Role.PARENT)
+    StudentSubject.objects.create(student=student, subject=subj, grade=grade)
+    ParentChild.objects.create(parent=parent, child=student)
+    return {"teacher": teacher, "student": student, "parent": parent}
+
+
+def _frames(chunks):
+    """SSE-кадры с данными: [(event, data)]."""
+    out = []
+    for chunk in chunks:
+        lines = dict(line.split(": ", 1) for line in chunk.strip().splitlines() if not line.startswith(":"))
+        if "data" in lines:
+            out.append((lines["event"], json.loads(lines["data"])))
+    return out
+
+
+async def _collect(gen, n, timeout=3.0):
+    chunks = []
+    while len(_frames(chunks)) < n:
+        chunks.append(await asyncio.wait_for(gen.__anext__(), timeout))
+    return chunks
+
+
+def test_transitions_are_logged(make_lesson):
+    running = make_lesson(offset_minutes=-5)
+    finished = make_lesson(offset_minutes=-120)
+    ChangeEvent.objects.all().delete()
+    maintain_rooms()
+
+    statuses = {(e.lesson_id, e.payload["status"]) for e in ChangeEvent.objects.filter(kind="room.status")}
+    assert (running.id, "OPEN") in statuses
+    assert (finished.id, "CLOSED") in statuses
+
+    room = Room.objects.get(lesson=running)
+    room.recording_status = "READY"
+    room.save(update_fields=["recording_status"])
+    ev = ChangeEvent.objects.filter(kind="recording.status").get()
+    assert (ev.room_id, ev.teacher_id, ev.payload["recording_status"]) == (room.id, running.teacher_id, "READY")
+
+
+def test_replay_filters_by_audience(people, make_lesson):
+    other = make_lesson(offset_minutes=60, grade=Grade.objects.create(name="6B"),
+                        teacher=User.objects.create_user(username="t2", password="x", role=User.Role.TEACHER))
+    own = make_lesson(offset_minutes=60)
+    open_lesson = make_lesson(offset_minutes=60, grade=other.grade, teacher=other.teacher, is_open=True)
+
+    async def run(user):
+        gen = stream_events(user, await sync_to_async(audience_for)(user), last_id=0)
+        try:
+            return _frames(await _collect(gen, 2))
+        finally:
+            await gen.aclose()
+
+    for who in ("teacher", "student", "parent"):
+        frames = async_to_sync(run)(people[who])
+        assert [d["lesson_id"] for _, d in frames] == [own.id, open_lesson.id], who
+        assert {e for e, _ in frames} == {"lesson.changed"}
+
+
+def test_live_events_reach_subscriber(people, make_lesson):
+    lesson = make_lesson(offset_minutes=60)
+
+    async def run():
+        student = people["student"]
+        gen = stream_events(student, await sync_to_async(audience_for)(student))
+        try:
+            await gen.__anext__()  # retry:
+            first = asyncio.ensure_future(_collect(gen, 1))
+            await asyncio.sleep(0.05)
+            lesson.start += dt.timedelta(minutes=5)
+            await sync_to_async(lesson.save)()
+            return _frames(await first)
+        finally:
+            await gen.aclose()
+
+    [(kind, data)] = async_to_sync(run)()
+    assert kind == "lesson.changed"
+    assert data["lesson_id"] == lesson.id
+    assert data["start"] == lesson.start.isoformat()
+
+
+def test_ticket_and_stream_endpoint(people, make_lesson):
+    lesson = make_lesson(offset_minutes=60)
+    api = APIClient()
+    api.force_authenticate(people["student"])
+    url = api.get(reverse("room-events-ticket")).json()["url"]
+    last = ChangeEvent.objects.order_by("id").last().id
+    publish_lesson(lesson)
+
+    async def run():
+        client = AsyncClient()
+        assert (await client.get(url.replace("sig=", "sig=x"))).status_code == 401
+        res = await client.get(url, headers={"Last-Event-ID": str(last)})
+        assert res["Content-Type"] == "text/event-stream"
+        gen = aiter(res.streaming_content)
+        chunks = []
+        while len(_frames([c.decode() for c in chunks])) < 1:
+            chunks.append(await asyncio.wait_for(anext(gen), 3.0))
+        await gen.aclose()
+        return _frames([c.decode() for c in chunks])
+
+    [(kind, data)] = async_to_sync(run)()
+    assert (kind, data["lesson_id"]) == ("lesson.changed", lesson.id)
+
+
+def test_stream_refused_under_wsgi(people):
+    api = APIClient()
+    api.force_authenticate(people["student"])
+    url = api.get(reverse("room-events-ticket")).json()["url"]
+    res = Client().get(url)  # WSGIRequest: поток под WSGI не отдаётся
+    assert res.status_code == 503
+    assert res.json()["detail"] == "ASGI_REQUIRED"
+
+
+def test_prune_drops_old_events(make_lesson):
+    make_lesson(offset_minutes=60)
+    ChangeEvent.objects.update(created_at=timezone.now() - dt.timedelta(days=2))
+    make_lesson(offset_minutes=90)
+    assert prune_events() == 1
+    assert ChangeEvent.objects.count() == 1
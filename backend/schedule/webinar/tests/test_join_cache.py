@@ -0,0 +1,138 @@
+import datetime as dt
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from users.models import ParentChild, User
+from schedule.core.models import StudentSubject
+from schedule.real_schedule.models import Room
+from schedule.core.checks import check_shared_cache
+from schedule.webinar.services import join
+from schedule.webinar.services.auto import _room_for_lesson
+from schedule.webinar.services.join import build_join_payload, build_role_maps, warm_join_payloads
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def _jwt(settings):
+    settings.JITSI_JWT_ENABLED = True
+    settings.JITSI_JWT_SECRET = "test-secret"
+
+
+@pytest.fixture
+def shared_cache(monkeypatch):
+    # LocMemCache тестов считаем общим: прогрев и вход — в одном процессе
+    monkeypatch.setattr(join, "is_process_local", lambda: False)
+
+
+@pytest.fixture
+def people(ref):
+    subj, grade, teacher, _ = ref
+    student = User.objects.create_user(username="st", password="x", role=User.Role.STUDENT)
+    parent = User.objects.create_user(username="pa", password="x", role=User.Role.PARENT)
+    outsider = User.objects.create_user(username="out", password="x", role=User.Role.STUDENT)
+    director = User.objects.create_user(username="dir", password="x", role=User.Role.DIRECTOR)
+    StudentSubject.objects.create(student=student, subject=subj, grade=grade)
+    ParentChild.objects.create(parent=parent, child=student)
+    return {"teacher": teacher, "student": student, "parent": parent,
+            "outsider": outsider, "director": director}
+
+
+@pytest.fixture
+def room(make_lesson):
+    lesson = make_lesson(offset_minutes=10)
+    r = _room_for_lesson(lesson.id, lesson.start, lesson.duration_minutes, False)
+    r.save()
+    return r
+
+
+def _join(user, room):
+    c = APIClient()
+    c.force_authenticate(user)
+    return c.post(reverse("room-join", args=[room.id]))
+
+
+def test_role_map_built_in_bulk(people, room, django_assert_num_queries):
+    rooms = list(Room.objects.filter(id=room.id).select_related("lesson"))
+    with django_assert_num_queries(2):  # StudentSubject + ParentChild
+        maps = build_role_maps(rooms)
+    roles = maps[room.id]
+    assert roles[people["teacher"].id] == ("moderator", True)
+    assert roles[people["student"].id] == ("participant", True)
+    assert roles[people["parent"].id] == ("observer", True)
+    assert people["outsider"].id not in roles
+
+
+def test_roles_unchanged(people, room):
+    expected = {"teacher": "moderator", "student": "participant", "parent": "observer", "director": "observer"}
+    for who, role in expected.items():
+        res = _join(people[who], room)
+        assert res.status_code == 200, who
+        assert res.json()["you_are"] == role
+    assert _join(people["outsider"], room).status_code == 403
+
+
+def test_warmed_join_needs_only_room_lookup(people, room, django_assert_num_queries, shared_cache):
+    issued = warm_join_payloads(Room.objects.filter(id=room.id).select_related("lesson"))
+    assert issued == 3  # учитель, ученик, родитель
+
+    for who in ("teacher", "student", "parent"):
+        with django_assert_num_queries(2):  # get_object_or_404(Room) + строка журнала присутствия
+            assert _join(people[who], room).status_code == 200
+
+
+def test_warm_skipped_with_process_local_cache(people, room, caplog):
+    assert warm_join_payloads(Room.objects.filter(id=room.id).select_related("lesson")) == 0
+    assert "process-local" in caplog.text
+
+
+def test_process_local_cache_is_reported(settings):
+    settings.DEBUG = False
+    assert [w.id for w in check_shared_cache(None)] == ["core.W001"]
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache",
+                                   "LOCATION": "redis://redis:6379/0"}}
+    assert check_shared_cache(None) == []
+
+
+def test_payload_reused_until_near_expiry(people, room, shared_cache):
+    first = _join(people["student"], room).json()
+    second = _join(people["student"], room).json()
+    assert first == second
+    assert "jwt=" in first["join_url"]
+    room.refresh_from_db()
+    other = build_join_payload(room, people["student"], display_name="Другое имя")
+    assert other["join_url"] != first["join_url"]
+
+
+def test_enrollment_change_invalidates_role_map(people, room, shared_cache):
+    assert _join(people["student"], room).status_code == 200
+    StudentSubject.objects.filter(student=people["student"]).delete()
+    assert _join(people["student"], room).status_code == 403
+
+
+def test_teacher_change_invalidates_lesson_roles(people, room, shared_cache):
+    assert _join(people["teacher"], room).json()["you_are"] == "moderator"
+    lesson = room.lesson
+    new_teacher = User.objects.create_user(username="t2", password="x", role=User.Role.TEACHER)
+    lesson.teacher = new_teacher
+    lesson.start += dt.timedelta(minutes=1)
+    lesson.save()
+    assert _join(people["teacher"], room).status_code == 403
+    assert _join(new_teacher, room).json()["you_are"] == "moderator"
+
+
+def test_process_local_cache_computes_roles_per_request(people, room, monkeypatch):
+    # сброс карты ролей случился в другом воркере — этот его не видит
+    monkeypatch.setattr("schedule.webinar.signals.invalidate_role_maps", lambda: None)
+    assert _join(people["student"], room).status_code == 200
+    StudentSubject.objects.filter(student=people["student"]).delete()
+    assert _join(people["student"], room).status_code == 403
+
+    # с общим кэшем та же ситуация — устаревшая карта; поэтому там сброс обязателен
+    monkeypatch.setattr(join, "is_process_local", lambda: False)
+    StudentSubject.objects.create(student=people["student"], subject=room.lesson.subject, grade=room.lesson.grade)
+    assert _join(people["student"], room).status_code == 200
+    StudentSubject.objects.filter(student=people["student"]).delete()
+    assert _join(people["student"], room).status_code == 200
@@ -0,0 +1,62 @@
+import pytest
+from rest_framework.test import APIClient
+
+from schedule.real_schedule.models import Room
+from schedule.webinar.services.auto import precreate_rooms_for_open_lessons
+from schedule.webinar.services.feed import window_minutes
+
+pytestmark = pytest.mark.django_db
+
+URL = "/api/rooms/open-lessons/"
+
+
+def test_feed_is_read_only(make_lesson):
+    lesson = make_lesson(offset_minutes=60, is_open=True)
+    make_lesson(offset_minutes=60, is_open=False)
+
+    r = APIClient().get(URL)
+    assert r.status_code == 200
+    items = r.json()
+    assert [i["lesson"]["id"] for i in items] == [lesson.id]
+    assert items[0]["room_id"] is None and items[0]["status"] == "SCHEDULED"
+    assert Room.objects.count() == 0
+
+
+def test_feed_is_cached_and_invalidated_by_maintenance(make_lesson, django_assert_num_queries):
+    lesson = make_lesson(offset_minutes=60, is_open=True)
+    client = APIClient()
+    client.get(URL)
+
+    with django_assert_num_queries(0):
+        assert client.get(URL).json()[0]["room_id"] is None
+
+    precreate_rooms_for_open_lessons(hours_ahead=48)
+    item = client.get(URL).json()[0]
+    room = Room.objects.get(lesson=lesson)
+    assert item["room_id"] == room.id
+    assert item["public_slug"] == f"cedar-lesson-{lesson.id}"
+
+
+def test_feed_includes_open_rooms_of_closed_lessons(make_lesson):
+    lesson = make_lesson(offset_minutes=30, is_open=False)
+    precreate = Room.objects.create(
+        type="LESSON", lesson=lesson, is_open=True, public_slug="x-open",
+        scheduled_start=lesson.start, scheduled_end=lesson.start, join_url="https://j/x",
+    )
+    items = APIClient().get(URL).json()
+    assert [i["room_id"] for i in items] == [precreate.id]
+
+
+def test_window_params_are_bounded_and_bucketed(make_lesson, django_assert_num_queries):
+    client = APIClient()
+    for bad in ({"since_hours": "nan"}, {"hours": "inf"}, {"hours": "-inf"}):
+        assert client.get(URL, bad).json() == {"detail": "INVALID_HOURS"}
+    assert client.get(URL, {"hours": "1e9"}).status_code == 200  # обрезается до недели
+
+    assert [window_minutes(h) for h in (0.1667, 0.05, -3, 1, 1.01, 48, 48.000001, 100, 1e9)] == \
+        [10, 10, 0, 60, 120, 2880, 2880, 7200, 10080]
+
+    client.get(URL, {"hours": 48})
+    with django_assert_num_queries(0):  # та же корзина — тот же ключ кэша
+        client.get(URL, {"hours": "48.000001"})
+        client.get(URL, {"hours": "47.5"})
@@ -0,0 +1,136 @@
+import datetime as dt
+import hashlib
+import io
+import os
+
+import pytest
+
+from schedule.real_schedule.models import Room
+from schedule.webinar.models import RecordingBlob, RecordingBlobRef, RecordingIngest
+from schedule.webinar.services import blobs, recordings
+from schedule.webinar.services.blobs import index_recording
+from schedule.webinar.storage import LocalRecordingStorage
+
+pytestmark = pytest.mark.django_db
+
+DATA = b"cedar-recording" * 1000
+
+
+@pytest.fixture
+def store(settings, tmp_path):
+    settings.RECORDING_STORAGE = "LOCAL"
+    settings.RECORDING_LOCAL_DIR = str(tmp_path / "rec")
+    return LocalRecordingStorage(settings.RECORDING_LOCAL_DIR)
+
+
+@pytest.fixture
+def make_room(make_lesson):
+    def _make(name):
+        lesson = make_lesson(offset_minutes=-90)
+        return Room.objects.create(
+            type="LESSON", lesson=lesson, jitsi_room=name,
+            scheduled_start=lesson.start, scheduled_end=lesson.start + dt.timedelta(minutes=45),
+        )
+    return _make
+
+
+def _save(store, room, path, data=DATA):
+    saved = store.save_fileobj(io.BytesIO(data), path)
+    index_recording(room.id, path, saved)
+    return saved
+
+
+def _blob_files(store):
+    root = os.path.join(store.base_dir, store.BLOB_DIR)
+    return [f for d, _, files in os.walk(root) if not d.endswith("tmp") for f in files]
+
+
+def test_hash_is_computed_during_copy(store, make_room):
+    room = make_room("r1")
+    saved = _save(store, room, "lessons/1/a.mp4")
+    assert saved.digest == hashlib.sha256(DATA).hexdigest()
+    assert saved.size == len(DATA)
+    assert saved.public_url == "/media/recordings/lessons/1/a.mp4"
+    with open(os.path.join(store.base_dir, "lessons/1/a.mp4"), "rb") as f:
+        assert f.read() == DATA
+
+
+def test_redelivery_is_noop(store, make_room):
+    room = make_room("r1")
+    _save(store, room, "lessons/1/a.mp4")
+    _save(store, room, "lessons/1/a.mp4")
+
+    blob = RecordingBlob.objects.get()
+    assert blob.refcount == 1
+    assert RecordingBlobRef.objects.count() == 1
+    assert len(_blob_files(store)) == 1
+
+
+def test_same_content_for_two_rooms_shares_blob(store, make_room):
+    r1, r2 = make_room("r1"), make_room("r2")
+    _save(store, r1, "lessons/1/a.mp4")
+    _save(store, r2, "lessons/2/a.mp4")
+
+    blob = RecordingBlob.objects.get()
+    assert blob.refcount == 2
+    assert os.path.samefile(os.path.join(store.base_dir, "lessons/1/a.mp4"),
+                            os.path.join(store.base_dir, "lessons/2/a.mp4"))
+
+
+def test_new_content_moves_ref_and_room_delete_releases(store, make_room):
+    room = make_room("r1")
+    _save(store, room, "lessons/1/a.mp4")
+    _save(store, room, "lessons/1/a.mp4", data=b"other")
+
+    old = RecordingBlob.objects.get(digest=hashlib.sha256(DATA).hexdigest())
+    new = RecordingBlob.objects.get(digest=hashlib.sha256(b"other").hexdigest())
+    assert (old.refcount, new.refcount) == (0, 1)
+
+    room.delete()
+    new.refresh_from_db()
+    assert new.refcount == 0
+
+
+def test_duplicate_webhook_returns_same_job(store, make_room, tmp_path):
+    room = make_room("r1")
+    src = tmp_path / "jibri.mp4"
+    src.write_bytes(DATA)
+
+    job = recordings.enqueue_recording(room.id, RecordingIngest.Source.JIBRI, str(src))
+    recordings.run_pending()
+    again = recordings.enqueue_recording(room.id, RecordingIngest.Source.JIBRI, str(src))
+
+    assert again.id == job.id
+    assert RecordingIngest.objects.count() == 1
+    assert recordings.run_pending() == 0
+    ref = RecordingBlobRef.objects.get(room=room)
+    assert ref.blob.size == len(DATA)
+    room.refresh_from_db()
+    assert room.recording_status == "READY"
+
+
+def test_known_content_is_linked_without_copy(store, make_room, tmp_path, monkeypatch):
+    r1, r2 = make_room("r1"), make_room("r2")
+    src = tmp_path / "jibri.mp4"
+    src.write_bytes(DATA)
+    recordings.enqueue_recording(r1.id, RecordingIngest.Source.JIBRI, str(src))
+    recordings.run_pending()
+
+    # та же запись пришла ещё раз другой доставкой — blob находится до копирования
+    def no_copy(*args, **kwargs):
+        raise AssertionError("blob must not be rewritten")
+
+    monkeypatch.setattr(LocalRecordingStorage, "_write_blob", no_copy)
+    again = tmp_path / "jibri-copy.mp4"
+    again.write_bytes(DATA)
+    job = recordings.enqueue_recording(r2.id, RecordingIngest.Source.JIBRI, str(again))
+    recordings.run_pending()
+    job.refresh_from_db()
+    assert job.status == RecordingIngest.Status.DONE
+    assert RecordingBlob.objects.get().refcount == 2
+
+    # размера нет в индексе — содержимое заведомо новое, исходник до копирования не читается
+    other = tmp_path / "other.mp4"
+    other.write_bytes(b"x" * 10)
+    monkeypatch.setattr(blobs, "open", no_copy, raising=False)
+    assert blobs.find_blob(str(other)) is None
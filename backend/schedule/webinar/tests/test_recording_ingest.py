@@ -0,0 +1,261 @@
+import datetime as dt
+import os
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from schedule.real_schedule.models import Room
+from schedule.webinar.models import RecordingDelivery, RecordingIngest
+from schedule.webinar.services import recordings
+
+pytestmark = pytest.mark.django_db
+
+SECRET = "test-secret"
+PAYLOAD = bytes(range(256)) * 40  # 10 240 байт
+
+
+class FakeResponse:
+    """Потоковый ответ requests: отдаёт body кусками, опционально рвётся после fail_after байт."""
+
+    def __init__(self, body: bytes, offset: int = 0, fail_after: int | None = None):
+        self.body = body[offset:]
+        self.offset = offset
+        self.fail_after = fail_after
+        self.status_code = 206 if offset else 200
+        self.headers = {"Content-Length": str(len(self.body))}
+        if offset:
+            self.headers["Content-Range"] = f"bytes {offset}-{len(body) - 1}/{len(body)}"
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        sent = 0
+        for i in range(0, len(self.body), 1000):
+            if self.fail_after is not None and sent >= self.fail_after:
+                raise ConnectionError("connection reset")
+            block = self.body[i:i + 1000]
+            sent += len(block)
+            yield block
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+@pytest.fixture
+def storage_dirs(settings, tmp_path):
+    settings.RECORDING_STORAGE = "LOCAL"
+    settings.RECORDING_LOCAL_DIR = str(tmp_path / "recordings")
+    settings.RECORDING_INGEST_DIR = str(tmp_path / "ingest")
+    settings.RECORDING_WEBHOOK_SECRET = SECRET
+    return tmp_path
+
+
+@pytest.fixture
+def room(make_lesson):
+    lesson = make_lesson(offset_minutes=-60)
+    return Room.objects.create(
+        type="LESSON", lesson=lesson, jitsi_room="cedar-lesson-rec",
+        scheduled_start=lesson.start, scheduled_end=lesson.start + dt.timedelta(minutes=45),
+    )
+
+
+@pytest.fixture
+def http(monkeypatch):
+    """Подменяет requests.get; сценарий — список kwargs для FakeResponse на каждый вызов."""
+    calls, script = [], []
+
+    def fake_get(url, headers=None, **kwargs):
+        headers = headers or {}
+        calls.append(headers)
+        offset = int(headers["Range"].split("=")[1].rstrip("-")) if "Range" in headers else 0
+        return FakeResponse(PAYLOAD, offset=offset, **(script.pop(0) if script else {}))
+
+    monkeypatch.setattr(recordings.requests, "get", fake_get)
+    monkeypatch.setattr(recordings, "CHUNK_SIZE", 2048)
+    return calls, script
+
+
+def _run_now(job):
+    RecordingIngest.objects.filter(id=job.id).update(next_attempt_at=timezone.now())
+
+
+def test_webhook_enqueues_without_downloading(storage_dirs, room, http):
+    calls, _ = http
+    res = APIClient().post(
+        reverse("jaas-recording-webhook"),
+        {"room_id": room.id, "preAuthenticatedLink": "https://jaas.example/rec.mp4", "fileExt": "mp4"},
+        format="json", HTTP_X_RECORDING_SECRET=SECRET,
+    )
+    assert res.status_code == 202
+    job = RecordingIngest.objects.get(id=res.json()["ingest_id"])
+    assert job.status == RecordingIngest.Status.QUEUED
+    assert calls == []
+    room.refresh_from_db()
+    assert room.recording_status == "UPLOADING"
+
+
+def _jaas(room, link):
+    return APIClient().post(
+        reverse("jaas-recording-webhook"),
+        {"room_id": room.id, "preAuthenticatedLink": link, "fileExt": "mp4"},
+        format="json", HTTP_X_RECORDING_SECRET=SECRET,
+    )
+
+
+def test_webhook_retry_reuses_ingest(storage_dirs, room, http):
+    calls, _ = http
+    first = _jaas(room, "https://jaas.example/rec.mp4?sig=aaa&se=1")
+    assert first.status_code == 202
+    # ретрай провайдера: та же запись, новая подпись ссылки
+    again = _jaas(room, "https://jaas.example/rec.mp4?se=2&sig=bbb")
+    assert again.status_code == 200
+    assert again.json()["duplicate"] is True
+    assert again.json()["ingest_id"] == first.json()["ingest_id"]
+    assert RecordingIngest.objects.count() == 1
+    assert RecordingDelivery.objects.get().hits == 2
+
+    assert recordings.run_pending() == 1
+    done = _jaas(room, "https://jaas.example/rec.mp4?sig=ccc").json()
+    assert done["status"] == RecordingIngest.Status.DONE
+    assert done["result_url"].endswith(".mp4")
+    assert recordings.run_pending() == 0
+    assert len(calls) == 1  # файл скачан один раз
+
+
+def test_webhook_retry_after_failure_enqueues_again(storage_dirs, room, http):
+    first = _jaas(room, "https://jaas.example/rec.mp4").json()
+    RecordingIngest.objects.filter(id=first["ingest_id"]).update(status=RecordingIngest.Status.FAILED)
+    again = _jaas(room, "https://jaas.example/rec.mp4")
+    assert again.status_code == 202
+    assert again.json()["ingest_id"] != first["ingest_id"]
+    assert RecordingDelivery.objects.get().ingest_id == again.json()["ingest_id"]
+
+
+def test_webhook_unknown_room_404(storage_dirs):
+    res = APIClient().post(
+        reverse("jaas-recording-webhook"),
+        {"room_id": 999999, "preAuthenticatedLink": "https://jaas.example/rec.mp4"},
+        format="json", HTTP_X_RECORDING_SECRET=SECRET,
+    )
+    assert res.status_code == 404
+    assert not RecordingIngest.objects.exists()
+
+
+def test_worker_resumes_with_range_after_failure(storage_dirs, room, http):
+    calls, script = http
+    script.append({"fail_after": 5000})  # первая попытка рвётся после ~5 КБ
+    job = recordings.enqueue_recording(room.id, RecordingIngest.Source.JAAS, "https://jaas.example/rec.mp4")
+
+    assert recordings.run_pending() == 1
+    job.refresh_from_db()
+    assert job.status == RecordingIngest.Status.QUEUED
+    assert job.bytes_done == 4096  # два подтверждённых чанка по 2048
+    assert len(job.chunk_checksums) == 2
+
+    _run_now(job)
+    assert recordings.run_pending() == 1
+    assert calls[1] == {"Range": "bytes=4096-"}
+
+    job.refresh_from_db()
+    room.refresh_from_db()
+    assert job.status == RecordingIngest.Status.DONE
+    assert job.bytes_done == job.bytes_total == len(PAYLOAD)
+    assert room.recording_status == "READY"
+    assert room.recording_file_url == job.result_url
+
+    rel = job.result_url.removeprefix("/media/recordings/")
+    with open(os.path.join(storage_dirs / "recordings", rel), "rb") as f:
+        assert f.read() == PAYLOAD
+    assert not os.path.exists(job.part_path)
+
+
+def test_corrupted_part_is_truncated_to_verified_chunk(storage_dirs, room, http):
+    calls, script = http
+    script.append({"fail_after": 5000})
+    job = recordings.enqueue_recording(room.id, RecordingIngest.Source.JAAS, "https://jaas.example/rec.mp4")
+    recordings.run_pending()
+    job.refresh_from_db()
+
+    # портим второй чанк на диске — докачка должна начаться со второго чанка
+    with open(job.part_path, "r+b") as f:
+        f.seek(3000)
+        f.write(b"\x00" * 10)
+
+    _run_now(job)
+    recordings.run_pending()
+    assert calls[1] == {"Range": "bytes=2048-"}
+    job.refresh_from_db()
+    assert job.status == RecordingIngest.Status.DONE
+
+
+def test_trailing_partial_chunk_is_not_resumed(storage_dirs, room, http):
+    calls, _ = http
+    job = recordings.enqueue_recording(room.id, RecordingIngest.Source.JAAS, "https://jaas.example/rec.mp4")
+    # прошлая попытка оборвалась на 5000 байт: два полных чанка и неполный хвост
+    part = storage_dirs / "ingest" / f"{job.id}.part"
+    os.makedirs(part.parent, exist_ok=True)
+    part.write_bytes(PAYLOAD[:5000])
+    sums = [recordings.hashlib.sha256(PAYLOAD[a:b]).hexdigest() for a, b in ((0, 2048), (2048, 4096), (4096, 5000))]
+    RecordingIngest.objects.filter(id=job.id).update(part_path=str(part), bytes_done=5000,
+                                                     bytes_total=len(PAYLOAD), chunk_checksums=sums)
+
+    recordings.run_pending()
+    assert calls[0] == {"Range": "bytes=4096-"}
+    job.refresh_from_db()
+    assert job.status == RecordingIngest.Status.DONE
+    expected = [recordings.hashlib.sha256(PAYLOAD[i:i + 2048]).hexdigest() for i in range(0, len(PAYLOAD), 2048)]
+    assert job.chunk_checksums == expected
+
+
+def test_retries_exhausted_marks_failed(storage_dirs, room, http):
+    _, script = http
+    job = recordings.enqueue_recording(room.id, RecordingIngest.Source.JAAS, "https://jaas.example/rec.mp4")
+    script.extend({"fail_after": 0} for _ in range(job.max_attempts))
+
+    for _ in range(job.max_attempts):
+        _run_now(job)
+        assert recordings.run_pending() == 1
+
+    job.refresh_from_db()
+    room.refresh_from_db()
+    assert job.status == RecordingIngest.Status.FAILED
+    assert job.attempts == job.max_attempts
+    assert "connection reset" in job.last_error
+    assert room.recording_status == "FAILED"
+    assert recordings.run_pending() == 0
+
+
+def test_jibri_finalize_copies_local_file(storage_dirs, room):
+    src = storage_dirs / "lesson.webm"
+    src.write_bytes(PAYLOAD)
+    res = APIClient().post(
+        reverse("room-recording-uploaded", args=[room.id]),
+        {"file_path": str(src)}, format="json", HTTP_X_RECORDING_SECRET=SECRET,
+    )
+    assert res.status_code == 202
+
+    assert recordings.run_pending() == 1
+    job = RecordingIngest.objects.get(id=res.json()["ingest_id"])
+    assert job.status == RecordingIngest.Status.DONE
+    assert job.file_ext == "webm"
+    assert job.result_url.endswith(".webm")
+
+
+def test_jibri_key_tracks_size_and_mtime(storage_dirs, room):
+    src = storage_dirs / "lesson.mp4"
+    src.write_bytes(PAYLOAD)
+    job, duplicate = recordings.accept_delivery(room.id, RecordingIngest.Source.JIBRI, str(src))
+    assert not duplicate
+    assert recordings.accept_delivery(room.id, RecordingIngest.Source.JIBRI, str(src)) == (job, True)
+
+    src.write_bytes(PAYLOAD * 2)  # finalize перезаписал файл по тому же пути
+    os.utime(src, ns=(0, os.stat(src).st_mtime_ns + 10**9))
+    other, duplicate = recordings.accept_delivery(room.id, RecordingIngest.Source.JIBRI, str(src))
+    assert not duplicate
+    assert other.id != job.id
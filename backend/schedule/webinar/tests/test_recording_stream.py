@@ -0,0 +1,149 @@
+import datetime as dt
+import time
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from users.models import User
+from schedule.real_schedule.models import Room
+from schedule.webinar.services.delivery import parse_range, signed_stream_url, verify_stream_signature
+from schedule.webinar.views_rooms import RecordingFileView
+
+pytestmark = pytest.mark.django_db
+
+DATA = bytes(range(256)) * 8  # 2048 байт
+
+
+@pytest.fixture
+def recording(settings, tmp_path, make_lesson):
+    settings.RECORDING_LOCAL_DIR = str(tmp_path)
+    settings.RECORDING_ACCEL_REDIRECT_PREFIX = ""
+    (tmp_path / "lessons" / "5").mkdir(parents=True)
+    (tmp_path / "lessons" / "5" / "rec.mp4").write_bytes(DATA)
+    lesson = make_lesson(offset_minutes=-120)
+    return Room.objects.create(
+        type="LESSON", lesson=lesson, jitsi_room="cedar-lesson-stream",
+        scheduled_start=lesson.start, scheduled_end=lesson.start + dt.timedelta(minutes=45),
+        recording_status="READY", recording_file_url="/media/recordings/lessons/5/rec.mp4",
+    )
+
+
+def _client(user=None):
+    c = APIClient()
+    if user:
+        c.force_authenticate(user)
+    return c
+
+
+def _url(room):
+    return reverse("room-recording-stream", args=[room.id])
+
+
+def _body(res):
+    return b"".join(res.streaming_content)
+
+
+def test_teacher_gets_full_file(recording):
+    res = _client(recording.lesson.teacher).get(_url(recording))
+    assert res.status_code == 200
+    assert res["Accept-Ranges"] == "bytes"
+    assert res["Content-Length"] == str(len(DATA))
+    assert res["Content-Type"] == "video/mp4"
+    assert _body(res) == DATA
+
+
+@pytest.mark.parametrize("header,start,end", [
+    ("bytes=100-199", 100, 199),
+    ("bytes=2000-", 2000, 2047),
+    ("bytes=-48", 2000, 2047),
+    ("bytes=1000-99999", 1000, 2047),
+])
+def test_range_returns_partial_content(recording, header, start, end):
+    res = _client(recording.lesson.teacher).get(_url(recording), HTTP_RANGE=header)
+    assert res.status_code == 206
+    assert res["Content-Range"] == f"bytes {start}-{end}/{len(DATA)}"
+    assert res["Content-Length"] == str(end - start + 1)
+    assert _body(res) == DATA[start:end + 1]
+
+
+def test_unsatisfiable_range(recording):
+    res = _client(recording.lesson.teacher).get(_url(recording), HTTP_RANGE="bytes=5000-")
+    assert res.status_code == 416
+    assert res["Content-Range"] == f"bytes */{len(DATA)}"
+
+
+def test_outsider_forbidden_for_closed_lesson(recording):
+    outsider = User.objects.create_user(username="outsider", password="x", role=User.Role.STUDENT)
+    assert _client(outsider).get(_url(recording)).status_code == 403
+    assert _client().get(_url(recording)).status_code == 401
+
+    recording.is_open = True
+    recording.save(update_fields=["is_open"])
+    assert _client(outsider).get(_url(recording)).status_code == 200
+
+
+def test_signed_url_without_auth(recording):
+    teacher = recording.lesson.teacher
+    meta = _client(teacher).get(reverse("room-recording", args=[recording.id])).json()
+    res = _client().get(meta["stream_url"], HTTP_RANGE="bytes=0-9")
+    assert res.status_code == 206
+    assert _body(res) == DATA[:10]
+
+    q = parse_qs(urlparse(meta["stream_url"]).query)
+    assert not verify_stream_signature(recording.id + 1, q["exp"][0], q["sig"][0])
+    assert not verify_stream_signature(recording.id, q["exp"][0], q["sig"][0], now=time.time() + 10 ** 6)
+
+
+def test_expired_signature_rejected(recording):
+    url = signed_stream_url(recording.id, ttl=60, now=time.time() - 120)
+    assert _client().get(url).status_code == 401
+
+
+def test_outsider_gets_no_stream_url(recording):
+    outsider = User.objects.create_user(username="outsider2", password="x", role=User.Role.STUDENT)
+    meta = _client(outsider).get(reverse("room-recording", args=[recording.id])).json()
+    assert meta["stream_url"] is None and meta["file_url"] is None
+
+    # сырой путь /media/recordings/... не отдаётся никому — только подписанная ссылка
+    meta = _client(recording.lesson.teacher).get(reverse("room-recording", args=[recording.id])).json()
+    assert meta["file_url"] == meta["stream_url"]
+    assert meta["file_url"].startswith(_url(recording) + "?")
+
+
+def test_local_file_route_checks_access(recording):
+    view = RecordingFileView.as_view()
+    factory = APIRequestFactory()
+
+    def get(user=None, path="lessons/5/rec.mp4"):
+        request = factory.get(f"/media/recordings/{path}")
+        if user:
+            force_authenticate(request, user=user)
+        return view(request, path=path)
+
+    outsider = User.objects.create_user(username="outsider3", password="x", role=User.Role.STUDENT)
+    assert get().status_code == 401
+    assert get(outsider).status_code == 403
+    assert get(recording.lesson.teacher, path="lessons/5/other.mp4").status_code == 404
+    res = get(recording.lesson.teacher)
+    assert res.status_code == 200 and _body(res) == DATA
+
+
+def test_accel_redirect_offloads_to_nginx(recording, settings):
+    settings.RECORDING_ACCEL_REDIRECT_PREFIX = "/protected-recordings/"
+    res = _client(recording.lesson.teacher).get(_url(recording), HTTP_RANGE="bytes=0-9")
+    assert res.status_code == 200
+    assert res["X-Accel-Redirect"] == "/protected-recordings/lessons/5/rec.mp4"
+    assert res.content == b""
+
+
+def test_path_traversal_rejected(recording):
+    Room.objects.filter(id=recording.id).update(recording_file_url="/media/recordings/../../etc/passwd")
+    res = _client(recording.lesson.teacher).get(_url(recording))
+    assert res.status_code == 404
+
+
+def test_parse_range_ignores_multi_range():
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    assert parse_range(None, 100) is None
@@ -0,0 +1,157 @@
+import datetime as dt
+import io
+import os
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import User
+from schedule.core.models import AcademicYear, LessonType
+from schedule.real_schedule.models import Room
+from schedule.webinar.models import RecordingBlob, RecordingBlobRef, RecordingQuota, RecordingRetention
+from schedule.webinar.services.blobs import index_recording
+from schedule.webinar.services.retention import ORPHAN_GRACE, collect_garbage
+from schedule.webinar.storage import LocalRecordingStorage
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def store(settings, tmp_path):
+    settings.RECORDING_STORAGE = "LOCAL"
+    settings.RECORDING_LOCAL_DIR = str(tmp_path / "rec")
+    return LocalRecordingStorage(settings.RECORDING_LOCAL_DIR)
+
+
+@pytest.fixture
+def recorded(store, make_lesson):
+    """Урок с записью: days_ago — давность урока, data — содержимое файла."""
+    counter = iter(range(1000))
+
+    def _make(days_ago, data, lesson_type=None, keep=False):
+        n = next(counter)
+        kw = {"lesson_type": lesson_type} if lesson_type else {}
+        lesson = make_lesson(offset_minutes=-days_ago * 24 * 60, **kw)
+        room = Room.objects.create(
+            type="LESSON", lesson=lesson, jitsi_room=f"gc-{n}",
+            scheduled_start=lesson.start, scheduled_end=lesson.start + dt.timedelta(minutes=45),
+            recording_status="READY", recording_file_url=f"/media/recordings/lessons/{n}/a.mp4",
+            recording_keep=keep,
+        )
+        path = f"lessons/{n}/a.mp4"
+        saved = store.save_fileobj(io.BytesIO(data), path)
+        index_recording(room.id, path, saved)
+        RecordingBlob.objects.update(created_at=timezone.now() - ORPHAN_GRACE * 2)
+        return room
+    return _make
+
+
+def _exists(store, room):
+    ref_path = room.recording_file_url.removeprefix("/media/recordings/")
+    return os.path.exists(os.path.join(store.base_dir, ref_path))
+
+
+def test_retention_by_lesson_type_and_default(store, recorded, ref):
+    lecture = LessonType.objects.create(key="lecture", label="Лекция")
+    RecordingRetention.objects.create(retention_days=30)
+    RecordingRetention.objects.create(lesson_type=lecture, retention_days=None)  # бессрочно
+
+    old = recorded(60, b"old" * 100)
+    fresh = recorded(5, b"fresh" * 100)
+    old_lecture = recorded(60, b"lecture" * 100, lesson_type=lecture)
+    old_kept = recorded(60, b"kept" * 100, keep=True)
+
+    res = collect_garbage()
+    assert res.refs_deleted == 1
+    assert res.blobs_deleted == 1
+    assert res.bytes_freed == 300
+
+    old.refresh_from_db()
+    assert old.recording_status == "EXPIRED"
+    assert old.recording_file_url is None
+    assert not RecordingBlobRef.objects.filter(room=old).exists()
+    for room in (fresh, old_lecture, old_kept):
+        room.refresh_from_db()
+        assert room.recording_status == "READY"
+        assert _exists(store, room)
+    assert RecordingBlob.objects.count() == 3
+
+
+def test_shared_blob_survives_until_last_ref(store, recorded):
+    RecordingRetention.objects.create(retention_days=30)
+    same = b"same" * 100
+    old = recorded(60, same)
+    fresh = recorded(5, same)
+    old_path = os.path.join(store.base_dir, old.recording_file_url.removeprefix("/media/recordings/"))
+
+    res = collect_garbage()
+    assert (res.refs_deleted, res.blobs_deleted) == (1, 0)
+    assert RecordingBlob.objects.get().refcount == 1
+    assert _exists(store, fresh)
+    assert not os.path.exists(old_path)
+
+
+def test_quota_deletes_oldest_first(store, recorded):
+    today = timezone.localdate()
+    year = AcademicYear.objects.create(name="Y", start_date=today - dt.timedelta(days=300),
+                                       end_date=today + dt.timedelta(days=60))
+    RecordingQuota.objects.create(academic_year=year, quota_bytes=250)
+
+    oldest = recorded(40, b"a" * 100)
+    kept = recorded(30, b"b" * 100, keep=True)
+    middle = recorded(20, b"c" * 100)
+    newest = recorded(10, b"d" * 100)
+
+    res = collect_garbage()
+    assert len(res.over_quota) == 2
+    for room, status in ((oldest, "EXPIRED"), (kept, "READY"), (middle, "EXPIRED"), (newest, "READY")):
+        room.refresh_from_db()
+        assert room.recording_status == status
+
+
+def test_dry_run_and_batches(store, recorded):
+    RecordingRetention.objects.create(retention_days=1)
+    for i in range(5):
+        recorded(10, f"r{i}".encode() * 50)
+
+    dry = collect_garbage(dry_run=True)
+    assert len(dry.expired) == 5
+    assert RecordingBlobRef.objects.count() == 5
+
+    pauses = []
+    res = collect_garbage(batch_size=2, pause=0.1, sleep=pauses.append)
+    assert res.refs_deleted == 5
+    assert len(pauses) == 3 + 3  # 3 пачки ссылок + 3 пачки blob'ов
+
+
+def test_command(store, recorded, capsys):
+    RecordingRetention.objects.create(retention_days=1)
+    recorded(10, b"x" * 10)
+    call_command("recordings_gc", "--pause", "0")
+    assert "refs_deleted=1" in capsys.readouterr().out
+
+
+def test_usage_endpoint(store, recorded, django_assert_max_num_queries):
+    same = b"s" * 100
+    recorded(5, same)
+    recorded(6, same)
+    recorded(7, b"u" * 50)
+    admin = User.objects.create_user(username="adm", password="x", is_staff=True)
+    client = APIClient()
+    client.force_authenticate(admin)
+
+    with django_assert_max_num_queries(10):
+        data = client.get(reverse("recordings-usage")).json()
+    assert data["total"] == {"files": 3, "bytes": 250, "blobs": 2, "stored_bytes": 150}
+    assert data["by_grade"][0]["bytes"] == 250
+    assert data["orphans"] == {"blobs": 0, "bytes": 0}
+
+
+def test_usage_requires_staff(ref):
+    user = User.objects.create_user(username="plain", password="x")
+    client = APIClient()
+    client.force_authenticate(user)
+    assert client.get(reverse("recordings-usage")).status_code == 403
@@ -0,0 +1,74 @@
+import datetime as dt
+import pytest
+from rest_framework.test import APIClient
+
+from users.models import User
+from schedule.real_schedule.models import Room
+
+pytestmark = pytest.mark.django_db
+
+
+def _room(lesson, **kwargs):
+    return Room.objects.create(
+        type="LESSON", lesson=lesson, jitsi_room=f"cedar-lesson-{lesson.id}",
+        scheduled_start=lesson.start,
+        scheduled_end=lesson.start + dt.timedelta(minutes=lesson.duration_minutes),
+        join_url="https://jitsi.school.edu/x", **kwargs,
+    )
+
+
+def test_by_lesson_get_does_not_write_status(make_lesson, ref):
+    lesson = make_lesson(offset_minutes=5)
+    room = _room(lesson)  # в БД SCHEDULED, по окну уже OPEN
+    api = APIClient()
+    api.force_authenticate(ref[2])
+
+    r = api.get(f"/api/rooms/by-lesson/{lesson.id}/")
+    assert r.status_code == 200
+    assert r.json()["status"] == "OPEN" and r.json()["is_join_allowed_now"] is True
+    room.refresh_from_db()
+    assert room.status == "SCHEDULED"
+
+
+def test_by_lesson_get_never_creates_room(make_lesson, ref):
+    lesson = make_lesson(offset_minutes=5)  # окно уже открыто, но комнату создаёт maintenance
+    api = APIClient()
+    api.force_authenticate(ref[2])
+    r = api.get(f"/api/rooms/by-lesson/{lesson.id}/")
+    assert r.status_code == 200 and r.json()["detail"] == "Room not available yet"
+    assert not Room.objects.exists()
+    assert api.post(f"/api/rooms/by-lesson/{lesson.id}/").status_code == 403
+
+
+def test_by_lesson_post_provisions_for_staff(make_lesson):
+    lesson = make_lesson(offset_minutes=600)
+    api = APIClient()
+    api.force_authenticate(User.objects.create_superuser(username="adm", password="x"))
+    r = api.post(f"/api/rooms/by-lesson/{lesson.id}/")
+    assert r.status_code == 201 and r.json()["lesson"] == lesson.id
+    assert api.post(f"/api/rooms/by-lesson/{lesson.id}/").status_code == 200  # повтор — без второй комнаты
+    assert Room.objects.filter(lesson=lesson).count() == 1
+    assert api.get(f"/api/rooms/by-lesson/{lesson.id}/").json()["id"] == r.json()["id"]
+
+
+def test_live_status_annotation_filters(make_lesson):
+    open_room = _room(make_lesson(offset_minutes=5))
+    later = _room(make_lesson(offset_minutes=120))
+    ended = _room(make_lesson(offset_minutes=-120))
+    overridden = _room(make_lesson(offset_minutes=0), status_override="CLOSED")
+
+    rows = dict(Room.objects.with_live_status().values_list("id", "live_status"))
+    assert rows == {open_room.id: "OPEN", later.id: "SCHEDULED",
+                    ended.id: "ENDED", overridden.id: "CLOSED"}
+    assert list(Room.objects.with_live_status().filter(live_status="OPEN")) == [open_room]
+    for room in Room.objects.with_live_status():
+        assert room.compute_live_status() == Room.objects.get(id=room.id).compute_live_status()
+
+
+def test_close_sets_override(make_lesson):
+    room = _room(make_lesson(offset_minutes=0))
+    admin = User.objects.create_superuser(username="adm", password="x")
+    api = APIClient()
+    api.force_authenticate(admin)
+    body = api.post(f"/api/rooms/{room.id}/close/").json()
+    assert body["status"] == "CLOSED" and body["is_join_allowed_now"] is False
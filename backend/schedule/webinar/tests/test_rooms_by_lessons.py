@@ -0,0 +1,88 @@
+import datetime as dt
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from users.models import ParentChild, User
+from schedule.core.models import Grade, StudentSubject
+from schedule.webinar.services.auto import _room_for_lesson
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def lessons(ref, make_lesson):
+    """Урок с открытой комнатой, урок без комнаты и урок другого класса."""
+    subj, grade, teacher, _ = ref
+    live = make_lesson(offset_minutes=5)
+    _room_for_lesson(live.id, live.start, live.duration_minutes, False).save()
+    later = make_lesson(offset_minutes=120)
+    other_grade = Grade.objects.create(name="6B")
+    other_teacher = User.objects.create_user(username="t2", password="x", role=User.Role.TEACHER)
+    foreign = make_lesson(offset_minutes=10, grade=other_grade, teacher=other_teacher)
+    return live, later, foreign
+
+
+def _get(user, **params):
+    c = APIClient()
+    c.force_authenticate(user)
+    return c.get(reverse("rooms-by-lessons"), params)
+
+
+def _ids(lessons):
+    return ",".join(str(getattr(x, "id", x)) for x in lessons)
+
+
+def test_teacher_sees_own_lessons_with_state(ref, lessons):
+    live, later, foreign = lessons
+    data = _get(ref[2], ids=_ids(lessons)).json()
+    rows = {r["lesson_id"]: r for r in data["results"]}
+    assert set(rows) == {live.id, later.id}
+
+    assert rows[live.id]["room_id"] == live.room.id
+    assert rows[live.id]["status"] == "OPEN"
+    assert rows[live.id]["is_join_allowed_now"] is True
+    assert rows[later.id]["room_id"] is None
+    assert rows[later.id]["status"] == "SCHEDULED"
+    assert rows[later.id]["is_join_allowed_now"] is False
+
+
+def test_student_and_parent_use_my_acl(ref, lessons):
+    subj, grade, _, _ = ref
+    student = User.objects.create_user(username="st", password="x", role=User.Role.STUDENT)
+    parent = User.objects.create_user(username="pa", password="x", role=User.Role.PARENT)
+    StudentSubject.objects.create(student=student, subject=subj, grade=grade)
+    ParentChild.objects.create(parent=parent, child=student)
+    expected = {lessons[0].id, lessons[1].id}
+
+    for user in (student, parent):
+        rows = _get(user, ids=_ids(lessons)).json()["results"]
+        assert {r["lesson_id"] for r in rows} == expected
+
+    outsider = User.objects.create_user(username="out", password="x", role=User.Role.STUDENT)
+    assert _get(outsider, ids=_ids(lessons)).json()["count"] == 0
+
+
+def test_unknown_role_forbidden(lessons):
+    user = User.objects.create_user(username="plain", password="x")
+    user.role = "GUEST"
+    assert _get(user, ids=_ids(lessons)).status_code == 403
+
+
+def test_single_query_for_range(ref, lessons, django_assert_num_queries):
+    director = User.objects.create_user(username="dir", password="x", role=User.Role.DIRECTOR)
+    today = timezone.localdate()
+    c = APIClient()
+    c.force_authenticate(director)
+    with django_assert_num_queries(1):
+        res = c.get(reverse("rooms-by-lessons"), {
+            "from": (today - dt.timedelta(days=1)).isoformat(),
+            "to": (today + dt.timedelta(days=1)).isoformat(),
+        })
+    assert res.json()["count"] == 3
+
+
+def test_too_many_ids(ref):
+    assert _get(ref[2], ids=_ids(range(501))).status_code == 400
@@ -0,0 +1,93 @@
+import datetime as dt
+import pytest
+from django.utils import timezone
+
+from schedule.real_schedule.models import Room
+from schedule.webinar.services.scheduler import RoomScheduler
+
+pytestmark = pytest.mark.django_db
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = timezone.now()
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += dt.timedelta(seconds=seconds)
+
+
+def _status(lesson):
+    room = Room.objects.filter(lesson=lesson).first()
+    return room.status if room else None
+
+
+def test_scheduler_transitions_on_deadlines(make_lesson):
+    clock = FakeClock()
+    lesson = make_lesson(offset_minutes=20, duration=45)
+    s = RoomScheduler(clock=clock, sleep=clock.sleep, refresh_seconds=3600)
+
+    s.step()
+    assert _status(lesson) is None
+    # ближайший дедлайн — создание комнаты за 15 минут до старта
+    assert s.next_wakeup() == lesson.start - dt.timedelta(minutes=15)
+
+    clock.now = s.next_wakeup()
+    s.step()
+    assert _status(lesson) == "SCHEDULED"
+
+    # за 10 минут до старта — прогрев join-payload'ов
+    assert s.next_wakeup() == lesson.start - dt.timedelta(minutes=10)
+    clock.now = s.next_wakeup()
+    s.step()
+
+    clock.now = lesson.start
+    s.step()
+    assert _status(lesson) == "OPEN"
+
+    clock.now = lesson.start + dt.timedelta(minutes=45 + 10)
+    s.step()
+    assert _status(lesson) == "CLOSED"
+    assert s.metrics.ticks == 4 and s.metrics.max_lateness_ms == 0
+
+
+def test_scheduler_picks_up_changed_lessons_incrementally(make_lesson):
+    clock = FakeClock()
+    lesson = make_lesson(offset_minutes=120)
+    s = RoomScheduler(clock=clock, sleep=clock.sleep, refresh_seconds=30)
+    assert s.refresh() == 1
+
+    # урок перенесли ближе — после refresh дедлайн обновился, старый пропускается
+    lesson.start = clock.now + dt.timedelta(minutes=10)
+    lesson.save()
+    assert s.refresh() == 1
+    assert s.next_wakeup() <= clock.now + dt.timedelta(seconds=30)
+    s.run_due()
+    assert _status(lesson) == "SCHEDULED"
+
+    # неизменённые уроки повторно не грузятся в очередь
+    size = len(s._heap)
+    s.refresh()
+    assert len(s._heap) == size
+
+
+def test_scheduler_drops_lessons_moved_beyond_horizon(make_lesson):
+    clock = FakeClock()
+    lesson = make_lesson(offset_minutes=20)
+    s = RoomScheduler(clock=clock, sleep=clock.sleep, refresh_seconds=30, ahead_hours=48)
+    s.refresh()
+
+    # урок перенесли на неделю вперёд — дедлайны старого времени не срабатывают
+    lesson.start = clock.now + dt.timedelta(days=7)
+    lesson.save()
+    assert s.refresh() == 1
+    clock.now += dt.timedelta(minutes=90)
+    assert s.run_due() == 0
+    assert _status(lesson) is None
+
+    # когда урок снова входит в горизонт, он планируется заново
+    clock.now = lesson.start - dt.timedelta(hours=47)
+    s.refresh()
+    assert lesson.id in s._sig
@@ -0,0 +1,220 @@
+import hashlib
+import os
+import threading
+import types
+
+import pytest
+
+from schedule.webinar import storage
+
+
+class FakeTransport:
+    def __init__(self):
+        self.active = True
+
+    def is_active(self):
+        return self.active
+
+
+class FakeClient:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.closed = False
+
+    def get_transport(self):
+        return self.transport
+
+    def close(self):
+        self.closed = True
+
+
+class FakeSFTPFile:
+    """Обёртка над локальным файлом с API paramiko.SFTPFile."""
+
+    def __init__(self, path, mode):
+        self._f = open(path, mode)
+        self.pipelined = False
+
+    def set_pipelined(self, pipelined=True):
+        self.pipelined = pipelined
+
+    def prefetch(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+
+class FakeSFTP:
+    """Локальная замена SFTP-сервера: удалённые пути отображаются в каталог root."""
+
+    def __init__(self, root, stats):
+        self.root = root
+        self.stats = stats
+
+    def _local(self, path):
+        return os.path.join(self.root, path.lstrip("/"))
+
+    def stat(self, path):
+        self.stats["stat"] += 1
+        return os.stat(self._local(path))
+
+    def mkdir(self, path):
+        self.stats["mkdir"] += 1
+        os.mkdir(self._local(path))
+
+    def open(self, path, mode="r"):
+        self.stats["open"] += 1
+        return FakeSFTPFile(self._local(path), mode)
+
+    def posix_rename(self, src, dst):
+        os.replace(self._local(src), self._local(dst))
+
+    def rename(self, src, dst):
+        if os.path.exists(self._local(dst)):
+            raise IOError("Failure")  # SFTP v3: целевой файл не перезаписывается
+        os.rename(self._local(src), self._local(dst))
+
+    def remove(self, path):
+        os.remove(self._local(path))
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def sftp_server(tmp_path, monkeypatch):
+    stats = {"connect": 0, "stat": 0, "mkdir": 0, "open": 0}
+    clients = []
+    lock = threading.Lock()
+
+    def fake_connect(self):
+        with lock:
+            stats["connect"] += 1
+        client = FakeClient()
+        clients.append(client)
+        return client, FakeSFTP(str(tmp_path / "remote"), stats)
+
+    (tmp_path / "remote").mkdir()
+    monkeypatch.setattr(storage, "paramiko", types.SimpleNamespace())
+    monkeypatch.setattr(storage.SFTPRecordingStorage, "_connect", fake_connect)
+    monkeypatch.setattr(storage, "_pools", {})
+    return types.SimpleNamespace(root=tmp_path / "remote", stats=stats, clients=clients)
+
+
+def _storage(**kw):
+    return storage.SFTPRecordingStorage(
+        host="sftp.local", port=22, username="u", password="p",
+        base_dir="/data/rec", public_base="https://files.example.com/rec", **kw,
+    )
+
+
+def _src(tmp_path, size):
+    data = os.urandom(size)
+    path = tmp_path / "src.mp4"
+    path.write_bytes(data)
+    return str(path), data
+
+
+def test_sessions_and_dirs_are_reused(sftp_server, tmp_path):
+    src, data = _src(tmp_path, 3000)
+    for i in range(3):
+        saved = _storage().save_local_path(src, f"lessons/7/{i}.mp4")
+        assert saved.size == 3000
+    assert saved.public_url == "https://files.example.com/rec/lessons/7/2.mp4"
+
+    assert sftp_server.stats["connect"] == 1
+    assert sftp_server.stats["mkdir"] == 4  # /data, /data/rec, /data/rec/lessons, /data/rec/lessons/7
+    stats_before = sftp_server.stats["stat"]
+    _storage().save_local_path(src, "lessons/7/3.mp4")
+    assert sftp_server.stats["stat"] == stats_before + 1  # только проверка размера
+    assert (sftp_server.root / "data/rec/lessons/7/3.mp4").read_bytes() == data
+    assert not (sftp_server.root / "data/rec/lessons/7/3.mp4.part").exists()
+
+
+def test_dead_session_is_replaced(sftp_server, tmp_path):
+    src, _ = _src(tmp_path, 100)
+    _storage().save_local_path(src, "a.mp4")
+    sftp_server.clients[0].transport.active = False
+    _storage().save_local_path(src, "b.mp4")
+    assert sftp_server.stats["connect"] == 2
+    assert sftp_server.clients[0].closed
+
+
+@pytest.fixture
+def ranges(monkeypatch):
+    monkeypatch.setattr(storage.SFTPRecordingStorage, "CHUNK_SIZE", 1024)
+    calls = []
+    real_upload = storage.SFTPRecordingStorage._upload_range
+
+    def spy(self, src_path, tmp_path, offset, length):
+        calls.append((offset, length))
+        real_upload(self, src_path, tmp_path, offset, length)
+        if self.damage:
+            self.damage(self, tmp_path, offset, length)
+
+    monkeypatch.setattr(storage.SFTPRecordingStorage, "damage", None, raising=False)
+    monkeypatch.setattr(storage.SFTPRecordingStorage, "_upload_range", spy)
+    return calls
+
+
+@pytest.mark.parametrize("verify", ["size", "sha256"])
+def test_parallel_upload_matches_source(sftp_server, tmp_path, ranges, verify):
+    src, data = _src(tmp_path, 10_000)
+    st = _storage(parallel_streams=3, parallel_threshold=4096, verify=verify)
+    saved = st.save_local_path(src, "lessons/9/big.mp4")
+
+    assert saved.size == len(data)
+    assert sorted(ranges) == [(0, 4096), (4096, 4096), (8192, 1808)]  # выровнено по CHUNK_SIZE
+    remote = (sftp_server.root / "data/rec/lessons/9/big.mp4").read_bytes()
+    assert hashlib.sha256(remote).digest() == hashlib.sha256(data).digest()
+
+
+def test_size_mismatch_removes_partial_upload(sftp_server, tmp_path, ranges):
+    src, _ = _src(tmp_path, 8000)
+    st = _storage(parallel_streams=2, parallel_threshold=1024)
+
+    def lose_tail(self, tmp, offset, length):
+        if offset + length == 8000:
+            with self.pool.session() as sftp, sftp.open(tmp, "r+b") as f:
+                f.truncate(offset + 10)
+    st.damage = lose_tail
+
+    with pytest.raises(IOError, match="size mismatch"):
+        st.save_local_path(src, "x.mp4")
+    assert not list(sftp_server.root.rglob("x.mp4*"))
+
+
+def test_checksum_mismatch_detected(sftp_server, tmp_path, ranges):
+    src, _ = _src(tmp_path, 8000)
+    st = _storage(parallel_streams=2, parallel_threshold=1024, verify="sha256")
+
+    def flip_byte(self, tmp, offset, length):
+        if offset == 0:
+            with self.pool.session() as sftp, sftp.open(tmp, "r+b") as f:
+                f.seek(5)
+                f.write(b"\x00\x01")
+    st.damage = flip_byte
+
+    with pytest.raises(IOError, match="checksum mismatch"):
+        st.save_local_path(src, "y.mp4")
+    assert not list(sftp_server.root.rglob("y.mp4*"))
+
+
+def test_rename_fallback_without_posix_rename(sftp_server, tmp_path, monkeypatch):
+    def unsupported(self, src, dst):
+        raise IOError("Operation unsupported")
+
+    monkeypatch.setattr(FakeSFTP, "posix_rename", unsupported)
+    src, _ = _src(tmp_path, 100)
+    _storage().save_local_path(src, "a.mp4")
+    src, data = _src(tmp_path, 200)
+    _storage().save_local_path(src, "a.mp4")  # перезапись существующего файла
+    assert (sftp_server.root / "data/rec/a.mp4").read_bytes() == data
+    assert not (sftp_server.root / "data/rec/a.mp4.part").exists()
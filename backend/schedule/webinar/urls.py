@@ -1,8 +1,9 @@
 # backend/schedule/webinar/urls.py
 from django.urls import path
-from .views import JaasRecordingWebhookView, RoomRecordingUploadedView
+from .views import JaasRecordingWebhookView, JitsiPresenceWebhookView, RoomRecordingUploadedView
 
 urlpatterns = [
     path("webhooks/jaas/recording/", JaasRecordingWebhookView.as_view(), name="jaas-recording-webhook"),
+    path("webhooks/jitsi/presence/", JitsiPresenceWebhookView.as_view(), name="jitsi-presence-webhook"),
     path("rooms/<int:room_id>/recording/uploaded/", RoomRecordingUploadedView.as_view(), name="room-recording-uploaded"),
 ]
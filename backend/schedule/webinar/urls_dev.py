@@ -1,6 +1,7 @@
 from django.urls import path
-from .views_dev import DevMakeDummyRecordingView
+from .views_dev import DevMakeDummyRecordingView, DevPresenceStubView
 
 urlpatterns = [
     path("recordings/make-dummy/", DevMakeDummyRecordingView.as_view(), name="dev-make-dummy"),
+    path("presence/", DevPresenceStubView.as_view(), name="dev-presence-stub"),
 ]
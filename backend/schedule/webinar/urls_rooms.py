@@ -1,19 +1,26 @@
 # backend/schedule/webinar/urls_rooms.py
 from django.urls import path
 from .views_rooms import (
-    RoomByLessonView, RoomRetrieveView,
-    MeetingCreateView, RoomCloseView, RecordingMetaView,
+    RoomByLessonView, RoomsByLessonsView, RoomRetrieveView,
+    MeetingCreateView, RoomCloseView, RecordingMetaView, RecordingStreamView, RecordingUsageView, RoomCapacityView,
     RoomJoinView, PublicRoomJoinView, OpenLessonsFeedView
 )
+from .views_events import EventsTicketView, events_stream
 
 urlpatterns = [
     path("by-lesson/<int:lesson_id>/", RoomByLessonView.as_view(), name="room-by-lesson"),
+    path("by-lessons/", RoomsByLessonsView.as_view(), name="rooms-by-lessons"),
     path("<int:room_id>/", RoomRetrieveView.as_view(), name="room-retrieve"),
     path("meeting/", MeetingCreateView.as_view(), name="room-meeting-create"),
     path("<int:room_id>/close/", RoomCloseView.as_view(), name="room-close"),
     path("<int:room_id>/recording/", RecordingMetaView.as_view(), name="room-recording"),
+    path("<int:room_id>/recording/stream/", RecordingStreamView.as_view(), name="room-recording-stream"),
     path("<int:room_id>/join/", RoomJoinView.as_view(), name="room-join"),
     path("public/<slug:slug>/join/", PublicRoomJoinView.as_view(), name="room-public-join"),
+    path("recordings/usage/", RecordingUsageView.as_view(), name="recordings-usage"),
+    path("capacity/", RoomCapacityView.as_view(), name="rooms-capacity"),
     path("open-lessons/", OpenLessonsFeedView.as_view(), name="open-lessons"),
+    path("events/", events_stream, name="room-events"),
+    path("events/ticket/", EventsTicketView.as_view(), name="room-events-ticket"),
 ]
 
@@ -5,12 +5,18 @@ from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 
 
-from schedule.webinar.services.recordings import (
-    recording_uploaded_from_jaas,
-    recording_uploaded_from_jibri,
-)
+from schedule.webinar.models import RecordingIngest
+from schedule.webinar.services.attendance import ingest_jitsi_events
+from schedule.webinar.services.recordings import accept_delivery
 from schedule.real_schedule.models import Room
 
+def _accepted(job: RecordingIngest, duplicate: bool = False) -> JsonResponse:
+    """202 — задание поставлено; 200 — повтор доставки: то же задание и его результат."""
+    if not duplicate:
+        return JsonResponse({"status": job.status, "ingest_id": job.id}, status=202)
+    return JsonResponse({"status": job.status, "ingest_id": job.id, "duplicate": True,
+                         "result_url": job.result_url}, status=200)
+
 class JaasRecordingWebhookView(APIView):
     """
     JaaS webhook payload example:
@@ -19,6 +25,8 @@ class JaasRecordingWebhookView(APIView):
       "preAuthenticatedLink": "https://.../download?sig=...",
       "fileExt": "mp4"
     }
+    Скачивание идёт в воркере recording_ingest; здесь только постановка в очередь → 202.
+    Повтор той же ссылки (ретрай провайдера) не качает файл заново → 200 с тем же заданием.
     """
     permission_classes = [AllowAny]
 
@@ -36,13 +44,13 @@ class JaasRecordingWebhookView(APIView):
             return JsonResponse({"detail": "room_id and preAuthenticatedLink are required"}, status=400)
 
         try:
-            room = recording_uploaded_from_jaas(int(room_id), link, file_ext=ext)
+            job, duplicate = accept_delivery(int(room_id), RecordingIngest.Source.JAAS, link, file_ext=ext)
         except Room.DoesNotExist:
             return JsonResponse({"detail": "Room not found"}, status=404)
         except Exception as e:
             return JsonResponse({"detail": str(e)}, status=500)
 
-        return JsonResponse({"status": room.recording_status, "file_url": room.recording_file_url}, status=200)
+        return _accepted(job, duplicate)
 
 class RoomRecordingUploadedView(APIView):
     """
@@ -52,6 +60,7 @@ class RoomRecordingUploadedView(APIView):
       "file_path": "/var/jibri/recordings/lesson-456.mp4",
       "file_ext": "mp4"  # optional
     }
+    Копирование в хранилище идёт в воркере recording_ingest; ответ — 202.
     """
     permission_classes = [AllowAny]
 
@@ -68,10 +77,28 @@ class RoomRecordingUploadedView(APIView):
             return JsonResponse({"detail": "file_path is required"}, status=400)
 
         try:
-            room = recording_uploaded_from_jibri(int(room_id), file_path, file_ext=file_ext)
+            job, duplicate = accept_delivery(int(room_id), RecordingIngest.Source.JIBRI, file_path, file_ext=file_ext)
         except Room.DoesNotExist:
             return JsonResponse({"detail": "Room not found"}, status=404)
         except Exception as e:
             return JsonResponse({"detail": str(e)}, status=500)
 
-        return JsonResponse({"status": room.recording_status, "file_url": room.recording_file_url}, status=200)
+        return _accepted(job, duplicate)
+
+class JitsiPresenceWebhookView(APIView):
+    """
+    Вебхук присутствия Jitsi (prosody mod_event_sync или локальная заглушка):
+    один объект, список или { "events": [...] } с muc-occupant-joined / muc-occupant-left.
+    События только дописываются в журнал одним bulk_create; посещаемость считает
+    агрегатор после закрытия комнаты → 202.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request, *args, **kwargs):
+        secret = request.headers.get("X-Presence-Secret", "")
+        configured = getattr(settings, "JITSI_PRESENCE_SECRET", None)
+        if configured and secret != configured:
+            return HttpResponse(status=403)
+
+        accepted = ingest_jitsi_events(request.data)
+        return JsonResponse({"accepted": accepted}, status=202)
@@ -2,8 +2,14 @@ from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from django.conf import settings
+from django.shortcuts import get_object_or_404
+from datetime import timedelta
 import os
 
+from schedule.real_schedule.models import Room
+from .services.attendance import ingest_jitsi_events
+from .services.join import build_role_maps
+
 class DevMakeDummyRecordingView(APIView):
     permission_classes = [AllowAny]
 
@@ -22,3 +28,36 @@ class DevMakeDummyRecordingView(APIView):
         with open(path, "wb") as f:
             f.write(b"\0" * (size_mb * 1024 * 1024))
         return Response({"file_path": path, "size_bytes": size_mb * 1024 * 1024}, status=201)
+
+
+class DevPresenceStubView(APIView):
+    """
+    POST /api/dev/presence/ — заглушка Jitsi: генерирует muc-occupant-joined/left
+    и прогоняет их через тот же разбор, что и вебхук присутствия.
+    body: { "room_id": 1, "user_ids": [..] (по умолчанию — ученики урока),
+            "join_offset_min": 0, "leave_offset_min": <длительность> }  — смещения от начала урока
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        if not settings.DEBUG:
+            return Response({"detail": "Not allowed in production"}, status=403)
+
+        room = get_object_or_404(Room.objects.select_related("lesson"), id=request.data.get("room_id"))
+        if not (room.scheduled_start and room.scheduled_end):
+            return Response({"detail": "Room has no schedule"}, status=400)
+        user_ids = request.data.get("user_ids")
+        if user_ids is None:
+            roles = build_role_maps([room]).get(room.id, {})
+            user_ids = [uid for uid, (role, _) in roles.items() if role == "participant"]
+        duration = (room.scheduled_end - room.scheduled_start).total_seconds() / 60
+        joined = room.scheduled_start + timedelta(minutes=float(request.data.get("join_offset_min") or 0))
+        left = room.scheduled_start + timedelta(minutes=float(request.data.get("leave_offset_min") or duration))
+
+        events = []
+        for uid in user_ids:
+            occupant = {"id": str(uid), "occupant_jid": f"{room.jitsi_room}@conference/stub-{uid}",
+                        "joined_at": int(joined.timestamp()), "left_at": int(left.timestamp())}
+            events.append({"event_name": "muc-occupant-joined", "room_name": room.jitsi_room, "occupant": occupant})
+            events.append({"event_name": "muc-occupant-left", "room_name": room.jitsi_room, "occupant": occupant})
+        return Response({"accepted": ingest_jitsi_events(events)}, status=201)
@@ -0,0 +1,53 @@
+# backend/schedule/webinar/views_events.py
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.models import User
+from schedule.real_schedule.services.visibility import audience_for
+from .services.events import signed_events_url, stream_events, verify_events_signature
+
+
+class EventsTicketView(APIView):
+    """
+    GET /api/rooms/events/ticket/
+    Подписанная ссылка на SSE-поток текущего пользователя (EventSource не шлёт Bearer).
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        if audience_for(request.user) is None:
+            return Response({"detail": "FORBIDDEN"}, status=403)
+        return Response({"url": signed_events_url(request.user.id)}, status=200)
+
+
+async def events_stream(request):
+    """
+    GET /api/rooms/events/?uid=…&exp=…&sig=…
+    text/event-stream: room.status, recording.status, lesson.changed — только по видимым урокам
+    (правило /api/real_schedule/my/) и открытым комнатам. Переподключение с Last-Event-ID
+    догоняет пропущенное. Отдаётся только под ASGI (config/asgi.py, сервис events в compose):
+    WSGI (gunicorn, runserver) вычитывает асинхронный поток целиком до отправки — такой
+    запрос висел бы вечно, поэтому под WSGI сразу 503 ASGI_REQUIRED.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({"detail": "ASGI_REQUIRED"}, status=503)
+    uid = request.GET.get("uid", "")
+    if not (uid.isdigit() and verify_events_signature(int(uid), request.GET.get("exp"), request.GET.get("sig"))):
+        return JsonResponse({"detail": "Invalid or expired signature"}, status=401)
+    user = await User.objects.filter(id=int(uid), is_active=True).afirst()
+    if user is None:
+        return JsonResponse({"detail": "Invalid or expired signature"}, status=401)
+    audience = await sync_to_async(audience_for)(user)
+    if audience is None:
+        return JsonResponse({"detail": "FORBIDDEN"}, status=403)
+
+    raw_last = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id") or ""
+    last_id = int(raw_last) if raw_last.isdigit() else None
+    response = StreamingHttpResponse(stream_events(user, audience, last_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # nginx: не буферизовать поток
+    return response
@@ -10,9 +10,19 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.response import Response
 
-from schedule.real_schedule.models import RealLesson, Room  # модель Room пока остаётся здесь
-from schedule.real_schedule.serializers import RoomSerializer, RealLessonSerializer  # используем уже готовый сериализатор
-from .services.join import build_join_payload
+from schedule.real_schedule.models import (  # модель Room пока остаётся здесь
+    RealLesson, Room, ROOM_OPEN_BEFORE, ROOM_CLOSE_AFTER, room_window_status,
+)
+from schedule.real_schedule.serializers import RoomSerializer  # используем уже готовый сериализатор
+from schedule.real_schedule.services.visibility import visible_lessons
+from schedule.core.services import date_windows as dw
+from .services.attendance import record_join_click
+from .services.auto import provision_rooms
+from .services.capacity import capacity_forecast, materialize_range
+from .services.join import build_join_payload, can_view_recording
+from .services.delivery import LOCAL_URL_PREFIX, serve_recording, signed_stream_url, verify_stream_signature
+from .services.feed import get_open_lessons_feed, window_minutes
+from .services.retention import recording_usage
 
 def _gen_room_name(prefix: str) -> str:
     return f"cedar-{prefix}-{uuid.uuid4().hex[:6]}"
@@ -21,25 +31,28 @@ def _window_status(scheduled_start, scheduled_end):
     """
     Возвращает ('SCHEDULED'|'OPEN'|'ENDED', available_from, available_until)
     """
-    now = timezone.now()
-    available_from = scheduled_start - timedelta(minutes=15)
-    available_until = scheduled_end + timedelta(minutes=10)
-    if now < available_from:
-        return "SCHEDULED", available_from, available_until
-    if now > available_until:
-        return "ENDED", available_from, available_until
-    return "OPEN", available_from, available_until
+    available_from = scheduled_start - ROOM_OPEN_BEFORE
+    available_until = scheduled_end + ROOM_CLOSE_AFTER
+    return room_window_status(scheduled_start, scheduled_end), available_from, available_until
 
 
 class RoomByLessonView(APIView):
     """
-    GET /api/rooms/by-lesson/{lesson_id}/?force=1
-    Возвращает комнату типа LESSON, создаёт автоматически:
-      • если текущее время >= (start - 15мин), ИЛИ
-      • если ?force=1 и пользователь staff (для MVP).
+    GET  /api/rooms/by-lesson/{lesson_id}/ — комната типа LESSON; только чтение.
+         Комнаты создаёт maintenance (webinar_scheduler, start-15m) — пока её нет,
+         ответ «Room not available yet» с окном доступности.
+    POST /api/rooms/by-lesson/{lesson_id}/ — staff: создать комнату сейчас (provision_rooms).
     """
     permission_classes = [IsAuthenticated]
 
+    def post(self, request, lesson_id: int):
+        if not request.user.is_staff:
+            return Response({"detail": "FORBIDDEN"}, status=403)
+        get_object_or_404(RealLesson, id=lesson_id)
+        created = provision_rooms(RealLesson.objects.filter(pk=lesson_id))
+        room = Room.objects.get(type="LESSON", lesson_id=lesson_id)
+        return Response(RoomSerializer(room, context={"request": request}).data, status=201 if created else 200)
+
     def get(self, request, lesson_id: int):
         lesson = get_object_or_404(RealLesson, id=lesson_id)
 
@@ -50,43 +63,13 @@ class RoomByLessonView(APIView):
         scheduled_end = scheduled_start + timedelta(minutes=lesson.duration_minutes)
 
         room = Room.objects.filter(type="LESSON", lesson_id=lesson_id).first()
-
-        force = request.query_params.get("force") in ("1", "true", "yes", "on")
-        status_val, available_from, available_until = _window_status(scheduled_start, scheduled_end)
-        now = timezone.now()
-
-        should_create = False
-        if room is None:
-            if force and request.user.is_staff:
-                should_create = True
-            elif now >= available_from:
-                should_create = True
-
-        if should_create:
-            name = _gen_room_name(f"lesson-{lesson_id}")
-            status_val, _, _ = _window_status(scheduled_start, scheduled_end)
-            room = Room.objects.create(
-                type="LESSON",
-                lesson_id=lesson_id,
-                jitsi_room=name,
-                jitsi_env="SELF_HOSTED",  # по умолчанию
-                is_open=getattr(lesson, "is_open", False),
-                status=status_val,
-                scheduled_start=scheduled_start,
-                scheduled_end=scheduled_end,
-                join_url=f"https://{Room._meta.get_field('jitsi_domain').default}/{name}",
-                auto_manage=True,
-            )
+        _, available_from, available_until = _window_status(scheduled_start, scheduled_end)
 
         if room:
-            # поддержим автоматическое обновление статуса при чтении
-            new_status, _, _ = _window_status(room.scheduled_start, room.scheduled_end)
-            if new_status != room.status:
-                room.status = new_status
-                room.save(update_fields=["status"])
-            return Response(RoomSerializer(room).data, status=200)
-
-        # Рано — окно ещё не открылось, и force не разрешён
+            # статус в ответе вычисляется на чтении (live_status), в БД его пишет только maintenance
+            return Response(RoomSerializer(room, context={"request": request}).data, status=200)
+
+        # Комнату ещё не создал maintenance (или урок вне окна)
         return Response({
             "detail": "Room not available yet",
             "lesson_id": lesson_id,
@@ -95,6 +78,66 @@ class RoomByLessonView(APIView):
         }, status=200)
 
 
+class RoomsByLessonsView(APIView):
+    """
+    GET /api/rooms/by-lessons/?ids=1,2,3   или   ?from=YYYY-MM-DD&to=YYYY-MM-DD
+    Состояние комнат сразу для пачки уроков (календарь): один запрос уроков с их Room.
+    Видимость уроков — как в /api/real_schedule/my/; чужие id молча отбрасываются.
+    Комнаты не создаёт: у урока без комнаты room_id=null, статус — по окну урока.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_IDS = 500
+
+    def get(self, request):
+        qs = RealLesson.objects.select_related("room")
+
+        raw_ids = request.query_params.get("ids")
+        if raw_ids is not None:
+            ids = {int(x) for x in raw_ids.split(",") if x.strip().isdigit()}
+            if len(ids) > self.MAX_IDS:
+                return Response({"detail": f"Too many ids (max {self.MAX_IDS})"}, status=400)
+            qs = qs.filter(id__in=ids)
+        else:
+            raw_from = request.query_params.get("from")
+            raw_to = request.query_params.get("to")
+            if not raw_from and not raw_to:
+                d_from, d_to = dw.get_default_school_week()
+            else:
+                d_from, d_to = dw.parse_from_to_dates(raw_from, raw_to)
+            try:
+                from_dt, to_dt_excl = dw.validate_and_materialize_range(d_from, d_to)
+            except ValueError as e:
+                return Response({"detail": str(e)}, status=400)
+            qs = qs.filter(start__gte=from_dt, start__lt=to_dt_excl)
+
+        qs = visible_lessons(qs, request.user, request.query_params.get("children"))
+        if qs is None:
+            return Response({"detail": "FORBIDDEN"}, status=403)
+
+        now = timezone.now()
+        results = []
+        for lesson in qs.order_by("start", "id"):
+            room = getattr(lesson, "room", None)
+            start = lesson.start
+            end = start + timedelta(minutes=lesson.duration_minutes or 0)
+            if room is not None:
+                start, end = room.scheduled_start or start, room.scheduled_end or end
+                status_val = room.compute_live_status(now)
+            else:
+                status_val = room_window_status(start, end, now)
+            results.append({
+                "lesson_id": lesson.id,
+                "room_id": room.id if room else None,
+                "status": status_val,
+                "available_from": start - ROOM_OPEN_BEFORE,
+                "available_until": end + ROOM_CLOSE_AFTER,
+                "is_join_allowed_now": room is not None and status_val == "OPEN",
+                "is_open": room.is_open if room else lesson.is_open,
+                "public_slug": room.public_slug if room else None,
+            })
+        return Response({"count": len(results), "results": results}, status=200)
+
+
 class RoomRetrieveView(APIView):
     """
     GET /api/rooms/{id}/ — отдать любую комнату по id (в т.ч. MEETING).
@@ -103,7 +146,7 @@ class RoomRetrieveView(APIView):
 
     def get(self, request, room_id: int):
         room = get_object_or_404(Room, id=room_id)
-        return Response(RoomSerializer(room).data, status=200)
+        return Response(RoomSerializer(room, context={"request": request}).data, status=200)
 
 
 class MeetingCreateView(APIView):
@@ -145,7 +188,7 @@ class MeetingCreateView(APIView):
         if room.is_open and not room.public_slug:
             room.public_slug = slugify(room.jitsi_room)
             room.save(update_fields=["public_slug"])
-        return Response(RoomSerializer(room).data, status=201)
+        return Response(RoomSerializer(room, context={"request": request}).data, status=201)
 
 class RoomJoinView(APIView):
     """
@@ -161,6 +204,7 @@ class RoomJoinView(APIView):
         payload = build_join_payload(room, user=request.user, enforce_closed_access=True)
         if payload.get("error") == "forbidden":
             return Response({"detail": "Join is not allowed"}, status=403)
+        record_join_click(room, request.user)
         return Response(payload, status=200)
 
 class PublicRoomJoinView(APIView):
@@ -186,9 +230,10 @@ class RoomCloseView(APIView):
     def post(self, request, room_id: int):
         room = get_object_or_404(Room, id=room_id)
         room.status = "CLOSED"
+        room.status_override = "CLOSED"
         room.ended_at = timezone.now()
-        room.save(update_fields=["status", "ended_at"])
-        return Response(RoomSerializer(room).data, status=200)
+        room.save(update_fields=["status", "status_override", "ended_at"])
+        return Response(RoomSerializer(room, context={"request": request}).data, status=200)
 
 
 class RecordingMetaView(APIView):
@@ -199,27 +244,122 @@ class RecordingMetaView(APIView):
 
     def get(self, request, room_id: int):
         room = get_object_or_404(Room, id=room_id)
+        job = room.recording_ingests.order_by("-id").first()
+        ready = room.recording_status == "READY" and bool(room.recording_file_url)
+        # подписанная ссылка для плеера (Range/seek), только тем, кому запись доступна;
+        # сырой путь файла наружу не отдаётся
+        url = signed_stream_url(room.id) if ready and can_view_recording(room, request.user) else None
         return Response({
             "status": room.recording_status,
-            "file_url": room.recording_file_url,
+            "file_url": url,
+            "stream_url": url,
             "started_at": room.recording_started_at,
             "ended_at": room.recording_ended_at,
             "duration_secs": room.recording_duration_secs,
+            # последнее задание приёма записи (очередь recording_ingest)
+            "ingest": {
+                "id": job.id,
+                "status": job.status,
+                "attempts": job.attempts,
+                "max_attempts": job.max_attempts,
+                "bytes_done": job.bytes_done,
+                "bytes_total": job.bytes_total,
+                "next_attempt_at": job.next_attempt_at,
+                "last_error": job.last_error or None,
+            } if job else None,
         }, status=200)
 
+class RecordingStreamView(APIView):
+    """
+    GET /api/rooms/{id}/recording/stream/[?exp=...&sig=...]
+    Отдаёт файл записи с поддержкой Range (206). Доступ — по подписанной ссылке
+    из /recording/ или по авторизации с проверкой прав на урок.
+    Байты отдаёт nginx (X-Accel-Redirect) либо sendfile через wsgi.file_wrapper.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, room_id: int):
+        room = get_object_or_404(Room, id=room_id)
+        signed = verify_stream_signature(room.id, request.GET.get("exp"), request.GET.get("sig"))
+        if not signed:
+            if not request.user.is_authenticated:
+                return Response({"detail": "Authentication required"}, status=401)
+            if not can_view_recording(room, request.user):
+                return Response({"detail": "Forbidden"}, status=403)
+        if room.recording_status != "READY":
+            return Response({"detail": "Recording is not ready"}, status=404)
+        return serve_recording(request, room)
+
+class RecordingFileView(APIView):
+    """
+    GET /media/recordings/<path>  (DEV, SERVE_RECORDINGS_VIA_DJANGO)
+    Локальный файл записи — с той же проверкой прав, что у /recording/stream/.
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, path: str):
+        room = Room.objects.filter(recording_file_url=LOCAL_URL_PREFIX + path).select_related("lesson").first()
+        if room is None:
+            return Response({"detail": "Not found"}, status=404)
+        if not request.user.is_authenticated:
+            return Response({"detail": "Authentication required"}, status=401)
+        if not can_view_recording(room, request.user):
+            return Response({"detail": "Forbidden"}, status=403)
+        return serve_recording(request, room)
+
+class RecordingUsageView(APIView):
+    """
+    GET /api/rooms/recordings/usage/
+    Объём записей: всего, по классам, типам уроков и учебным годам (с квотами).
+    Считается агрегатами по индексу blob'ов, без обхода диска.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(recording_usage(), status=200)
+
+class RoomCapacityView(APIView):
+    """
+    GET /api/rooms/capacity/?from=YYYY-MM-DD&to=YYYY-MM-DD&bucket=5&series=1
+    Прогноз нагрузки на видеосерверы: пик одновременных комнат и ожидаемых участников
+    по корзинам bucket минут (sweep line по урокам, см. services/capacity.py).
+    Диапазон — до года; по умолчанию текущая учебная неделя.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        raw_from = request.query_params.get("from")
+        raw_to = request.query_params.get("to")
+        if not raw_from and not raw_to:
+            d_from, d_to = dw.get_default_school_week()
+        else:
+            d_from, d_to = dw.parse_from_to_dates(raw_from, raw_to)
+        try:
+            from_dt, to_dt = materialize_range(d_from, d_to)
+            bucket = int(request.query_params.get("bucket", 5))
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=400)
+        if not 1 <= bucket <= 24 * 60:
+            return Response({"detail": "bucket must be 1..1440 minutes"}, status=400)
+
+        with_series = request.query_params.get("series", "1") not in ("0", "false", "no", "off")
+        return Response(capacity_forecast(from_dt, to_dt, bucket, with_series=with_series), status=200)
+
 class OpenLessonsFeedView(APIView):
     """
     GET /api/rooms/open-lessons/
       Параметры:
         - all=1                → игнорировать окно времени (всё)
-        - since_hours=<int>    → сколько часов назад брать (по умолчанию 0.1667 ≈ 10 минут)
-        - hours=<int>          → сколько часов вперёд (по умолчанию 48)
-    Логика:
-      1) Берём RealLesson.is_open=True в окне времени.
-         Если нет Room — создаём SCHEDULED с public_slug.
+        - since_hours=<float>  → сколько часов назад брать (по умолчанию 0.1667 ≈ 10 минут)
+        - hours=<float>        → сколько часов вперёд (по умолчанию 48)
+        Окно — 0..FEED_MAX_HOURS, округляется вверх до шага (feed.window_minutes);
+        nan/inf → 400 INVALID_HOURS.
+    Логика (только чтение, см. services/feed.py):
+      1) RealLesson.is_open=True в окне времени вместе с их Room одним join'ом.
+         Комнаты не создаём — это делает maintenance; у урока без комнаты room_id=null.
       2) Плюсом добавляем уже существующие Room(type='LESSON', is_open=True) в этом же окне.
          (Чтобы показать открытые комнаты, даже если урок не помечен is_open.)
-      3) Дедуп по lesson_id/room_id.
+      3) Ответ кэшируется по минутной корзине окна с коротким TTL.
     """
     permission_classes = [AllowAny]
 
@@ -237,78 +377,16 @@ class OpenLessonsFeedView(APIView):
             hours = 48.0
 
         if all_flag:
-            since = now - timedelta(days=3650)
-            until = now + timedelta(days=3650)
+            since_delta = until_delta = timedelta(days=3650)
+            cache_tag = "all"
         else:
-            since = now - timedelta(hours=since_hours)
-            until = now + timedelta(hours=hours)
-
-        items = []
-        seen_room_ids = set()
-        seen_lesson_ids = set()
-
-        # 1) Уроки is_open=True
-        lessons = (RealLesson.objects
-                   .select_related("subject","grade","teacher")
-                   .filter(is_open=True, start__gte=since, start__lte=until)
-                   .order_by("start"))
-
-        for lesson in lessons:
-            seen_lesson_ids.add(lesson.id)
-            room = Room.objects.filter(type="LESSON", lesson_id=lesson.id).first()
-            if not room:
-                start = lesson.start
-                end = start + timedelta(minutes=lesson.duration_minutes or 0)
-                jitsi_room = f"cedar-lesson-{lesson.id}"
-                domain_default = Room._meta.get_field("jitsi_domain").default
-                room = Room.objects.create(
-                    type="LESSON",
-                    lesson_id=lesson.id,
-                    jitsi_room=jitsi_room,
-                    jitsi_env="SELF_HOSTED",
-                    is_open=True,
-                    status="SCHEDULED",
-                    scheduled_start=start,
-                    scheduled_end=end,
-                    join_url=f"https://{domain_default}/{jitsi_room}",
-                    auto_manage=True,
-                )
-                if not room.public_slug:
-                    room.public_slug = slugify(room.jitsi_room)
-                    room.save(update_fields=["public_slug"])
-
-            items.append({
-                "room_id": room.id,
-                "public_slug": room.public_slug,
-                "status": room.status,
-                "scheduled_start": room.scheduled_start,
-                "scheduled_end": room.scheduled_end,
-                "lesson": RealLessonSerializer(lesson).data,
-            })
-            seen_room_ids.add(room.id)
-
-        # 2) Фолбэк: открытые комнаты в том же окне (могут быть без is_open у урока)
-        rooms = (Room.objects
-                 .select_related("lesson","lesson__subject","lesson__grade","lesson__teacher")
-                 .filter(type="LESSON", is_open=True,
-                         scheduled_start__lte=until, scheduled_end__gte=since)
-                 .order_by("scheduled_start"))
-
-        for r in rooms:
-            if r.id in seen_room_ids:
-                continue
-            lesson = r.lesson
-            # Если есть lesson и он уже добавлен как открытый — пропустим
-            if lesson and lesson.id in seen_lesson_ids:
-                continue
-            items.append({
-                "room_id": r.id,
-                "public_slug": r.public_slug,
-                "status": r.status,
-                "scheduled_start": r.scheduled_start,
-                "scheduled_end": r.scheduled_end,
-                "lesson": RealLessonSerializer(lesson).data if lesson else None,
-            })
-            seen_room_ids.add(r.id)
-
-        return Response(items, status=200)
\ No newline at end of file
+            try:
+                since_minutes, until_minutes = window_minutes(since_hours), window_minutes(hours)
+            except ValueError:
+                return Response({"detail": "INVALID_HOURS"}, status=400)
+            since_delta = timedelta(minutes=since_minutes)
+            until_delta = timedelta(minutes=until_minutes)
+            cache_tag = f"{since_minutes}:{until_minutes}"
+
+        items = get_open_lessons_feed(now, since_delta, until_delta, cache_tag)
+        return Response(items, status=200)
@@ -30,6 +30,12 @@ export default defineConfig({
     port: 5173,
     allowedHosts: ['.ngrok-free.app'],
     proxy: {
+      // SSE-поток событий отдаёт ASGI-сервис events (docker-compose), не runserver
+      '/api/rooms/events/': {
+        target: 'http://localhost:8001',
+        changeOrigin: true,
+        secure: false,
+      },
       '/api': {
         target: 'http://localhost:8000',
         changeOrigin: true,